@@ -0,0 +1,103 @@
+"""
+Micro-benchmark: scalar vs. vectorized BM25 scoring.
+
+Compares the per-document path used by hybrid search before batching
+(calculate_corpus_stats + calculate_score per candidate) with
+BM25Scorer.calculate_scores_batch at 50 / 500 / 5000 candidates. The batch
+path is reported cold (empty tokenizer cache) and warm (candidates already
+seen by a previous query).
+
+Run from the code/python directory:
+
+    python benchmark/bm25_benchmark.py [--repeat N]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core.bm25 import BM25Scorer
+
+CANDIDATE_COUNTS = [50, 500, 5000]
+
+# Vocabulary loosely resembling Taiwanese tech/business news
+VOCABULARY = [
+    '台積電', '半導體', '零售', '數位轉型', '人工智慧', '生成式', '金融科技', '電動車',
+    '供應鏈', '晶片', '雲端', '資安', '新創', '投資', '市場', '政策', '能源', '物流',
+    'AI', 'cloud', 'retail', 'fintech', 'walmart', 'tsmc', 'nvidia', 'data',
+]
+
+QUERY = '台積電 AI 晶片 最新 供應鏈'
+
+
+def make_document(rng: random.Random, length: int) -> str:
+    title = ''.join(rng.choice(VOCABULARY) for _ in range(4))
+    body = ' '.join(rng.choice(VOCABULARY) for _ in range(length))
+    return f"{title} {title} {title} {body}"
+
+
+def run_scalar(scorer: BM25Scorer, query_tokens, documents):
+    avg_doc_length, term_doc_counts = scorer.calculate_corpus_stats(
+        [{'name': '', 'description': doc} for doc in documents]
+    )
+    return [
+        scorer.calculate_score(query_tokens, doc, avg_doc_length, len(documents), term_doc_counts)
+        for doc in documents
+    ]
+
+
+def run_batch(scorer: BM25Scorer, query_tokens, documents):
+    return scorer.calculate_scores_batch(query_tokens, documents)
+
+
+def run_batch_cold(scorer: BM25Scorer, query_tokens, documents):
+    scorer.tokenizer.clear()
+    return scorer.calculate_scores_batch(query_tokens, documents)
+
+
+def time_it(fn, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per measurement (median is reported)')
+    parser.add_argument('--doc-length', type=int, default=300, help='Words per synthetic document body')
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    scorer = BM25Scorer()
+    query_tokens = scorer.tokenize(QUERY)
+
+    print("=" * 64)
+    print(f"BM25 scoring benchmark (query: {QUERY!r}, median of {args.repeat})")
+    print("=" * 64)
+    print(f"{'candidates':>10} | {'scalar (ms)':>11} | {'cold (ms)':>9} | {'warm (ms)':>9} | {'speedup':>7} | max |Δ|")
+
+    for count in CANDIDATE_COUNTS:
+        documents = [make_document(rng, args.doc_length) for _ in range(count)]
+
+        scalar_scores = run_scalar(scorer, query_tokens, documents)
+        batch_scores = run_batch_cold(scorer, query_tokens, documents)
+        max_diff = max(abs(a - b) for a, b in zip(scalar_scores, batch_scores))
+
+        scalar_time = time_it(lambda: run_scalar(scorer, query_tokens, documents), args.repeat)
+        cold_time = time_it(lambda: run_batch_cold(scorer, query_tokens, documents), args.repeat)
+        warm_time = time_it(lambda: run_batch(scorer, query_tokens, documents), args.repeat)
+
+        print(f"{count:>10} | {scalar_time * 1000:>11.1f} | {cold_time * 1000:>9.1f} | {warm_time * 1000:>9.1f} | "
+              f"{scalar_time / cold_time:>6.1f}x | {max_diff:.2e}")
+
+
+if __name__ == '__main__':
+    main()
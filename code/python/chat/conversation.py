@@ -508,6 +508,13 @@ class ConversationManager:
                 await asyncio.gather(*self._persistence_tasks, return_exceptions=True)
             except Exception as e:
                 logger.error(f"Error waiting for persistence tasks: {e}")
+        
+        # Write out any buffered storage appends
+        if self.storage and hasattr(self.storage, 'close'):
+            try:
+                await self.storage.close()
+            except Exception as e:
+                logger.error(f"Error closing storage: {e}")
     
     @staticmethod
     def create_message(
@@ -33,6 +33,9 @@ class ChatMetrics:
         # Queue depth metrics
         self._queue_depths = {}
         
+        # Outbound send lag per WebSocket connection
+        self._send_stats: Dict[str, Dict[str, Any]] = {}
+        
         # Conversation pattern metrics
         self._conversation_patterns = {
             "single_human": 0,
@@ -148,6 +151,94 @@ class ChatMetrics:
                 "queues_near_limit": sum(1 for d in depths if d > 900)  # Assuming 1000 limit
             }
     
+    def _connection_send_stats(self, connection_id: str) -> Dict[str, Any]:
+        stats = self._send_stats.get(connection_id)
+        if stats is None:
+            stats = {
+                "frames_sent": 0,
+                "total_lag": 0.0,
+                "max_lag": 0.0,
+                "last_lag": 0.0,
+                "queue_depth": 0,
+                "peak_queue_depth": 0,
+                "coalesced": 0,
+                "dropped": 0,
+                "overflows": 0
+            }
+            self._send_stats[connection_id] = stats
+        return stats
+    
+    def record_frame_sent(self, connection_id: str, lag: float, queue_depth: int) -> None:
+        """
+        Record a frame written to a WebSocket connection.
+        
+        Args:
+            connection_id: The connection ID
+            lag: Seconds between the frame being queued and written
+            queue_depth: Frames still waiting in the connection's send queue
+        """
+        with self._lock:
+            stats = self._connection_send_stats(connection_id)
+            stats["frames_sent"] += 1
+            stats["total_lag"] += lag
+            stats["max_lag"] = max(stats["max_lag"], lag)
+            stats["last_lag"] = lag
+            stats["queue_depth"] = queue_depth
+    
+    def record_frame_queued(self, connection_id: str, queue_depth: int) -> None:
+        """Record the send queue depth after a frame was queued."""
+        with self._lock:
+            stats = self._connection_send_stats(connection_id)
+            stats["queue_depth"] = queue_depth
+            stats["peak_queue_depth"] = max(stats["peak_queue_depth"], queue_depth)
+    
+    def record_frame_skipped(self, connection_id: str, reason: str) -> None:
+        """
+        Record a frame that was not sent to a slow connection.
+        
+        Args:
+            connection_id: The connection ID
+            reason: "coalesced" (replaced by a newer chunk), "dropped" (queue full)
+                    or "overflows" (queue full of frames that cannot be dropped)
+        """
+        with self._lock:
+            self._connection_send_stats(connection_id)[reason] += 1
+    
+    def forget_connection(self, connection_id: str) -> None:
+        """Stop reporting send lag for a closed connection."""
+        with self._lock:
+            self._send_stats.pop(connection_id, None)
+    
+    def get_send_lag_stats(self) -> Dict[str, Any]:
+        """
+        Get outbound send lag statistics.
+        
+        Returns:
+            Per-connection lag (ms), queue depths and skipped frames, plus totals
+        """
+        with self._lock:
+            connections = {}
+            for connection_id, stats in self._send_stats.items():
+                sent = stats["frames_sent"]
+                connections[connection_id] = {
+                    "frames_sent": sent,
+                    "avg_lag_ms": stats["total_lag"] / sent * 1000 if sent > 0 else 0,
+                    "max_lag_ms": stats["max_lag"] * 1000,
+                    "last_lag_ms": stats["last_lag"] * 1000,
+                    "queue_depth": stats["queue_depth"],
+                    "peak_queue_depth": stats["peak_queue_depth"],
+                    "coalesced": stats["coalesced"],
+                    "dropped": stats["dropped"],
+                    "overflows": stats["overflows"]
+                }
+            return {
+                "connections": connections,
+                "max_lag_ms": max((c["max_lag_ms"] for c in connections.values()), default=0),
+                "max_queue_depth": max((c["queue_depth"] for c in connections.values()), default=0),
+                "frames_coalesced": sum(c["coalesced"] for c in connections.values()),
+                "frames_dropped": sum(c["dropped"] for c in connections.values())
+            }
+    
     def track_conversation_pattern(self, conversation_id: str, human_count: int) -> None:
         """
         Track multi-human conversation patterns.
@@ -201,5 +292,6 @@ class ChatMetrics:
             "connections": self.get_connection_stats(),
             "queues": self.get_queue_stats(),
             "conversation_patterns": self.get_conversation_patterns(),
+            "send_lag": self.get_send_lag_stats(),
             "timestamp": datetime.utcnow().isoformat()
         }
\ No newline at end of file
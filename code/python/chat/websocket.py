@@ -6,10 +6,11 @@ import asyncio
 import json
 import time
 from datetime import datetime, timedelta
-from typing import Dict, List, Set, Optional, Any
+from typing import Deque, Dict, List, Set, Optional, Any, Tuple
 from dataclasses import dataclass
 from enum import Enum
-from collections import defaultdict
+from collections import defaultdict, deque
+import uuid
 import weakref
 from aiohttp import web
 import logging
@@ -19,6 +20,29 @@ from chat.metrics import ChatMetrics
 
 logger = logging.getLogger(__name__)
 
+# Streamed progress chunks that only matter until a newer one of the same kind
+# (see coalesce_key) arrives. A slow consumer gets the latest of a run of these
+# instead of every one. site_querying is not among them: each frame announces
+# a different site.
+COALESCIBLE_MESSAGE_TYPES = frozenset({
+    "intermediate_message",
+    "intermediate_result",
+    "retrieval_count",
+})
+
+
+def coalesce_key(message: Dict[str, Any]) -> Optional[Tuple[Any, ...]]:
+    """
+    Key under which a frame supersedes the previous one, or None if every frame must be delivered.
+
+    Progress chunks are only interchangeable within the same stage and site,
+    e.g. a critic_reviewing chunk must not replace analyst_complete.
+    """
+    message_type = message.get('message_type', message.get('type'))
+    if message_type not in COALESCIBLE_MESSAGE_TYPES:
+        return None
+    return (message_type, message.get('stage'), message.get('site'))
+
 
 class ConnectionState(Enum):
     """WebSocket connection states"""
@@ -53,6 +77,22 @@ class ConnectionConfig:
     ping_interval: int = 30  # seconds
     pong_timeout: int = 600  # 10 minutes
     max_retries: int = 10
+    send_queue_size: int = 256  # frames buffered per connection before dropping
+
+
+class _Frame:
+    """A pre-encoded WebSocket text frame waiting in a connection's send queue"""
+    __slots__ = ("data", "coalesce_key", "queued_at")
+
+    def __init__(self, data: str, coalesce_key: Optional[Tuple[Any, ...]], queued_at: float):
+        self.data = data
+        self.coalesce_key = coalesce_key
+        self.queued_at = queued_at
+
+
+def encode_message(message: Dict[str, Any]) -> str:
+    """Encode a message once for sending to any number of connections (same as send_json)"""
+    return json.dumps(message)
 
 
 class WebSocketConnection:
@@ -77,6 +117,15 @@ class WebSocketConnection:
         self.state = ConnectionState.CONNECTED
         self.last_pong_time = datetime.utcnow()
         self.heartbeat_task = None
+        self.connection_id = f"{participant_id}:{uuid.uuid4().hex[:8]}"
+        
+        # Broadcast frames are queued and written by a per-connection sender task
+        self.metrics: Optional[ChatMetrics] = None
+        self._send_queue: Deque[_Frame] = deque()
+        self._send_ready = asyncio.Event()
+        self._send_idle = asyncio.Event()
+        self._send_idle.set()
+        self._sender_task = None
         
     async def send_message(self, message: Dict[str, Any]) -> None:
         """Send a message to this connection"""
@@ -87,6 +136,90 @@ class WebSocketConnection:
                 logger.error(f"Error sending message to {self.user_id}: {e}")
                 self.state = ConnectionState.FAILED
     
+    def enqueue_frame(self, frame: str, coalesce_key: Optional[Tuple[Any, ...]] = None) -> bool:
+        """
+        Queue a pre-encoded frame for this connection without waiting for the write.
+        
+        When the consumer falls behind, a coalescible chunk replaces a chunk
+        with the same coalesce_key at the tail of the queue, and a full queue
+        drops its oldest coalescible chunk. A queue full of frames that cannot
+        be dropped marks the connection failed so cleanup disconnects it.
+        
+        Args:
+            frame: The encoded message
+            coalesce_key: coalesce_key(message), None if the frame must be delivered
+        
+        Returns:
+            False if the frame will not be delivered
+        """
+        if self.state != ConnectionState.CONNECTED or self.ws.closed:
+            return False
+        
+        coalescible = coalesce_key is not None
+        queue = self._send_queue
+        if coalescible and queue and queue[-1].coalesce_key == coalesce_key:
+            queue[-1].data = frame
+            self._record_skipped("coalesced")
+            return True
+        
+        if len(queue) >= self.config.send_queue_size:
+            victim = next((f for f in queue if f.coalesce_key is not None), None)
+            if victim is not None:
+                queue.remove(victim)
+                self._record_skipped("dropped")
+            elif coalescible:
+                self._record_skipped("dropped")
+                return True
+            else:
+                logger.warning(f"Send queue full for {self.user_id}, disconnecting slow consumer")
+                self._record_skipped("overflows")
+                self.state = ConnectionState.FAILED
+                queue.clear()
+                self._send_ready.set()
+                return False
+        
+        queue.append(_Frame(frame, coalesce_key, time.monotonic()))
+        if self.metrics:
+            self.metrics.record_frame_queued(self.connection_id, len(queue))
+        self._send_idle.clear()
+        self._send_ready.set()
+        if self._sender_task is None or self._sender_task.done():
+            self._sender_task = asyncio.create_task(self._send_loop())
+        return True
+    
+    def _record_skipped(self, reason: str) -> None:
+        if self.metrics:
+            self.metrics.record_frame_skipped(self.connection_id, reason)
+    
+    async def _send_loop(self) -> None:
+        """Write queued frames in order until the connection closes"""
+        queue = self._send_queue
+        try:
+            while self.state == ConnectionState.CONNECTED:
+                if not queue:
+                    self._send_idle.set()
+                    self._send_ready.clear()
+                    await self._send_ready.wait()
+                    continue
+                frame = queue.popleft()
+                try:
+                    await self.ws.send_str(frame.data)
+                except Exception as e:
+                    logger.error(f"Error sending message to {self.user_id}: {e}")
+                    self.state = ConnectionState.FAILED
+                    break
+                if self.metrics:
+                    self.metrics.record_frame_sent(
+                        self.connection_id, time.monotonic() - frame.queued_at, len(queue)
+                    )
+        finally:
+            queue.clear()
+            self._send_idle.set()
+    
+    async def drain(self, timeout: Optional[float] = None) -> None:
+        """Wait until every queued frame has been written (or dropped)"""
+        await asyncio.wait_for(self._send_idle.wait(), timeout)
+    
     async def heartbeat(self) -> None:
         """Send periodic pings to keep connection alive"""
         while self.state == ConnectionState.CONNECTED:
@@ -118,6 +251,10 @@ class WebSocketConnection:
         self.state = ConnectionState.DISCONNECTED
         if self.heartbeat_task:
             self.heartbeat_task.cancel()
+        if self._sender_task:
+            self._sender_task.cancel()
+        if self.metrics:
+            self.metrics.forget_connection(self.connection_id)
         if not self.ws.closed:
             await self.ws.close()
 
@@ -205,6 +342,7 @@ class WebSocketManager:
         )
         
         # Store connection
+        connection.metrics = self.metrics
         self._connections[conversation_id][user_id] = connection
         
         # Start heartbeat
@@ -243,46 +381,36 @@ class WebSocketManager:
     ) -> None:
         """
         Broadcast a message to all participants in a conversation.
-        O(N) complexity where N is number of participants.
+        
+        The message is JSON-encoded once and the frame is queued on every
+        recipient's connection; each connection's sender task writes it, so
+        a slow participant neither blocks the caller nor the others.
         
         Args:
             conversation_id: The conversation ID
             message: Message to broadcast
             exclude_user_id: Optional user to exclude (usually the sender)
         """
-        
-        if conversation_id not in self._connections:
+        connections = self._connections.get(conversation_id)
+        if not connections:
             return
         
-        # Get all connections for conversation
-        connections = self._connections[conversation_id]
-        
-        # Debug: log what we're doing (commented out for performance)
-        # print(f"[WebSocket] Broadcasting to conversation {conversation_id}")
-        # print(f"[WebSocket] Exclude user: {exclude_user_id}")
-        # print(f"[WebSocket] Active connections: {list(connections.keys())}")
-        
-        # Send to all participants except excluded
-        tasks = []
-        msg_type = message.get('message_type', message.get('type', 'unknown'))
-        # Handle content as either string or object
-        content = message.get('content', '')
-        if isinstance(content, dict):
-            msg_content = content.get('query', 'NO_CONTENT')[:50] if content.get('query') else 'NO_CONTENT'
-        elif isinstance(content, str):
-            msg_content = content[:50] if content else 'NO_CONTENT'
-        else:
-            msg_content = str(content)[:50] if content else 'NO_CONTENT'
-        sender = message.get('sender_info', {}).get('id', 'unknown') if message.get('sender_info') else 'unknown'
-        
-        
+        frame = None
+        key = coalesce_key(message)
         for user_id, connection in connections.items():
             if user_id != exclude_user_id:
-                tasks.append(connection.send_message(message))
-        
-        # Send all messages concurrently
-        if tasks:
-            await asyncio.gather(*tasks, return_exceptions=True)
+                if frame is None:
+                    frame = encode_message(message)
+                connection.enqueue_frame(frame, key)
+    
+    async def flush_conversation(self, conversation_id: str, timeout: Optional[float] = None) -> None:
+        """Wait until broadcasts queued for a conversation have been written"""
+        connections = list(self._connections.get(conversation_id, {}).values())
+        if connections:
+            await asyncio.gather(
+                *(connection.drain(timeout) for connection in connections),
+                return_exceptions=True
+            )
     
     def get_connection_count(self, conversation_id: str) -> int:
         """Get number of active connections for a conversation"""
@@ -365,7 +493,8 @@ class WebSocketManager:
             "connections_per_conversation": connections_per_conv,
             "messages_per_second": 0,  # TODO: Implement message rate tracking
             "average_queue_depth": avg_queue_depth,
-            "max_queue_depth": max(self._queue_sizes.values()) if self._queue_sizes else 0
+            "max_queue_depth": max(self._queue_sizes.values()) if self._queue_sizes else 0,
+            "send_lag": self.metrics.get_send_lag_stats()
         }
     
     async def broadcast_to_conversation(
@@ -408,6 +537,7 @@ class WebSocketManager:
         if conversation_id not in self._connections:
             self._connections[conversation_id] = {}
         
+        connection.metrics = self.metrics
         self._connections[conversation_id][connection.participant_id] = connection
         
         # Start heartbeat
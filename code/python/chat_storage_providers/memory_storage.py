@@ -1,138 +1,331 @@
 """
 In-memory storage implementation for chat system.
 Used for development and testing.
+
+Messages are indexed per conversation in bounded ring buffers, so reading the
+recent context of one conversation does not depend on the history of all the
+others. With persist_to_disk, each conversation has its own append log
+(storage_path/conversations/<conversation_id>.jsonl):
+
+- appends are buffered and written by a background flush task, fsynced at
+  most every fsync_interval seconds
+- a conversation's log is loaded the first time that conversation is used,
+  not at startup; only the newest max_messages_per_conversation messages are
+  kept in memory, the log keeps the full history
+
+Truncating history on disk is opt-in: with max_log_messages_per_conversation
+set, a log that grows past twice that size is rewritten to its newest
+max_log_messages_per_conversation messages.
+
+A legacy single messages.jsonl is split into per-conversation logs once, on
+first use.
 """
 
-from typing import Dict, List, Optional
+from typing import Deque, Dict, List, Optional, Set
+from collections import deque
+from itertools import islice
+from urllib.parse import quote
 import asyncio
 import json
+import logging
+import os
+import time
 from pathlib import Path
 
 from core.schemas import Message
 from chat.storage import SimpleChatStorageInterface
 
+logger = logging.getLogger(__name__)
+
 
 class MemoryStorage(SimpleChatStorageInterface):
     """
     Simple in-memory implementation of chat storage.
-    Stores messages in a list and persists to JSONL file.
+    Keeps recent messages per conversation and persists them to per-conversation JSONL logs.
     """
-    
+
     def __init__(self, config: Dict):
         """
         Initialize memory storage.
-        
+
         Args:
             config: Storage configuration
         """
         self.config = config
         # Note: queue_size_limit not used in simple storage
-        
+
         # Storage configuration
         self.enable_storage = config.get('enable_storage', True)  # Default to True - storage enabled for upload endpoint
         self.persist_to_disk = config.get('persist_to_disk', True)
         self.storage_path = Path(config.get('storage_path', 'data/chat_storage'))
-        
-        # Storage structures
-        self._messages: List[Message] = []
-        
-        # Load existing data from disk if available
+        self.max_messages_per_conversation = config.get('max_messages_per_conversation', 1000)
+        # Messages kept in a conversation's log when compacting; None keeps the full history
+        self.max_log_messages = config.get('max_log_messages_per_conversation')
+        self.flush_interval = config.get('flush_interval', 0.2)  # seconds between log writes
+        self.fsync_interval = config.get('fsync_interval', 1.0)  # seconds between fsyncs
+        self.conversations_path = self.storage_path / 'conversations'
+
+        # Storage structures: conversation_id -> most recent messages
+        self._conversations: Dict[Optional[str], Deque[Message]] = {}
+        self._loading: Dict[Optional[str], asyncio.Task] = {}
+
+        # Append log state
+        self._pending: Dict[Optional[str], List[str]] = {}
+        self._log_lines: Dict[Optional[str], int] = {}
+        self._needs_compaction: Set[Optional[str]] = set()
+        self._unsynced: Set[Path] = set()
+        self._last_fsync = time.monotonic()
+        self._write_lock: Optional[asyncio.Lock] = None
+        self._flush_task: Optional[asyncio.Task] = None
+        self._migration_task: Optional[asyncio.Task] = None
+
         if self.persist_to_disk:
             # Create storage directory if it doesn't exist
-            self.storage_path.mkdir(parents=True, exist_ok=True)
-            # Load data synchronously during init
-            asyncio.create_task(self._load_from_disk())
-    
+            self.conversations_path.mkdir(parents=True, exist_ok=True)
+
     async def store_message(self, message: Message) -> None:
         """
-        Store a message - simply append to list and file.
-        
+        Store a message - append to its conversation and queue it for the log.
+
         Args:
             message: The message to store
         """
         if not self.enable_storage:
             return  # Skip storage if disabled
-        
-        # Append message
-        self._messages.append(message)
-        
-        # Append to disk immediately
+
+        conversation_id = message.conversation_id
+        messages = await self._get_buffer(conversation_id)
+        messages.append(message)
+
         if self.persist_to_disk:
-            await self._append_message_to_disk(message)
-    
+            self._pending.setdefault(conversation_id, []).append(json.dumps(message.to_dict()))
+            self._log_lines[conversation_id] = self._log_lines.get(conversation_id, 0) + 1
+            if self._log_too_long(conversation_id):
+                self._needs_compaction.add(conversation_id)
+            if self._flush_task is None or self._flush_task.done():
+                self._flush_task = asyncio.create_task(self._flush_loop())
+
     async def get_conversation_messages(
-        self, 
-        conversation_id: str, 
+        self,
+        conversation_id: str,
         limit: int = 100,
         after_sequence_id: Optional[int] = None
     ) -> List[Message]:
         """
-        Get messages for a conversation - filter from the list.
-        
+        Get the most recent messages for a conversation.
+
         Args:
             conversation_id: The conversation ID
             limit: Maximum number of messages to return
             after_sequence_id: Ignored in simple implementation
-            
+
         Returns:
             List of messages in order they were added
         """
-        # Filter messages for this conversation
-        conv_messages = [m for m in self._messages if m.conversation_id == conversation_id]
-        
-        # Apply limit (return most recent messages)
-        if len(conv_messages) > limit:
-            conv_messages = conv_messages[-limit:]
-        
-        return conv_messages
-    
+        messages = await self._get_buffer(conversation_id)
+
+        # Walk back from the newest message, so cost depends on limit only
+        recent = list(islice(reversed(messages), limit))
+        recent.reverse()
+        return recent
+
     async def clear_all(self) -> None:
         """
         Clear all data from memory storage.
         Used for test cleanup.
         """
-        self._messages.clear()
-        
+        self._conversations.clear()
+        self._pending.clear()
+        self._log_lines.clear()
+        self._needs_compaction.clear()
+
         # Clear persisted data
         if self.persist_to_disk:
-            msg_file = self.storage_path / 'messages.jsonl'
-            if msg_file.exists():
-                # Clear the file by opening in write mode
-                with open(msg_file, 'w') as f:
-                    pass  # Empty file
-    
-    async def _append_message_to_disk(self, message: Message) -> None:
-        """Append message to messages.jsonl file"""
-        try:
-            msg_file = self.storage_path / 'messages.jsonl'
-            
-            # Write the message as-is using to_dict()
-            with open(msg_file, 'a') as f:
-                f.write(json.dumps(message.to_dict()) + '\n')
-                
-        except Exception as e:
-            # Log error silently
-            pass
-    
-    async def _load_from_disk(self) -> None:
-        """Load persisted state from disk"""
+            async with self._get_write_lock():
+                for log_file in self.conversations_path.glob('*.jsonl'):
+                    log_file.unlink()
+                self._unsynced.clear()
+                legacy_file = self.storage_path / 'messages.jsonl'
+                if legacy_file.exists():
+                    legacy_file.unlink()
+
+    async def flush(self) -> None:
+        """Write buffered messages (and pending compactions) to disk now."""
         if not self.persist_to_disk:
             return
-            
+        async with self._get_write_lock():
+            if not self._pending and not self._needs_compaction and not self._unsynced:
+                return
+            pending, self._pending = self._pending, {}
+            compactions = {cid: self._log_lines.get(cid, 0) for cid in self._needs_compaction}
+            self._needs_compaction.clear()
+
+            fsync = time.monotonic() - self._last_fsync >= self.fsync_interval
+            try:
+                compacted = await asyncio.to_thread(self._write_logs, pending, list(compactions), fsync)
+            except Exception as e:
+                logger.error(f"Failed to write chat messages to disk: {e}")
+                compacted = {}
+            for conversation_id, line_count in compacted.items():
+                # Messages stored during the write are still pending and counted on top
+                self._log_lines[conversation_id] += line_count - compactions[conversation_id]
+            if fsync:
+                self._last_fsync = time.monotonic()
+
+    async def close(self) -> None:
+        """Stop the flush task and write everything buffered."""
+        if self._flush_task:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        self._last_fsync = 0.0
+        await self.flush()
+
+    def _get_write_lock(self) -> asyncio.Lock:
+        if self._write_lock is None:
+            self._write_lock = asyncio.Lock()
+        return self._write_lock
+
+    async def _flush_loop(self) -> None:
+        """Periodically write buffered messages until there is nothing left to write"""
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+            if not self._pending and not self._needs_compaction and not self._unsynced:
+                return
+
+    def _log_too_long(self, conversation_id: Optional[str]) -> bool:
+        return bool(self.max_log_messages) and self._log_lines.get(conversation_id, 0) > 2 * self.max_log_messages
+
+    def _log_file(self, conversation_id: Optional[str]) -> Path:
+        name = quote(conversation_id, safe='') if conversation_id else '_no_conversation'
+        return self.conversations_path / f'{name}.jsonl'
+
+    def _write_logs(
+        self,
+        pending: Dict[Optional[str], List[str]],
+        compactions: List[Optional[str]],
+        fsync: bool
+    ) -> Dict[Optional[str], int]:
+        """
+        Append to (and compact) conversation logs. Runs in a worker thread.
+
+        Returns:
+            conversation_id -> line count of each compacted log
+        """
+        for conversation_id, lines in pending.items():
+            log_file = self._log_file(conversation_id)
+            with open(log_file, 'a', encoding='utf-8') as f:
+                f.write('\n'.join(lines) + '\n')
+            self._unsynced.add(log_file)
+
+        compacted = {}
+        for conversation_id in compactions:
+            log_file = self._log_file(conversation_id)
+            if not log_file.exists():
+                continue
+            with open(log_file, 'r', encoding='utf-8') as f:
+                retained = deque((line for line in f if line.strip()), maxlen=self.max_log_messages)
+            tmp_file = log_file.with_suffix('.jsonl.tmp')
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                f.write(''.join(line if line.endswith('\n') else line + '\n' for line in retained))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_file, log_file)
+            self._unsynced.discard(log_file)
+            compacted[conversation_id] = len(retained)
+
+        if fsync:
+            for log_file in self._unsynced:
+                try:
+                    with open(log_file, 'a') as f:
+                        os.fsync(f.fileno())
+                except OSError as e:
+                    logger.warning(f"Failed to fsync {log_file}: {e}")
+            self._unsynced.clear()
+        return compacted
+
+    async def _get_buffer(self, conversation_id: Optional[str]) -> Deque[Message]:
+        """Get a conversation's ring buffer, loading its log on first use."""
+        messages = self._conversations.get(conversation_id)
+        if messages is not None:
+            return messages
+
+        if not self.persist_to_disk:
+            return self._conversations.setdefault(
+                conversation_id, deque(maxlen=self.max_messages_per_conversation)
+            )
+
+        # Concurrent first uses share one load
+        task = self._loading.get(conversation_id)
+        if task is None:
+            task = asyncio.create_task(self._load_conversation(conversation_id))
+            self._loading[conversation_id] = task
         try:
-            # Load messages from JSONL file
-            msg_file = self.storage_path / 'messages.jsonl'
-            if msg_file.exists():
-                self._messages = []
-                with open(msg_file, 'r') as f:
-                    for line in f:
-                        line = line.strip()
-                        if line:  # Skip empty lines
-                            msg_data = json.loads(line)
-                            message = Message.from_dict(msg_data)
-                            self._messages.append(message)
-            
-        except Exception as e:
-            # Don't fail if loading fails, just start fresh
-            pass
-            # Don't fail if loading fails, just start fresh
\ No newline at end of file
+            return await asyncio.shield(task)
+        finally:
+            if task.done():
+                self._loading.pop(conversation_id, None)
+
+    async def _load_conversation(self, conversation_id: Optional[str]) -> Deque[Message]:
+        if self._migration_task is None:
+            self._migration_task = asyncio.create_task(self._migrate_legacy_log())
+        await self._migration_task
+
+        messages, line_count = await asyncio.to_thread(self._read_log, conversation_id)
+        # A store that raced the load may already have created the buffer
+        existing = self._conversations.get(conversation_id)
+        if existing is not None:
+            return existing
+        self._conversations[conversation_id] = messages
+        self._log_lines[conversation_id] = self._log_lines.get(conversation_id, 0) + line_count
+        if self._log_too_long(conversation_id):
+            self._needs_compaction.add(conversation_id)
+        return messages
+
+    def _read_log(self, conversation_id: Optional[str]):
+        """Read the in-memory tail of one conversation's log. Runs in a worker thread."""
+        messages: Deque[Message] = deque(maxlen=self.max_messages_per_conversation)
+        line_count = 0
+        log_file = self._log_file(conversation_id)
+        if log_file.exists():
+            with open(log_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:  # Skip empty lines
+                        continue
+                    line_count += 1
+                    try:
+                        messages.append(Message.from_dict(json.loads(line)))
+                    except (ValueError, TypeError) as e:
+                        logger.warning(f"Skipping unreadable chat message in {log_file.name}: {e}")
+        return messages, line_count
+
+    async def _migrate_legacy_log(self) -> None:
+        """Split a legacy messages.jsonl into per-conversation logs (once)."""
+        legacy_file = self.storage_path / 'messages.jsonl'
+        if legacy_file.exists():
+            try:
+                await asyncio.to_thread(self._split_legacy_log, legacy_file)
+            except Exception as e:
+                # Don't fail if migration fails, just start fresh
+                logger.error(f"Failed to migrate {legacy_file}: {e}")
+
+    def _split_legacy_log(self, legacy_file: Path) -> None:
+        by_conversation: Dict[Optional[str], List[str]] = {}
+        with open(legacy_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    conversation_id = json.loads(line).get('conversation_id')
+                    by_conversation.setdefault(conversation_id, []).append(line)
+        for conversation_id, lines in by_conversation.items():
+            with open(self._log_file(conversation_id), 'a', encoding='utf-8') as f:
+                f.write(''.join(line + '\n' for line in lines))
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(legacy_file, legacy_file.with_name('messages.jsonl.migrated'))
+        logger.info(f"Migrated {legacy_file} into {len(by_conversation)} conversation logs")
@@ -8,8 +8,13 @@ Supports both SQLite (local development) and PostgreSQL (production on Render/Ne
 Automatically detects which database to use based on environment variables.
 """
 
+import asyncio
 import os
 import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from queue import Empty, Queue
 from typing import Any, List, Dict, Optional, Tuple
 from pathlib import Path
 from misc.logger.logging_config_helper import get_configured_logger
@@ -25,6 +30,21 @@ except ImportError:
     POSTGRES_AVAILABLE = False
     logger.warning("PostgreSQL libraries not available, falling back to SQLite")
 
+try:
+    from psycopg_pool import ConnectionPool, PoolTimeout as PsycopgPoolTimeout
+    POSTGRES_POOL_AVAILABLE = True
+except ImportError:
+    POSTGRES_POOL_AVAILABLE = False
+
+# Pooled connections per database (readers for SQLite; SQLite always has one writer)
+DEFAULT_POOL_SIZE = int(os.environ.get('ANALYTICS_DB_POOL_SIZE', 8))
+# Seconds to wait for a free pooled connection before raising PoolTimeout
+DEFAULT_POOL_TIMEOUT = 10.0
+# Statement caches: sqlite3 compiled statements per connection, and the number of
+# executions after which psycopg server-side prepares a query
+SQLITE_STATEMENT_CACHE = 256
+POSTGRES_PREPARE_THRESHOLD = 2
+
 
 def get_project_root_db_path() -> str:
     """
@@ -42,6 +62,178 @@ def get_project_root_db_path() -> str:
     return str(db_path)
 
 
+class PoolTimeout(Exception):
+    """Raised when no pooled connection becomes available within the timeout."""
+
+
+class _PoolMetrics:
+    """Thread-safe saturation counters for one connection pool."""
+
+    def __init__(self, size: int):
+        self.size = size
+        self._lock = threading.Lock()
+        self.in_use = 0
+        self.peak_in_use = 0
+        self.acquisitions = 0
+        self.waits = 0
+        self.total_wait_ms = 0.0
+        self.max_wait_ms = 0.0
+        self.timeouts = 0
+
+    def acquired(self, wait_seconds: float) -> None:
+        wait_ms = wait_seconds * 1000
+        with self._lock:
+            self.acquisitions += 1
+            self.in_use += 1
+            self.peak_in_use = max(self.peak_in_use, self.in_use)
+            # Anything above a millisecond means the pool was saturated
+            if wait_ms > 1.0:
+                self.waits += 1
+            self.total_wait_ms += wait_ms
+            self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+
+    def released(self) -> None:
+        with self._lock:
+            self.in_use -= 1
+
+    def timed_out(self) -> None:
+        with self._lock:
+            self.timeouts += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'size': self.size,
+                'in_use': self.in_use,
+                'peak_in_use': self.peak_in_use,
+                'utilization': self.in_use / self.size if self.size else 0.0,
+                'acquisitions': self.acquisitions,
+                'waits': self.waits,
+                'avg_wait_ms': round(self.total_wait_ms / self.acquisitions, 3) if self.acquisitions else 0.0,
+                'max_wait_ms': round(self.max_wait_ms, 3),
+                'timeouts': self.timeouts,
+            }
+
+
+class _QueuePool:
+    """Bounded pool of connections created lazily by `factory`."""
+
+    def __init__(self, factory, size: int, timeout: float):
+        self.factory = factory
+        self.timeout = timeout
+        self.metrics = _PoolMetrics(size)
+        self._idle: Queue = Queue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout: Optional[float] = None):
+        started = time.monotonic()
+        waited = 0.0
+        try:
+            conn = self._idle.get_nowait()
+        except Empty:
+            with self._lock:
+                create = self._created < self.metrics.size
+                if create:
+                    self._created += 1
+            if create:
+                try:
+                    conn = self.factory()
+                except Exception:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+            else:
+                try:
+                    conn = self._idle.get(timeout=self.timeout if timeout is None else timeout)
+                except Empty:
+                    self.metrics.timed_out()
+                    raise PoolTimeout(f"No connection available within {self.timeout}s "
+                                      f"(pool size {self.metrics.size})")
+                # Only time spent blocked on a saturated pool counts as waiting
+                waited = time.monotonic() - started
+        self.metrics.acquired(waited)
+        return conn
+
+    def release(self, conn, discard: bool = False) -> None:
+        self.metrics.released()
+        if discard:
+            with self._lock:
+                self._created -= 1
+            try:
+                conn.close()
+            except Exception:
+                pass
+            return
+        self._idle.put(conn)
+
+    def close(self) -> None:
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except Empty:
+                break
+            except Exception:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        stats = self.metrics.snapshot()
+        stats['idle'] = self._idle.qsize()
+        return stats
+
+
+class _PsycopgPool:
+    """psycopg_pool.ConnectionPool with the same interface and metrics as _QueuePool."""
+
+    def __init__(self, conninfo: str, size: int, timeout: float, prepare_threshold: Optional[int]):
+        self.timeout = timeout
+        self.metrics = _PoolMetrics(size)
+        self._pool = ConnectionPool(
+            conninfo,
+            min_size=1,
+            max_size=size,
+            timeout=timeout,
+            kwargs={'row_factory': dict_row, 'prepare_threshold': prepare_threshold},
+            open=True,
+        )
+
+    def acquire(self, timeout: Optional[float] = None):
+        started = time.monotonic()
+        try:
+            conn = self._pool.getconn(timeout=self.timeout if timeout is None else timeout)
+        except PsycopgPoolTimeout as e:
+            self.metrics.timed_out()
+            raise PoolTimeout(str(e)) from e
+        self.metrics.acquired(time.monotonic() - started)
+        return conn
+
+    def release(self, conn, discard: bool = False) -> None:
+        self.metrics.released()
+        if discard:
+            # The pool replaces closed connections when they are returned
+            try:
+                conn.close()
+            except Exception:
+                pass
+        self._pool.putconn(conn)
+
+    def close(self) -> None:
+        self._pool.close()
+
+    def stats(self) -> Dict[str, Any]:
+        stats = self.metrics.snapshot()
+        pool_stats = self._pool.get_stats()
+        stats['idle'] = pool_stats.get('pool_available', 0)
+        stats['requests_waiting'] = pool_stats.get('requests_waiting', 0)
+        return stats
+
+
+# Pools are shared by every AnalyticsDB pointing at the same database, so a process
+# has one SQLite writer and one bounded set of server connections
+_pools: Dict[Tuple[str, str], Dict[str, Any]] = {}
+_pools_lock = threading.Lock()
+
+
 class AnalyticsDB:
     """
     Database abstraction layer that supports both SQLite and PostgreSQL.
@@ -51,14 +243,20 @@ class AnalyticsDB:
     - ANALYTICS_DB_PATH: SQLite file path (fallback if DATABASE_URL not set)
     """
 
-    def __init__(self, db_path: str = None):
+    def __init__(self, db_path: str = None, pool_size: int = DEFAULT_POOL_SIZE,
+                 pool_timeout: float = DEFAULT_POOL_TIMEOUT):
         """
         Initialize database connection.
 
         Args:
             db_path: Path to SQLite database (used if ANALYTICS_DATABASE_URL not set).
                      If None, uses absolute path from project root.
+            pool_size: Pooled connections (PostgreSQL) or reader connections (SQLite)
+            pool_timeout: Seconds to wait for a pooled connection
         """
+        self.pool_size = pool_size
+        self.pool_timeout = pool_timeout
+
         # Use absolute path from project root if not specified
         if db_path is None:
             db_path = get_project_root_db_path()
@@ -84,6 +282,169 @@ class AnalyticsDB:
             conn.row_factory = sqlite3.Row
             return conn
 
+    def _connect_sqlite(self, writer: bool):
+        """Pooled SQLite connection: WAL, shareable across threads, larger statement cache."""
+        conn = sqlite3.connect(str(self.db_path), check_same_thread=False,
+                               cached_statements=SQLITE_STATEMENT_CACHE, timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        if not writer:
+            conn.execute("PRAGMA query_only=ON")
+        return conn
+
+    def _pool_key(self) -> Tuple[str, str]:
+        return (self.db_type, self.database_url if self.db_type == 'postgres' else str(self.db_path.resolve()))
+
+    def _get_pools(self) -> Dict[str, Any]:
+        """Get (creating on first use) the pools shared for this database."""
+        key = self._pool_key()
+        with _pools_lock:
+            pools = _pools.get(key)
+            if pools is None:
+                if self.db_type == 'postgres':
+                    if POSTGRES_POOL_AVAILABLE:
+                        pool = _PsycopgPool(self.database_url, self.pool_size, self.pool_timeout,
+                                            POSTGRES_PREPARE_THRESHOLD)
+                    else:
+                        pool = _QueuePool(self.connect, self.pool_size, self.pool_timeout)
+                    # Postgres handles concurrent writers itself
+                    pools = {'reader': pool, 'writer': pool}
+                else:
+                    pools = {
+                        'reader': _QueuePool(lambda: self._connect_sqlite(writer=False),
+                                             self.pool_size, self.pool_timeout),
+                        # A single writer connection serializes writes in this process
+                        'writer': _QueuePool(lambda: self._connect_sqlite(writer=True),
+                                             1, self.pool_timeout),
+                    }
+                _pools[key] = pools
+                logger.info(f"Analytics DB pool created ({self.db_type}, size={self.pool_size})")
+            return pools
+
+    def acquire(self, write: bool = False, timeout: Optional[float] = None):
+        """
+        Take a connection from the pool. Must be returned with release().
+
+        Args:
+            write: SQLite only - take the single writer instead of a read-only reader
+            timeout: Seconds to wait (default: pool_timeout); raises PoolTimeout
+        """
+        return self._get_pools()['writer' if write else 'reader'].acquire(timeout)
+
+    def release(self, conn, write: bool = False, discard: bool = False) -> None:
+        """Return a connection from acquire(); discard=True closes it instead of reusing it."""
+        self._release_to(self._get_pools()['writer' if write else 'reader'], conn, discard)
+
+    @staticmethod
+    def _release_to(pool, conn, discard: bool) -> None:
+        if not discard:
+            try:
+                # Never hand an open transaction to the next user
+                conn.rollback()
+            except Exception:
+                discard = True
+        pool.release(conn, discard=discard)
+
+    @contextmanager
+    def connection(self, write: bool = False):
+        """
+        Borrow a pooled connection for the duration of a `with` block.
+
+        Commits on success and rolls back on error, like psycopg_pool. Safe to
+        use from worker threads; from coroutines use run_sync/fetch_all instead.
+        """
+        # Hold on to the pool so the connection goes back where it came from
+        pool = self._get_pools()['writer' if write else 'reader']
+        conn = pool.acquire()
+        discard = False
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            try:
+                conn.rollback()
+            except Exception:
+                discard = True
+            raise
+        finally:
+            self._release_to(pool, conn, discard)
+
+    async def run_sync(self, func, *args, write: bool = False):
+        """
+        Run blocking DB work off the event loop.
+
+        Borrows a pooled connection in a worker thread and calls func(conn, *args),
+        so aiohttp handlers never block on the database.
+        """
+        def call():
+            with self.connection(write=write) as conn:
+                return func(conn, *args)
+
+        return await asyncio.to_thread(call)
+
+    async def fetch_all(self, query: str, params: Optional[Tuple] = None) -> List[Dict[str, Any]]:
+        """Run a SELECT (with ? placeholders) off the event loop and return rows as dicts."""
+        def fetch(conn):
+            return [dict(row) for row in self.execute(conn, query, params).fetchall()]
+
+        return await self.run_sync(fetch)
+
+    async def fetch_one(self, query: str, params: Optional[Tuple] = None) -> Optional[Dict[str, Any]]:
+        """Run a SELECT (with ? placeholders) off the event loop and return the first row."""
+        def fetch(conn):
+            row = self.execute(conn, query, params).fetchone()
+            return dict(row) if row is not None else None
+
+        return await self.run_sync(fetch)
+
+    def get_pool_stats(self) -> Dict[str, Any]:
+        """Pool saturation metrics (in use, waits, wait times, timeouts)."""
+        pools = self._get_pools()
+        if pools['reader'] is pools['writer']:
+            return {'db_type': self.db_type, 'pool': pools['reader'].stats()}
+        return {
+            'db_type': self.db_type,
+            'readers': pools['reader'].stats(),
+            'writer': pools['writer'].stats(),
+        }
+
+    def close_pools(self) -> None:
+        """Close the pools for this database (they are recreated on next use)."""
+        with _pools_lock:
+            pools = _pools.pop(self._pool_key(), None)
+        if pools:
+            for pool in {id(p): p for p in pools.values()}.values():
+                pool.close()
+
+    def stream_query(self, conn, query: str, params: Tuple = (), chunk_size: int = 5000):
+        """
+        Run a SELECT and yield its rows in chunks of dicts.
+
+        PostgreSQL uses a named (server-side) cursor so the result set is not
+        materialized on the client; SQLite steps its cursor with fetchmany.
+
+        Args:
+            conn: Connection from connect() or acquire()
+            query: SQL query with placeholders already adapted
+            params: Query parameters
+            chunk_size: Rows per chunk
+        """
+        if self.db_type == 'postgres':
+            cursor = conn.cursor(name=f"stream_{id(conn)}_{time.monotonic_ns()}")
+            cursor.itersize = chunk_size
+        else:
+            cursor = conn.cursor()
+        try:
+            cursor.execute(query, params)
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield [dict(row) for row in rows]
+        finally:
+            cursor.close()
+
     def get_schema_sql(self) -> Dict[str, str]:
         """
         Get SQL statements for creating tables.
@@ -0,0 +1,326 @@
+"""
+Pre-aggregated rollup tables for the analytics dashboard.
+
+The dashboard endpoints used to run COUNT/AVG/SUM over the whole `queries` and
+`user_interactions` tables on every refresh, so their latency grew with the
+query log. Two rollup tables keep the aggregates instead:
+
+- analytics_hourly: per hour of query time - query count, latency and cost
+  sums, errors, queries with at least one click, retrieved documents
+- analytics_url_clicks_daily: per day of click time and URL - clicks,
+  position and dwell-time sums
+
+Averages are stored as (sum, count) pairs so any range of buckets can be
+combined exactly. Refreshes are incremental: the buckets overlapping the
+lookback window (late completions and clicks land there) are recomputed from
+the raw tables, older buckets are left alone. In a running server the
+aggregation runs on a pooled reader and the (single, for SQLite) writer is only
+held to swap the recomputed buckets in. The QueryLogger worker and the
+dashboard refresh the lookback window only; rebuilding all history (e.g. for a
+new or migrated database) is left to jobs/refresh_analytics_rollups.py.
+"""
+
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from core.analytics_db import AnalyticsDB
+from misc.logger.logging_config_helper import get_configured_logger
+
+logger = get_configured_logger("analytics_rollup")
+
+HOUR_SECONDS = 3600
+DAY_SECONDS = 24 * HOUR_SECONDS
+
+# Recomputed on every incremental refresh (clicks and completions arrive late)
+DEFAULT_LOOKBACK_SECONDS = 2 * DAY_SECONDS
+
+ROLLUP_TABLES = {
+    'sqlite': [
+        """
+        CREATE TABLE IF NOT EXISTS analytics_hourly (
+            hour_start REAL PRIMARY KEY,
+            query_count INTEGER NOT NULL DEFAULT 0,
+            latency_sum REAL NOT NULL DEFAULT 0,
+            latency_count INTEGER NOT NULL DEFAULT 0,
+            cost_sum REAL NOT NULL DEFAULT 0,
+            error_count INTEGER NOT NULL DEFAULT 0,
+            clicked_queries INTEGER NOT NULL DEFAULT 0,
+            retrieved_docs INTEGER NOT NULL DEFAULT 0,
+            updated_at REAL NOT NULL
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS analytics_url_clicks_daily (
+            day_start REAL NOT NULL,
+            doc_url TEXT NOT NULL,
+            doc_title TEXT,
+            click_count INTEGER NOT NULL DEFAULT 0,
+            position_sum REAL NOT NULL DEFAULT 0,
+            position_count INTEGER NOT NULL DEFAULT 0,
+            dwell_sum REAL NOT NULL DEFAULT 0,
+            dwell_count INTEGER NOT NULL DEFAULT 0,
+            updated_at REAL NOT NULL,
+            PRIMARY KEY (day_start, doc_url)
+        )
+        """,
+    ],
+    'postgres': [
+        """
+        CREATE TABLE IF NOT EXISTS analytics_hourly (
+            hour_start DOUBLE PRECISION PRIMARY KEY,
+            query_count INTEGER NOT NULL DEFAULT 0,
+            latency_sum DOUBLE PRECISION NOT NULL DEFAULT 0,
+            latency_count INTEGER NOT NULL DEFAULT 0,
+            cost_sum DOUBLE PRECISION NOT NULL DEFAULT 0,
+            error_count INTEGER NOT NULL DEFAULT 0,
+            clicked_queries INTEGER NOT NULL DEFAULT 0,
+            retrieved_docs INTEGER NOT NULL DEFAULT 0,
+            updated_at DOUBLE PRECISION NOT NULL
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS analytics_url_clicks_daily (
+            day_start DOUBLE PRECISION NOT NULL,
+            doc_url TEXT NOT NULL,
+            doc_title TEXT,
+            click_count INTEGER NOT NULL DEFAULT 0,
+            position_sum DOUBLE PRECISION NOT NULL DEFAULT 0,
+            position_count INTEGER NOT NULL DEFAULT 0,
+            dwell_sum DOUBLE PRECISION NOT NULL DEFAULT 0,
+            dwell_count INTEGER NOT NULL DEFAULT 0,
+            updated_at DOUBLE PRECISION NOT NULL,
+            PRIMARY KEY (day_start, doc_url)
+        )
+        """,
+    ],
+}
+
+ROLLUP_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_interactions_timestamp ON user_interactions(interaction_timestamp)",
+    "CREATE INDEX IF NOT EXISTS idx_retrieved_docs_url ON retrieved_documents(doc_url)",
+]
+
+
+HOURLY_COLUMNS = (
+    'hour_start', 'query_count', 'latency_sum', 'latency_count', 'cost_sum',
+    'error_count', 'clicked_queries', 'retrieved_docs', 'updated_at',
+)
+DAILY_COLUMNS = (
+    'day_start', 'doc_url', 'doc_title', 'click_count', 'position_sum',
+    'position_count', 'dwell_sum', 'dwell_count', 'updated_at',
+)
+
+
+def _align(timestamp: float, bucket_seconds: int) -> float:
+    return float(int(timestamp // bucket_seconds) * bucket_seconds)
+
+
+def _insert_sql(table: str, columns) -> str:
+    return f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)})"
+
+
+class AnalyticsRollups:
+    """Maintains and reads the dashboard rollup tables (SQLite or PostgreSQL)."""
+
+    def __init__(self, db: AnalyticsDB, lookback_seconds: float = DEFAULT_LOOKBACK_SECONDS):
+        self.db = db
+        self.lookback_seconds = lookback_seconds
+        # One pooled refresh at a time per process
+        self._refresh_lock = threading.Lock()
+
+    def _bucket(self, column: str, bucket_seconds: int) -> str:
+        """SQL expression truncating an epoch column to its bucket start."""
+        if self.db.db_type == 'postgres':
+            return f"FLOOR({column} / {bucket_seconds}) * {bucket_seconds}"
+        return f"CAST({column} / {bucket_seconds} AS INTEGER) * {bucket_seconds}"
+
+    def ensure_tables(self, conn) -> None:
+        """Create rollup tables and the indexes their refresh relies on."""
+        cursor = conn.cursor()
+        for create_sql in ROLLUP_TABLES[self.db.db_type]:
+            cursor.execute(create_sql)
+        for index_sql in ROLLUP_INDEXES:
+            cursor.execute(index_sql)
+        conn.commit()
+
+    def is_empty(self, conn) -> bool:
+        row = self.db.execute(conn, "SELECT COUNT(*) AS n FROM analytics_hourly").fetchone()
+        return not row["n"]
+
+    def _window(self, since: Optional[float], full: bool):
+        if full:
+            since = 0.0
+        elif since is None:
+            since = time.time() - self.lookback_seconds
+        return since, _align(since, HOUR_SECONDS), _align(since, DAY_SECONDS)
+
+    def compute(self, conn, hour_since: float, day_since: float) -> Dict[str, List[tuple]]:
+        """
+        Aggregate the raw tables into rollup rows (SELECT only).
+
+        Safe on a pooled reader, so the scan never holds the SQLite writer.
+        """
+        now = time.time()
+        hourly = self.db.execute(conn, f"""
+            SELECT
+                {self._bucket('q.timestamp', HOUR_SECONDS)} AS hour_start,
+                COUNT(*) AS query_count,
+                COALESCE(SUM(q.latency_total_ms), 0) AS latency_sum,
+                COUNT(q.latency_total_ms) AS latency_count,
+                COALESCE(SUM(q.cost_usd), 0) AS cost_sum,
+                SUM(CASE WHEN q.error_occurred = 1 THEN 1 ELSE 0 END) AS error_count,
+                SUM(CASE WHEN EXISTS (
+                    SELECT 1 FROM user_interactions ui
+                    WHERE ui.query_id = q.query_id AND ui.clicked = 1
+                ) THEN 1 ELSE 0 END) AS clicked_queries,
+                SUM((SELECT COUNT(*) FROM retrieved_documents rd WHERE rd.query_id = q.query_id)) AS retrieved_docs
+            FROM queries q
+            WHERE q.timestamp >= ?
+            GROUP BY 1
+        """, (hour_since,)).fetchall()
+
+        daily = self.db.execute(conn, f"""
+            SELECT
+                {self._bucket('ui.interaction_timestamp', DAY_SECONDS)} AS day_start,
+                ui.doc_url AS doc_url,
+                (SELECT MAX(rd.doc_title) FROM retrieved_documents rd WHERE rd.doc_url = ui.doc_url) AS doc_title,
+                COUNT(*) AS click_count,
+                COALESCE(SUM(ui.result_position), 0) AS position_sum,
+                COUNT(ui.result_position) AS position_count,
+                COALESCE(SUM(ui.dwell_time_ms), 0) AS dwell_sum,
+                COUNT(ui.dwell_time_ms) AS dwell_count
+            FROM user_interactions ui
+            WHERE ui.clicked = 1 AND ui.interaction_timestamp >= ?
+            GROUP BY 1, ui.doc_url
+        """, (day_since,)).fetchall()
+
+        return {
+            'hourly': [tuple(row[c] for c in HOURLY_COLUMNS[:-1]) + (now,) for row in hourly],
+            'daily': [tuple(row[c] for c in DAILY_COLUMNS[:-1]) + (now,) for row in daily],
+        }
+
+    def store(self, conn, hour_since: float, day_since: float, rows: Dict[str, List[tuple]]) -> None:
+        """Replace the buckets from the window start on with computed rows, in one transaction."""
+        try:
+            self.db.execute(conn, "DELETE FROM analytics_hourly WHERE hour_start >= ?", (hour_since,))
+            if rows['hourly']:
+                self.db.executemany(conn, _insert_sql('analytics_hourly', HOURLY_COLUMNS), rows['hourly'])
+            self.db.execute(conn, "DELETE FROM analytics_url_clicks_daily WHERE day_start >= ?", (day_since,))
+            if rows['daily']:
+                self.db.executemany(conn, _insert_sql('analytics_url_clicks_daily', DAILY_COLUMNS), rows['daily'])
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+    def refresh(self, conn, since: Optional[float] = None, full: bool = False) -> Dict[str, Any]:
+        """
+        Recompute rollup buckets from the raw tables on a single connection.
+
+        Used by jobs/refresh_analytics_rollups.py; running processes use
+        refresh_pooled() instead.
+
+        Args:
+            conn: Database connection
+            since: Recompute buckets from this epoch on (default: now - lookback)
+            full: Rebuild all buckets
+
+        Returns:
+            Number of hourly and daily-click buckets written
+        """
+        since, hour_since, day_since = self._window(since, full)
+        if full:
+            logger.info("Rebuilding analytics rollups from full history")
+        rows = self.compute(conn, hour_since, day_since)
+        self.store(conn, hour_since, day_since, rows)
+        return {'hourly_buckets': len(rows['hourly']), 'daily_click_buckets': len(rows['daily']), 'since': since}
+
+    def refresh_pooled(self, since: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        Incremental refresh on pooled connections: aggregate on a reader, then
+        hold the writer only for the delete and bulk insert.
+
+        Never rebuilds full history (an empty rollup only gets the lookback
+        window; run jobs/refresh_analytics_rollups.py --full for the rest).
+        Returns None if another refresh is already running in this process.
+        """
+        if not self._refresh_lock.acquire(blocking=False):
+            return None
+        try:
+            since, hour_since, day_since = self._window(since, False)
+            with self.db.connection() as conn:
+                rows = self.compute(conn, hour_since, day_since)
+            with self.db.connection(write=True) as conn:
+                self.store(conn, hour_since, day_since, rows)
+            return {'hourly_buckets': len(rows['hourly']), 'daily_click_buckets': len(rows['daily']), 'since': since}
+        finally:
+            self._refresh_lock.release()
+
+    def refresh_if_stale(self, max_age_seconds: float) -> bool:
+        """
+        Refresh (see refresh_pooled) when the last refresh is older than max_age_seconds.
+
+        Lets readers in a process without a QueryLogger worker keep the
+        rollups current. Returns True if a refresh ran.
+        """
+        with self.db.connection() as conn:
+            row = self.db.execute(conn, "SELECT MAX(updated_at) AS updated_at FROM analytics_hourly").fetchone()
+        if row["updated_at"] is not None and time.time() - row["updated_at"] < max_age_seconds:
+            return False
+        return self.refresh_pooled() is not None
+
+    def read_stats(self, conn, cutoff_timestamp: float) -> Dict[str, Any]:
+        """Dashboard totals since the cutoff (to the hour)."""
+        row = self.db.execute(conn, """
+            SELECT
+                COALESCE(SUM(query_count), 0) AS total_queries,
+                COALESCE(SUM(latency_sum), 0) AS latency_sum,
+                COALESCE(SUM(latency_count), 0) AS latency_count,
+                COALESCE(SUM(cost_sum), 0) AS total_cost,
+                COALESCE(SUM(error_count), 0) AS error_count,
+                COALESCE(SUM(clicked_queries), 0) AS clicked_queries,
+                COALESCE(SUM(retrieved_docs), 0) AS retrieved_docs
+            FROM analytics_hourly
+            WHERE hour_start >= ?
+        """, (_align(cutoff_timestamp, HOUR_SECONDS),)).fetchone()
+
+        total_queries = int(row["total_queries"])
+        latency_count = int(row["latency_count"])
+        return {
+            "total_queries": total_queries,
+            "avg_latency_ms": float(row["latency_sum"]) / latency_count if latency_count else 0,
+            "total_cost_usd": float(row["total_cost"]),
+            "error_count": int(row["error_count"]),
+            "queries_with_clicks": int(row["clicked_queries"]),
+            "training_samples": int(row["retrieved_docs"]),
+        }
+
+    def read_top_clicks(self, conn, cutoff_timestamp: float, limit: int) -> List[Dict[str, Any]]:
+        """Most clicked URLs since the cutoff (to the day)."""
+        rows = self.db.execute(conn, """
+            SELECT
+                doc_url,
+                MAX(doc_title) AS doc_title,
+                SUM(click_count) AS click_count,
+                SUM(position_sum) AS position_sum,
+                SUM(position_count) AS position_count,
+                SUM(dwell_sum) AS dwell_sum,
+                SUM(dwell_count) AS dwell_count
+            FROM analytics_url_clicks_daily
+            WHERE day_start >= ?
+            GROUP BY doc_url
+            ORDER BY click_count DESC
+            LIMIT ?
+        """, (_align(cutoff_timestamp, DAY_SECONDS), limit)).fetchall()
+
+        clicks = []
+        for row in rows:
+            clicks.append({
+                "doc_url": row["doc_url"],
+                "doc_title": row["doc_title"],
+                "click_count": int(row["click_count"] or 0),
+                "avg_position": float(row["position_sum"]) / row["position_count"] if row["position_count"] else None,
+                "avg_dwell_time": float(row["dwell_sum"]) / row["dwell_count"] if row["dwell_count"] else None,
+            })
+        return clicks
@@ -8,7 +8,7 @@ WARNING: This code is under development and may undergo changes in future releas
 Backwards compatibility is not guaranteed at this time.
 """
 
-from core.retriever import search
+from core.retriever import DateRange, log_retrieved_items, search
 import asyncio
 import importlib
 import time
@@ -33,6 +33,7 @@ import core.router as router
 import methods.accompaniment as accompaniment
 import methods.recipe_substitution as substitution
 from core.state import NLWebHandlerState
+from core.speculative_retrieval import SpeculativeRetrieval
 from core.utils.utils import get_param, siteToItemType, log
 from core.utils.message_senders import MessageSender
 from misc.logger.logger import get_logger, LogLevel
@@ -131,6 +132,13 @@ class NLWebHandler:
 
         self.fastTrackRanker = None
         self.fastTrackWorked = False
+        # LLM ranking calls cancelled after fast track abort or client disconnect
+        self.llm_calls_cancelled = 0
+        self.llm_tokens_saved = 0
+        # Outcome of the search started alongside the prechecks (see core/speculative_retrieval.py)
+        self.retrieval_speculation = None
+        # How ToolSelector chose the tool (see core/router.py)
+        self.tool_routing = None
         self.sites_in_embeddings_sent = False
 
         self.return_value = {}
@@ -282,7 +290,7 @@ class NLWebHandler:
                     cache = get_results_cache()
                     # Use query+site as fallback key if conversation_id is empty
                     cache_key = self.conversation_id if self.conversation_id else f"{self.query}_{self.site}"
-                    cache.store(cache_key, self.final_ranked_answers, self.query)
+                    await cache.store(cache_key, self.final_ranked_answers, self.query)
                 except Exception as e:
                     logger.warning(f"Failed to cache results: {e}")
 
@@ -310,7 +318,12 @@ class NLWebHandler:
                     num_results_ranked=getattr(self, 'num_ranked', 0),
                     num_results_returned=num_results,
                     cost_usd=getattr(self, 'estimated_cost', 0),
-                    error_occurred=False
+                    error_occurred=False,
+                    llm_calls_cancelled=self.llm_calls_cancelled,
+                    llm_tokens_saved=self.llm_tokens_saved,
+                    retrieval_speculation=self.retrieval_speculation,
+                    tool_selected=self.selected_tool_name(),
+                    tool_routing=self.tool_routing
                 )
             except Exception as e:
                 logger.warning(f"Failed to log query completion: {e}")
@@ -328,7 +341,12 @@ class NLWebHandler:
                     query_id=self.query_id,
                     latency_total_ms=total_latency_ms,
                     error_occurred=True,
-                    error_message=str(e)
+                    error_message=str(e),
+                    llm_calls_cancelled=self.llm_calls_cancelled,
+                    llm_tokens_saved=self.llm_tokens_saved,
+                    retrieval_speculation=self.retrieval_speculation,
+                    tool_selected=self.selected_tool_name(),
+                    tool_routing=self.tool_routing
                 )
             except Exception as log_err:
                 logger.warning(f"Failed to log query error: {log_err}")
@@ -341,11 +359,27 @@ class NLWebHandler:
     async def prepare(self):
         tasks = []
 
+        # Start searching the raw query now instead of after the prechecks
+        speculation = None
+        nlweb_config = getattr(CONFIG, 'nlweb', None)
+        if (nlweb_config and nlweb_config.speculative_retrieval_enabled
+                and not self.retrieval_done_event.is_set()
+                and site_supports_standard_retrieval(self.site)
+                and not self.free_conversation
+                and SpeculativeRetrieval.can_speculate(self)):
+            speculation = SpeculativeRetrieval(self, self.retrieval_size(None), self.include_vectors())
+            speculation.start()
+
         tasks.append(asyncio.create_task(self.decontextualizeQuery().do()))
         # FastTrack disabled - all searches now use regular path for unified vector/MMR handling
         # tasks.append(asyncio.create_task(fastTrack.FastTrack(self).do()))
         tasks.append(asyncio.create_task(query_rewrite.QueryRewrite(self).do()))
-        tasks.append(asyncio.create_task(time_range_extractor.TimeRangeExtractor(self).do()))
+        time_range_task = asyncio.create_task(time_range_extractor.TimeRangeExtractor(self).do())
+        if speculation:
+            # Cancel the speculative search as soon as a date filter makes it unusable
+            time_range_task.add_done_callback(
+                lambda _: speculation.on_temporal_range(getattr(self, 'temporal_range', None)))
+        tasks.append(time_range_task)
         
         # Check if a specific tool is requested via the 'tool' parameter
         requested_tool = get_param(self.query_params, "tool", str, None)
@@ -377,6 +411,8 @@ class NLWebHandler:
                 await asyncio.gather(*tasks, return_exceptions=True)
         except Exception as e:
             if CONFIG.should_raise_exceptions():
+                if speculation:
+                    speculation.cancel()
                 raise  # Re-raise in testing/development mode
         finally:
             self.pre_checks_done_event.set()  # Signal completion regardless of errors
@@ -438,35 +474,55 @@ class NLWebHandler:
             else:
                 # Get parsed time range (TimeRangeExtractor runs in parallel during prepare())
                 temporal_range = getattr(self, 'temporal_range', None)
+                num_to_retrieve = self.retrieval_size(temporal_range)
+                # Pushed down into the vector search so the backend only returns in-range articles
+                date_range = DateRange.from_temporal_range(temporal_range)
 
                 if temporal_range and temporal_range.get('is_temporal'):
-                    # Adjust retrieval volume based on time window
                     days = temporal_range.get('relative_days') or 365
-                    if days <= 7:
-                        num_to_retrieve = 100  # Recent queries need more candidates
-                    elif days <= 30:
-                        num_to_retrieve = 150
-                    else:
-                        num_to_retrieve = 200
-
                     logger.info(f"[TEMPORAL] Temporal query detected (method: {temporal_range.get('method')})")
                     logger.info(f"[TEMPORAL] Time range: {temporal_range.get('start_date')} to {temporal_range.get('end_date')} ({days} days)")
-                    logger.info(f"[TEMPORAL] Retrieving {num_to_retrieve} items for date filtering")
+                    logger.info(f"[TEMPORAL] Retrieving {num_to_retrieve} items filtered to the time range")
                 else:
-                    logger.info(f"[TEMPORAL] Non-temporal query: '{self.query}' - retrieving 50 items")
-                    num_to_retrieve = 50
-
-                # Check if MMR is enabled and request vectors if needed
-                include_vectors = CONFIG.mmr_params.get('enabled', True) and CONFIG.mmr_params.get('include_vectors', True)
-
-                items = await search(
-                    self.decontextualized_query,
-                    self.site,
-                    query_params=self.query_params,
-                    handler=self,
-                    num_results=num_to_retrieve,
-                    include_vectors=include_vectors
-                )
+                    logger.info(f"[TEMPORAL] Non-temporal query: '{self.query}' - retrieving {num_to_retrieve} items")
+
+                # Analytics rows are collected per search and logged once for the items used
+                retrieval_log = {}
+                items = None
+                if speculation:
+                    items = await speculation.resolve(self.decontextualized_query, num_to_retrieve, date_range)
+                    if items is not None:
+                        retrieval_log = speculation.retrieval_log
+                if items is None:
+                    items = await search(
+                        self.decontextualized_query,
+                        self.site,
+                        query_params=self.query_params,
+                        handler=self,
+                        num_results=num_to_retrieve,
+                        include_vectors=self.include_vectors(),
+                        date_range=date_range,
+                        retrieval_log=retrieval_log
+                    )
+
+                if date_range and len(items) < self.MIN_TEMPORAL_RESULTS:
+                    # Too few articles in the time range: top up with the best matches outside it
+                    days = temporal_range.get('relative_days') or 365
+                    logger.info(f"[TEMPORAL] Only {len(items)} articles found in last {days} days, adding unfiltered results")
+                    unfiltered = await search(
+                        self.decontextualized_query,
+                        self.site,
+                        query_params=self.query_params,
+                        handler=self,
+                        num_results=num_to_retrieve,
+                        include_vectors=self.include_vectors(),
+                        retrieval_log=retrieval_log
+                    )
+                    seen_urls = {item[0] for item in items}
+                    items = items + [item for item in unfiltered if item[0] not in seen_urls]
+                    items = items[:num_to_retrieve]
+
+                log_retrieved_items(self, items, retrieval_log)
 
                 # Query user's private files if requested
                 if self.include_private_sources and self.user_id:
@@ -504,66 +560,36 @@ class NLWebHandler:
                         logger.exception(f"Failed to retrieve private documents: {str(e)}")
                         # Continue with public results only
 
-                # DIAGNOSTIC: Check items immediately after search
-                if items:
-                    pass  # Items received from search
-
-                # Pre-filter by date for temporal queries using parsed time range
-                if temporal_range and temporal_range.get('is_temporal') and len(items) > 0:
-                    # Use precise date filtering from parsed range
-                    start_date_str = temporal_range.get('start_date')
-                    if not start_date_str:
-                        logger.warning(f"[TEMPORAL] temporal_range marked as temporal but missing start_date: {temporal_range}")
-                        # Skip filtering if start_date is missing
-                        self.final_retrieved_items = items
-                    else:
-                        cutoff_date = datetime.strptime(start_date_str, '%Y-%m-%d')
-                        cutoff_date = cutoff_date.replace(tzinfo=timezone.utc)
-                        filtered_items = []
-
-                        for item in items:
-                            # Handle both 4-tuple and 5-tuple (with vector) formats
-                            if len(item) == 5:
-                                url, json_str, name, site, vector = item
-                            else:
-                                url, json_str, name, site = item
-                                vector = None
-                            try:
-                                schema_obj = json.loads(json_str)
-                                date_published = schema_obj.get('datePublished', 'Unknown')
-
-                                if date_published != 'Unknown':
-                                    # Parse date
-                                    date_str = date_published.split('T')[0] if 'T' in date_published else date_published
-                                    pub_date = datetime.strptime(date_str, '%Y-%m-%d')
-                                    pub_date = pub_date.replace(tzinfo=timezone.utc)
-
-                                    # Keep only articles within the parsed time range
-                                    if pub_date >= cutoff_date:
-                                        if vector is not None:
-                                            filtered_items.append([url, json_str, name, site, vector])
-                                        else:
-                                            filtered_items.append([url, json_str, name, site])
-                            except Exception as e:
-                                # If we can't parse the date, skip this article for temporal queries
-                                logger.debug(f"Could not parse date for temporal filtering: {e}")
-                                pass
-
-                        # If we filtered too aggressively, take top 50 anyway
-                        days = temporal_range.get('relative_days') or 365
-                        if len(filtered_items) < 50:
-                            logger.info(f"[TEMPORAL] Only {len(filtered_items)} articles found in last {days} days, using all {len(items)} retrieved")
-                            self.final_retrieved_items = items[:80]
-                        else:
-                            logger.info(f"[TEMPORAL] Filtered {len(items)} → {len(filtered_items)} articles (last {days} days)")
-                            self.final_retrieved_items = filtered_items[:80]
-                else:
-                    self.final_retrieved_items = items
+                self.final_retrieved_items = items
 
                 self.retrieval_done_event.set()
 
+        if speculation:
+            # Retrieval was skipped or already done; nothing will use the speculative search
+            speculation.cancel()
         logger.info("Preparation phase completed")
 
+    def selected_tool_name(self):
+        """Name of the top tool from tool selection, or None if it did not run."""
+        if self.tool_routing_results:
+            return self.tool_routing_results[0]['tool'].name
+        return None
+
+    # Temporal queries with fewer in-range articles than this are topped up from an unfiltered search
+    MIN_TEMPORAL_RESULTS = 50
+
+    @staticmethod
+    def retrieval_size(temporal_range):
+        """Number of candidates to retrieve; temporal queries keep more since they are date-filtered in the search."""
+        if temporal_range and temporal_range.get('is_temporal'):
+            return 80
+        return 50
+
+    @staticmethod
+    def include_vectors():
+        """Check if MMR is enabled and request vectors if needed"""
+        return CONFIG.mmr_params.get('enabled', True) and CONFIG.mmr_params.get('include_vectors', True)
+
     def decontextualizeQuery(self):
         if (len(self.prev_queries) < 1):
             self.decontextualized_query = self.query
@@ -11,8 +11,11 @@ References:
 
 import re
 import math
-from typing import List, Dict, Tuple
-from collections import Counter
+from typing import List, Dict, Tuple, Optional
+
+import numpy as np
+
+from core.ngram_tokenizer import NgramTokenizer, get_ngram_tokenizer
 
 
 class BM25Scorer:
@@ -36,7 +39,7 @@ class BM25Scorer:
             - n(qᵢ) = number of documents containing qᵢ
     """
 
-    def __init__(self, k1: float = 1.5, b: float = 0.75):
+    def __init__(self, k1: float = 1.5, b: float = 0.75, tokenizer: Optional[NgramTokenizer] = None):
         """
         Initialize BM25 scorer with parameters.
 
@@ -45,9 +48,12 @@ class BM25Scorer:
                 Higher values give more weight to term frequency
             b: Length normalization parameter (typical range: 0.5-0.9)
                 Higher values penalize longer documents more
+            tokenizer: Integer n-gram tokenizer used for scoring (defaults to the shared,
+                cached instance)
         """
         self.k1 = k1
         self.b = b
+        self.tokenizer = tokenizer or get_ngram_tokenizer()
 
     def tokenize(self, text: str) -> List[str]:
         """
@@ -140,25 +146,21 @@ class BM25Scorer:
         if not query_tokens or not document_text:
             return 0.0
 
-        # Tokenize the document
-        doc_tokens = self.tokenize(document_text)
-        doc_length = len(doc_tokens)
+        # Term counts of the document (memoized integer n-gram IDs)
+        doc_term_ids, doc_term_freqs, doc_length = self.tokenizer.term_counts(document_text)
 
         # Avoid division by zero
         if doc_length == 0 or avg_doc_length == 0:
             return 0.0
 
-        # Count term frequencies in document
-        doc_term_freqs = Counter(doc_tokens)
-
         # Calculate BM25 score
         score = 0.0
-        for term in set(query_tokens):  # Use set to avoid counting same term multiple times
+        for term, term_id in self.tokenizer.term_ids(set(query_tokens)).items():  # Use set to avoid counting same term multiple times
             # Term frequency in document
-            tf = doc_term_freqs.get(term, 0)
-
-            if tf == 0:
+            pos = np.searchsorted(doc_term_ids, term_id)
+            if pos >= len(doc_term_ids) or doc_term_ids[pos] != term_id:
                 continue  # Term not in document
+            tf = int(doc_term_freqs[pos])
 
             # Document frequency (how many docs contain this term)
             df = term_doc_counts.get(term, 0)
@@ -223,3 +225,168 @@ class BM25Scorer:
         term_doc_counts = {term: len(doc_set) for term, doc_set in term_doc_presence.items()}
 
         return avg_doc_length, term_doc_counts
+
+    def build_term_matrix(
+        self,
+        documents: List[str],
+        doc_keys: Optional[List[Optional[str]]] = None
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Build a sparse (CSR) document-term frequency matrix.
+
+        Per-document term counts come from the tokenizer cache, so documents
+        already seen (by key or content hash) are not tokenized again.
+
+        Args:
+            documents: List of document texts
+            doc_keys: Optional stable cache keys (e.g. URLs), aligned with documents
+
+        Returns:
+            Tuple of (indptr, indices, data, vocabulary)
+            - indptr: Row pointers, shape (n_docs + 1,)
+            - indices: Column ids of the non-zero entries
+            - data: Term frequencies of the non-zero entries
+            - vocabulary: Sorted term IDs; column j holds term ID vocabulary[j]
+        """
+        keys = doc_keys or [None] * len(documents)
+        entries = [self.tokenizer.term_counts(doc, key) for doc, key in zip(documents, keys)]
+
+        indptr = np.zeros(len(entries) + 1, dtype=np.int64)
+        if not entries:
+            return indptr, np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float64), np.zeros(0, dtype=np.int64)
+        np.cumsum([len(term_ids) for term_ids, _, _ in entries], out=indptr[1:])
+
+        all_term_ids = np.concatenate([term_ids for term_ids, _, _ in entries])
+        vocabulary, indices = np.unique(all_term_ids, return_inverse=True)
+        data = np.concatenate([freqs for _, freqs, _ in entries]).astype(np.float64)
+
+        return indptr, indices.astype(np.int64), data, vocabulary
+
+    def calculate_batch_stats(
+        self,
+        query_tokens: List[str],
+        documents: List[str],
+        doc_keys: Optional[List[Optional[str]]] = None
+    ) -> Tuple[float, Dict[str, int]]:
+        """
+        Calculate candidate-set corpus statistics restricted to the query terms.
+
+        Equivalent to calculate_corpus_stats for the terms that matter to a query,
+        so a candidate set can be scored in several calculate_scores_batch calls
+        that share the same statistics.
+
+        Args:
+            query_tokens: List of tokens from the query
+            documents: List of document texts
+            doc_keys: Optional stable cache keys (e.g. URLs), aligned with documents
+
+        Returns:
+            Tuple of (average_doc_length, term_doc_counts for query terms present)
+        """
+        if not documents:
+            return 0.0, {}
+        _, indices, data, vocabulary = self.build_term_matrix(documents, doc_keys)
+        avg_doc_length = float(data.sum()) / len(documents)
+
+        df_all = np.bincount(indices, minlength=len(vocabulary))
+        term_doc_counts = {}
+        for term, term_id in self.tokenizer.term_ids(set(query_tokens)).items():
+            pos = np.searchsorted(vocabulary, term_id)
+            if pos < len(vocabulary) and vocabulary[pos] == term_id:
+                term_doc_counts[term] = int(df_all[pos])
+        return avg_doc_length, term_doc_counts
+
+    def calculate_scores_batch(
+        self,
+        query_tokens: List[str],
+        documents: List[str],
+        avg_doc_length: Optional[float] = None,
+        corpus_size: Optional[int] = None,
+        term_doc_counts: Optional[Dict[str, int]] = None,
+        doc_keys: Optional[List[Optional[str]]] = None
+    ) -> np.ndarray:
+        """
+        Calculate BM25 scores for a batch of candidate documents in one call.
+
+        Builds a sparse term-frequency matrix for the candidates and evaluates
+        IDF and length normalization as vectorized NumPy operations. Produces the
+        same scores as calling calculate_score once per document.
+
+        Corpus statistics default to the candidate set itself (as computed by
+        calculate_corpus_stats); pass them explicitly to score against a larger
+        corpus, e.g. the persistent BM25 index.
+
+        Args:
+            query_tokens: List of tokens from the query
+            documents: List of document texts to score
+            avg_doc_length: Average document length in the corpus (in tokens)
+            corpus_size: Total number of documents in the corpus
+            term_doc_counts: Dictionary mapping terms to document frequency counts
+            doc_keys: Optional stable cache keys (e.g. URLs), aligned with documents
+
+        Returns:
+            Array of BM25 scores, one per document (higher = more relevant)
+        """
+        n_docs = len(documents)
+        scores = np.zeros(n_docs, dtype=np.float64)
+        if not query_tokens or n_docs == 0:
+            return scores
+
+        indptr, indices, data, vocabulary = self.build_term_matrix(documents, doc_keys)
+        row_nnz = np.diff(indptr)
+
+        # Document lengths = row sums of the TF matrix
+        doc_lengths = np.bincount(
+            np.repeat(np.arange(n_docs), row_nnz), weights=data, minlength=n_docs
+        )
+
+        if avg_doc_length is None:
+            avg_doc_length = float(doc_lengths.mean())
+        if corpus_size is None:
+            corpus_size = n_docs
+        if avg_doc_length == 0:
+            return scores
+
+        # Only columns for query terms contribute to the score
+        query_term_ids = self.tokenizer.term_ids(set(query_tokens))
+        query_terms = []
+        query_ids_list = []
+        for term, term_id in query_term_ids.items():
+            pos = np.searchsorted(vocabulary, term_id)
+            if pos < len(vocabulary) and vocabulary[pos] == term_id:
+                query_terms.append(term)
+                query_ids_list.append(pos)
+        if not query_terms:
+            return scores
+        query_ids = np.asarray(query_ids_list, dtype=np.int64)
+
+        # Vectorized IDF over query terms
+        if term_doc_counts is None:
+            df_all = np.bincount(indices, minlength=len(vocabulary))
+            df = df_all[query_ids].astype(np.float64)
+        else:
+            df = np.asarray([term_doc_counts.get(term, 0) for term in query_terms], dtype=np.float64)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            idf = np.where(
+                df > 0,
+                np.log((corpus_size - df + 0.5) / (df + 0.5) + 1),
+                0.0
+            )
+
+        # Gather the non-zero TF entries for query columns
+        column_map = np.full(len(vocabulary), -1, dtype=np.int64)
+        column_map[query_ids] = np.arange(len(query_ids))
+        query_columns = column_map[indices]
+        mask = query_columns >= 0
+        rows = np.repeat(np.arange(n_docs), row_nnz)[mask]
+        cols = query_columns[mask]
+        tf = data[mask]
+
+        # BM25 per non-zero entry, then sum per document
+        norm = self.k1 * (1 - self.b + self.b * (doc_lengths[rows] / avg_doc_length))
+        term_scores = idf[cols] * (tf * (self.k1 + 1)) / (tf + norm)
+        scores += np.bincount(rows, weights=term_scores, minlength=n_docs)
+
+        # Match calculate_score: empty documents score 0
+        scores[doc_lengths == 0] = 0.0
+        return scores
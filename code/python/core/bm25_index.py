@@ -0,0 +1,401 @@
+"""
+Persistent inverted index for BM25 hybrid search.
+
+The index is built at upload time (QdrantVectorClient.upload_documents, which
+db_load uses) so that query-time BM25 scoring becomes a postings lookup with
+corpus-wide IDF instead of re-tokenizing every retrieved candidate.
+
+Storage is a single SQLite file (WAL mode) so the indexing process and the
+web server can share it:
+
+    docs(url PK, site, length)            - one row per indexed document
+    postings(term, url, tf) PK(term,url)  - term frequencies per document
+    terms(term PK, df)                    - document frequency per term
+    stats(key PK, value)                  - corpus totals (doc_count, total_length)
+                                            and schema_version
+
+Terms are stored as the stable int64 IDs produced by core.ngram_tokenizer;
+the public API accepts and returns token strings. An index file written with a
+different schema_version (e.g. the TEXT term keys of the first version) is
+dropped and recreated empty on open; run jobs/build_bm25_index.py to refill it.
+"""
+
+import sqlite3
+import threading
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+from core.bm25 import BM25Scorer
+from misc.logger.logging_config_helper import get_configured_logger
+
+logger = get_configured_logger("bm25_index")
+
+# SQLite host-parameter limit is 999 on older builds; stay below it.
+_SQL_CHUNK_SIZE = 900
+
+# Bump when the table layout or term encoding changes (1: TEXT terms, 2: n-gram IDs)
+SCHEMA_VERSION = 2
+
+_TABLES = ("docs", "postings", "terms", "stats")
+
+
+def resolve_index_path(index_path: Optional[str] = None) -> str:
+    """
+    Resolve the BM25 index path against the project root.
+
+    Args:
+        index_path: Absolute path, or path relative to the project root.
+                    Defaults to data/bm25/bm25_index.db.
+
+    Returns:
+        Absolute path to the SQLite index file
+    """
+    # bm25_index.py -> core/ -> python/ -> code/ -> project root
+    project_root = Path(__file__).resolve().parent.parent.parent.parent
+    path = Path(index_path or "data/bm25/bm25_index.db")
+    if not path.is_absolute():
+        path = project_root / path
+    return str(path)
+
+
+def build_document_text(title: Optional[str], body: Optional[str]) -> str:
+    """
+    Build the text that BM25 indexes for a document.
+
+    Title is weighted 3x by repeating it, matching the hybrid search scoring.
+    """
+    title = title or ""
+    body = body or ""
+    return f"{title} {title} {title} {body}"
+
+
+def _chunks(items: List[Any], size: int = _SQL_CHUNK_SIZE) -> Iterable[List[Any]]:
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+class BM25Index:
+    """
+    SQLite-backed inverted index with incremental updates.
+
+    Documents are keyed by URL. Re-adding a URL replaces its postings and keeps
+    the global df/avgdl statistics consistent.
+    """
+
+    def __init__(self, index_path: Optional[str] = None, scorer: Optional[BM25Scorer] = None):
+        """
+        Initialize (and create if needed) the index.
+
+        Args:
+            index_path: Path to the SQLite index file (absolute or relative to project root)
+            scorer: BM25Scorer used for tokenization and IDF (defaults to k1=1.5, b=0.75)
+        """
+        self.index_path = Path(resolve_index_path(index_path))
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        self.scorer = scorer or BM25Scorer()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.index_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._create_tables()
+        logger.info(f"BM25 index ready at {self.index_path} ({self.doc_count} documents)")
+
+    def _stored_schema_version(self) -> Optional[int]:
+        if not self._conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'stats'"
+        ).fetchone():
+            return None
+        row = self._conn.execute("SELECT value FROM stats WHERE key = 'schema_version'").fetchone()
+        return int(row[0]) if row else None
+
+    def _create_tables(self):
+        with self._lock, self._conn:
+            stored_version = self._stored_schema_version()
+            if stored_version != SCHEMA_VERSION:
+                existing = [name for name in _TABLES if self._conn.execute(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)
+                ).fetchone()]
+                if existing:
+                    # Old rows would never match the current term encoding
+                    logger.warning(
+                        f"BM25 index schema version {stored_version} != {SCHEMA_VERSION}; "
+                        f"recreating an empty index, run jobs/build_bm25_index.py to rebuild it"
+                    )
+                    for name in existing:
+                        self._conn.execute(f"DROP TABLE {name}")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS docs ("
+                "url TEXT PRIMARY KEY, site TEXT, length INTEGER NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS postings ("
+                "term INTEGER NOT NULL, url TEXT NOT NULL, tf INTEGER NOT NULL, "
+                "PRIMARY KEY (term, url)) WITHOUT ROWID"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_postings_url ON postings(url)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_docs_site ON docs(site)")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS terms (term INTEGER PRIMARY KEY, df INTEGER NOT NULL) WITHOUT ROWID"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS stats (key TEXT PRIMARY KEY, value REAL NOT NULL)"
+            )
+            self._conn.execute("INSERT OR IGNORE INTO stats (key, value) VALUES ('doc_count', 0)")
+            self._conn.execute("INSERT OR IGNORE INTO stats (key, value) VALUES ('total_length', 0)")
+            self._conn.execute(
+                "INSERT OR REPLACE INTO stats (key, value) VALUES ('schema_version', ?)", (SCHEMA_VERSION,)
+            )
+
+    # ------------------------------------------------------------------
+    # Corpus statistics
+    # ------------------------------------------------------------------
+
+    def _get_stat(self, key: str) -> float:
+        row = self._conn.execute("SELECT value FROM stats WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else 0.0
+
+    @property
+    def doc_count(self) -> int:
+        with self._lock:
+            return int(self._get_stat('doc_count'))
+
+    @property
+    def avg_doc_length(self) -> float:
+        with self._lock:
+            count = self._get_stat('doc_count')
+            return self._get_stat('total_length') / count if count else 0.0
+
+    def get_term_doc_counts(self, terms: Iterable[str]) -> Dict[str, int]:
+        """Return corpus-wide document frequency for each term (missing terms omitted)."""
+        term_ids = self.scorer.tokenizer.term_ids(set(terms))
+        id_to_term = {term_id: term for term, term_id in term_ids.items()}
+        result: Dict[str, int] = {}
+        with self._lock:
+            for chunk in _chunks(list(id_to_term)):
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT term, df FROM terms WHERE term IN ({placeholders})", chunk
+                ).fetchall()
+                result.update({id_to_term[term_id]: df for term_id, df in rows})
+        return result
+
+    # ------------------------------------------------------------------
+    # Incremental updates
+    # ------------------------------------------------------------------
+
+    def _remove_locked(self, urls: List[str]) -> int:
+        """Remove documents and their postings. Caller holds the lock and transaction."""
+        removed = 0
+        for chunk in _chunks(urls):
+            placeholders = ",".join("?" * len(chunk))
+            rows = self._conn.execute(
+                f"SELECT url, length FROM docs WHERE url IN ({placeholders})", chunk
+            ).fetchall()
+            if not rows:
+                continue
+            present = [url for url, _ in rows]
+            removed_length = sum(length for _, length in rows)
+            present_placeholders = ",".join("?" * len(present))
+
+            # Decrement df for every term the removed docs contained
+            term_rows = self._conn.execute(
+                f"SELECT term, COUNT(*) FROM postings WHERE url IN ({present_placeholders}) GROUP BY term",
+                present
+            ).fetchall()
+            self._conn.executemany(
+                "UPDATE terms SET df = df - ? WHERE term = ?",
+                [(count, term) for term, count in term_rows]
+            )
+            self._conn.execute(f"DELETE FROM postings WHERE url IN ({present_placeholders})", present)
+            self._conn.execute(f"DELETE FROM docs WHERE url IN ({present_placeholders})", present)
+            self._conn.execute(
+                "UPDATE stats SET value = value - ? WHERE key = 'doc_count'", (len(present),)
+            )
+            self._conn.execute(
+                "UPDATE stats SET value = value - ? WHERE key = 'total_length'", (removed_length,)
+            )
+            removed += len(present)
+
+        if removed:
+            self._conn.execute("DELETE FROM terms WHERE df <= 0")
+        return removed
+
+    def add_documents(self, documents: List[Dict[str, Any]]) -> int:
+        """
+        Add or replace documents in the index.
+
+        Args:
+            documents: Dicts with 'url', 'name' (title), 'schema_json' (body) and optional 'site'
+
+        Returns:
+            Number of documents indexed
+        """
+        prepared = []
+        for doc in documents:
+            url = doc.get("url")
+            if not url:
+                continue
+            # Uncached encode: bulk indexing should not churn the query-time token cache
+            term_ids = self.scorer.tokenizer.encode(build_document_text(doc.get("name"), doc.get("schema_json")))
+            unique_ids, counts = np.unique(term_ids, return_counts=True)
+            prepared.append((url, doc.get("site"), len(term_ids), dict(zip(unique_ids.tolist(), counts.tolist()))))
+
+        if not prepared:
+            return 0
+
+        # Last write wins for duplicate URLs inside a batch
+        prepared = list({entry[0]: entry for entry in prepared}.values())
+
+        with self._lock, self._conn:
+            self._remove_locked([url for url, *_ in prepared])
+
+            df_delta: Counter = Counter()
+            total_length = 0
+            for url, site, length, term_freqs in prepared:
+                self._conn.execute(
+                    "INSERT INTO docs (url, site, length) VALUES (?, ?, ?)", (url, site, length)
+                )
+                self._conn.executemany(
+                    "INSERT INTO postings (term, url, tf) VALUES (?, ?, ?)",
+                    [(term, url, tf) for term, tf in term_freqs.items()]
+                )
+                df_delta.update(term_freqs.keys())
+                total_length += length
+
+            self._conn.executemany(
+                "INSERT INTO terms (term, df) VALUES (?, ?) "
+                "ON CONFLICT(term) DO UPDATE SET df = df + excluded.df",
+                list(df_delta.items())
+            )
+            self._conn.execute(
+                "UPDATE stats SET value = value + ? WHERE key = 'doc_count'", (len(prepared),)
+            )
+            self._conn.execute(
+                "UPDATE stats SET value = value + ? WHERE key = 'total_length'", (total_length,)
+            )
+
+        logger.debug(f"Indexed {len(prepared)} documents into BM25 index")
+        return len(prepared)
+
+    def remove_documents(self, urls: List[str]) -> int:
+        """Remove documents by URL. Returns number removed."""
+        with self._lock, self._conn:
+            return self._remove_locked(list(urls))
+
+    def remove_site(self, site: str) -> int:
+        """Remove all documents belonging to a site. Returns number removed."""
+        with self._lock, self._conn:
+            urls = [row[0] for row in self._conn.execute("SELECT url FROM docs WHERE site = ?", (site,))]
+            return self._remove_locked(urls)
+
+    # ------------------------------------------------------------------
+    # Query-time lookup
+    # ------------------------------------------------------------------
+
+    def get_postings(self, terms: Iterable[str], urls: Iterable[str]) -> Dict[str, Dict[str, int]]:
+        """
+        Look up term frequencies for the given terms restricted to the given documents.
+
+        Returns:
+            Dict mapping url -> {term: tf} (only non-zero entries)
+        """
+        term_ids = self.scorer.tokenizer.term_ids(set(terms))
+        id_to_term = {term_id: term for term, term_id in term_ids.items()}
+        ids = list(id_to_term)
+        urls = list(set(urls))
+        postings: Dict[str, Dict[str, int]] = {}
+        if not ids or not urls:
+            return postings
+
+        term_placeholders = ",".join("?" * len(ids))
+        with self._lock:
+            for chunk in _chunks(urls, max(1, _SQL_CHUNK_SIZE - len(ids))):
+                url_placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT url, term, tf FROM postings "
+                    f"WHERE term IN ({term_placeholders}) AND url IN ({url_placeholders})",
+                    ids + chunk
+                ).fetchall()
+                for url, term_id, tf in rows:
+                    postings.setdefault(url, {})[id_to_term[term_id]] = tf
+        return postings
+
+    def get_doc_lengths(self, urls: Iterable[str]) -> Dict[str, int]:
+        """Return token length for each indexed URL (unindexed URLs omitted)."""
+        urls = list(set(urls))
+        lengths: Dict[str, int] = {}
+        with self._lock:
+            for chunk in _chunks(urls):
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT url, length FROM docs WHERE url IN ({placeholders})", chunk
+                ).fetchall()
+                lengths.update({url: length for url, length in rows})
+        return lengths
+
+    def score(self, query_tokens: List[str], urls: List[str],
+              k1: Optional[float] = None, b: Optional[float] = None) -> Dict[str, float]:
+        """
+        Score candidate documents against a query using corpus-wide statistics.
+
+        Args:
+            query_tokens: Tokenized query
+            urls: Candidate document URLs
+            k1: Term saturation parameter (defaults to the scorer's k1)
+            b: Length normalization parameter (defaults to the scorer's b)
+
+        Returns:
+            Dict mapping url -> BM25 score for every candidate that is indexed.
+            Candidates missing from the index are omitted so callers can fall back.
+        """
+        k1 = self.scorer.k1 if k1 is None else k1
+        b = self.scorer.b if b is None else b
+
+        doc_lengths = self.get_doc_lengths(urls)
+        if not doc_lengths:
+            return {}
+
+        unique_terms = list(set(query_tokens))
+        with self._lock:
+            corpus_size = int(self._get_stat('doc_count'))
+            total_length = self._get_stat('total_length')
+        avg_doc_length = total_length / corpus_size if corpus_size else 0.0
+        if avg_doc_length == 0:
+            return {url: 0.0 for url in doc_lengths}
+
+        term_doc_counts = self.get_term_doc_counts(unique_terms)
+        idf = {
+            term: self.scorer.calculate_idf(term, corpus_size, df)
+            for term, df in term_doc_counts.items()
+        }
+        postings = self.get_postings(idf.keys(), doc_lengths.keys())
+
+        scores: Dict[str, float] = {}
+        for url, doc_length in doc_lengths.items():
+            score = 0.0
+            norm = k1 * (1 - b + b * (doc_length / avg_doc_length))
+            for term, tf in postings.get(url, {}).items():
+                score += idf[term] * (tf * (k1 + 1)) / (tf + norm)
+            scores[url] = score
+        return scores
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+# Global singleton instance (created lazily)
+_bm25_index: Optional[BM25Index] = None
+_bm25_index_lock = threading.Lock()
+
+
+def get_bm25_index(index_path: Optional[str] = None) -> BM25Index:
+    """Get the global BM25 index instance."""
+    global _bm25_index
+    with _bm25_index_lock:
+        if _bm25_index is None:
+            _bm25_index = BM25Index(index_path)
+        return _bm25_index
@@ -100,6 +100,7 @@ class NLWebConfig:
     who_endpoint_enabled: bool = True  # Enable or disable the who endpoint
     api_keys: Dict[str, str] = field(default_factory=dict)  # API keys for external services
     who_endpoint: str = "http://localhost:8000/who"  # Endpoint for /who requests
+    speculative_retrieval_enabled: bool = True  # Start vector search on the raw query alongside the prechecks
 
 @dataclass
 class ConversationStorageConfig:
@@ -247,6 +248,34 @@ class AppConfig:
             data = yaml.safe_load(f)
 
             self.preferred_llm_endpoint: str = data["preferred_endpoint"]
+
+            # Process-wide LLM admission control (concurrency, rate limit, priority queue)
+            self.llm_scheduler_params: Dict[str, Any] = data.get("scheduler", {
+                "enabled": True,
+                "default": {
+                    "max_concurrency": 16,
+                    "model_max_concurrency": 16,
+                    "requests_per_second": 0,
+                    "burst": 0
+                },
+                "endpoints": {}
+            })
+
+            # Cache of LLM ranking results keyed by (query, document, prompt, model)
+            self.ranking_cache_params: Dict[str, Any] = data.get("ranking_cache", {
+                "enabled": True,
+                "backend": "memory",
+                "max_entries": 50000,
+                "ttl_seconds": 86400,
+                "sqlite_path": "data/ranking_cache/ranking_cache.db"
+            })
+
+            # Batched LLM ranking: items scored per prompt, with per-endpoint overrides
+            self.ranking_batch_params: Dict[str, Any] = data.get("ranking_batch", {
+                "enabled": False,
+                "batch_size": 1,
+                "providers": {}
+            })
             self.llm_endpoints: Dict[str, LLMProviderConfig] = {}
 
             for name, cfg in data.get("endpoints", {}).items():
@@ -287,6 +316,22 @@ class AppConfig:
             }
         
         self.preferred_embedding_provider: str = data["preferred_provider"]
+
+        # Query embedding cache (see core/embedding_cache.py)
+        self.embedding_cache_params: Dict[str, Any] = data.get("cache", {
+            "enabled": True,
+            "max_entries": 10000,
+            "ttl_seconds": 86400,
+            "sqlite_path": None
+        })
+
+        # Micro-batching of concurrent get_embedding calls into batch requests
+        self.embedding_coalescing_params: Dict[str, Any] = data.get("coalescing", {
+            "enabled": True,
+            "window_ms": 5,
+            "max_batch": 64,
+            "providers": ["openai", "azure_openai", "snowflake"]
+        })
         self.embedding_providers: Dict[str, EmbeddingProviderConfig] = {}
 
         for name, cfg in data.get("providers", {}).items():
@@ -333,7 +378,10 @@ class AppConfig:
             "k1": 1.5,
             "b": 0.75,
             "alpha": 0.6,
-            "beta": 0.4
+            "beta": 0.4,
+            "use_index": True,
+            "index_path": "data/bm25/bm25_index.db",
+            "token_cache_mb": 64
         })
 
         # Load MMR parameters
@@ -344,6 +392,20 @@ class AppConfig:
             "include_vectors": True
         })
 
+        # Load hybrid search rescoring parameters (worker pool for keyword/BM25/recency scoring)
+        self.rescoring_params: Dict[str, Any] = data.get("rescoring_params", {
+            "executor": "thread",
+            "max_workers": 4,
+            "cpu_budget_ms": 0
+        })
+
+        # Load HNSW (hnswlib) filtered search and query batching parameters
+        self.hnswlib_params: Dict[str, Any] = data.get("hnswlib_params", {
+            "max_ef_search": 1600,
+            "exact_search_threshold": 2000,
+            "batching": {"enabled": True, "window_ms": 2, "max_batch": 32, "num_threads": -1}
+        })
+
         # Load XGBoost parameters (Phase A - Week 1-2)
         self.xgboost_params: Dict[str, Any] = data.get("xgboost_params", {
             "enabled": False,
@@ -456,6 +518,21 @@ class AppConfig:
             gzip_enabled=self._get_config_value(static_data.get("gzip_enabled"), True)
         )
         
+        # SSE streaming: coalesce frames produced within window_ms into one write
+        self.sse_params: Dict[str, Any] = server_data.get("sse", {
+            "coalesce": True,
+            "window_ms": 5,
+            "max_buffer_bytes": 65536
+        })
+
+        # Ranked results shared between list and generate requests (see core/results_cache.py)
+        self.results_cache_params: Dict[str, Any] = server_data.get("results_cache", {
+            "backend": "memory",
+            "ttl_seconds": 300,
+            "sqlite_path": "data/results_cache/results_cache.db",
+            "redis_url": "redis://localhost:6379/0"
+        })
+
         # Create the server config
         self.server = ServerConfig(
             host=self._get_config_value(server_data.get("host"), "localhost"),
@@ -537,6 +614,19 @@ class AppConfig:
         # Load who_endpoint from config
         who_endpoint = self._get_config_value(data.get("who_endpoint"), "http://localhost:8000/who")
 
+        # Load speculative retrieval enabled flag
+        speculative_retrieval_enabled = self._get_config_value(data.get("speculative_retrieval_enabled"), True)
+
+        # Load embedding tool router parameters
+        self.tool_router_params: Dict[str, Any] = data.get("tool_router", {
+            "enabled": True,
+            "min_similarity": 0.35,
+            "margin": 0.08,
+            "max_llm_candidates": 3,
+            "classifier_enabled": False,
+            "classifier_max_examples": 2000
+        })
+
         # Load API keys from config
         api_keys = {}
         if "api_keys" in data:
@@ -571,7 +661,8 @@ class AppConfig:
             aggregation_enabled=aggregation_enabled,
             who_endpoint_enabled=who_endpoint_enabled,
             api_keys=api_keys,
-            who_endpoint=who_endpoint
+            who_endpoint=who_endpoint,
+            speculative_retrieval_enabled=speculative_retrieval_enabled
         )
     
     def get_chatbot_instructions(self, instruction_type: str = "search_results") -> str:
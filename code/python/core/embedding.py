@@ -8,11 +8,12 @@ WARNING: This code is under development and may undergo changes in future releas
 Backwards compatibility is not guaranteed at this time.
 """
 
-from typing import Optional, List
+from typing import Any, Dict, List, Optional, Set, Tuple
 import asyncio
 import threading
 
 from core.config import CONFIG
+from core.embedding_cache import get_embedding_cache
 from misc.logger.logging_config_helper import get_configured_logger, LogLevel
 
 logger = get_configured_logger("embedding_wrapper")
@@ -26,6 +27,124 @@ _provider_locks = {
     "elasticsearch": threading.Lock()
 }
 
+
+class EmbeddingCoalescer:
+    """
+    Micro-batches concurrent single-text embedding requests.
+
+    Requests for the same (event loop, provider, model) are collected for up to
+    window_ms or until max_batch distinct texts are queued, then sent as one
+    batch_get_embeddings call. Results are fanned back to the waiting futures;
+    identical texts in the same window share one slot in the batch.
+    """
+
+    def __init__(self, window_ms: float = 5, max_batch: int = 64):
+        """
+        Initialize the coalescer.
+
+        Args:
+            window_ms: Maximum time a request waits for others to join its batch
+            max_batch: Flush as soon as this many distinct texts are queued
+        """
+        self.window_s = window_ms / 1000.0
+        self.max_batch = max_batch
+        # (loop, provider, model) -> {text: [futures]}
+        self._pending: Dict[Tuple[Any, str, str], Dict[str, List[asyncio.Future]]] = {}
+        self._timers: Dict[Tuple[Any, str, str], asyncio.TimerHandle] = {}
+        self._timeouts: Dict[Tuple[Any, str, str], int] = {}
+        self._tasks: Set[asyncio.Task] = set()
+
+        self.requests = 0
+        self.batches = 0
+        self.batched_texts = 0
+
+    async def embed(self, text: str, provider: str, model: str, timeout: int = 30) -> List[float]:
+        """Queue a text for the next batch and wait for its embedding."""
+        loop = asyncio.get_running_loop()
+        key = (loop, provider, model)
+        future = loop.create_future()
+
+        batch = self._pending.setdefault(key, {})
+        batch.setdefault(text, []).append(future)
+        self._timeouts[key] = max(self._timeouts.get(key, 0), timeout)
+        self.requests += 1
+
+        if len(batch) >= self.max_batch:
+            self._flush(key)
+        elif key not in self._timers:
+            self._timers[key] = loop.call_later(self.window_s, self._flush, key)
+
+        return await asyncio.wait_for(future, timeout=timeout)
+
+    def _flush(self, key: Tuple[Any, str, str]) -> None:
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+        batch = self._pending.pop(key, None)
+        timeout = self._timeouts.pop(key, 30)
+        if not batch:
+            return
+        loop, provider, model = key
+        task = loop.create_task(self._run_batch(provider, model, batch, timeout))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self, provider: str, model: str,
+                         batch: Dict[str, List[asyncio.Future]], timeout: int) -> None:
+        texts = list(batch)
+        self.batches += 1
+        self.batched_texts += len(texts)
+        try:
+            if len(texts) == 1:
+                embeddings = [await _fetch_embedding(texts[0], provider, model, timeout)]
+            else:
+                logger.debug(f"Coalesced {len(texts)} embedding requests into one {provider} batch")
+                embeddings = await batch_get_embeddings(texts, provider, model, timeout)
+            if len(embeddings) != len(texts):
+                raise ValueError(f"Batch embedding returned {len(embeddings)} vectors for {len(texts)} texts")
+        except Exception as e:
+            for futures in batch.values():
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(e)
+            return
+
+        for text, embedding in zip(texts, embeddings):
+            for i, future in enumerate(batch[text]):
+                if not future.done():
+                    # Each waiter gets its own list so callers can mutate results safely
+                    future.set_result(embedding if i == 0 else list(embedding))
+
+    def get_stats(self) -> Dict[str, float]:
+        """Get coalescing statistics for monitoring."""
+        return {
+            'requests': self.requests,
+            'batches': self.batches,
+            'batched_texts': self.batched_texts,
+            'avg_batch_size': self.batched_texts / self.batches if self.batches else 0.0,
+        }
+
+
+# Global coalescer instance (created lazily from CONFIG.embedding_coalescing_params)
+_embedding_coalescer: Optional[EmbeddingCoalescer] = None
+_embedding_coalescer_lock = threading.Lock()
+
+
+def get_embedding_coalescer(provider: str) -> Optional[EmbeddingCoalescer]:
+    """Get the global coalescer, or None if coalescing is disabled for this provider."""
+    global _embedding_coalescer
+    params = CONFIG.embedding_coalescing_params
+    if not params.get('enabled', True) or provider not in params.get('providers', []):
+        return None
+    with _embedding_coalescer_lock:
+        if _embedding_coalescer is None:
+            _embedding_coalescer = EmbeddingCoalescer(
+                window_ms=params.get('window_ms', 5),
+                max_batch=params.get('max_batch', 64),
+            )
+        return _embedding_coalescer
+
+
 async def get_embedding(
     text: str,
     provider: Optional[str] = None,
@@ -85,6 +204,26 @@ async def get_embedding(
     
     logger.debug(f"Using embedding model: {model_id}")
 
+    cache = get_embedding_cache()
+    if cache is not None:
+        cached = await cache.get_async(provider, model_id, text)
+        if cached is not None:
+            logger.debug(f"Embedding cache hit for provider {provider}, model {model_id}")
+            return cached
+
+    coalescer = get_embedding_coalescer(provider)
+    if coalescer is not None:
+        result = await coalescer.embed(text, provider, model_id, timeout)
+    else:
+        result = await _fetch_embedding(text, provider, model_id, timeout)
+
+    if cache is not None:
+        await cache.put_async(provider, model_id, text, result)
+    return result
+
+
+async def _fetch_embedding(text: str, provider: str, model_id: str, timeout: int) -> List[float]:
+    """Call the embedding provider for a single text (no caching)."""
     try:
         # Use a timeout wrapper for all embedding calls
         if provider == "openai":
@@ -332,4 +471,53 @@ async def batch_get_embeddings(
                 "error_message": str(e)
             }
         )
-        raise
\ No newline at end of file
+        raise
+
+
+async def warmup_embedding_cache(
+    texts: List[str],
+    provider: Optional[str] = None,
+    model: Optional[str] = None,
+    timeout: int = 60
+) -> int:
+    """
+    Pre-populate the embedding cache, e.g. with popular queries at startup.
+
+    Texts already cached are skipped; the rest are embedded with one
+    batch_get_embeddings call.
+
+    Args:
+        texts: Query texts to warm
+        provider: Optional provider name, defaults to preferred_embedding_provider
+        model: Optional model name, defaults to the provider's configured model
+        timeout: Maximum time to wait for the batch embedding response in seconds
+
+    Returns:
+        Number of embeddings added to the cache
+    """
+    cache = get_embedding_cache()
+    if cache is None or not texts:
+        return 0
+
+    provider = provider or CONFIG.preferred_embedding_provider
+    provider_config = CONFIG.get_embedding_provider(provider)
+    model_id = model or (provider_config.model if provider_config else None)
+    if not model_id:
+        logger.warning(f"Cannot warm embedding cache: no model configured for provider '{provider}'")
+        return 0
+
+    MAX_CHARS = 20000
+    def uncached():
+        return list(dict.fromkeys(
+            text[:MAX_CHARS] for text in texts
+            if text and not cache.contains(provider, model_id, text[:MAX_CHARS])
+        ))
+
+    missing = await asyncio.to_thread(uncached)
+    if not missing:
+        return 0
+
+    embeddings = await batch_get_embeddings(missing, provider, model_id, timeout)
+    stored = await cache.put_many_async(provider, model_id, zip(missing, embeddings))
+    logger.info(f"Warmed embedding cache with {stored} entries (provider={provider}, model={model_id})")
+    return stored
@@ -0,0 +1,340 @@
+"""
+Two-tier cache for query embeddings.
+
+get_embedding is called for every search and for every sub-query the deep
+research orchestrator issues, and each call is a 100-400 ms round trip to the
+embedding provider. Popular news queries repeat constantly, so vectors are
+cached:
+
+- Tier 1: in-process LRU (bounded by entry count)
+- Tier 2: optional SQLite file shared across processes and restarts
+
+Entries are keyed by (provider, model, normalized text) so switching the
+embedding provider or model never returns a vector from a different space,
+and expire after a TTL.
+
+get_embedding uses get_async/put_async: the LRU is checked inline and only
+the SQLite tier runs in a worker thread, so disk I/O never blocks the event loop.
+
+Configuration (config_embedding.yaml -> cache):
+    enabled: true
+    max_entries: in-memory LRU size
+    ttl_seconds: entry lifetime (0 = never expire)
+    sqlite_path: on-disk store relative to the project root (null = memory only)
+"""
+
+import asyncio
+import hashlib
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from core.config import CONFIG
+from misc.logger.logging_config_helper import get_configured_logger
+
+logger = get_configured_logger("embedding_cache")
+
+
+def normalize_text(text: str) -> str:
+    """
+    Normalize query text for cache keying.
+
+    Applies NFKC (full-width/half-width forms common in Chinese input) and
+    collapses whitespace. Case is preserved since embeddings are case-sensitive.
+    """
+    return " ".join(unicodedata.normalize("NFKC", text).split())
+
+
+def make_cache_key(provider: str, model: str, text: str) -> str:
+    """Build the cache key for (provider, model, normalized text)."""
+    raw = f"{provider}\x00{model}\x00{normalize_text(text)}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def resolve_cache_path(sqlite_path: str) -> str:
+    """Resolve the on-disk cache path against the project root."""
+    # embedding_cache.py -> core/ -> python/ -> code/ -> project root
+    project_root = Path(__file__).resolve().parent.parent.parent.parent
+    path = Path(sqlite_path)
+    if not path.is_absolute():
+        path = project_root / path
+    return str(path)
+
+
+class EmbeddingCache:
+    """
+    Thread-safe LRU embedding cache with TTL and optional SQLite persistence.
+
+    Vectors are held as float64 NumPy arrays (exact round trip of provider
+    output) and returned as fresh lists, so callers may mutate them.
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS embeddings (
+        key TEXT PRIMARY KEY,
+        provider TEXT NOT NULL,
+        model TEXT NOT NULL,
+        vector BLOB NOT NULL,
+        created_at REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_embeddings_created_at ON embeddings(created_at);
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl_seconds: float = 86400,
+                 sqlite_path: Optional[str] = None):
+        """
+        Initialize the cache.
+
+        Args:
+            max_entries: Maximum entries kept in memory
+            ttl_seconds: Entry lifetime in seconds (0 = never expire)
+            sqlite_path: Optional path of the on-disk tier
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._memory: "OrderedDict[str, Tuple[np.ndarray, float]]" = OrderedDict()
+        # Separate locks so LRU lookups on the event loop never wait for disk I/O
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+
+        if sqlite_path:
+            path = resolve_cache_path(sqlite_path)
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(self.SCHEMA)
+            self._conn.commit()
+
+        logger.info(f"EmbeddingCache initialized (max_entries={max_entries}, ttl={ttl_seconds}s, "
+                    f"sqlite={'on' if self._conn else 'off'})")
+
+    def _is_expired(self, created_at: float, now: float) -> bool:
+        return bool(self.ttl_seconds) and now - created_at > self.ttl_seconds
+
+    def _put_memory(self, key: str, vector: np.ndarray, created_at: float) -> None:
+        """Insert into the LRU tier. Caller must hold the lock."""
+        self._memory[key] = (vector, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.evictions += 1
+
+    def get(self, provider: str, model: str, text: str) -> Optional[List[float]]:
+        """
+        Look up a cached embedding.
+
+        Returns:
+            Embedding vector, or None on miss/expiry
+        """
+        key = make_cache_key(provider, model, text)
+        now = time.time()
+        vector = self._get_memory(key, now)
+        if vector is None and self._conn is not None:
+            vector = self._get_disk(key, now)
+        return self._count_lookup(vector)
+
+    async def get_async(self, provider: str, model: str, text: str) -> Optional[List[float]]:
+        """get() for coroutines: the SQLite tier is read in a worker thread."""
+        key = make_cache_key(provider, model, text)
+        now = time.time()
+        vector = self._get_memory(key, now)
+        if vector is None and self._conn is not None:
+            vector = await asyncio.to_thread(self._get_disk, key, now)
+        return self._count_lookup(vector)
+
+    def _count_lookup(self, vector: Optional[List[float]]) -> Optional[List[float]]:
+        if vector is None:
+            with self._lock:
+                self.misses += 1
+        return vector
+
+    def _get_memory(self, key: str, now: float) -> Optional[List[float]]:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                return None
+            vector, created_at = entry
+            if not self._is_expired(created_at, now):
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return vector.tolist()
+            del self._memory[key]
+            self.expired += 1
+            return None
+
+    def _get_disk(self, key: str, now: float) -> Optional[List[float]]:
+        with self._db_lock:
+            if self._conn is None:
+                return None
+            row = self._conn.execute(
+                "SELECT vector, created_at FROM embeddings WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and self._is_expired(row[1], now):
+                self._conn.execute("DELETE FROM embeddings WHERE key = ?", (key,))
+                self._conn.commit()
+        if row is None:
+            return None
+        with self._lock:
+            if self._is_expired(row[1], now):
+                self.expired += 1
+                return None
+            vector = np.frombuffer(row[0], dtype=np.float64)
+            self._put_memory(key, vector, row[1])
+            self.disk_hits += 1
+        return vector.tolist()
+
+    def put(self, provider: str, model: str, text: str, embedding: List[float]) -> None:
+        """Store an embedding in both tiers."""
+        self.put_many(provider, model, [(text, embedding)])
+
+    async def put_async(self, provider: str, model: str, text: str, embedding: List[float]) -> None:
+        """put() for coroutines: the SQLite tier is written in a worker thread."""
+        await self.put_many_async(provider, model, [(text, embedding)])
+
+    def put_many(self, provider: str, model: str,
+                 items: Iterable[Tuple[str, List[float]]]) -> int:
+        """
+        Bulk-store embeddings (used for warmup).
+
+        Args:
+            provider: Embedding provider name
+            model: Embedding model name
+            items: (text, embedding) pairs
+
+        Returns:
+            int: Number of entries stored
+        """
+        rows = self._put_many_memory(provider, model, items)
+        self._write_disk(rows)
+        return len(rows)
+
+    async def put_many_async(self, provider: str, model: str,
+                             items: Iterable[Tuple[str, List[float]]]) -> int:
+        """put_many() for coroutines: the SQLite tier is written in a worker thread."""
+        rows = self._put_many_memory(provider, model, items)
+        if self._conn is not None and rows:
+            await asyncio.to_thread(self._write_disk, rows)
+        return len(rows)
+
+    def _put_many_memory(self, provider: str, model: str,
+                         items: Iterable[Tuple[str, List[float]]]) -> List[Tuple]:
+        """Store in the LRU tier and return the rows for the SQLite tier."""
+        now = time.time()
+        rows = []
+        with self._lock:
+            for text, embedding in items:
+                key = make_cache_key(provider, model, text)
+                vector = np.asarray(embedding, dtype=np.float64)
+                self._put_memory(key, vector, now)
+                rows.append((key, provider, model, vector.tobytes(), now))
+        return rows
+
+    def _write_disk(self, rows: List[Tuple]) -> None:
+        with self._db_lock:
+            if self._conn is not None and rows:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, provider, model, vector, created_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    rows
+                )
+                self._conn.commit()
+
+    def contains(self, provider: str, model: str, text: str) -> bool:
+        """Check whether a live entry exists without touching hit/miss counters."""
+        key = make_cache_key(provider, model, text)
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and not self._is_expired(entry[1], now):
+                return True
+        with self._db_lock:
+            if self._conn is not None:
+                row = self._conn.execute(
+                    "SELECT created_at FROM embeddings WHERE key = ?", (key,)
+                ).fetchone()
+                return row is not None and not self._is_expired(row[0], now)
+        return False
+
+    def purge_expired(self) -> int:
+        """Drop expired entries from both tiers. Returns the number removed."""
+        if not self.ttl_seconds:
+            return 0
+        now = time.time()
+        removed = 0
+        with self._lock:
+            stale = [k for k, (_, created_at) in self._memory.items() if self._is_expired(created_at, now)]
+            for key in stale:
+                del self._memory[key]
+            removed += len(stale)
+        with self._db_lock:
+            if self._conn is not None:
+                cursor = self._conn.execute(
+                    "DELETE FROM embeddings WHERE created_at < ?", (now - self.ttl_seconds,)
+                )
+                self._conn.commit()
+                removed += cursor.rowcount
+        return removed
+
+    def clear(self) -> None:
+        """Drop all entries from both tiers."""
+        with self._lock:
+            self._memory.clear()
+        with self._db_lock:
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM embeddings")
+                self._conn.commit()
+
+    def get_stats(self) -> Dict[str, float]:
+        """Get cache statistics for monitoring."""
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                'memory_entries': len(self._memory),
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'expired': self.expired,
+                'evictions': self.evictions,
+                'hit_rate': (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+            }
+
+    def close(self) -> None:
+        with self._db_lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+# Global singleton instance (created lazily from CONFIG.embedding_cache_params)
+_embedding_cache: Optional[EmbeddingCache] = None
+_embedding_cache_lock = threading.Lock()
+
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    """Get the global embedding cache, or None if caching is disabled."""
+    global _embedding_cache
+    params = CONFIG.embedding_cache_params
+    if not params.get('enabled', True):
+        return None
+    with _embedding_cache_lock:
+        if _embedding_cache is None:
+            _embedding_cache = EmbeddingCache(
+                max_entries=params.get('max_entries', 10000),
+                ttl_seconds=params.get('ttl_seconds', 86400),
+                sqlite_path=params.get('sqlite_path'),
+            )
+        return _embedding_cache
@@ -0,0 +1,508 @@
+"""
+Hybrid search rescoring (keyword / BM25 / domain-entity / recency).
+
+QdrantVectorClient.search retrieves up to 500 vector candidates and rescores
+them before returning the top results. That rescoring is CPU-bound, so it is
+factored out here as a pure function over plain data (vector score + payload
+dict per candidate) and run on a configurable worker pool instead of the
+aiohttp event loop.
+
+Configuration (config_retrieval.yaml -> rescoring_params):
+    executor: thread | process | inline
+    max_workers: pool size
+    cpu_budget_ms: per-request CPU budget for BM25/recency scoring (0 = unlimited)
+"""
+
+import asyncio
+import functools
+import json
+import re
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from core.bm25 import BM25Scorer
+from core.bm25_index import build_document_text, get_bm25_index
+from core.config import CONFIG
+from misc.logger.logging_config_helper import get_configured_logger
+
+logger = get_configured_logger("hybrid_rescoring")
+
+# Domains that trigger strict on-topic filtering when mentioned in the query
+DOMAIN_INDICATORS = ['零售', '金融', '製造', '醫療', '教育', '政府', '農業', '運輸',
+                     '物流', '通訊', '媒體', '娛樂', '旅遊', '餐飲', '房地產', '能源']
+
+# Domain-specific company/entity names that indicate the domain
+# This helps match articles about retail companies even if "零售" isn't mentioned
+DOMAIN_ENTITIES = {
+    '零售': ['walmart', 'target', 'amazon', 'momo', '7-eleven', '全家', 'familymart',
+            '統一超商', '家樂福', 'carrefour', '好市多', 'costco', 'pchome', '蝦皮', 'shopee',
+            '零售it', 'retail'],
+    '金融': ['fintech', '金融科技', '銀行', 'bank', '證券', '保險', '投資', '花旗', '摩根'],
+    '製造': ['tsmc', '台積電', '鴻海', 'foxconn', '製造業', '工廠', 'factory'],
+}
+
+# Publications that mention a domain but are not ABOUT that domain
+NEGATIVE_INDICATORS = {
+    '零售': ['fintech周報', 'fintech週報', 'fintech雙周報',
+            'martech周報', 'martech週報', 'martech雙周報',
+            'cloud周報', 'cloud週報', 'cloud雙周報',
+            'ai趨勢周報', 'ai趨勢週報', 'ai趨勢雙周報',
+            '金融科技', '台積電', 'tsmc', '趨勢科技', '鴻海', 'vmware', '博通'],
+    '金融': ['零售it', 'retail', 'martech周報', 'martech週報', 'martech雙周報'],
+    '製造': ['零售it', 'retail', 'fintech周報', 'fintech週報', 'fintech雙周報'],
+}
+
+TEMPORAL_KEYWORDS = ['最新', '最近', '近期', 'latest', 'recent', '新', '現在', '目前', '當前']
+
+# Temporal queries exclude articles older than this (also pushed down as a Qdrant range filter)
+RECENCY_CUTOFF_DAYS = 1095
+SECONDS_PER_DAY = 86400
+
+# Candidates scored per BM25 batch between CPU budget checks
+_BUDGET_CHUNK_SIZE = 64
+
+
+@dataclass
+class RescoringResult:
+    """Output of rescore_candidates. Indices refer to the input candidate list."""
+    ranking: List[Tuple[float, int]]            # (final_score, candidate index), best first
+    point_scores: Dict[str, Dict[str, float]]   # url -> {'bm25_score', 'keyword_boost'}
+    alpha: float
+    beta: float
+    use_bm25: bool
+    query_domains: List[str]
+    off_topic_count: int = 0
+    stats: Dict[str, Any] = field(default_factory=dict)
+
+
+def detect_query_domains(query: str) -> List[str]:
+    """Find which domain indicators are mentioned in the query."""
+    return [domain for domain in DOMAIN_INDICATORS if domain in query]
+
+
+def is_temporal_query(query: str) -> bool:
+    """Whether the query asks for recent content."""
+    return any(keyword in query for keyword in TEMPORAL_KEYWORDS)
+
+
+def detect_query_intent(query: str, alpha_default: float, beta_default: float) -> Tuple[float, float, str]:
+    """
+    Detect query intent (exact match vs semantic) and adjust alpha/beta weights.
+
+    Args:
+        query: The search query
+        alpha_default: Default alpha (vector weight)
+        beta_default: Default beta (BM25 weight)
+
+    Returns:
+        Tuple[float, float, str]: (alpha, beta, intent_type)
+    """
+    # Exact match intent features
+    has_quotes = '"' in query or '"' in query or '"' in query
+    has_numbers = bool(re.search(r'\d+', query))
+    has_hashtag = '#' in query
+
+    # Detect proper nouns (capitalized English words)
+    proper_nouns = re.findall(r'\b[A-Z][a-z]+\b', query)
+
+    # Semantic intent features
+    question_words = ['如何', '為什麼', '什麼', '怎麼', 'how', 'why', 'what', 'when', 'where']
+    has_question = any(word in query.lower() for word in question_words)
+
+    concept_words = ['趨勢', '策略', '方法', '應用', '發展', '技術', 'trend', 'strategy', 'approach', 'development']
+    has_concept = any(word in query.lower() for word in concept_words)
+
+    # Query length (Chinese characters + English words)
+    chinese_chars = len(re.findall(r'[\u4e00-\u9fff]', query))
+    english_words = len(re.findall(r'\b[a-zA-Z]{2,}\b', query))
+    total_length = chinese_chars + english_words
+
+    # Calculate intent scores
+    exact_score = 0
+    if has_quotes: exact_score += 3
+    if has_numbers: exact_score += 2
+    if has_hashtag: exact_score += 2
+    if len(proper_nouns) >= 2: exact_score += 2
+    if total_length > 15: exact_score += 1  # Long queries tend to be specific
+
+    semantic_score = 0
+    if has_question: semantic_score += 3
+    if has_concept: semantic_score += 2
+    if total_length < 8: semantic_score += 1  # Short queries tend to be exploratory
+
+    # Decide alpha/beta based on intent
+    if exact_score > semantic_score + 2:
+        # Strong exact match intent
+        return 0.4, 0.6, "EXACT_MATCH"
+    elif semantic_score > exact_score + 2:
+        # Strong semantic intent
+        return 0.7, 0.3, "SEMANTIC"
+    # Balanced or unclear - use default
+    return alpha_default, beta_default, "BALANCED"
+
+
+def _has_critical_keyword(query_domains: List[str], name: str, schema_json: str) -> bool:
+    """Check whether a (lowercased) article is about one of the query's domains."""
+    # If article has negative indicators, it is off-topic
+    for domain in query_domains:
+        for neg_indicator in NEGATIVE_INDICATORS.get(domain, []):
+            if neg_indicator in name:
+                return False
+
+    # STRICTER: Require domain keyword in TITLE or known entity in title/body
+    for domain in query_domains:
+        if domain.lower() in name:
+            return True
+        for entity in DOMAIN_ENTITIES.get(domain, []):
+            if entity.lower() in name or entity.lower() in schema_json:
+                return True
+    return False
+
+
+def extract_date_published_ts(schema: Any) -> Optional[float]:
+    """
+    Extract the publication date from an article's schema as a UTC epoch timestamp.
+
+    Called at upload time so the query path can read the precomputed
+    date_published_ts payload field instead of parsing schema_json per point.
+    Only the date part is kept (midnight UTC), matching the day-granular
+    recency buckets.
+
+    Args:
+        schema: schema_json string or already-parsed schema dict
+
+    Returns:
+        Epoch seconds, or None if the schema has no parseable datePublished
+    """
+    try:
+        schema_dict = json.loads(schema or "{}") if isinstance(schema, str) else (schema or {})
+        if isinstance(schema_dict, list):
+            schema_dict = schema_dict[0] if schema_dict else {}
+        date_published = schema_dict.get('datePublished', '')
+        if not date_published or not isinstance(date_published, str):
+            return None
+        date_str = date_published.split('T')[0]
+        pub_date = datetime.strptime(date_str, '%Y-%m-%d').replace(tzinfo=timezone.utc)
+        return pub_date.timestamp()
+    except (ValueError, TypeError, AttributeError):
+        return None
+
+
+def recency_cutoff_ts(now: Optional[datetime] = None) -> float:
+    """Oldest date_published_ts kept for temporal queries (3-year hard cutoff)."""
+    now = now or datetime.now(timezone.utc)
+    return now.timestamp() - (RECENCY_CUTOFF_DAYS + 1) * SECONDS_PER_DAY
+
+
+def recency_multipliers(date_published_ts: np.ndarray, now: datetime) -> np.ndarray:
+    """
+    Vectorized recency multipliers for temporal queries.
+
+    Args:
+        date_published_ts: float array of epoch seconds, NaN where the date is unknown
+        now: Reference time
+
+    Returns:
+        Multipliers per candidate: 1.0 if the date is unknown, NaN if the article
+        is older than 3 years and must be excluded.
+    """
+    days_old = np.floor((now.timestamp() - date_published_ts) / SECONDS_PER_DAY)
+    # STRONG recency multipliers: <6 months 2.5x, 6-12 months 1.8x, 1-2 years 1.0x, 2-3 years 0.5x
+    multipliers = np.select(
+        [np.isnan(days_old), days_old <= 180, days_old <= 365, days_old <= 730, days_old <= RECENCY_CUTOFF_DAYS],
+        [1.0, 2.5, 1.8, 1.0, 0.5],
+        default=np.nan  # HARD CUTOFF: exclude articles older than 3 years
+    )
+    return multipliers
+
+
+def _keyword_boost(keywords: List[str], name: str, schema_json: str) -> float:
+    """OLD LOGIC: Simple keyword boosting (fallback when BM25 is disabled)."""
+    boost = 0.0
+    for keyword in keywords:
+        keyword_lower = keyword.lower()
+        # VERY strong boost for keywords in title (3-4 char keywords get higher weight)
+        if keyword_lower in name:
+            boost += 3.0 if len(keyword) >= 3 else 1.0
+        # Moderate boost for keywords in body
+        elif keyword_lower in schema_json:
+            boost += 0.5 if len(keyword) >= 3 else 0.1
+    return boost
+
+
+def rescore_candidates(
+    query: str,
+    keywords: List[str],
+    candidates: List[Tuple[float, Dict[str, Any]]],
+    bm25_params: Dict[str, Any],
+    cpu_budget_ms: float = 0,
+    submitted_at: Optional[float] = None
+) -> RescoringResult:
+    """
+    Rescore vector search candidates with BM25/keyword, domain and recency signals.
+
+    Pure function over plain data so it can run on a thread or process pool.
+    BM25/keyword scores are computed in chunks in the candidates' incoming
+    (vector score) order; once the CPU budget is exhausted, the candidates not
+    scored yet keep only their vector score contribution. Every score that was
+    computed is used. Domain filtering and the recency boost and cutoff are
+    always applied to every candidate.
+
+    Args:
+        query: The search query
+        keywords: Query keywords (BM25 tokens)
+        candidates: List of (vector_score, payload) where payload has url/name/schema_json
+            and optionally date_published_ts
+        bm25_params: CONFIG.bm25_params
+        cpu_budget_ms: CPU time budget for scoring (0 = unlimited)
+        submitted_at: time.time() when the job was submitted (for queue time)
+
+    Returns:
+        RescoringResult with ranking and per-URL scores
+    """
+    started_at = time.time()
+    cpu_start = time.thread_time()
+    budget_s = cpu_budget_ms / 1000.0 if cpu_budget_ms else 0.0
+
+    def over_budget() -> bool:
+        return bool(budget_s) and (time.thread_time() - cpu_start) > budget_s
+
+    use_bm25 = bm25_params.get('enabled', True)
+    k1 = bm25_params.get('k1', 1.5)
+    b = bm25_params.get('b', 0.75)
+    alpha, beta, _ = detect_query_intent(query, bm25_params.get('alpha', 0.6), bm25_params.get('beta', 0.4))
+    query_domains = detect_query_domains(query)
+    temporal = is_temporal_query(query)
+
+    n = len(candidates)
+    bm25_scores = [0.0] * n
+    keyword_boosts = [0.0] * n
+    scored = [False] * n  # Received a BM25/keyword score within the budget
+
+    if use_bm25 and n:
+        bm25_scorer = BM25Scorer(k1=k1, b=b)
+        bm25_index = None
+        if bm25_params.get('use_index', True):
+            try:
+                bm25_index = get_bm25_index(bm25_params.get('index_path'))
+            except Exception as e:
+                logger.warning(f"BM25 index unavailable, falling back to per-query corpus stats: {e}")
+
+        # Corpus statistics default to the retrieved candidates themselves
+        avg_doc_length = None
+        corpus_size = None
+        term_doc_counts = None
+        unscored = list(range(n))
+
+        if bm25_index is not None and bm25_index.doc_count > 0:
+            # Postings lookup with corpus-wide IDF (no re-tokenization)
+            candidate_urls = [payload.get("url", "") for _, payload in candidates]
+            index_scores = bm25_index.score(keywords, candidate_urls, k1=k1, b=b)
+            unscored = []
+            for idx, url in enumerate(candidate_urls):
+                if url in index_scores:
+                    bm25_scores[idx] = index_scores[url]
+                    scored[idx] = True
+                else:
+                    unscored.append(idx)
+
+            # Candidates not yet indexed are scored against the same global stats
+            corpus_size = bm25_index.doc_count
+            avg_doc_length = bm25_index.avg_doc_length
+            if unscored:
+                term_doc_counts = bm25_index.get_term_doc_counts(keywords)
+
+        else:
+            # No index available: derive statistics once from all retrieved candidates
+            avg_doc_length, term_doc_counts = bm25_scorer.calculate_batch_stats(
+                keywords,
+                [build_document_text(payload.get("name", ""), payload.get("schema_json", ""))
+                 for _, payload in candidates]
+            )
+            corpus_size = n
+
+        # Vectorized batch scoring in chunks, checking the CPU budget in between
+        for start in range(0, len(unscored), _BUDGET_CHUNK_SIZE):
+            if over_budget():
+                break
+            chunk = unscored[start:start + _BUDGET_CHUNK_SIZE]
+            doc_texts = [build_document_text(candidates[idx][1].get("name", ""),
+                                             candidates[idx][1].get("schema_json", ""))
+                         for idx in chunk]
+            chunk_scores = bm25_scorer.calculate_scores_batch(
+                query_tokens=keywords,
+                documents=doc_texts,
+                avg_doc_length=avg_doc_length,
+                corpus_size=corpus_size,
+                term_doc_counts=term_doc_counts
+            )
+            for idx, score in zip(chunk, chunk_scores):
+                bm25_scores[idx] = float(score)
+                scored[idx] = True
+
+    elif n:
+        # Keyword boost mode, same budget checks per chunk
+        for start in range(0, n, _BUDGET_CHUNK_SIZE):
+            if over_budget():
+                break
+            for idx in range(start, min(start + _BUDGET_CHUNK_SIZE, n)):
+                payload = candidates[idx][1]
+                keyword_boosts[idx] = _keyword_boost(keywords, (payload.get("name", "") or "").lower(),
+                                                     (payload.get("schema_json", "") or "").lower())
+                scored[idx] = True
+
+    scored_results = []
+    on_topic_results = []
+    off_topic_results = []
+    point_scores: Dict[str, Dict[str, float]] = {}
+    multipliers = None
+    if temporal and n:
+        # Precomputed at upload time (date_published_ts payload field); NaN = unknown date
+        published = np.array(
+            [payload.get("date_published_ts") for _, payload in candidates], dtype=np.float64
+        )
+        multipliers = recency_multipliers(published, datetime.now(timezone.utc))
+
+    for idx, (base_score, payload) in enumerate(candidates):
+        doc_url = payload.get("url", "")
+        name = (payload.get("name", "") or "").lower()
+        schema_json = (payload.get("schema_json", "") or "").lower()
+        bm25_score = bm25_scores[idx]
+        keyword_boost = keyword_boosts[idx]
+
+        has_critical_keyword = bool(query_domains) and _has_critical_keyword(query_domains, name, schema_json)
+
+        if use_bm25:
+            # Combined score: α * vector_score + β * bm25_score
+            final_score = alpha * base_score + beta * bm25_score
+        else:
+            # Combined score: base similarity * (1 + keyword boost)
+            final_score = base_score * (1 + keyword_boost)
+
+        # Apply recency boost for temporal queries at retrieval level
+        # This is CRITICAL because we only pass top N results to the LLM ranker
+        if multipliers is not None:
+            multiplier = multipliers[idx]
+            if np.isnan(multiplier):
+                continue  # Older than 3 years: exclude completely
+            final_score = final_score * float(multiplier)
+
+        if doc_url:
+            point_scores[doc_url] = {
+                'bm25_score': bm25_score,
+                'keyword_boost': keyword_boost
+            }
+
+        # Separate on-topic vs off-topic results
+        if query_domains and has_critical_keyword:
+            on_topic_results.append((final_score, idx))
+        elif query_domains:
+            off_topic_results.append((final_score, idx))
+        else:
+            scored_results.append((final_score, idx))
+
+    # ONLY return on-topic results for domain-specific queries (no backfill)
+    if query_domains:
+        scored_results = on_topic_results
+    scored_results.sort(key=lambda x: x[0], reverse=True)
+
+    finished_at = time.time()
+    fully_scored = sum(scored)
+    stats = {
+        'queue_time': (started_at - submitted_at) if submitted_at else 0.0,
+        'compute_time': finished_at - started_at,
+        'cpu_time': time.thread_time() - cpu_start,
+        'candidates': n,
+        'fully_scored': fully_scored,
+        'budget_exhausted': fully_scored < n,
+    }
+
+    return RescoringResult(
+        ranking=scored_results,
+        point_scores=point_scores,
+        alpha=alpha,
+        beta=beta,
+        use_bm25=use_bm25,
+        query_domains=query_domains,
+        off_topic_count=len(off_topic_results),
+        stats=stats,
+    )
+
+
+class HybridRescorer:
+    """
+    Runs rescore_candidates on a thread or process pool so the event loop stays free.
+    """
+
+    def __init__(self, executor_type: str = "thread", max_workers: int = 4, cpu_budget_ms: float = 0):
+        """
+        Initialize the rescorer.
+
+        Args:
+            executor_type: "thread", "process" or "inline" (run on the calling thread)
+            max_workers: Worker pool size
+            cpu_budget_ms: Per-request CPU budget passed to rescore_candidates (0 = unlimited)
+        """
+        self.executor_type = executor_type
+        self.max_workers = max_workers
+        self.cpu_budget_ms = cpu_budget_ms
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+        logger.info(f"HybridRescorer initialized (executor={executor_type}, max_workers={max_workers}, "
+                    f"cpu_budget_ms={cpu_budget_ms})")
+
+    def _get_executor(self) -> Optional[Executor]:
+        if self.executor_type == "inline":
+            return None
+        with self._lock:
+            if self._executor is None:
+                if self.executor_type == "process":
+                    self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+                else:
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                        thread_name_prefix="hybrid-rescore")
+            return self._executor
+
+    async def rescore(self, query: str, keywords: List[str],
+                      candidates: List[Tuple[float, Dict[str, Any]]],
+                      bm25_params: Dict[str, Any]) -> RescoringResult:
+        """Rescore candidates off the event loop."""
+        job = functools.partial(
+            rescore_candidates, query, keywords, candidates, dict(bm25_params),
+            self.cpu_budget_ms, time.time()
+        )
+        executor = self._get_executor()
+        if executor is None:
+            return job()
+        return await asyncio.get_running_loop().run_in_executor(executor, job)
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+
+
+# Global singleton instance (created lazily from CONFIG.rescoring_params)
+_hybrid_rescorer: Optional[HybridRescorer] = None
+_hybrid_rescorer_lock = threading.Lock()
+
+
+def get_hybrid_rescorer() -> HybridRescorer:
+    """Get the global hybrid rescorer instance."""
+    global _hybrid_rescorer
+    with _hybrid_rescorer_lock:
+        if _hybrid_rescorer is None:
+            params = CONFIG.rescoring_params
+            _hybrid_rescorer = HybridRescorer(
+                executor_type=params.get('executor', 'thread'),
+                max_workers=params.get('max_workers', 4),
+                cpu_budget_ms=params.get('cpu_budget_ms', 0),
+            )
+        return _hybrid_rescorer
@@ -9,12 +9,16 @@ Backwards compatibility is not guaranteed at this time.
 
 """
 
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
+from contextlib import asynccontextmanager
 from core.config import CONFIG
 import asyncio
+import bisect
+import itertools
 import threading
 import subprocess
 import sys
+import time
 
 
 from misc.logger.logging_config_helper import get_configured_logger, LogLevel
@@ -154,6 +158,238 @@ def _get_provider(llm_type: str):
         logger.error(f"Failed to import provider for {llm_type}: {e}")
         raise ValueError(f"Failed to load provider for {llm_type}: {e}")
 
+# Priority classes for the LLM scheduler (lower value is served first)
+LLM_PRIORITIES = {"interactive": 0, "normal": 1, "background": 2}
+
+
+class _TokenBucket:
+    """Token-bucket rate limiter (requests per second with a burst allowance)."""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.capacity = max(1.0, burst or rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_take(self) -> bool:
+        self._refill()
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return True
+        return False
+
+    def wait_time(self) -> float:
+        self._refill()
+        return max(0.0, (1.0 - self.tokens) / self.rate)
+
+
+class _Waiter:
+    __slots__ = ("priority", "seq", "model", "future", "enqueued_at", "granted")
+
+    def __init__(self, priority: int, seq: int, model: str, future: asyncio.Future):
+        self.priority = priority
+        self.seq = seq
+        self.model = model
+        self.future = future
+        self.enqueued_at = time.monotonic()
+        self.granted = False
+
+    def __lt__(self, other: "_Waiter") -> bool:
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class _EndpointLane:
+    """Concurrency, rate-limit and queue state for one LLM endpoint."""
+
+    def __init__(self, max_concurrency: int, model_max_concurrency: int,
+                 requests_per_second: float, burst: float):
+        self.max_concurrency = max_concurrency
+        self.model_max_concurrency = model_max_concurrency
+        self.bucket = _TokenBucket(requests_per_second, burst) if requests_per_second else None
+        self.in_flight = 0
+        self.model_in_flight: Dict[str, int] = {}
+        self.waiters: List[_Waiter] = []  # sorted by (priority, seq)
+        self.timer_pending = False
+
+        self.granted = 0
+        self.queued = 0
+        self.rate_limited = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def can_run(self, model: str) -> bool:
+        return (self.in_flight < self.max_concurrency and
+                self.model_in_flight.get(model, 0) < self.model_max_concurrency)
+
+
+class LLMScheduler:
+    """
+    Process-wide admission control for LLM calls.
+
+    Each endpoint has a concurrency limit, a per-model concurrency limit and an
+    optional token-bucket rate limit. Calls that cannot start immediately wait in
+    a priority queue: interactive work (ranking) is admitted before normal and
+    background (deep research) work; equal priorities are FIFO.
+
+    Configured in config_llm.yaml -> scheduler, with per-endpoint overrides.
+    """
+
+    def __init__(self, params: Dict[str, Any]):
+        self.params = params
+        self._lanes: Dict[str, _EndpointLane] = {}
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+
+    def _get_lane(self, endpoint: str) -> _EndpointLane:
+        lane = self._lanes.get(endpoint)
+        if lane is None:
+            cfg = dict(self.params.get('default', {}))
+            cfg.update(self.params.get('endpoints', {}).get(endpoint, {}))
+            lane = _EndpointLane(
+                max_concurrency=cfg.get('max_concurrency', 16),
+                model_max_concurrency=cfg.get('model_max_concurrency', cfg.get('max_concurrency', 16)),
+                requests_per_second=cfg.get('requests_per_second', 0),
+                burst=cfg.get('burst', 0),
+            )
+            self._lanes[endpoint] = lane
+        return lane
+
+    def _grant(self, lane: _EndpointLane, model: str, waited: float) -> None:
+        """Account for an admitted call. Caller must hold the lock."""
+        lane.in_flight += 1
+        lane.model_in_flight[model] = lane.model_in_flight.get(model, 0) + 1
+        lane.granted += 1
+        lane.total_wait += waited
+        lane.max_wait = max(lane.max_wait, waited)
+
+    def _dispatch(self, lane: _EndpointLane) -> None:
+        """Admit queued calls in priority order while capacity allows. Caller must hold the lock."""
+        i = 0
+        while i < len(lane.waiters) and lane.in_flight < lane.max_concurrency:
+            waiter = lane.waiters[i]
+            if waiter.future.done():  # Cancelled while queued
+                lane.waiters.pop(i)
+                continue
+            if not lane.can_run(waiter.model):
+                i += 1  # Model saturated; other models may still run
+                continue
+            if lane.bucket is not None and not lane.bucket.try_take():
+                self._schedule_retry(lane, waiter.future.get_loop())
+                return
+            lane.waiters.pop(i)
+            waiter.granted = True
+            self._grant(lane, waiter.model, time.monotonic() - waiter.enqueued_at)
+            waiter.future.get_loop().call_soon_threadsafe(_resolve_waiter, waiter.future)
+
+    def _schedule_retry(self, lane: _EndpointLane, loop: asyncio.AbstractEventLoop) -> None:
+        """Re-run dispatch once the token bucket has refilled. Caller must hold the lock."""
+        if lane.timer_pending:
+            return
+        lane.timer_pending = True
+        delay = lane.bucket.wait_time()
+
+        def retry():
+            with self._lock:
+                lane.timer_pending = False
+                self._dispatch(lane)
+
+        loop.call_soon_threadsafe(loop.call_later, delay, retry)
+
+    async def acquire(self, endpoint: str, model: str, priority: str = "normal") -> None:
+        """Wait until a call to endpoint/model may start."""
+        priority_value = LLM_PRIORITIES.get(priority, LLM_PRIORITIES["normal"])
+        with self._lock:
+            lane = self._get_lane(endpoint)
+            # Fast path: nothing queued ahead and capacity/rate available
+            if not lane.waiters and lane.can_run(model):
+                if lane.bucket is None or lane.bucket.try_take():
+                    self._grant(lane, model, 0.0)
+                    return
+                lane.rate_limited += 1
+            waiter = _Waiter(priority_value, next(self._seq), model, asyncio.get_running_loop().create_future())
+            bisect.insort(lane.waiters, waiter)
+            lane.queued += 1
+            self._dispatch(lane)
+
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            with self._lock:
+                if waiter.granted:
+                    self._release_locked(lane, model)
+                elif waiter in lane.waiters:
+                    lane.waiters.remove(waiter)
+            raise
+
+    def _release_locked(self, lane: _EndpointLane, model: str) -> None:
+        lane.in_flight -= 1
+        lane.model_in_flight[model] -= 1
+        self._dispatch(lane)
+
+    def release(self, endpoint: str, model: str) -> None:
+        """Mark a call as finished and admit the next queued call."""
+        with self._lock:
+            self._release_locked(self._get_lane(endpoint), model)
+
+    @asynccontextmanager
+    async def slot(self, endpoint: str, model: str, priority: str = "normal"):
+        """Async context manager holding an admission slot for one LLM call."""
+        await self.acquire(endpoint, model, priority)
+        try:
+            yield
+        finally:
+            self.release(endpoint, model)
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Get per-endpoint queue depth and wait metrics for monitoring."""
+        stats = {}
+        with self._lock:
+            for endpoint, lane in self._lanes.items():
+                queue_depth = {name: 0 for name in LLM_PRIORITIES}
+                names = {value: name for name, value in LLM_PRIORITIES.items()}
+                for waiter in lane.waiters:
+                    if not waiter.future.done():
+                        queue_depth[names[waiter.priority]] += 1
+                stats[endpoint] = {
+                    'in_flight': lane.in_flight,
+                    'max_concurrency': lane.max_concurrency,
+                    'queue_depth': queue_depth,
+                    'granted': lane.granted,
+                    'queued': lane.queued,
+                    'rate_limited': lane.rate_limited,
+                    'avg_wait_ms': round(lane.total_wait / lane.granted * 1000, 2) if lane.granted else 0.0,
+                    'max_wait_ms': round(lane.max_wait * 1000, 2),
+                }
+        return stats
+
+
+def _resolve_waiter(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+# Global scheduler instance (created lazily from CONFIG.llm_scheduler_params)
+_llm_scheduler: Optional[LLMScheduler] = None
+_llm_scheduler_lock = threading.Lock()
+
+
+def get_llm_scheduler() -> Optional[LLMScheduler]:
+    """Get the global LLM scheduler, or None if scheduling is disabled."""
+    global _llm_scheduler
+    params = CONFIG.llm_scheduler_params
+    if not params.get('enabled', True):
+        return None
+    with _llm_scheduler_lock:
+        if _llm_scheduler is None:
+            _llm_scheduler = LLMScheduler(params)
+        return _llm_scheduler
+
+
 async def ask_llm(
     prompt: str,
     schema: Dict[str, Any],
@@ -161,7 +397,8 @@ async def ask_llm(
     level: str = "low",
     timeout: int = 60,
     query_params: Optional[Dict[str, Any]] = None,
-    max_length: int = 512
+    max_length: int = 512,
+    priority: str = "normal"
 ) -> Dict[str, Any]:
     """
     Route an LLM request to the specified endpoint, with dispatch based on llm_type.
@@ -174,6 +411,8 @@ async def ask_llm(
         timeout: Request timeout in seconds
         query_params: Optional query parameters for development mode provider override
         max_length: Maximum length of the response in tokens (default: 512)
+        priority: Scheduling class: 'interactive', 'normal' or 'background'.
+                  Time spent queued in the scheduler counts toward the timeout.
         
     Returns:
         Parsed JSON response from the LLM
@@ -238,10 +477,16 @@ async def ask_llm(
         # Simply call the provider's get_completion method without locking
         # Each provider should handle thread-safety internally
         logger.debug(f"Calling {llm_type} provider completion for endpoint {provider_name} with max_completion_tokens={max_length}")
-        result = await asyncio.wait_for(
-            provider_instance.get_completion(prompt, schema, model=model_id, timeout=timeout, max_completion_tokens=max_length),
-            timeout=timeout
-        )
+        scheduler = get_llm_scheduler()
+        if scheduler is not None:
+            async def scheduled_completion():
+                async with scheduler.slot(provider_name, model_id, priority):
+                    return await provider_instance.get_completion(
+                        prompt, schema, model=model_id, timeout=timeout, max_completion_tokens=max_length)
+            completion = scheduled_completion()
+        else:
+            completion = provider_instance.get_completion(prompt, schema, model=model_id, timeout=timeout, max_completion_tokens=max_length)
+        result = await asyncio.wait_for(completion, timeout=timeout)
         logger.debug(f"{provider_name} response received, size: {len(str(result))} chars")
         return result
         
@@ -0,0 +1,252 @@
+"""
+Compact n-gram tokenizer for BM25 scoring.
+
+BM25Scorer.tokenize builds a Python string for every 2/3/4-character window of
+Chinese text, so long schema_json payloads turn into tens of thousands of short
+strings per document. This module encodes the same tokens as int64 term IDs
+without materializing those strings:
+
+- Chinese n-grams are packed arithmetically: each CJK code point in
+  U+4E00..U+9FFF fits in 15 bits, so a 4-gram fits in 60 bits. The n-gram
+  length is stored in bits 60-62. Encoding is vectorized with NumPy.
+- English words (2+ letters, lowercased) get a stable 60-bit hash ID tagged
+  with 1 << 60 (never a valid n-gram length).
+
+IDs are deterministic, so they are identical across processes and can be
+persisted (the BM25 inverted index stores them directly).
+
+Per-document term counts are memoized in a bounded LRU keyed by a caller
+supplied key (e.g. URL) or by content hash, so candidates that repeat across
+queries are not tokenized again.
+"""
+
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from core.config import CONFIG
+from misc.logger.logging_config_helper import get_configured_logger
+
+logger = get_configured_logger("ngram_tokenizer")
+
+CJK_BASE = 0x4E00
+_CJK_BITS = 15
+_CJK_MASK = (1 << _CJK_BITS) - 1
+_TAG_SHIFT = 60
+_VALUE_MASK = (1 << _TAG_SHIFT) - 1
+_ENGLISH_TAG = 1
+NGRAM_SIZES = (2, 3, 4)
+
+_CJK_PATTERN = re.compile(r'[\u4e00-\u9fff]+')
+_ENGLISH_PATTERN = re.compile(r'[a-zA-Z]{2,}')
+
+_EMPTY_IDS = np.zeros(0, dtype=np.int64)
+_EMPTY_COUNTS = np.zeros(0, dtype=np.int32)
+
+
+@lru_cache(maxsize=65536)
+def _english_term_id(word: str) -> int:
+    digest = hashlib.blake2b(word.encode('utf-8'), digest_size=8).digest()
+    return (_ENGLISH_TAG << _TAG_SHIFT) | (int.from_bytes(digest, 'little') & _VALUE_MASK)
+
+
+def encode_chinese_ngrams(chinese_text: str) -> np.ndarray:
+    """
+    Encode all 2, 3 and 4-character windows of CJK text as packed int64 IDs.
+
+    Args:
+        chinese_text: Text consisting only of characters in U+4E00..U+9FFF
+
+    Returns:
+        Array of term IDs in the same order BM25Scorer.tokenize emits tokens
+    """
+    if len(chinese_text) < 2:
+        return _EMPTY_IDS
+    code_points = np.frombuffer(chinese_text.encode('utf-32-le'), dtype=np.uint32).astype(np.int64) - CJK_BASE
+
+    parts = []
+    for n in NGRAM_SIZES:
+        window_count = len(code_points) - n + 1
+        if window_count <= 0:
+            break
+        packed = np.zeros(window_count, dtype=np.int64)
+        for offset in range(n):
+            packed = (packed << _CJK_BITS) | code_points[offset:offset + window_count]
+        parts.append(packed | (n << _TAG_SHIFT))
+    return np.concatenate(parts)
+
+
+class NgramTokenizer:
+    """
+    Tokenizer producing integer term IDs with a bounded per-document cache.
+
+    Thread-safe; a single shared instance is used by BM25Scorer and BM25Index.
+    """
+
+    def __init__(self, max_cache_bytes: int = 64 * 1024 * 1024):
+        """
+        Initialize the tokenizer.
+
+        Args:
+            max_cache_bytes: Upper bound on memory used by memoized document term counts
+        """
+        self.max_cache_bytes = max_cache_bytes
+        self._cache: "OrderedDict[str, Tuple[np.ndarray, np.ndarray, int]]" = OrderedDict()
+        self._cache_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    # ------------------------------------------------------------------
+    # Term <-> ID
+    # ------------------------------------------------------------------
+
+    def term_id(self, term: str) -> Optional[int]:
+        """
+        Get the ID for a single token as produced by BM25Scorer.tokenize.
+
+        Returns:
+            Term ID, or None if the string is not a valid token
+        """
+        if 2 <= len(term) <= 4 and _CJK_PATTERN.fullmatch(term):
+            value = 0
+            for ch in term:
+                value = (value << _CJK_BITS) | (ord(ch) - CJK_BASE)
+            return (len(term) << _TAG_SHIFT) | value
+        if _ENGLISH_PATTERN.fullmatch(term):
+            # Document tokens are lowercased, so mixed-case query terms never match (as before)
+            return _english_term_id(term)
+        return None
+
+    def term_ids(self, terms: Iterable[str]) -> Dict[str, int]:
+        """Map tokens to IDs, skipping strings that are not valid tokens."""
+        result = {}
+        for term in terms:
+            tid = self.term_id(term)
+            if tid is not None:
+                result[term] = tid
+        return result
+
+    @staticmethod
+    def decode(term_id: int) -> Optional[str]:
+        """Decode a Chinese n-gram ID back to its string (English IDs are one-way hashes)."""
+        n = term_id >> _TAG_SHIFT
+        if n not in NGRAM_SIZES:
+            return None
+        chars = []
+        for _ in range(n):
+            chars.append(chr((term_id & _CJK_MASK) + CJK_BASE))
+            term_id >>= _CJK_BITS
+        return ''.join(reversed(chars))
+
+    # ------------------------------------------------------------------
+    # Encoding
+    # ------------------------------------------------------------------
+
+    def encode(self, text: str) -> np.ndarray:
+        """
+        Encode text into term IDs (Chinese 2/3/4-grams followed by English words).
+
+        Args:
+            text: Input text
+
+        Returns:
+            int64 array with one ID per token emitted by BM25Scorer.tokenize
+        """
+        if not text:
+            return _EMPTY_IDS
+        chinese_ids = encode_chinese_ngrams(''.join(_CJK_PATTERN.findall(text)))
+        english_words = _ENGLISH_PATTERN.findall(text)
+        if not english_words:
+            return chinese_ids
+        english_ids = np.fromiter(
+            (_english_term_id(w.lower()) for w in english_words), dtype=np.int64, count=len(english_words)
+        )
+        return np.concatenate([chinese_ids, english_ids]) if len(chinese_ids) else english_ids
+
+    def term_counts(self, text: str, key: Optional[str] = None) -> Tuple[np.ndarray, np.ndarray, int]:
+        """
+        Get (unique term IDs, term frequencies, document length) for a document.
+
+        Results are memoized. When a key (e.g. the document URL) is given the
+        caller guarantees the content for that key does not change; otherwise
+        the content hash is used.
+
+        Args:
+            text: Document text
+            key: Optional stable cache key for the document
+
+        Returns:
+            Tuple of (sorted unique IDs as int64, counts as int32, total token count).
+            The arrays are shared with the cache and must not be modified.
+        """
+        if not text:
+            return _EMPTY_IDS, _EMPTY_COUNTS, 0
+
+        cache_key = key if key is not None else hashlib.blake2b(
+            text.encode('utf-8'), digest_size=16
+        ).hexdigest()
+
+        with self._lock:
+            entry = self._cache.get(cache_key)
+            if entry is not None:
+                self._cache.move_to_end(cache_key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+
+        ids = self.encode(text)
+        unique_ids, counts = np.unique(ids, return_counts=True)
+        entry = (unique_ids, counts.astype(np.int32), int(len(ids)))
+        entry_bytes = unique_ids.nbytes + entry[1].nbytes
+
+        if entry_bytes <= self.max_cache_bytes:
+            with self._lock:
+                if cache_key not in self._cache:
+                    self._cache[cache_key] = entry
+                    self._cache_bytes += entry_bytes
+                while self._cache_bytes > self.max_cache_bytes and self._cache:
+                    _, (old_ids, old_counts, _) = self._cache.popitem(last=False)
+                    self._cache_bytes -= old_ids.nbytes + old_counts.nbytes
+        return entry
+
+    def clear(self):
+        """Drop all memoized documents."""
+        with self._lock:
+            self._cache.clear()
+            self._cache_bytes = 0
+
+    def get_stats(self) -> Dict[str, int]:
+        """Get cache statistics for monitoring."""
+        with self._lock:
+            return {
+                'cached_documents': len(self._cache),
+                'cache_bytes': self._cache_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+            }
+
+
+def unique_terms(tokens: List[str]) -> List[str]:
+    """Deduplicate tokens while preserving their first-seen order."""
+    return list(dict.fromkeys(tokens))
+
+
+# Global singleton instance (created lazily)
+_ngram_tokenizer: Optional[NgramTokenizer] = None
+_ngram_tokenizer_lock = threading.Lock()
+
+
+def get_ngram_tokenizer() -> NgramTokenizer:
+    """Get the global n-gram tokenizer instance."""
+    global _ngram_tokenizer
+    with _ngram_tokenizer_lock:
+        if _ngram_tokenizer is None:
+            cache_mb = CONFIG.bm25_params.get('token_cache_mb', 64)
+            _ngram_tokenizer = NgramTokenizer(max_cache_bytes=int(cache_mb * 1024 * 1024))
+        return _ngram_tokenizer
@@ -0,0 +1,193 @@
+"""
+Columnar (Parquet) export for analytics and training data.
+
+The CSV exports pull the whole queries/retrieved_documents/ranking_scores join
+into Python lists before writing, so their memory use and latency grow with
+the query log. The helpers here work on row chunks from a server-side cursor
+(see AnalyticsDB.stream_query) and write typed Parquet:
+
+- PartitionedParquetWriter: files on disk, one directory per day
+  (output_dir/day=YYYY-MM-DD/part-<export>.parquet), readable as a dataset
+- iter_parquet_bytes: a single Parquet file produced incrementally as bytes,
+  one row group per chunk, for streaming HTTP downloads
+
+pyarrow is optional; callers check PYARROW_AVAILABLE (or call require_pyarrow)
+before using the Parquet paths.
+"""
+
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+# pyarrow is optional (only needed for Parquet export/loading)
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+# Column type names accepted by make_schema
+COLUMN_TYPES = ("string", "int64", "float64")
+
+
+def require_pyarrow() -> None:
+    """Raise a clear error when Parquet support is requested without pyarrow."""
+    if not PYARROW_AVAILABLE:
+        raise RuntimeError("Parquet export requires pyarrow (pip install pyarrow)")
+
+
+def make_schema(columns: Sequence[Tuple[str, str]], metadata: Optional[Dict[str, str]] = None):
+    """
+    Build an Arrow schema from (name, type) pairs.
+
+    Args:
+        columns: Column names with one of COLUMN_TYPES
+        metadata: Optional key/value metadata stored in the file footer
+    """
+    require_pyarrow()
+    types = {"string": pa.string(), "int64": pa.int64(), "float64": pa.float64()}
+    schema = pa.schema([pa.field(name, types[type_name]) for name, type_name in columns])
+    if metadata:
+        schema = schema.with_metadata(metadata)
+    return schema
+
+
+def day_partition(timestamp: float) -> str:
+    """UTC day (YYYY-MM-DD) of an epoch timestamp, used as the partition key."""
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc).strftime("%Y-%m-%d")
+
+
+def _type_name(arrow_type) -> str:
+    if pa.types.is_integer(arrow_type):
+        return "int64"
+    if pa.types.is_floating(arrow_type):
+        return "float64"
+    return "string"
+
+
+def _coerce(value: Any, type_name: str) -> Any:
+    """Convert DB values to the column type (SQLite may hand back bools, ints for REAL, ...)."""
+    if value is None:
+        return None
+    if type_name == "int64":
+        return int(value)
+    if type_name == "float64":
+        return float(value)
+    return str(value)
+
+
+def rows_to_table(rows: List[Dict[str, Any]], schema):
+    """Convert a chunk of row dicts to a table; keys missing from a row become nulls."""
+    columns = {}
+    for field in schema:
+        type_name = _type_name(field.type)
+        columns[field.name] = [_coerce(row.get(field.name), type_name) for row in rows]
+    return pa.Table.from_pydict(columns, schema=schema)
+
+
+class PartitionedParquetWriter:
+    """
+    Write row chunks into day-partitioned Parquet files.
+
+    Rows are routed by the epoch timestamp in `timestamp_column`. Each export
+    writes one file per day it touches, named after the export so repeated
+    exports never overwrite each other's parts.
+    """
+
+    def __init__(self, output_dir: Path, schema, timestamp_column: str = "timestamp",
+                 export_id: Optional[str] = None):
+        require_pyarrow()
+        self.output_dir = Path(output_dir)
+        self.schema = schema
+        self.timestamp_column = timestamp_column
+        self.export_id = export_id or str(int(time.time()))
+        self._writers: Dict[str, Any] = {}
+        self.rows_per_day: Dict[str, int] = {}
+
+    def _writer_for(self, day: str):
+        writer = self._writers.get(day)
+        if writer is None:
+            partition_dir = self.output_dir / f"day={day}"
+            partition_dir.mkdir(parents=True, exist_ok=True)
+            writer = pq.ParquetWriter(str(partition_dir / f"part-{self.export_id}.parquet"), self.schema)
+            self._writers[day] = writer
+        return writer
+
+    def write(self, rows: List[Dict[str, Any]]) -> None:
+        """Append a chunk of rows to the partitions they belong to."""
+        by_day: Dict[str, List[Dict[str, Any]]] = {}
+        for row in rows:
+            by_day.setdefault(day_partition(row[self.timestamp_column]), []).append(row)
+        for day, day_rows in by_day.items():
+            self._writer_for(day).write_table(rows_to_table(day_rows, self.schema))
+            self.rows_per_day[day] = self.rows_per_day.get(day, 0) + len(day_rows)
+
+    def close(self) -> Dict[str, int]:
+        """Finish all files. Returns rows written per day."""
+        for writer in self._writers.values():
+            writer.close()
+        self._writers.clear()
+        return dict(self.rows_per_day)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class _ByteSink:
+    """Write-only file object that hands written bytes back to the caller in pieces."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        # Parquet records absolute offsets, so this is the total written, not the buffered size
+        return self._position
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def writable(self) -> bool:
+        return True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def iter_parquet_bytes(chunks: Iterable[List[Dict[str, Any]]], schema) -> Iterator[bytes]:
+    """
+    Encode row chunks as one Parquet file, yielding bytes as each row group is written.
+
+    Only one chunk is held in memory at a time, so this suits streaming an
+    HTTP download of an arbitrarily large export.
+    """
+    require_pyarrow()
+    sink = _ByteSink()
+    writer = pq.ParquetWriter(pa.PythonFile(sink, mode="w"), schema)
+    try:
+        for rows in chunks:
+            if rows:
+                writer.write_table(rows_to_table(rows, schema))
+            data = sink.drain()
+            if data:
+                yield data
+    finally:
+        writer.close()
+    yield sink.drain()
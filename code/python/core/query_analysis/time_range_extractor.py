@@ -105,6 +105,22 @@ class TimeRangeExtractor:
 
         logger.info(f"[TIME-EXTRACTOR] Initializing for query: {handler.query}")
 
+    @classmethod
+    def finds_range_without_llm(cls, query: str, query_params: Dict) -> bool:
+        """
+        Whether do() will return a date range without asking the LLM.
+
+        True for explicit time_range_start/end params, a regex match or a
+        fallback keyword; lets callers skip work that a date filter makes useless.
+        """
+        from core.utils.utils import get_param
+        if (get_param(query_params, "time_range_start", str, None)
+                and get_param(query_params, "time_range_end", str, None)):
+            return True
+        if any(re.search(pattern, query, re.IGNORECASE) for pattern in cls.REGEX_PATTERNS.values()):
+            return True
+        return any(keyword in query for keyword in cls.FALLBACK_KEYWORDS)
+
     async def do(self) -> Optional[Dict]:
         """
         Main extraction method using 3-tier approach.
@@ -22,12 +22,14 @@ import json
 import time
 import uuid
 from datetime import datetime, timezone
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from pathlib import Path
 import threading
-from queue import Queue
+from collections import OrderedDict
+from queue import Empty, Full, Queue
 from misc.logger.logging_config_helper import get_configured_logger
 from core.analytics_db import AnalyticsDB
+from core.analytics_rollup import AnalyticsRollups
 
 logger = get_configured_logger("query_logger")
 
@@ -64,13 +66,31 @@ class QueryLogger:
     4. User interactions (clicks, dwell time, scroll depth)
     """
 
-    def __init__(self, db_path: str = None):
+    # Tables whose rows reference queries(query_id) and must be written after the parent row
+    CHILD_TABLES = frozenset({
+        "retrieved_documents", "ranking_scores", "user_interactions",
+        "feature_vectors", "tier_6_enrichment",
+    })
+
+    def __init__(self, db_path: str = None, batch_size: int = 500, flush_interval: float = 0.2,
+                 max_queue_size: int = 20000, enqueue_timeout: float = 0.0,
+                 orphan_timeout: float = 30.0, known_queries_size: int = 50000,
+                 rollup_interval: float = 60.0):
         """
         Initialize the query logger.
 
         Args:
             db_path: Path to SQLite database file (used if ANALYTICS_DATABASE_URL not set).
                      If None, uses absolute path from project root.
+            batch_size: Maximum rows written per transaction by the worker
+            flush_interval: Maximum time (seconds) the worker waits for more rows before writing
+            max_queue_size: Queue bound; beyond it new rows are dropped (backpressure)
+            enqueue_timeout: How long log_* calls may block on a full queue before dropping
+                             (0 = never block the caller, which is usually the event loop)
+            orphan_timeout: How long (seconds) child rows wait for their parent queries row
+                            before being dropped as orphans
+            known_queries_size: Number of committed query_ids remembered to skip parent lookups
+            rollup_interval: Seconds between incremental dashboard rollup refreshes (0 = disabled)
         """
         # Use absolute path from project root if not specified
         if db_path is None:
@@ -80,10 +100,39 @@ class QueryLogger:
         self.db = AnalyticsDB(db_path)
 
         # Async queue for non-blocking logging
-        self.log_queue = Queue()
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.enqueue_timeout = enqueue_timeout
+        self.log_queue = Queue(maxsize=max_queue_size)
         self.is_running = False
         self.worker_thread = None
 
+        # Dashboard rollups, refreshed by the worker thread
+        self.rollups = AnalyticsRollups(self.db)
+        self.rollup_interval = rollup_interval
+        self._last_rollup = 0.0
+
+        # Child rows waiting for their parent queries row, keyed by query_id (worker thread only)
+        self.orphan_timeout = orphan_timeout
+        self.known_queries_size = known_queries_size
+        self._pending: Dict[str, List[Dict[str, Any]]] = {}
+        self._known_queries: "OrderedDict[str, None]" = OrderedDict()
+        self._known_lock = threading.Lock()
+
+        # Writer metrics
+        self._stats_lock = threading.Lock()
+        self.rows_written = 0
+        self.batches_written = 0
+        self.rows_dropped = 0
+        self.write_errors = 0
+        self.rows_deferred = 0
+        self.rows_orphaned = 0
+        self.pending_rows = 0
+        self.last_batch_ms = 0.0
+        self.last_lag_ms = 0.0
+        self.max_lag_ms = 0.0
+        self._started_at = time.time()
+
         # Initialize database schema
         self._init_database()
 
@@ -112,12 +161,18 @@ class QueryLogger:
             for table_name, create_sql in schema_dict.items():
                 cursor.execute(create_sql)
 
+            # Columns added after Schema v2
+            self._add_missing_columns(cursor)
+
             # Create indexes
             index_sqls = self._get_database_indexes()
             for index_sql in index_sqls:
                 cursor.execute(index_sql)
 
             conn.commit()
+
+            # Dashboard rollup tables (see core/analytics_rollup.py)
+            self.rollups.ensure_tables(conn)
             logger.info(f"Database schema initialized successfully ({self.db.db_type})")
 
         finally:
@@ -246,6 +301,26 @@ class QueryLogger:
             logger.error(f"❌ Schema migration failed: {e}")
             raise
 
+    # (table, column, SQLite type, PostgreSQL type) added to existing v2 databases
+    ADDED_COLUMNS = [
+        ("queries", "llm_calls_cancelled", "INTEGER DEFAULT 0", "INTEGER DEFAULT 0"),
+        ("queries", "llm_tokens_saved", "INTEGER DEFAULT 0", "INTEGER DEFAULT 0"),
+        ("queries", "retrieval_speculation", "TEXT", "VARCHAR(20)"),
+        ("queries", "tool_selected", "TEXT", "VARCHAR(100)"),
+        ("queries", "tool_routing", "TEXT", "VARCHAR(20)"),
+    ]
+
+    def _add_missing_columns(self, cursor):
+        """Add columns introduced after Schema v2 to tables created before them."""
+        for table, column, sqlite_type, postgres_type in self.ADDED_COLUMNS:
+            if self.db.db_type == 'postgres':
+                cursor.execute(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {column} {postgres_type}")
+                continue
+            cursor.execute(f"PRAGMA table_info({table})")
+            if column not in [row[1] for row in cursor.fetchall()]:
+                cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {sqlite_type}")
+                logger.info(f"Added column {table}.{column}")
+
     def _get_database_schema(self) -> Dict[str, str]:
         """Get database schema SQL for current database type."""
         if self.db.db_type == 'postgres':
@@ -283,7 +358,12 @@ class QueryLogger:
                     query_length_chars INTEGER,
                     has_temporal_indicator INTEGER DEFAULT 0,
                     embedding_model TEXT,
-                    schema_version INTEGER DEFAULT 2
+                    schema_version INTEGER DEFAULT 2,
+                    llm_calls_cancelled INTEGER DEFAULT 0,
+                    llm_tokens_saved INTEGER DEFAULT 0,
+                    retrieval_speculation TEXT,
+                    tool_selected TEXT,
+                    tool_routing TEXT
                 )
             """,
             'retrieved_documents': """
@@ -431,7 +511,12 @@ class QueryLogger:
                     query_length_chars INTEGER,
                     has_temporal_indicator INTEGER DEFAULT 0,
                     embedding_model VARCHAR(100),
-                    schema_version INTEGER DEFAULT 2
+                    schema_version INTEGER DEFAULT 2,
+                    llm_calls_cancelled INTEGER DEFAULT 0,
+                    llm_tokens_saved INTEGER DEFAULT 0,
+                    retrieval_speculation VARCHAR(20),
+                    tool_selected VARCHAR(100),
+                    tool_routing VARCHAR(20)
                 )
             """,
             'retrieved_documents': """
@@ -586,68 +671,327 @@ class QueryLogger:
         self.worker_thread.start()
         logger.info("Logging worker thread started")
 
-    def _worker_loop(self):
-        """Background worker that processes log queue."""
-        while self.is_running:
-            try:
-                # Get log entry from queue (blocks with timeout)
-                if not self.log_queue.empty():
-                    log_entry = self.log_queue.get(timeout=0.1)
-
-                    # Process the log entry
-                    table_name = log_entry.get("table")
-                    data = log_entry.get("data")
+    def _enqueue(self, table_name: str, data: Dict[str, Any], where: Optional[str] = None) -> None:
+        """
+        Queue a row for the background writer, dropping it if the queue is full.
 
-                    if table_name and data:
-                        self._write_to_db(table_name, data)
+        With `where`, the row is an UPDATE of the other columns keyed on that
+        column instead of an INSERT.
+        """
+        entry = {"table": table_name, "data": data, "enqueued_at": time.time()}
+        if where:
+            entry["where"] = where
+        try:
+            if self.enqueue_timeout > 0:
+                self.log_queue.put(entry, timeout=self.enqueue_timeout)
+            else:
+                self.log_queue.put_nowait(entry)
+        except Full:
+            with self._stats_lock:
+                self.rows_dropped += 1
+                dropped = self.rows_dropped
+            # Log the first drop and then every 1000th to avoid flooding the log
+            if dropped == 1 or dropped % 1000 == 0:
+                logger.warning(f"Analytics queue full ({self.log_queue.maxsize}); dropped {dropped} rows so far")
 
-                    self.log_queue.task_done()
-                else:
-                    time.sleep(0.1)
+    def _worker_loop(self):
+        """Background worker that drains the log queue in batches."""
+        while self.is_running or not self.log_queue.empty():
+            try:
+                batch = self._next_batch()
+                try:
+                    ready = self._route_children(batch)
+                    ready.extend(self._release_pending())
+                    if ready:
+                        self._write_batch(ready)
+                finally:
+                    for _ in batch:
+                        self.log_queue.task_done()
+                self._maybe_refresh_rollups()
             except Exception as e:
                 logger.error(f"Error in logging worker: {e}")
 
-    def _write_to_db(self, table_name: str, data: Dict[str, Any]):
-        """Write data to database (synchronous, called by worker thread)."""
-        max_retries = 5  # Increased from 3
-        # Exponential backoff: 0.5s, 1s, 2s, 4s, 8s
-        retry_delays = [0.5, 1.0, 2.0, 4.0, 8.0]
+        # Shutting down: write what has a parent by now, drop the rest
+        try:
+            remaining = self._release_pending(final=True)
+            if remaining:
+                self._write_batch(remaining)
+        except Exception as e:
+            logger.error(f"Error flushing pending analytics rows: {e}")
 
-        for attempt in range(max_retries):
+    def _maybe_refresh_rollups(self) -> None:
+        """Recompute recent dashboard rollup buckets every rollup_interval seconds."""
+        if not self.rollup_interval or time.time() - self._last_rollup < self.rollup_interval:
+            return
+        self._last_rollup = time.time()
+        try:
+            # Aggregates on a reader; the writer is only held for the bucket swap
+            self.rollups.refresh_pooled()
+        except Exception as e:
+            logger.error(f"Error refreshing analytics rollups: {e}")
+
+    def _next_batch(self) -> List[Dict[str, Any]]:
+        """Block for the first entry, then collect up to batch_size entries within flush_interval."""
+        try:
+            batch = [self.log_queue.get(timeout=self.flush_interval)]
+        except Empty:
+            return []
+        deadline = time.time() + self.flush_interval
+        while len(batch) < self.batch_size:
             try:
-                print(f"[_write_to_db] Attempt {attempt + 1}/{max_retries} for table={table_name}")
-                conn = self.db.connect()
-                cursor = conn.cursor()
+                batch.append(self.log_queue.get_nowait())
+            except Empty:
+                remaining = deadline - time.time()
+                if remaining <= 0 or not self.is_running:
+                    break
+                try:
+                    batch.append(self.log_queue.get(timeout=remaining))
+                except Empty:
+                    break
+        return batch
+
+    def _entry_sql(self, table_name: str, columns, where: Optional[str] = None) -> str:
+        placeholder = "%s" if self.db.db_type == 'postgres' else "?"
+        if where:
+            assignments = ', '.join(f"{column} = {placeholder}" for column in columns if column != where)
+            return f"UPDATE {table_name} SET {assignments} WHERE {where} = {placeholder}"
+        return (f"INSERT INTO {table_name} ({', '.join(columns)}) "
+                f"VALUES ({', '.join(placeholder for _ in columns)})")
+
+    @staticmethod
+    def _entry_params(entry: Dict[str, Any]) -> tuple:
+        where = entry.get("where")
+        if where:
+            data = entry["data"]
+            return tuple(value for column, value in data.items() if column != where) + (data[where],)
+        return tuple(entry["data"].values())
+
+    @staticmethod
+    def _needs_parent(entry: Dict[str, Any]) -> bool:
+        """Child rows and updates of a queries row can only be written once the queries row exists."""
+        return entry["table"] in QueryLogger.CHILD_TABLES or bool(entry.get("where"))
+
+    def _mark_known(self, query_ids) -> None:
+        """Remember query_ids whose queries row is committed."""
+        with self._known_lock:
+            for query_id in query_ids:
+                self._known_queries[query_id] = None
+                self._known_queries.move_to_end(query_id)
+            while len(self._known_queries) > self.known_queries_size:
+                self._known_queries.popitem(last=False)
+
+    def _is_known(self, query_id: str) -> bool:
+        with self._known_lock:
+            return query_id in self._known_queries
+
+    def _forget_known(self, query_id: str) -> None:
+        with self._known_lock:
+            self._known_queries.pop(query_id, None)
+
+    def _lookup_parents(self, query_ids) -> set:
+        """
+        Find which query_ids already have a queries row in the database.
 
-                # Build INSERT statement dynamically
-                columns = ", ".join(data.keys())
-                # Use appropriate placeholder for database type
-                placeholder = "%s" if self.db.db_type == 'postgres' else "?"
-                placeholders = ", ".join([placeholder for _ in data])
-                query = f"INSERT INTO {table_name} ({columns}) VALUES ({placeholders})"
+        Covers parents written before a restart or by another process. Marks
+        found ids as known and returns them.
+        """
+        query_ids = list(query_ids)
+        if not query_ids:
+            return set()
+        placeholder = "%s" if self.db.db_type == 'postgres' else "?"
+        found = set()
+        with self.db.connection() as conn:
+            cursor = conn.cursor()
+            # Chunk to stay under SQLite's bound-parameter limit
+            for i in range(0, len(query_ids), 500):
+                chunk = query_ids[i:i + 500]
+                cursor.execute(
+                    f"SELECT query_id FROM queries WHERE query_id IN "
+                    f"({', '.join(placeholder for _ in chunk)})",
+                    chunk
+                )
+                found.update(row["query_id"] for row in cursor.fetchall())
+        self._mark_known(found)
+        return found
+
+    def _defer(self, entry: Dict[str, Any]) -> None:
+        """Hold a child row until its parent queries row is committed."""
+        self._pending.setdefault(entry["data"]["query_id"], []).append(entry)
+        with self._stats_lock:
+            self.rows_deferred += 1
+            self.pending_rows += 1
+
+    def _route_children(self, batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Split a batch into rows that can be written now and child rows whose
+        parent queries row is not committed yet (those are deferred, never retried
+        by sleeping, so one early child row does not stall the worker).
 
-                cursor.execute(query, list(data.values()))
-                conn.commit()
-                conn.close()
-                return  # Success, exit retry loop
+        A queries row in the same batch counts as committed: _write_batch writes
+        parent rows first in the same transaction.
+        """
+        ready = []
+        unknown: Dict[str, List[Dict[str, Any]]] = {}
+        batch_parents = {
+            entry["data"].get("query_id") for entry in batch
+            if entry.get("table") == "queries" and entry.get("data") and not entry.get("where")
+        }
+        for entry in batch:
+            if not entry.get("table") or not entry.get("data"):
+                continue
+            query_id = entry["data"].get("query_id")
+            if (not self._needs_parent(entry) or not query_id
+                    or query_id in batch_parents or self._is_known(query_id)):
+                ready.append(entry)
+            elif query_id in self._pending:
+                self._defer(entry)
+            else:
+                unknown.setdefault(query_id, []).append(entry)
 
+        if unknown:
+            try:
+                found = self._lookup_parents(unknown)
             except Exception as e:
-                error_msg = str(e)
-                # Check if it's a foreign key error
-                if "foreign key constraint" in error_msg.lower() and attempt < max_retries - 1:
-                    # Wait and retry with exponential backoff
-                    delay = retry_delays[attempt]
-                    time.sleep(delay)
-                    logger.warning(
-                        f"Foreign key constraint error on {table_name}, "
-                        f"retrying in {delay}s (attempt {attempt + 2}/{max_retries})"
-                    )
+                logger.error(f"Parent lookup failed, deferring rows: {e}")
+                found = set()
+            for query_id, entries in unknown.items():
+                if query_id in found:
+                    ready.extend(entries)
                 else:
-                    # Log error but don't crash
-                    logger.error(
-                        f"Failed to write to {table_name} after {attempt + 1} attempts: {e}"
+                    for entry in entries:
+                        self._defer(entry)
+        return ready
+
+    def _release_pending(self, final: bool = False) -> List[Dict[str, Any]]:
+        """
+        Return deferred rows whose parent is now committed and drop rows that
+        waited longer than orphan_timeout (all remaining rows if final).
+        """
+        if not self._pending:
+            return []
+
+        now = time.time()
+        released = []
+        expiring = []
+        for query_id, entries in self._pending.items():
+            if self._is_known(query_id):
+                released.append(query_id)
+            elif final or now - entries[0]["enqueued_at"] > self.orphan_timeout:
+                expiring.append(query_id)
+
+        # Last chance for parents written by another process
+        if expiring:
+            try:
+                found = self._lookup_parents(expiring)
+            except Exception as e:
+                logger.error(f"Parent lookup failed for expiring rows: {e}")
+                found = set()
+            released.extend(q for q in expiring if q in found)
+            expiring = [q for q in expiring if q not in found]
+
+        ready = []
+        for query_id in released:
+            ready.extend(self._pending.pop(query_id))
+        orphaned = 0
+        for query_id in expiring:
+            orphaned += len(self._pending.pop(query_id))
+
+        with self._stats_lock:
+            self.pending_rows -= len(ready) + orphaned
+            self.rows_orphaned += orphaned
+        if orphaned:
+            logger.warning(
+                f"Dropped {orphaned} analytics rows for {len(expiring)} queries "
+                f"with no queries row after {self.orphan_timeout}s"
+            )
+        return ready
+
+    def _write_batch(self, batch: List[Dict[str, Any]]) -> None:
+        """
+        Write a batch of queued rows: one executemany per (table, columns, where),
+        one transaction. queries inserts go first, updates last, so child rows and
+        completion updates in the same batch find their parent row.
+        """
+        groups: Dict[tuple, List[Dict[str, Any]]] = {}
+        for entry in batch:
+            groups.setdefault((entry["table"], tuple(entry["data"].keys()), entry.get("where")), []).append(entry)
+        if not groups:
+            return
+        ordered = sorted(groups.items(), key=lambda group: (group[0][2] is not None, group[0][0] != "queries"))
+        parents = [entry["data"]["query_id"] for entry in batch
+                   if entry["table"] == "queries" and not entry.get("where")]
+
+        started = time.time()
+        try:
+            # One transaction per batch on the (single, for SQLite) pooled writer
+            with self.db.connection(write=True) as conn:
+                cursor = conn.cursor()
+                for (table_name, columns, where), entries in ordered:
+                    cursor.executemany(
+                        self._entry_sql(table_name, columns, where),
+                        [self._entry_params(entry) for entry in entries]
                     )
-                    return
+            written = len(batch)
+            # Lets the worker release child rows deferred for these queries
+            self._mark_known(parents)
+        except Exception as e:
+            # Replay row by row so one bad row does not lose the whole batch
+            logger.error(f"Batch write failed ({e}); retrying rows individually")
+            written = sum(1 for _, entries in ordered for entry in entries if self._write_entry(entry))
+        finished = time.time()
+
+        lag_ms = (finished - min(entry.get("enqueued_at", finished) for entry in batch)) * 1000
+        with self._stats_lock:
+            self.rows_written += written
+            self.batches_written += 1
+            self.last_batch_ms = (finished - started) * 1000
+            self.last_lag_ms = lag_ms
+            self.max_lag_ms = max(self.max_lag_ms, lag_ms)
+
+    def _write_entry(self, entry: Dict[str, Any]) -> bool:
+        """Write one queued row; a child row that hits a foreign key error is deferred again."""
+        try:
+            with self.db.connection(write=True) as conn:
+                conn.cursor().execute(
+                    self._entry_sql(entry["table"], tuple(entry["data"].keys()), entry.get("where")),
+                    list(self._entry_params(entry))
+                )
+        except Exception as e:
+            query_id = entry["data"].get("query_id")
+            if "foreign key constraint" in str(e).lower() and entry["table"] in self.CHILD_TABLES and query_id:
+                # Parent is not actually committed (e.g. its write failed)
+                self._forget_known(query_id)
+                self._defer(entry)
+                return False
+            with self._stats_lock:
+                self.write_errors += 1
+            logger.error(f"Failed to write to {entry['table']}: {e}")
+            return False
+        if entry["table"] == "queries" and not entry.get("where"):
+            self._mark_known([entry["data"]["query_id"]])
+        return True
+
+    def get_writer_stats(self) -> Dict[str, Any]:
+        """Get background writer throughput, backlog and lag metrics."""
+        with self._stats_lock:
+            uptime = max(time.time() - self._started_at, 1e-9)
+            return {
+                'db_type': self.db.db_type,
+                'queue_depth': self.log_queue.qsize(),
+                'queue_limit': self.log_queue.maxsize,
+                'rows_written': self.rows_written,
+                'batches_written': self.batches_written,
+                'avg_batch_size': self.rows_written / self.batches_written if self.batches_written else 0.0,
+                'rows_dropped': self.rows_dropped,
+                'write_errors': self.write_errors,
+                'rows_deferred': self.rows_deferred,
+                'rows_orphaned': self.rows_orphaned,
+                'pending_rows': self.pending_rows,
+                'rows_per_second': self.rows_written / uptime,
+                'last_batch_ms': round(self.last_batch_ms, 2),
+                'last_lag_ms': round(self.last_lag_ms, 2),
+                'max_lag_ms': round(self.max_lag_ms, 2),
+            }
 
     def log_query_start(
         self,
@@ -663,7 +1007,11 @@ class QueryLogger:
         parent_query_id: str = None
     ) -> None:
         """
-        Log the start of a query (SYNCHRONOUS - ensures queries table is written first).
+        Log the start of a query.
+
+        Queued like every other row, so the caller never waits on the (single,
+        for SQLite) writer connection. The worker writes queries rows ahead of
+        child rows in the same batch and defers child rows that arrive first.
 
         Args:
             query_id: Unique identifier for this query
@@ -691,11 +1039,7 @@ class QueryLogger:
             "parent_query_id": parent_query_id,
         }
 
-        # Write synchronously to ensure queries table has the record BEFORE
-        # any child tables (retrieved_documents, ranking_scores, etc.) are written
-        print(f"[QueryLogger] log_query_start: About to write query_id={query_id}")
-        self._write_to_db("queries", data)
-        print(f"[QueryLogger] log_query_start: _write_to_db returned")
+        self._enqueue("queries", data)
 
     def log_query_complete(
         self,
@@ -709,7 +1053,12 @@ class QueryLogger:
         num_results_returned: int = 0,
         cost_usd: float = 0,
         error_occurred: bool = False,
-        error_message: str = ""
+        error_message: str = "",
+        llm_calls_cancelled: int = 0,
+        llm_tokens_saved: int = 0,
+        retrieval_speculation: Optional[str] = None,
+        tool_selected: Optional[str] = None,
+        tool_routing: Optional[str] = None
     ) -> None:
         """
         Update query with completion metrics.
@@ -726,47 +1075,33 @@ class QueryLogger:
             cost_usd: Estimated cost in USD
             error_occurred: Whether an error occurred
             error_message: Error message if any
+            llm_calls_cancelled: LLM ranking calls cancelled (fast track abort or client disconnect)
+            llm_tokens_saved: Estimated tokens those cancelled calls would have used
+            retrieval_speculation: Outcome of speculative retrieval ('kept', 'query_changed', ...), None if not used
+            tool_selected: Name of the top tool from tool selection, None if it did not run
+            tool_routing: How the tool was chosen ('embedding', 'llm_candidates', 'llm', ...), see core/router.py
         """
-        try:
-            conn = self.db.connect()
-            cursor = conn.cursor()
-
-            # Use appropriate placeholder for database type
-            placeholder = "%s" if self.db.db_type == 'postgres' else "?"
-
-            query_sql = f"""
-                UPDATE queries SET
-                    latency_total_ms = {placeholder},
-                    latency_retrieval_ms = {placeholder},
-                    latency_ranking_ms = {placeholder},
-                    latency_generation_ms = {placeholder},
-                    num_results_retrieved = {placeholder},
-                    num_results_ranked = {placeholder},
-                    num_results_returned = {placeholder},
-                    cost_usd = {placeholder},
-                    error_occurred = {placeholder},
-                    error_message = {placeholder}
-                WHERE query_id = {placeholder}
-            """
-
-            cursor.execute(query_sql, (
-                latency_total_ms,
-                latency_retrieval_ms,
-                latency_ranking_ms,
-                latency_generation_ms,
-                num_results_retrieved,
-                num_results_ranked,
-                num_results_returned,
-                cost_usd,
-                1 if error_occurred else 0,
-                error_message,
-                query_id
-            ))
+        data = {
+            "query_id": query_id,
+            "latency_total_ms": latency_total_ms,
+            "latency_retrieval_ms": latency_retrieval_ms,
+            "latency_ranking_ms": latency_ranking_ms,
+            "latency_generation_ms": latency_generation_ms,
+            "num_results_retrieved": num_results_retrieved,
+            "num_results_ranked": num_results_ranked,
+            "num_results_returned": num_results_returned,
+            "cost_usd": cost_usd,
+            "error_occurred": 1 if error_occurred else 0,
+            "error_message": error_message,
+            "llm_calls_cancelled": llm_calls_cancelled,
+            "llm_tokens_saved": llm_tokens_saved,
+            "retrieval_speculation": retrieval_speculation,
+            "tool_selected": tool_selected,
+            "tool_routing": tool_routing,
+        }
 
-            conn.commit()
-            conn.close()
-        except Exception as e:
-            logger.error(f"Error updating query completion: {e}")
+        # Applied by the worker once the queries row is written
+        self._enqueue("queries", data, where="query_id")
 
     def log_retrieved_document(
         self,
@@ -821,7 +1156,7 @@ class QueryLogger:
             "final_retrieval_score": final_retrieval_score,
         }
 
-        self.log_queue.put({"table": "retrieved_documents", "data": data})
+        self._enqueue("retrieved_documents", data)
 
     def log_ranking_score(
         self,
@@ -879,7 +1214,7 @@ class QueryLogger:
             "ranking_method": ranking_method,
         }
 
-        self.log_queue.put({"table": "ranking_scores", "data": data})
+        self._enqueue("ranking_scores", data)
 
     def log_mmr_score(
         self,
@@ -911,7 +1246,7 @@ class QueryLogger:
             "final_ranking_score": mmr_score,
         }
 
-        self.log_queue.put({"table": "ranking_scores", "data": data})
+        self._enqueue("ranking_scores", data)
 
     def log_xgboost_scores(
         self,
@@ -951,7 +1286,7 @@ class QueryLogger:
             "final_ranking_score": 0,
         }
 
-        self.log_queue.put({"table": "ranking_scores", "data": data})
+        self._enqueue("ranking_scores", data)
 
     def log_user_interaction(
         self,
@@ -992,7 +1327,7 @@ class QueryLogger:
             "client_ip_hash": client_ip_hash,
         }
 
-        self.log_queue.put({"table": "user_interactions", "data": data})
+        self._enqueue("user_interactions", data)
 
     def log_tier_6_enrichment(
         self,
@@ -1028,11 +1363,40 @@ class QueryLogger:
             "schema_version": 2
         }
 
-        self.log_queue.put({"table": "tier_6_enrichment", "data": data})
+        self._enqueue("tier_6_enrichment", data)
+
+    # Routing decisions made by the LLM, used as labels for the tool router classifier
+    LLM_TOOL_ROUTING = ('llm', 'llm_candidates')
+
+    def get_tool_routing_examples(self, limit: int = 2000) -> List[Tuple[str, str]]:
+        """
+        Get recent (query, tool) pairs whose tool was chosen by the LLM.
+
+        Args:
+            limit: Maximum number of pairs, most recent first
+
+        Returns:
+            List of (decontextualized query, tool name) tuples
+        """
+        placeholder = "%s" if self.db.db_type == 'postgres' else "?"
+        try:
+            with self.db.connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    f"""SELECT COALESCE(NULLIF(decontextualized_query, ''), query_text) AS query, tool_selected FROM queries
+                        WHERE tool_selected IS NOT NULL AND tool_routing IN ({placeholder}, {placeholder})
+                        AND error_occurred = 0
+                        ORDER BY timestamp DESC LIMIT {placeholder}""",
+                    (*self.LLM_TOOL_ROUTING, limit)
+                )
+                return [(row["query"], row["tool_selected"]) for row in cursor.fetchall()]
+        except Exception as e:
+            logger.error(f"Error reading tool routing examples: {e}")
+            return []
 
     def get_query_stats(self, days: int = 7) -> Dict[str, Any]:
         """
-        Get query statistics for the past N days.
+        Get query statistics for the past N days (from the hourly rollup).
 
         Args:
             days: Number of days to look back
@@ -1041,63 +1405,17 @@ class QueryLogger:
             Dictionary with statistics
         """
         try:
-            conn = self.db.connect()
-            cursor = conn.cursor()
-
             cutoff_timestamp = time.time() - (days * 24 * 60 * 60)
+            with self.db.connection() as conn:
+                stats = self.rollups.read_stats(conn, cutoff_timestamp)
 
-            # Use appropriate placeholder for database type
-            placeholder = "%s" if self.db.db_type == 'postgres' else "?"
-
-            # Total queries
-            cursor.execute(f"""
-                SELECT COUNT(*) FROM queries WHERE timestamp > {placeholder}
-            """, (cutoff_timestamp,))
-            result = cursor.fetchone()
-            total_queries = result[0] if isinstance(result, tuple) else result['count']
-
-            # Average latency
-            cursor.execute(f"""
-                SELECT AVG(latency_total_ms) FROM queries
-                WHERE timestamp > {placeholder} AND latency_total_ms IS NOT NULL
-            """, (cutoff_timestamp,))
-            result = cursor.fetchone()
-            avg_latency = (result[0] if isinstance(result, tuple) else result['avg']) or 0
-
-            # Total cost
-            cursor.execute(f"""
-                SELECT SUM(cost_usd) FROM queries
-                WHERE timestamp > {placeholder} AND cost_usd IS NOT NULL
-            """, (cutoff_timestamp,))
-            result = cursor.fetchone()
-            total_cost = (result[0] if isinstance(result, tuple) else result['sum']) or 0
-
-            # Error rate
-            cursor.execute(f"""
-                SELECT COUNT(*) FROM queries
-                WHERE timestamp > {placeholder} AND error_occurred = 1
-            """, (cutoff_timestamp,))
-            result = cursor.fetchone()
-            error_count = result[0] if isinstance(result, tuple) else result['count']
-            error_rate = error_count / total_queries if total_queries > 0 else 0
-
-            # Click-through rate
-            cursor.execute(f"""
-                SELECT COUNT(DISTINCT query_id) FROM user_interactions
-                WHERE interaction_timestamp > {placeholder} AND clicked = 1
-            """, (cutoff_timestamp,))
-            result = cursor.fetchone()
-            queries_with_clicks = result[0] if isinstance(result, tuple) else result['count']
-            ctr = queries_with_clicks / total_queries if total_queries > 0 else 0
-
-            conn.close()
-
+            total_queries = stats["total_queries"]
             return {
                 "total_queries": total_queries,
-                "avg_latency_ms": avg_latency,
-                "total_cost_usd": total_cost,
-                "error_rate": error_rate,
-                "click_through_rate": ctr,
+                "avg_latency_ms": stats["avg_latency_ms"],
+                "total_cost_usd": stats["total_cost_usd"],
+                "error_rate": stats["error_count"] / total_queries if total_queries > 0 else 0,
+                "click_through_rate": stats["queries_with_clicks"] / total_queries if total_queries > 0 else 0,
                 "days": days,
             }
         except Exception as e:
@@ -1109,12 +1427,11 @@ class QueryLogger:
         logger.info("Shutting down QueryLogger...")
         self.is_running = False
 
-        # Wait for queue to empty
-        self.log_queue.join()
-
+        # Worker drains the remaining queue before exiting
         if self.worker_thread:
-            self.worker_thread.join(timeout=5)
+            self.worker_thread.join(timeout=10)
 
+        self.db.close_pools()
         logger.info("QueryLogger shutdown complete")
 
 
@@ -16,6 +16,7 @@ from dataclasses import dataclass
 from typing import Optional, List, Dict
 from core.utils.json_utils import trim_json
 from core.prompts import find_prompt, fill_prompt
+from core.ranking_cache import content_hash, get_ranking_cache, make_ranking_key, prompt_version
 from misc.logger.logging_config_helper import get_configured_logger
 from core.schemas import create_assistant_result, create_status_message, Message, SenderType, MessageType
 
@@ -81,6 +82,15 @@ The user's question is: {request.query}. The item's description is {item.descrip
      "description" : "short description of the item"}]
 
     RANKING_PROMPT_NAME = "RankingPrompt"
+
+    # Appended to the site's ranking prompt when several items are scored per LLM call
+    BATCH_RANKING_INSTRUCTIONS = """
+
+Apply the instructions above to each of the following {count} items independently.
+Return a "results" list with exactly one entry per item, using the item's number as "id".
+The items are:
+"""
+    BATCH_TOKENS_PER_ITEM = 160
      
     def get_ranking_prompt(self):
         site = self.handler.site
@@ -112,6 +122,126 @@ The user's question is: {request.query}. The item's description is {item.descrip
         self.num_results_sent = 0
         self.rankedAnswers = []
         self.ranking_type = ranking_type
+        self.ranking_cache = None
+        # Work abandoned when fast track is aborted or the client disconnects
+        self.cancel_reason = None
+        self.llm_calls_cancelled = 0
+        self.llm_tokens_saved = 0
+
+    def _llm_endpoint(self):
+        """The (endpoint, level) ask_llm will use for this request, honouring development-mode overrides."""
+        from core.config import CONFIG
+        provider = CONFIG.preferred_llm_endpoint
+        level = self.level
+        if CONFIG.is_development_mode() and self.handler.query_params:
+            from core.utils.utils import get_param
+            provider = get_param(self.handler.query_params, "llm_provider", str, None) or provider
+            level = get_param(self.handler.query_params, "llm_level", str, None) or level
+        return provider, level
+
+    @staticmethod
+    def estimate_tokens(text):
+        """Rough token count: one per CJK character, one per four other characters."""
+        cjk = sum(1 for ch in text if ch >= '\u2e80')
+        return cjk + (len(text) - cjk) // 4
+
+    async def _ask_llm(self, prompt, schema, max_length=512):
+        """ask_llm for ranking; a cancelled call is counted with the tokens it would have used."""
+        try:
+            return await ask_llm(prompt, schema, level=self.level, query_params=self.handler.query_params,
+                                 max_length=max_length, priority="interactive")
+        except asyncio.CancelledError:
+            self.llm_calls_cancelled += 1
+            self.llm_tokens_saved += self.estimate_tokens(prompt) + max_length
+            raise
+
+    def get_batch_size(self):
+        """
+        Number of items scored per LLM prompt (1 = one ask_llm call per item).
+
+        Configured in config_llm.yaml -> ranking_batch, with per-endpoint overrides.
+        """
+        from core.config import CONFIG
+        params = CONFIG.ranking_batch_params
+        if not params.get('enabled', False):
+            return 1
+        provider, _ = self._llm_endpoint()
+        batch_size = params.get('providers', {}).get(provider, params.get('batch_size', 1))
+        return max(1, int(batch_size))
+
+    def _init_ranking_cache(self):
+        """Resolve the ranking cache and the request-level parts of its key."""
+        self.ranking_cache = get_ranking_cache()
+        if self.ranking_cache is None:
+            return
+        try:
+            from core.config import CONFIG
+            prompt_str, ans_struc = self.get_ranking_prompt()
+            provider, level = self._llm_endpoint()
+            provider_config = CONFIG.get_llm_provider(provider)
+            model = getattr(provider_config.models, level, None) if provider_config and provider_config.models else None
+            self._cache_context = (
+                fill_prompt(prompt_str, self.handler, {"item.description": ""}),
+                prompt_version(prompt_str, ans_struc),
+                f"{provider}/{model}",
+            )
+            # Rankings from rankBatch come from a different prompt and are cached apart
+            self._batch_prompt_version = prompt_version(prompt_str + self.BATCH_RANKING_INSTRUCTIONS, ans_struc)
+        except Exception as e:
+            logger.warning(f"Ranking cache disabled for this request: {e}")
+            self.ranking_cache = None
+
+    def _cache_key(self, item, batch=False):
+        url, json_str = self._unpack_item(item)[:2]
+        query_context, version, model = self._cache_context
+        if batch:
+            version = self._batch_prompt_version
+        return make_ranking_key(query_context, url, content_hash(json_str), version, model)
+
+    async def _cache_ranking(self, item, ranking, batch=False):
+        """Store a fresh LLM ranking (before per-request adjustments such as type filtering)."""
+        if self.ranking_cache is None or not isinstance(ranking, dict):
+            return
+        if not isinstance(ranking.get("score"), (int, float)):
+            return
+        try:
+            await self.ranking_cache.put_async(self._cache_key(item, batch), ranking)
+        except Exception as e:
+            logger.warning(f"Failed to cache ranking: {e}")
+
+    async def rankCached(self, cached):
+        """
+        Handle rankings served from the cache (no LLM call).
+
+        They go through the same path as fresh rankings, so early send and
+        log_ranking_score behave exactly as on a miss.
+        """
+        if (self.ranking_type == Ranking.FAST_TRACK and self.handler.state.should_abort_fast_track()):
+            logger.info("Fast track aborted, skipping cached rankings")
+            return
+        for item, ranking in sorted(cached, key=lambda pair: pair[1].get("score", 0), reverse=True):
+            if not self.handler.connection_alive_event.is_set():
+                return
+            try:
+                await self._handle_ranking(item, ranking)
+            except Exception as e:
+                logger.error(f"Error handling cached ranking: {str(e)}")
+                from config.config import CONFIG
+                if CONFIG.should_raise_exceptions():
+                    raise
+
+    @staticmethod
+    def _unpack_item(item):
+        """Return (url, json_str, name, site, retrieval_scores, vector) for Dict or Tuple items."""
+        # Handle Dict format (new) or Tuple format (legacy)
+        if isinstance(item, dict):
+            return (item.get('url', ''), item.get('schema_json', ''), item.get('title', ''),
+                    item.get('site', ''), item.get('retrieval_scores', {}), item.get('vector'))
+        elif len(item) == 5:
+            url, json_str, name, site, vector = item
+            return url, json_str, name, site, {}, vector  # Legacy format doesn't have retrieval scores
+        url, json_str, name, site = item
+        return url, json_str, name, site, {}, None
 
     async def rankItem(self, item):
 
@@ -119,85 +249,17 @@ The user's question is: {request.query}. The item's description is {item.descrip
             logger.info("Fast track aborted, skipping item ranking")
             logger.info("Aborting fast track")
             return
+        name = None
         try:
-            # Handle Dict format (new) or Tuple format (legacy)
-            if isinstance(item, dict):
-                url = item.get('url', '')
-                json_str = item.get('schema_json', '')
-                name = item.get('title', '')
-                site = item.get('site', '')
-                retrieval_scores = item.get('retrieval_scores', {})
-                vector = item.get('vector')
-            elif len(item) == 5:
-                url, json_str, name, site, vector = item
-                retrieval_scores = {}  # Legacy format doesn't have retrieval scores
-            else:
-                url, json_str, name, site = item
-                retrieval_scores = {}
-                vector = None
+            url, json_str, name, site, retrieval_scores, vector = self._unpack_item(item)
 
             prompt_str, ans_struc = self.get_ranking_prompt()
             description = trim_json(json_str)
             prompt = fill_prompt(prompt_str, self.handler, {"item.description": description})
-            ranking = await ask_llm(prompt, ans_struc, level=self.level, query_params=self.handler.query_params)
-
-            # Handle both string and dictionary inputs for json_str
-            schema_object = json_str if isinstance(json_str, dict) else json.loads(json_str)
-
-            # If schema_object is an array, set it to the first item
-            if isinstance(schema_object, list) and len(schema_object) > 0:
-                schema_object = schema_object[0]
-
-            ansr = {
-                'url': url,
-                'site': site,
-                'name': name,
-                'ranking': ranking,
-                'schema_object': schema_object,
-                'sent': False,
-                'retrieval_scores': retrieval_scores,  # Preserve retrieval scores for XGBoost
-            }
-
-            # Add vector if available (for MMR)
-            if vector is not None:
-                ansr['vector'] = vector
-            
-            # Check if required_item_type is specified and filter based on @type
-            if self.handler.required_item_type is not None:
-                item_type = schema_object.get('@type', None)
-                if item_type != self.handler.required_item_type:
-                    logger.debug(f"Item type mismatch: expected {self.handler.required_item_type}, got {item_type} - setting score to 0")
-                    ranking["score"] = 0
-            
-            if (ranking["score"] > self.EARLY_SEND_THRESHOLD):
-                logger.info(f"High score item: {name} (score: {ranking['score']}) - sending early {self.ranking_type_str}")
-                try:
-                    await self.sendAnswers([ansr])
-                except (BrokenPipeError, ConnectionResetError):
-                    logger.warning(f"Client disconnected while sending early answer for {name}")
-                    self.handler.connection_alive_event.clear()
-                    return
-
-            self.rankedAnswers.append(ansr)
-            logger.debug(f"Item {name} added to ranked answers")
-
-            # Analytics: Log ranking score
-            if hasattr(self.handler, 'query_id'):
-                query_logger = get_query_logger()
-                try:
-                    # Get current position (will be updated after final sorting)
-                    current_position = len(self.rankedAnswers) - 1
+            ranking = await self._ask_llm(prompt, ans_struc)
+            await self._cache_ranking(item, ranking)
 
-                    query_logger.log_ranking_score(
-                        query_id=self.handler.query_id,
-                        doc_url=url,
-                        ranking_position=current_position,  # Temporary position, will update after final sort
-                        llm_final_score=float(ranking.get("score", 0)),
-                        llm_snippet=ranking.get("description", ""),
-                        ranking_method='llm_fast_track' if self.ranking_type == Ranking.FAST_TRACK else 'llm_regular'
-                    )
-                except Exception as log_err:
-                    logger.warning(f"Failed to log ranking score: {log_err}")
+            await self._handle_ranking(item, ranking)
 
         except Exception as e:
             logger.error(f"Error in rankItem for {name}: {str(e)}")
@@ -207,6 +269,135 @@ The user's question is: {request.query}. The item's description is {item.descrip
             if CONFIG.should_raise_exceptions():
                 raise  # Re-raise in testing/development mode
 
+    async def rankBatch(self, items):
+        """
+        Score several items with a single LLM call.
+
+        The site's ranking prompt is applied to a numbered list of items and the
+        LLM returns one {id, score, description, ...} entry per item. Results are
+        handled as soon as the batch returns, highest score first, so high scorers
+        are still sent early. Items missing from the response fall back to rankItem.
+        """
+        if (self.ranking_type == Ranking.FAST_TRACK and self.handler.state.should_abort_fast_track()):
+            logger.info("Fast track aborted, skipping batch ranking")
+            return
+        try:
+            prompt_str, ans_struc = self.get_ranking_prompt()
+            descriptions = [trim_json(self._unpack_item(item)[1]) for item in items]
+            prompt = fill_prompt(prompt_str, self.handler, {"item.description": "listed below"})
+            prompt += self.BATCH_RANKING_INSTRUCTIONS.format(count=len(items)) + "\n".join(
+                f"[{i + 1}] {description}" for i, description in enumerate(descriptions)
+            )
+            batch_schema = {"results": [{"id": "integer item number from the list", **ans_struc}]}
+            response = await self._ask_llm(prompt, batch_schema,
+                                           max_length=self.BATCH_TOKENS_PER_ITEM * len(items))
+            rankings = self._parse_batch_response(response, len(items))
+        except Exception as e:
+            logger.error(f"Error in rankBatch for {len(items)} items: {str(e)}")
+            logger.debug("Full error trace: ", exc_info=True)
+            rankings = {}
+
+        missing = [item for i, item in enumerate(items) if i not in rankings]
+        if missing:
+            logger.warning(f"Batch ranking returned {len(rankings)}/{len(items)} results, ranking the rest individually")
+
+        # Highest scores first so early-send sees the best items of the batch first
+        for i in sorted(rankings, key=lambda i: rankings[i].get("score", 0), reverse=True):
+            if not self.handler.connection_alive_event.is_set():
+                return
+            try:
+                await self._cache_ranking(items[i], rankings[i], batch=True)
+                await self._handle_ranking(items[i], rankings[i])
+            except Exception as e:
+                logger.error(f"Error handling batch ranking for item {i}: {str(e)}")
+                from config.config import CONFIG
+                if CONFIG.should_raise_exceptions():
+                    raise
+
+        if missing:
+            await asyncio.gather(*[self.rankItem(item) for item in missing], return_exceptions=True)
+
+    @staticmethod
+    def _parse_batch_response(response, count):
+        """Map item index -> ranking dict from a batch LLM response, dropping malformed entries."""
+        entries = response.get("results", []) if isinstance(response, dict) else response
+        rankings = {}
+        for entry in entries if isinstance(entries, list) else []:
+            if not isinstance(entry, dict):
+                continue
+            try:
+                idx = int(entry.get("id")) - 1
+                entry["score"] = int(entry["score"])
+            except (TypeError, ValueError, KeyError):
+                continue
+            if 0 <= idx < count and idx not in rankings:
+                ranking = {k: v for k, v in entry.items() if k != "id"}
+                ranking.setdefault("description", "")
+                rankings[idx] = ranking
+        return rankings
+
+    async def _handle_ranking(self, item, ranking):
+        """Record one item's LLM ranking: type filtering, early send and analytics logging."""
+        url, json_str, name, site, retrieval_scores, vector = self._unpack_item(item)
+
+        # Handle both string and dictionary inputs for json_str
+        schema_object = json_str if isinstance(json_str, dict) else json.loads(json_str)
+
+        # If schema_object is an array, set it to the first item
+        if isinstance(schema_object, list) and len(schema_object) > 0:
+            schema_object = schema_object[0]
+
+        ansr = {
+            'url': url,
+            'site': site,
+            'name': name,
+            'ranking': ranking,
+            'schema_object': schema_object,
+            'sent': False,
+            'retrieval_scores': retrieval_scores,  # Preserve retrieval scores for XGBoost
+        }
+
+        # Add vector if available (for MMR)
+        if vector is not None:
+            ansr['vector'] = vector
+
+        # Check if required_item_type is specified and filter based on @type
+        if self.handler.required_item_type is not None:
+            item_type = schema_object.get('@type', None)
+            if item_type != self.handler.required_item_type:
+                logger.debug(f"Item type mismatch: expected {self.handler.required_item_type}, got {item_type} - setting score to 0")
+                ranking["score"] = 0
+
+        if (ranking["score"] > self.EARLY_SEND_THRESHOLD):
+            logger.info(f"High score item: {name} (score: {ranking['score']}) - sending early {self.ranking_type_str}")
+            try:
+                await self.sendAnswers([ansr])
+            except (BrokenPipeError, ConnectionResetError):
+                logger.warning(f"Client disconnected while sending early answer for {name}")
+                self.handler.connection_alive_event.clear()
+                return
+
+        self.rankedAnswers.append(ansr)
+        logger.debug(f"Item {name} added to ranked answers")
+
+        # Analytics: Log ranking score
+        if hasattr(self.handler, 'query_id'):
+            query_logger = get_query_logger()
+            try:
+                # Get current position (will be updated after final sorting)
+                current_position = len(self.rankedAnswers) - 1
+
+                query_logger.log_ranking_score(
+                    query_id=self.handler.query_id,
+                    doc_url=url,
+                    ranking_position=current_position,  # Temporary position, will update after final sort
+                    llm_final_score=float(ranking.get("score", 0)),
+                    llm_snippet=ranking.get("description", ""),
+                    ranking_method='llm_fast_track' if self.ranking_type == Ranking.FAST_TRACK else 'llm_regular'
+                )
+            except Exception as log_err:
+                logger.warning(f"Failed to log ranking score: {log_err}")
+
     def shouldSend(self, result):
         # Don't send if we've already reached the limit
         if self.num_results_sent >= self.NUM_RESULTS_TO_SEND:
@@ -341,6 +532,35 @@ The user's question is: {request.query}. The item's description is {item.descrip
                 logger.warning("Client disconnected when sending sites message")
                 self.handler.connection_alive_event.clear()
     
+    async def _run_cancellable(self, tasks):
+        """
+        Run the ranking tasks until they finish or the request no longer needs them.
+
+        Aborting fast track or losing the client connection cancels the tasks,
+        including LLM calls already in flight or queued in the scheduler.
+        """
+        if not tasks:
+            return
+        watcher = asyncio.create_task(
+            self.handler.state.wait_for_cancellation(fast_track=self.ranking_type == Ranking.FAST_TRACK))
+        ranking = asyncio.gather(*tasks, return_exceptions=True)
+        try:
+            await asyncio.wait({ranking, watcher}, return_when=asyncio.FIRST_COMPLETED)
+            if not ranking.done():
+                self.cancel_reason = watcher.result()
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+                logger.info(f"Ranking cancelled ({self.cancel_reason}): {self.llm_calls_cancelled} LLM calls, "
+                            f"~{self.llm_tokens_saved} tokens saved")
+        finally:
+            watcher.cancel()
+            if not ranking.done():
+                ranking.cancel()
+            # Accumulated per request for QueryLogger.log_query_complete
+            self.handler.llm_calls_cancelled = getattr(self.handler, 'llm_calls_cancelled', 0) + self.llm_calls_cancelled
+            self.handler.llm_tokens_saved = getattr(self.handler, 'llm_tokens_saved', 0) + self.llm_tokens_saved
+
     async def do(self):
         logger.info(f"Starting ranking process with {len(self.items)} items")
 
@@ -366,10 +586,43 @@ The user's question is: {request.query}. The item's description is {item.descrip
             pass  # No vectors available
 
         tasks = []
-        for item in self.items:
-            # Pass the full item (Dict or Tuple) to rankItem for better data preservation
+
+        # Serve repeated (query, document) pairs from the ranking cache without an LLM call
+        self._init_ranking_cache()
+        batch_size = self.get_batch_size()
+        to_rank = self.items
+        if self.ranking_cache is not None:
+            # Single-item rankings are always usable; batch rankings only when this request batches too
+            key_groups = [
+                [self._cache_key(item)] + ([self._cache_key(item, batch=True)] if batch_size > 1 else [])
+                for item in self.items
+            ]
+            try:
+                rankings = await self.ranking_cache.get_many_async(key_groups)
+            except Exception as e:
+                logger.warning(f"Ranking cache lookup failed: {e}")
+                rankings = [None] * len(self.items)
+            cached = []
+            to_rank = []
+            for item, ranking in zip(self.items, rankings):
+                if ranking is not None:
+                    cached.append((item, ranking))
+                else:
+                    to_rank.append(item)
+            if cached:
+                logger.info(f"Ranking cache: {len(cached)}/{len(self.items)} items served from cache")
+                tasks.append(asyncio.create_task(self.rankCached(cached)))
+
+        if batch_size > 1:
+            logger.info(f"Batched ranking: {batch_size} items per LLM call")
+        for start in range(0, len(to_rank), batch_size):
+            # Pass the full items (Dict or Tuple) to the rankers for better data preservation
             if self.handler.connection_alive_event.is_set():  # Only add new tasks if connection is still alive
-                tasks.append(asyncio.create_task(self.rankItem(item)))
+                batch = to_rank[start:start + batch_size]
+                if len(batch) == 1:
+                    tasks.append(asyncio.create_task(self.rankItem(batch[0])))
+                else:
+                    tasks.append(asyncio.create_task(self.rankBatch(batch)))
             else:
                 logger.warning("Connection lost, not creating new ranking tasks")
 
@@ -377,11 +630,14 @@ The user's question is: {request.query}. The item's description is {item.descrip
 
         try:
             logger.debug(f"Running {len(tasks)} ranking tasks concurrently")
-            await asyncio.gather(*tasks, return_exceptions=True)
+            await self._run_cancellable(tasks)
         except Exception as e:
             logger.error(f"Error during ranking tasks: {str(e)}")
             log(f"Error during ranking tasks: {str(e)}")
 
+        if self.cancel_reason == "fast_track_aborted":
+            return
+
         if not self.handler.connection_alive_event.is_set():
             logger.warning("Connection lost during ranking, skipping sending results")
             log("Connection lost during ranking, skipping sending results")
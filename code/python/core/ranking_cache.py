@@ -0,0 +1,277 @@
+"""
+Cache for LLM ranking results.
+
+Ranking asks the LLM to score every retrieved item against the query, and news
+queries repeat heavily within a day, so the same (query, article) pair is
+scored over and over. This cache stores the LLM's ranking dict (score,
+description, ...) keyed by:
+
+    normalized query context | document URL | content hash | prompt version | model
+
+The query context is the ranking prompt filled for the request (decontextualized
+query, previous queries, site, ...) with the item left blank, so anything that
+changes what the LLM sees for the query changes the key. The content hash
+covers edits to the article; the prompt version covers edits to the prompt
+template or answer structure, and differs for batched ranking prompts.
+
+Ranking looks up all of a request's items with one get_many_async call; with
+the sqlite backend that is a single IN (...) query, and it and the writes
+(put_async) run in a worker thread rather than on the event loop.
+
+Configuration (config_llm.yaml -> ranking_cache):
+    enabled: true
+    backend: memory | sqlite
+    max_entries: size bound (LRU in memory, oldest-first in SQLite)
+    ttl_seconds: entry lifetime (0 = never expire)
+    sqlite_path: SQLite file relative to the project root (sqlite backend)
+"""
+
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from core.config import CONFIG
+from core.embedding_cache import normalize_text, resolve_cache_path
+from misc.logger.logging_config_helper import get_configured_logger
+
+logger = get_configured_logger("ranking_cache")
+
+
+def _digest(value: str) -> str:
+    return hashlib.blake2b(value.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def content_hash(schema_json: Any) -> str:
+    """Hash of the document content the LLM ranks."""
+    if not isinstance(schema_json, str):
+        schema_json = json.dumps(schema_json, sort_keys=True, ensure_ascii=False)
+    return _digest(schema_json)
+
+
+def prompt_version(prompt_str: str, ans_struc: Any) -> str:
+    """Version of a ranking prompt template and its answer structure."""
+    return _digest(prompt_str + json.dumps(ans_struc, sort_keys=True, ensure_ascii=False))
+
+
+def make_ranking_key(query_context: str, url: str, doc_hash: str, version: str, model: str) -> str:
+    """Build the cache key for one (query, document) ranking."""
+    return _digest("\x00".join([normalize_text(query_context), url, doc_hash, version, model]))
+
+
+class RankingCache:
+    """
+    Thread-safe ranking-result cache with TTL and size-based eviction.
+
+    The memory backend is an LRU dict; the SQLite backend shares results across
+    processes and restarts and evicts the least recently written rows.
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS ranking_cache (
+        key TEXT PRIMARY KEY,
+        ranking TEXT NOT NULL,
+        created_at REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_ranking_cache_created_at ON ranking_cache(created_at);
+    """
+
+    def __init__(self, backend: str = "memory", max_entries: int = 50000,
+                 ttl_seconds: float = 86400, sqlite_path: Optional[str] = None):
+        """
+        Initialize the cache.
+
+        Args:
+            backend: "memory" or "sqlite"
+            max_entries: Maximum number of cached rankings
+            ttl_seconds: Entry lifetime in seconds (0 = never expire)
+            sqlite_path: SQLite file for the sqlite backend
+        """
+        self.backend = backend
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._memory: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._writes_since_trim = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+
+        if backend == "sqlite":
+            path = resolve_cache_path(sqlite_path or "data/ranking_cache/ranking_cache.db")
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(self.SCHEMA)
+            self._conn.commit()
+
+        logger.info(f"RankingCache initialized (backend={backend}, max_entries={max_entries}, ttl={ttl_seconds}s)")
+
+    def _is_expired(self, created_at: float, now: float) -> bool:
+        return bool(self.ttl_seconds) and now - created_at > self.ttl_seconds
+
+    # Keys per SELECT, below SQLite's bound-parameter limit
+    LOOKUP_CHUNK = 500
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a cached ranking.
+
+        Returns:
+            A fresh copy of the ranking dict, or None on miss/expiry
+        """
+        return self.get_many([[key]])[0]
+
+    def get_many(self, key_groups: Sequence[Sequence[str]]) -> List[Optional[Dict[str, Any]]]:
+        """
+        Look up the rankings of several items at once.
+
+        Args:
+            key_groups: Per item, the keys whose rankings are acceptable, in order of preference
+
+        Returns:
+            Per item, a fresh copy of the first live ranking, or None
+        """
+        now = time.time()
+        keys = list(dict.fromkeys(key for group in key_groups for key in group))
+        results = []
+        with self._lock:
+            if self._conn is not None:
+                rows = {}
+                for start in range(0, len(keys), self.LOOKUP_CHUNK):
+                    chunk = keys[start:start + self.LOOKUP_CHUNK]
+                    rows.update((key, (ranking, created_at)) for key, ranking, created_at in self._conn.execute(
+                        f"SELECT key, ranking, created_at FROM ranking_cache "
+                        f"WHERE key IN ({','.join('?' * len(chunk))})", chunk
+                    ))
+            else:
+                rows = {key: self._memory[key] for key in keys if key in self._memory}
+
+            stale = [key for key, (_, created_at) in rows.items() if self._is_expired(created_at, now)]
+            if stale:
+                if self._conn is not None:
+                    self._conn.executemany("DELETE FROM ranking_cache WHERE key = ?", [(key,) for key in stale])
+                    self._conn.commit()
+                else:
+                    for key in stale:
+                        del self._memory[key]
+                for key in stale:
+                    del rows[key]
+                self.expired += len(stale)
+
+            for group in key_groups:
+                key = next((key for key in group if key in rows), None)
+                if key is None:
+                    self.misses += 1
+                    results.append(None)
+                    continue
+                if self._conn is None:
+                    self._memory.move_to_end(key)
+                self.hits += 1
+                results.append(rows[key][0])
+        return [json.loads(ranking_json) if ranking_json is not None else None for ranking_json in results]
+
+    async def get_many_async(self, key_groups: Sequence[Sequence[str]]) -> List[Optional[Dict[str, Any]]]:
+        """get_many() for coroutines: the sqlite backend is queried in a worker thread."""
+        if self._conn is not None:
+            return await asyncio.to_thread(self.get_many, key_groups)
+        return self.get_many(key_groups)
+
+    async def put_async(self, key: str, ranking: Dict[str, Any]) -> None:
+        """put() for coroutines: the sqlite backend is written in a worker thread."""
+        if self._conn is not None:
+            await asyncio.to_thread(self.put, key, ranking)
+        else:
+            self.put(key, ranking)
+
+    def put(self, key: str, ranking: Dict[str, Any]) -> None:
+        """Store a ranking dict (serialized, so later mutation by callers is harmless)."""
+        ranking_json = json.dumps(ranking, ensure_ascii=False)
+        now = time.time()
+        with self._lock:
+            if self._conn is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO ranking_cache (key, ranking, created_at) VALUES (?, ?, ?)",
+                    (key, ranking_json, now)
+                )
+                self._writes_since_trim += 1
+                # Trim periodically rather than counting rows on every write
+                if self._writes_since_trim >= max(1, self.max_entries // 100):
+                    self._trim_sqlite()
+                self._conn.commit()
+            else:
+                self._memory[key] = (ranking_json, now)
+                self._memory.move_to_end(key)
+                while len(self._memory) > self.max_entries:
+                    self._memory.popitem(last=False)
+                    self.evictions += 1
+
+    def _trim_sqlite(self) -> None:
+        """Drop the oldest rows beyond max_entries. Caller must hold the lock."""
+        self._writes_since_trim = 0
+        count = self._conn.execute("SELECT COUNT(*) FROM ranking_cache").fetchone()[0]
+        excess = count - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM ranking_cache WHERE key IN "
+                "(SELECT key FROM ranking_cache ORDER BY created_at LIMIT ?)", (excess,)
+            )
+            self.evictions += excess
+
+    def clear(self) -> None:
+        """Drop all cached rankings."""
+        with self._lock:
+            self._memory.clear()
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM ranking_cache")
+                self._conn.commit()
+
+    def get_stats(self) -> Dict[str, float]:
+        """Get cache statistics for monitoring."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'backend': self.backend,
+                'hits': self.hits,
+                'misses': self.misses,
+                'expired': self.expired,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+# Global singleton instance (created lazily from CONFIG.ranking_cache_params)
+_ranking_cache: Optional[RankingCache] = None
+_ranking_cache_lock = threading.Lock()
+
+
+def get_ranking_cache() -> Optional[RankingCache]:
+    """Get the global ranking cache, or None if caching is disabled."""
+    global _ranking_cache
+    params = CONFIG.ranking_cache_params
+    if not params.get('enabled', True):
+        return None
+    with _ranking_cache_lock:
+        if _ranking_cache is None:
+            _ranking_cache = RankingCache(
+                backend=params.get('backend', 'memory'),
+                max_entries=params.get('max_entries', 50000),
+                ttl_seconds=params.get('ttl_seconds', 86400),
+                sqlite_path=params.get('sqlite_path'),
+            )
+        return _ranking_cache
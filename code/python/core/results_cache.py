@@ -1,15 +1,203 @@
 """
 Results cache for sharing retrieval results between list and generate modes.
 Allows generate mode to reuse the exact same ranked results from list mode.
+
+With several webserver workers, the generate request for a conversation often
+lands on a different process than the list request that ranked its results, so
+the cache backend is pluggable:
+
+- memory: per-process dict with heap-based expiry
+- sqlite: file shared by all workers on the host (WAL, memory-mapped reads)
+- redis: any Redis-protocol server (redis, valkey, KeyDB, ...) via redis-py
+
+Entries are stored as compact binary payloads (zlib-compressed JSON) with the
+'vector' embeddings stripped, since only list/generate metadata is reused.
+
+store() and retrieve() are coroutines: the sqlite and redis backends do
+blocking I/O, so their calls (and the encoding around them) run in a worker
+thread instead of on the event loop.
+
+Configuration (config_webserver.yaml -> server.results_cache):
+    backend: memory | sqlite | redis
+    ttl_seconds: entry lifetime
+    sqlite_path: SQLite file relative to the project root (sqlite backend)
+    redis_url: server URL (redis backend)
 """
 
+import asyncio
+import heapq
+import json
+import sqlite3
 import threading
 import time
-from typing import Dict, Optional, List, Any
+import zlib
+from pathlib import Path
+from typing import Dict, Optional, List, Any, Tuple
+
+from core.config import CONFIG
+from core.embedding_cache import resolve_cache_path
 from misc.logger.logging_config_helper import get_configured_logger
 
+# redis-py is optional; the redis backend falls back to memory without it
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
 logger = get_configured_logger("results_cache")
 
+# Result fields that are only needed during ranking (MMR) and not worth sharing
+STRIPPED_FIELDS = ('vector',)
+
+
+def _to_json(value: Any) -> Any:
+    # NumPy scalars/arrays in retrieval scores
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    return str(value)
+
+
+def encode_results(results: List[Any], query: str) -> bytes:
+    """Encode ranked results (without vectors) as a compact binary payload."""
+    stripped = [
+        {k: v for k, v in r.items() if k not in STRIPPED_FIELDS} if isinstance(r, dict) else r
+        for r in results
+    ]
+    data = json.dumps({'query': query, 'results': stripped}, ensure_ascii=False,
+                      separators=(',', ':'), default=_to_json)
+    return zlib.compress(data.encode('utf-8'), 1)
+
+
+def decode_results(payload: bytes) -> Dict[str, Any]:
+    """Decode a payload produced by encode_results."""
+    return json.loads(zlib.decompress(payload).decode('utf-8'))
+
+
+class MemoryBackend:
+    """Per-process store; a min-heap of expiry times avoids scanning every entry."""
+
+    name = 'memory'
+    blocking = False
+
+    def __init__(self):
+        self._entries: Dict[str, Tuple[bytes, float]] = {}
+        self._expiry_heap: List[Tuple[float, str]] = []
+
+    def get(self, key: str) -> Optional[Tuple[bytes, float]]:
+        return self._entries.get(key)
+
+    def set(self, key: str, payload: bytes, expires_at: float) -> None:
+        self._entries[key] = (payload, expires_at)
+        heapq.heappush(self._expiry_heap, (expires_at, key))
+
+    def delete(self, key: str) -> None:
+        self._entries.pop(key, None)
+
+    def purge_expired(self, now: float) -> int:
+        removed = 0
+        while self._expiry_heap and self._expiry_heap[0][0] <= now:
+            expires_at, key = heapq.heappop(self._expiry_heap)
+            entry = self._entries.get(key)
+            # Skip heap records left behind when a key was stored again
+            if entry is not None and entry[1] == expires_at:
+                del self._entries[key]
+                removed += 1
+        return removed
+
+    def count(self) -> Optional[int]:
+        return len(self._entries)
+
+    def close(self) -> None:
+        self._entries.clear()
+        self._expiry_heap.clear()
+
+
+class SQLiteBackend:
+    """Store shared by all worker processes on the host."""
+
+    name = 'sqlite'
+    blocking = True
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS results_cache (
+        key TEXT PRIMARY KEY,
+        payload BLOB NOT NULL,
+        expires_at REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_results_cache_expires_at ON results_cache(expires_at);
+    """
+
+    def __init__(self, sqlite_path: Optional[str] = None, mmap_bytes: int = 64 * 1024 * 1024):
+        path = resolve_cache_path(sqlite_path or "data/results_cache/results_cache.db")
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=5)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(f"PRAGMA mmap_size={int(mmap_bytes)}")
+        self._conn.executescript(self.SCHEMA)
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[Tuple[bytes, float]]:
+        row = self._conn.execute(
+            "SELECT payload, expires_at FROM results_cache WHERE key = ?", (key,)
+        ).fetchone()
+        return (bytes(row[0]), row[1]) if row else None
+
+    def set(self, key: str, payload: bytes, expires_at: float) -> None:
+        self._conn.execute(
+            "INSERT OR REPLACE INTO results_cache (key, payload, expires_at) VALUES (?, ?, ?)",
+            (key, payload, expires_at)
+        )
+        self._conn.commit()
+
+    def delete(self, key: str) -> None:
+        self._conn.execute("DELETE FROM results_cache WHERE key = ?", (key,))
+        self._conn.commit()
+
+    def purge_expired(self, now: float) -> int:
+        removed = self._conn.execute("DELETE FROM results_cache WHERE expires_at <= ?", (now,)).rowcount
+        self._conn.commit()
+        return removed
+
+    def count(self) -> Optional[int]:
+        return self._conn.execute("SELECT COUNT(*) FROM results_cache").fetchone()[0]
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+class RedisBackend:
+    """Redis-protocol store; the server expires keys itself."""
+
+    name = 'redis'
+    blocking = True
+
+    def __init__(self, redis_url: str = "redis://localhost:6379/0", key_prefix: str = "nlweb:results:"):
+        self._client = redis.Redis.from_url(redis_url)
+        self._prefix = key_prefix
+
+    def get(self, key: str) -> Optional[Tuple[bytes, float]]:
+        payload = self._client.get(self._prefix + key)
+        # Expiry is enforced server-side, so anything returned is fresh
+        return (payload, float('inf')) if payload is not None else None
+
+    def set(self, key: str, payload: bytes, expires_at: float) -> None:
+        ttl_ms = max(1, int((expires_at - time.time()) * 1000))
+        self._client.set(self._prefix + key, payload, px=ttl_ms)
+
+    def delete(self, key: str) -> None:
+        self._client.delete(self._prefix + key)
+
+    def purge_expired(self, now: float) -> int:
+        return 0
+
+    def count(self) -> Optional[int]:
+        return None
+
+    def close(self) -> None:
+        self._client.close()
+
 
 class ResultsCache:
     """
@@ -17,13 +205,41 @@ class ResultsCache:
     Allows generate mode to reuse results from list mode instead of doing separate retrieval.
     """
 
-    def __init__(self, ttl_seconds: int = 300):  # 5 minutes default TTL
-        self._cache: Dict[str, Dict[str, Any]] = {}
+    def __init__(self, ttl_seconds: int = 300, backend: Optional[Any] = None,
+                 cleanup_interval: float = 30):  # 5 minutes default TTL
+        """
+        Initialize the cache.
+
+        Args:
+            ttl_seconds: Entry lifetime in seconds
+            backend: Storage backend (MemoryBackend when omitted)
+            cleanup_interval: Minimum seconds between purges of expired entries
+        """
+        self._backend = backend or MemoryBackend()
         self._lock = threading.RLock()
         self.ttl_seconds = ttl_seconds
-        logger.info(f"ResultsCache initialized with TTL={ttl_seconds}s")
+        self.cleanup_interval = cleanup_interval
+        self._last_cleanup = 0.0
+
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.stores = 0
+        self.errors = 0
+        self.bytes_stored = 0
+        logger.info(f"ResultsCache initialized with backend={self._backend.name}, TTL={ttl_seconds}s")
 
-    def store(self, conversation_id: str, results: List[Any], query: str) -> None:
+    @property
+    def backend(self) -> str:
+        return self._backend.name
+
+    async def _run(self, func, *args):
+        """Call func directly for in-process backends, in a worker thread for blocking ones."""
+        if getattr(self._backend, 'blocking', True):
+            return await asyncio.to_thread(func, *args)
+        return func(*args)
+
+    async def store(self, conversation_id: str, results: List[Any], query: str) -> None:
         """
         Store ranked results for a conversation.
 
@@ -32,16 +248,9 @@ class ResultsCache:
             results: List of ranked answer objects (final_ranked_answers)
             query: The search query
         """
-        with self._lock:
-            self._cache[conversation_id] = {
-                'final_ranked_answers': results,
-                'query': query,
-                'timestamp': time.time()
-            }
-            logger.info(f"Cached {len(results)} results for conversation {conversation_id}")
-            self._cleanup_expired()
+        await self._run(self._store, conversation_id, results, query)
 
-    def retrieve(self, conversation_id: str) -> Optional[List[Any]]:
+    async def retrieve(self, conversation_id: str) -> Optional[List[Any]]:
         """
         Retrieve cached results for a conversation.
 
@@ -51,47 +260,114 @@ class ResultsCache:
         Returns:
             List of ranked results if found and not expired, None otherwise
         """
+        return await self._run(self._retrieve, conversation_id)
+
+    def _store(self, conversation_id: str, results: List[Any], query: str) -> None:
+        payload = encode_results(results, query)
+        now = time.time()
         with self._lock:
-            if conversation_id not in self._cache:
-                logger.debug(f"No cached results for conversation {conversation_id}")
+            try:
+                self._backend.set(conversation_id, payload, now + self.ttl_seconds)
+            except Exception as e:
+                self.errors += 1
+                logger.warning(f"Failed to cache results for conversation {conversation_id}: {e}")
+                return
+            self.stores += 1
+            self.bytes_stored += len(payload)
+            logger.info(f"Cached {len(results)} results ({len(payload)} bytes) for conversation {conversation_id}")
+            self._cleanup_expired(now)
+
+    def _retrieve(self, conversation_id: str) -> Optional[List[Any]]:
+        now = time.time()
+        with self._lock:
+            try:
+                entry = self._backend.get(conversation_id)
+            except Exception as e:
+                self.errors += 1
+                logger.warning(f"Failed to read cached results for conversation {conversation_id}: {e}")
                 return None
 
-            entry = self._cache[conversation_id]
+            if entry is None:
+                self.misses += 1
+                logger.debug(f"No cached results for conversation {conversation_id}")
+                return None
 
-            # Check if expired
-            age = time.time() - entry['timestamp']
-            if age > self.ttl_seconds:
-                logger.info(f"Cached results for {conversation_id} expired (age={age:.1f}s)")
-                del self._cache[conversation_id]
+            payload, expires_at = entry
+            if expires_at <= now:
+                logger.info(f"Cached results for {conversation_id} expired")
+                self._backend.delete(conversation_id)
+                self.expired += 1
+                self.misses += 1
                 return None
 
-            logger.info(f"Retrieved {len(entry['final_ranked_answers'])} cached results for conversation {conversation_id}")
-            return entry['final_ranked_answers']
-
-    def _cleanup_expired(self) -> None:
-        """Remove expired entries from cache."""
-        current_time = time.time()
-        expired = [
-            cid for cid, entry in self._cache.items()
-            if current_time - entry['timestamp'] > self.ttl_seconds
-        ]
-        for cid in expired:
-            del self._cache[cid]
-            logger.debug(f"Removed expired cache entry for conversation {cid}")
-
-    def get_stats(self) -> Dict[str, int]:
+            self.hits += 1
+
+        results = decode_results(payload)['results']
+        logger.info(f"Retrieved {len(results)} cached results for conversation {conversation_id}")
+        return results
+
+    def _cleanup_expired(self, now: float) -> None:
+        """Remove expired entries from cache. Caller must hold the lock."""
+        if now - self._last_cleanup < self.cleanup_interval:
+            return
+        self._last_cleanup = now
+        removed = self._backend.purge_expired(now)
+        if removed:
+            logger.debug(f"Removed {removed} expired cache entries")
+
+    def get_stats(self) -> Dict[str, Any]:
         """Get cache statistics for monitoring."""
         with self._lock:
+            lookups = self.hits + self.misses
+            try:
+                total_entries = self._backend.count()
+            except Exception:
+                total_entries = None
             return {
-                'total_entries': len(self._cache),
-                'total_results': sum(len(e['final_ranked_answers']) for e in self._cache.values())
+                'backend': self._backend.name,
+                'total_entries': total_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'expired': self.expired,
+                'stores': self.stores,
+                'errors': self.errors,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'avg_payload_bytes': self.bytes_stored / self.stores if self.stores else 0,
             }
 
+    def close(self) -> None:
+        with self._lock:
+            self._backend.close()
+
+
+def create_backend(params: Dict[str, Any]) -> Any:
+    """Build the storage backend named in the results_cache config."""
+    backend = params.get('backend', 'memory')
+    if backend == 'sqlite':
+        return SQLiteBackend(params.get('sqlite_path'), params.get('mmap_bytes', 64 * 1024 * 1024))
+    if backend == 'redis':
+        if REDIS_AVAILABLE:
+            return RedisBackend(params.get('redis_url', 'redis://localhost:6379/0'),
+                                params.get('key_prefix', 'nlweb:results:'))
+        logger.warning("results_cache backend 'redis' requires the redis package, using memory")
+    elif backend != 'memory':
+        logger.warning(f"Unknown results_cache backend '{backend}', using memory")
+    return MemoryBackend()
+
 
-# Global singleton instance
-_results_cache = ResultsCache()
+# Global singleton instance (created lazily from CONFIG.results_cache_params)
+_results_cache: Optional[ResultsCache] = None
+_results_cache_lock = threading.Lock()
 
 
 def get_results_cache() -> ResultsCache:
     """Get the global results cache instance."""
-    return _results_cache
+    global _results_cache
+    with _results_cache_lock:
+        if _results_cache is None:
+            params = CONFIG.results_cache_params
+            _results_cache = ResultsCache(
+                ttl_seconds=params.get('ttl_seconds', 300),
+                backend=create_backend(params),
+            )
+        return _results_cache
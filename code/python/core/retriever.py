@@ -12,6 +12,8 @@ import asyncio
 import subprocess
 import sys
 from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from datetime import datetime, timezone
 from typing import List, Dict, Any, Optional, Union, Tuple, Type
 import json
 
@@ -145,6 +147,103 @@ def _ensure_package_installed(db_type: str):
                 raise ValueError(f"Failed to install required package {package} for {db_type}")
 
 
+@dataclass(frozen=True)
+class DateRange:
+    """
+    Publication date filter passed to search() as the date_range kwarg.
+
+    Bounds are inclusive UTC epoch seconds at day granularity (midnight), the
+    same encoding as the date_published_ts payload field; None means unbounded.
+    Documents without a publication date never match.
+    """
+    start_ts: Optional[float] = None
+    end_ts: Optional[float] = None
+
+    @staticmethod
+    def _day_ts(date_str: Optional[str]) -> Optional[float]:
+        if not date_str:
+            return None
+        day = datetime.strptime(date_str.split('T')[0], '%Y-%m-%d')
+        return day.replace(tzinfo=timezone.utc).timestamp()
+
+    @classmethod
+    def from_temporal_range(cls, temporal_range: Optional[Dict[str, Any]]) -> Optional['DateRange']:
+        """Build a filter from TimeRangeExtractor output, or None if it has no usable start date."""
+        if not temporal_range or not temporal_range.get('is_temporal'):
+            return None
+        try:
+            start_ts = cls._day_ts(temporal_range.get('start_date'))
+            end_ts = cls._day_ts(temporal_range.get('end_date'))
+        except ValueError:
+            logger.warning(f"Unparseable temporal range, not filtering by date: {temporal_range}")
+            return None
+        if start_ts is None:
+            return None
+        return cls(start_ts, end_ts)
+
+    def contains(self, ts: Optional[float]) -> bool:
+        if ts is None:
+            return False
+        if self.start_ts is not None and ts < self.start_ts:
+            return False
+        return self.end_ts is None or ts <= self.end_ts
+
+    def start_date(self) -> Optional[str]:
+        return self._iso_date(self.start_ts)
+
+    def end_date(self) -> Optional[str]:
+        return self._iso_date(self.end_ts)
+
+    @staticmethod
+    def _iso_date(ts: Optional[float]) -> Optional[str]:
+        return datetime.fromtimestamp(ts, tz=timezone.utc).strftime('%Y-%m-%d') if ts is not None else None
+
+
+def filter_results_by_date_range(results: List[List[Any]], date_range: DateRange) -> List[List[Any]]:
+    """
+    Client-side date filter for backends that cannot apply date_range natively.
+
+    Args:
+        results: Search results in [url, schema_json, name, site, ...] format
+
+    Returns:
+        The results published within date_range, in their original order
+    """
+    from core.hybrid_rescoring import extract_date_published_ts
+    return [r for r in results if date_range.contains(extract_date_published_ts(r[1]))]
+
+
+def log_retrieved_items(handler: Any, items: List[List[Any]], retrieval_log: Dict[str, Dict[str, Any]]) -> int:
+    """
+    Log the retrieved documents a request actually uses, once, in their final order.
+
+    Searches called with retrieval_log={} collect each result's analytics row
+    (scores, metadata) by URL instead of writing it under handler.query_id, so
+    speculative or merged searches do not log rows that are later discarded.
+
+    Args:
+        handler: Request handler providing query_id
+        items: The retrieved items in [url, schema_json, name, site, ...] format
+        retrieval_log: url -> row filled in by the searches that produced items
+
+    Returns:
+        Number of rows logged
+    """
+    query_id = getattr(handler, 'query_id', None)
+    if not query_id or not retrieval_log:
+        return 0
+    from core.query_logger import get_query_logger
+    query_logger = get_query_logger()
+    logged = 0
+    for position, item in enumerate(items):
+        record = retrieval_log.get(item[0])
+        if record is not None:
+            query_logger.log_retrieved_document(query_id=query_id, retrieval_position=position, **record)
+            logged += 1
+    logger.info(f"Analytics: Logged {logged} retrieved documents for query {query_id}")
+    return logged
+
+
 class VectorDBClientInterface(ABC):
     """
     Abstract base class defining the interface for vector database clients.
@@ -248,6 +347,10 @@ class RetrievalClientBase(VectorDBClientInterface):
     Base implementation for retrieval clients with default caching behavior.
     All retrieval provider implementations should inherit from this class.
     """
+
+    # Whether search()/search_all_sites() apply the date_range kwarg themselves;
+    # results from other providers are filtered by VectorDBClient
+    supports_date_range = False
     
     def __init__(self):
         """Initialize the base client with caching structures."""
@@ -899,6 +1002,7 @@ class VectorDBClient:
             endpoint_results = {}
             successful_endpoints = 0
             
+            date_range = kwargs.get('date_range')
             for endpoint_name, result in zip(endpoint_names, results):
                 if isinstance(result, Exception):
                     logger.warning(f"Search failed for endpoint {endpoint_name}: {result}")
@@ -906,6 +1010,8 @@ class VectorDBClient:
                     logger.warning(f"Endpoint {endpoint_name} returned None, treating as empty results")
                     endpoint_results[endpoint_name] = []
                 else:
+                    if date_range and not getattr(await self.get_client(endpoint_name), 'supports_date_range', False):
+                        result = filter_results_by_date_range(result, date_range)
                     endpoint_results[endpoint_name] = result
                     successful_endpoints += 1
             
@@ -9,15 +9,18 @@ Backwards compatibility is not guaranteed at this time.
 """
 
 import xml.etree.ElementTree as ET
-from typing import List, Dict, Any, Optional
-from dataclasses import dataclass
+from typing import List, Dict, Any, Optional, Tuple
+from dataclasses import dataclass, field
+from collections import Counter
 import asyncio
 import os
 import json
 import time
+import numpy as np
 from misc.logger.logging_config_helper import get_configured_logger
 from core.llm import ask_llm
 from core.config import CONFIG
+from core.embedding import batch_get_embeddings, get_embedding
 from core.prompts import fill_prompt
 logger = get_configured_logger("tool_selector")
 
@@ -32,9 +35,11 @@ class Tool:
     prompt: str
     return_structure: Optional[Dict[str, Any]] = None
     handler_class: Optional[str] = None
+    description: str = ""
 
 def init():
     """Initialize the router module by loading tools."""
+    global _router_warmup_task
     # Load tools from config directory for default site
     tools_xml_path = os.path.join(CONFIG.config_directory, "tools.xml")
     site_id = 'default'
@@ -44,6 +49,15 @@ def init():
     cache_key = (tools_xml_path, site_id)
     _tools_cache[cache_key] = tools
     
+    # Embed tool descriptions and examples in the background so the first query can skip the LLM
+    router = get_embedding_router()
+    if router is not None:
+        try:
+            _router_warmup_task = asyncio.get_running_loop().create_task(_warm_embedding_router(router, tools))
+        except RuntimeError:
+            # No event loop (e.g. command line tools): tools are embedded on first use
+            pass
+    
     logger.info(f"Loaded {len(tools)} tools")
     logger.info("Router initialization complete")
 
@@ -109,6 +123,9 @@ def _load_tools_from_file(tools_xml_path: str, site_id: str = 'default') -> List
                 # Parse examples
                 examples = [ex.text.strip() for ex in tool_elem.findall('example') if ex.text]
                 
+                # Parse description (embedded by the router together with the examples)
+                description = (tool_elem.findtext('description') or '').strip()
+                
                 # Parse prompt
                 prompt_elem = tool_elem.find('prompt')
                 prompt = prompt_elem.text.strip() if prompt_elem is not None and prompt_elem.text else ""
@@ -135,7 +152,8 @@ def _load_tools_from_file(tools_xml_path: str, site_id: str = 'default') -> List
                     schema_type=schema_type,
                     prompt=prompt,
                     return_structure=return_structure,
-                    handler_class=handler_class
+                    handler_class=handler_class,
+                    description=description
                 )
                 tools.append(tool)
         
@@ -149,6 +167,198 @@ def _load_tools_from_file(tools_xml_path: str, site_id: str = 'default') -> List
 # Key is (tools_xml_path, site_id) tuple
 _tools_cache: Dict[tuple, List['Tool']] = {}
 
+
+# Return structure fields the router can fill without asking the LLM
+ROUTER_FILLED_FIELDS = {"score", "justification", "search_query"}
+
+# How each query was routed (handler.tool_routing, logged with the query):
+#   embedding         - embedding router was confident, no LLM call
+#   embedding_params  - embedding router picked the tool, LLM only extracted its parameters
+#   llm_candidates    - top candidates were close, LLM evaluated only those
+#   llm               - LLM evaluated every tool (router disabled, unavailable or no tool similar enough)
+_routing_outcomes: Counter = Counter()
+_llm_calls: Counter = Counter()
+
+
+def get_routing_stats() -> Dict[str, Any]:
+    """Routing outcome counts and the share of per-tool LLM calls skipped in this process."""
+    made, skipped = _llm_calls['made'], _llm_calls['skipped']
+    return {
+        'total': sum(_routing_outcomes.values()),
+        'outcomes': dict(_routing_outcomes),
+        'llm_calls_made': made,
+        'llm_calls_skipped': skipped,
+        'skipped_llm_ratio': skipped / (made + skipped) if made + skipped else 0.0,
+    }
+
+
+def needs_llm_parameters(tool: Tool) -> bool:
+    """Whether the tool's return structure has parameters only the LLM can extract."""
+    return bool(set(tool.return_structure or {}) - ROUTER_FILLED_FIELDS)
+
+
+@dataclass
+class RoutingDecision:
+    """Embedding router verdict for one query."""
+    outcome: str  # confident, ambiguous or low_similarity
+    candidates: List[Tool]
+    similarities: Dict[str, float] = field(default_factory=dict)
+
+
+class EmbeddingRouter:
+    """
+    First-stage tool router.
+
+    Each tool is represented by the normalized embeddings of its description and
+    examples (plus, with the classifier enabled, logged queries the LLM routed to
+    it); a query scores each tool by its best cosine similarity among them.
+    """
+
+    def __init__(self, min_similarity: float = 0.35, margin: float = 0.08, max_llm_candidates: int = 3):
+        self.min_similarity = min_similarity
+        self.margin = margin
+        self.max_llm_candidates = max_llm_candidates
+        self._vectors: Dict[str, np.ndarray] = {}  # tool name -> (n, dim) unit rows
+        self._lock = asyncio.Lock()
+
+    @staticmethod
+    def _normalize(vectors) -> np.ndarray:
+        matrix = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return matrix / np.maximum(norms, 1e-12)
+
+    def add_vectors(self, tool_name: str, vectors) -> None:
+        rows = self._normalize(vectors)
+        if tool_name in self._vectors:
+            rows = np.vstack([self._vectors[tool_name], rows])
+        self._vectors[tool_name] = rows
+
+    def has_tool(self, tool_name: str) -> bool:
+        return tool_name in self._vectors
+
+    async def embed_tools(self, tools: List[Tool]) -> None:
+        """Embed descriptions and examples of tools not seen yet, in one batch."""
+        async with self._lock:
+            texts, owners = [], []
+            for tool in tools:
+                if self.has_tool(tool.name):
+                    continue
+                for text in [tool.description, *tool.examples]:
+                    if text:
+                        texts.append(text)
+                        owners.append(tool.name)
+            if not texts:
+                return
+            embeddings = await batch_get_embeddings(texts)
+            by_tool: Dict[str, list] = {}
+            for owner, embedding in zip(owners, embeddings):
+                by_tool.setdefault(owner, []).append(embedding)
+            for tool_name, vectors in by_tool.items():
+                self.add_vectors(tool_name, vectors)
+            logger.info(f"Embedded {len(texts)} descriptions/examples for tools: {list(by_tool)}")
+
+    async def fit_from_log(self, examples: List[Tuple[str, str]]) -> int:
+        """
+        Add logged (query, tool name) pairs as labelled examples of their tools.
+
+        Only tools the router already knows are kept, so renamed or removed tools are ignored.
+
+        Returns:
+            Number of examples added
+        """
+        examples = [(query, tool_name) for query, tool_name in examples if query and self.has_tool(tool_name)]
+        if not examples:
+            return 0
+        embeddings = await batch_get_embeddings([query for query, _ in examples])
+        by_tool: Dict[str, list] = {}
+        for (_, tool_name), embedding in zip(examples, embeddings):
+            by_tool.setdefault(tool_name, []).append(embedding)
+        for tool_name, vectors in by_tool.items():
+            self.add_vectors(tool_name, vectors)
+        return len(examples)
+
+    def similarities(self, query_vector, tools: List[Tool]) -> List[Tuple[Tool, float]]:
+        """Tools with their similarity to the query, most similar first."""
+        query = self._normalize([query_vector])[0]
+        scored = [(tool, float(np.max(self._vectors[tool.name] @ query))) for tool in tools]
+        return sorted(scored, key=lambda pair: pair[1], reverse=True)
+
+    def route(self, query_vector, tools: List[Tool]) -> Optional[RoutingDecision]:
+        """
+        Decide which tools the LLM still has to evaluate.
+
+        Returns:
+            RoutingDecision, or None if some tool has no embeddings yet
+        """
+        if not tools or not all(self.has_tool(tool.name) for tool in tools):
+            return None
+        ranked = self.similarities(query_vector, tools)
+        similarities = {tool.name: round(score, 4) for tool, score in ranked}
+        top_score = ranked[0][1]
+        runner_up = ranked[1][1] if len(ranked) > 1 else -1.0
+
+        if top_score < self.min_similarity:
+            return RoutingDecision("low_similarity", [tool for tool, _ in ranked], similarities)
+        if top_score - runner_up >= self.margin:
+            return RoutingDecision("confident", [ranked[0][0]], similarities)
+        close = [tool for tool, score in ranked if top_score - score < self.margin]
+        return RoutingDecision("ambiguous", close[:self.max_llm_candidates], similarities)
+
+
+_embedding_router: Optional[EmbeddingRouter] = None
+_router_warmup_task: Optional[asyncio.Task] = None
+
+
+def get_embedding_router() -> Optional[EmbeddingRouter]:
+    """Get the global embedding router, or None if disabled in config_nlweb.yaml."""
+    global _embedding_router
+    params = CONFIG.tool_router_params
+    if not params.get('enabled', True):
+        return None
+    if _embedding_router is None:
+        _embedding_router = EmbeddingRouter(
+            min_similarity=params.get('min_similarity', 0.35),
+            margin=params.get('margin', 0.08),
+            max_llm_candidates=params.get('max_llm_candidates', 3),
+        )
+    return _embedding_router
+
+
+async def _warm_embedding_router(router: EmbeddingRouter, tools: List[Tool]) -> None:
+    try:
+        await router.embed_tools(tools)
+        params = CONFIG.tool_router_params
+        if params.get('classifier_enabled', False):
+            from core.query_logger import get_query_logger
+            examples = await asyncio.to_thread(
+                get_query_logger().get_tool_routing_examples, params.get('classifier_max_examples', 2000))
+            added = await router.fit_from_log(examples)
+            logger.info(f"Tool router classifier learned {added} logged routing decisions")
+    except Exception as e:
+        logger.warning(f"Tool router warmup failed, tools will be embedded on first use: {e}")
+
+
+async def route_query(query: str, tools: List[Tool]) -> Optional[RoutingDecision]:
+    """
+    Run the embedding router for a query.
+
+    The query embedding goes through the embedding cache, so the vector search
+    for the same query reuses it.
+
+    Returns:
+        RoutingDecision, or None if the router is disabled or unavailable
+    """
+    router = get_embedding_router()
+    if router is None:
+        return None
+    try:
+        await router.embed_tools(tools)
+        query_vector = await get_embedding(query)
+    except Exception as e:
+        logger.warning(f"Embedding router unavailable, evaluating tools with the LLM: {e}")
+        return None
+    return router.route(query_vector, tools)
+
 from typing import TYPE_CHECKING
 if TYPE_CHECKING:
     from typing import List, Dict
@@ -490,9 +700,8 @@ class ToolSelector:
                         "llm_skipped": True
                     })
             else:
-                # Evaluate tools with early termination strategy
-                # Evaluating tools for query
-                tool_results = await self._evaluate_tools_with_early_termination(query, tools, threshold=90)
+                # Embedding router first; the LLM evaluates only the tools it cannot decide between
+                tool_results = await self._route_tools(query, tools)
             
             # Sort by score
             tool_results.sort(key=lambda x: x["score"], reverse=True)
@@ -542,6 +751,46 @@ class ToolSelector:
             
             await self.handler.state.precheck_step_done(self.STEP_NAME)
     
+    async def _route_tools(self, query: str, tools: List[Tool]) -> List[dict]:
+        """Route with the embedding router, falling back to LLM evaluation with early termination."""
+        decision = await route_query(query, tools)
+        
+        if decision is None or decision.outcome == "low_similarity":
+            routing = "llm"
+            llm_tools = tools
+        elif decision.outcome == "ambiguous":
+            routing = "llm_candidates"
+            llm_tools = decision.candidates
+        elif needs_llm_parameters(decision.candidates[0]):
+            routing = "embedding_params"
+            llm_tools = decision.candidates
+        else:
+            routing = "embedding"
+            llm_tools = []
+        
+        if llm_tools:
+            tool_results = await self._evaluate_tools_with_early_termination(query, llm_tools, threshold=90)
+        else:
+            tool = decision.candidates[0]
+            similarity = decision.similarities[tool.name]
+            tool_results = [{
+                "tool": tool,
+                "score": 100,
+                "result": {
+                    "score": 100,
+                    "justification": f"Embedding router: similarity {similarity:.2f}",
+                    "search_query": query
+                }
+            }]
+        
+        self.handler.tool_routing = routing
+        _routing_outcomes[routing] += 1
+        _llm_calls['made'] += len(llm_tools)
+        _llm_calls['skipped'] += len(tools) - len(llm_tools)
+        logger.info(f"Tool routing '{routing}': {len(llm_tools)}/{len(tools)} tools evaluated by LLM, "
+                    f"similarities {decision.similarities if decision else None}")
+        return tool_results
+    
     async def _evaluate_tool(self, query: str, tool: Tool) -> dict:
         """Evaluate a single tool for the query."""
         if not tool.prompt:
@@ -0,0 +1,157 @@
+"""
+Speculative retrieval for NLWebHandler.prepare.
+
+Vector search used to start only after every precheck (decontextualization,
+query rewrite, time range extraction, tool selection, memory) had finished,
+and each precheck may be an LLM call. For the common single-turn query none of
+them changes what is searched for, so the search is started on the raw query
+at the same moment as the prechecks and its results are reused once they are
+done.
+
+The speculation is discarded (and the search re-issued) when:
+- the decontextualized query differs from the raw query, or
+- the time range extractor found a date range (the final search filters on it)
+  or asks for more candidates than were fetched.
+
+Searches are serialized by VectorDBClient, so a discarded speculation delays
+the real search: it is only started for single-turn queries (see
+can_speculate), whose query decontextualization leaves untouched, and not
+when the time range extractor will find a date range without an LLM call. A
+date range found later cancels the speculation right away (on_temporal_range)
+instead of when the prechecks finish. It runs
+without the handler and collects its analytics rows in retrieval_log; prepare
+logs the rows of the results it actually uses.
+
+Each request records the outcome as handler.retrieval_speculation
+("kept", "query_changed", "temporal_range" or "failed"), which QueryLogger
+stores with the query; process-wide counts are available from get_speculation_stats.
+"""
+
+import asyncio
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+from core.embedding_cache import normalize_text
+from core.query_analysis.time_range_extractor import TimeRangeExtractor
+from core.retriever import DateRange, search
+from misc.logger.logging_config_helper import get_configured_logger
+
+logger = get_configured_logger("speculative_retrieval")
+
+_outcomes: Counter = Counter()
+
+
+def get_speculation_stats() -> Dict[str, Any]:
+    """Outcome counts and keep rate of speculative retrievals in this process."""
+    total = sum(_outcomes.values())
+    return {
+        'total': total,
+        'outcomes': dict(_outcomes),
+        'kept_rate': _outcomes['kept'] / total if total else 0.0,
+    }
+
+
+class SpeculativeRetrieval:
+    """A search on the raw query, started before the prechecks finish."""
+
+    def __init__(self, handler, num_results: int, include_vectors: bool = False):
+        self.handler = handler
+        self.query = handler.query
+        self.num_results = num_results
+        self.include_vectors = include_vectors
+        self.task: Optional[asyncio.Task] = None
+        self.outcome: Optional[str] = None
+        # Analytics rows of the speculative results, logged by prepare only if they are kept
+        self.retrieval_log: Dict[str, Dict[str, Any]] = {}
+
+    @staticmethod
+    def can_speculate(handler) -> bool:
+        """
+        False when the speculation could not be kept: decontextualization may
+        rewrite the query (earlier turns in the conversation) or the final
+        search will be date filtered.
+        """
+        if TimeRangeExtractor.finds_range_without_llm(handler.query, handler.query_params):
+            return False
+        if not handler.prev_queries:
+            return True
+        decontextualized = getattr(handler, 'decontextualized_query', '')
+        return bool(decontextualized) and normalize_text(decontextualized) == normalize_text(handler.query)
+
+    def start(self) -> None:
+        # No handler: nothing is logged under the query_id or streamed for a search that may be discarded
+        self.task = asyncio.create_task(search(
+            self.query,
+            self.handler.site,
+            query_params=self.handler.query_params,
+            num_results=self.num_results,
+            include_vectors=self.include_vectors,
+            retrieval_log=self.retrieval_log
+        ))
+
+    def _mismatch(self, query: str, num_results: int, date_range: Optional[DateRange]) -> Optional[str]:
+        if normalize_text(query) != normalize_text(self.query):
+            return "query_changed"
+        if date_range is not None or num_results > self.num_results:
+            return "temporal_range"
+        return None
+
+    async def resolve(self, query: str, num_results: int,
+                      date_range: Optional[DateRange] = None) -> Optional[List[Any]]:
+        """
+        Return the speculative results if they answer the final search, else None.
+
+        Args:
+            query: The query the prechecks settled on (decontextualized)
+            num_results: The number of candidates the final search needs
+            date_range: Date filter of the final search, if any
+
+        Returns:
+            The search results, or None if the caller must search again
+        """
+        if self.outcome is not None:
+            # Already discarded by on_temporal_range
+            return None
+        reason = self._mismatch(query, num_results, date_range)
+        if reason:
+            self.discard(reason)
+            return None
+
+        waited = time.time()
+        try:
+            items = await self.task
+        except Exception as e:
+            logger.warning(f"Speculative retrieval failed, searching again: {e}")
+            self._record("failed")
+            return None
+
+        self._record("kept")
+        logger.info(f"Speculative retrieval kept: {len(items)} items, "
+                    f"{(time.time() - waited) * 1000:.0f} ms spent waiting after prechecks")
+        return items[:num_results]
+
+    def on_temporal_range(self, temporal_range: Optional[Dict[str, Any]]) -> None:
+        """Discard as soon as the time range extractor reports a date range the final search filters on."""
+        if self.outcome is None and DateRange.from_temporal_range(temporal_range) is not None:
+            self.discard("temporal_range")
+
+    def discard(self, reason: str) -> None:
+        self.cancel()
+        self._record(reason)
+
+    def cancel(self) -> None:
+        if self.task is None:
+            return
+        if not self.task.done():
+            self.task.cancel()
+        elif not self.task.cancelled():
+            # Consume a failure so it is not reported as never retrieved
+            self.task.exception()
+
+    def _record(self, outcome: str) -> None:
+        self.outcome = outcome
+        self.handler.retrieval_speculation = outcome
+        _outcomes[outcome] += 1
+        if outcome != "kept":
+            logger.info(f"Speculative retrieval discarded ({outcome}) for query '{self.query}'")
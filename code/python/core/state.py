@@ -120,4 +120,24 @@ class NLWebHandlerState:
         if self.should_abort_fast_track():
             self.handler.abort_fast_track_event.set()
             return True
-        return False
\ No newline at end of file
+        return False
+
+    async def wait_for_cancellation(self, fast_track=False, poll_interval=0.05):
+        """
+        Wait until in-flight work for this request should be cancelled.
+        Returns the reason: 'connection_lost' or 'fast_track_aborted'.
+        """
+        handler = self.handler
+        while True:
+            if not handler.connection_alive_event.is_set():
+                return "connection_lost"
+            if fast_track and (handler.abort_fast_track_event.is_set() or self.should_abort_fast_track()):
+                return "fast_track_aborted"
+            # Connection loss has no event of its own, so it is polled
+            if fast_track:
+                try:
+                    await asyncio.wait_for(handler.abort_fast_track_event.wait(), timeout=poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+            else:
+                await asyncio.sleep(poll_interval)
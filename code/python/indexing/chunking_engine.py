@@ -9,6 +9,7 @@ Length-based chunking strategy validated by POC (2026-01-28):
 
 import re
 from dataclasses import dataclass
+from datetime import datetime
 from pathlib import Path
 from typing import Optional
 
@@ -28,6 +29,7 @@ class Chunk:
     summary: str               # headline + representative sentences
     char_start: int
     char_end: int
+    date_published: Optional[datetime] = None  # Article publish date (recency filtering)
 
 
 def make_chunk_id(article_url: str, chunk_index: int) -> str:
@@ -204,7 +206,8 @@ class ChunkingEngine:
             full_text=full_text,
             summary=summary,
             char_start=char_start,
-            char_end=char_end
+            char_end=char_end,
+            date_published=cdm.date_published
         )
 
     def _generate_summary(self, headline: str, sentences: list[str]) -> str:
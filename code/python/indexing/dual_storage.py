@@ -8,7 +8,7 @@ Dual-Tier Storage for M0 Indexing Module.
 import json
 import sqlite3
 from dataclasses import dataclass
-from datetime import datetime
+from datetime import datetime, timezone
 from pathlib import Path
 from typing import Optional
 
@@ -234,6 +234,7 @@ class MapPayload:
     name: str          # summary
     site: str
     schema_json: str   # JSON with chunk metadata
+    date_published_ts: Optional[float] = None  # Article publish date (epoch seconds) for recency filtering
 
     @classmethod
     def from_chunk(cls, chunk: Chunk, site: str) -> 'MapPayload':
@@ -248,11 +249,21 @@ class MapPayload:
             'indexed_at': datetime.utcnow().isoformat()
         }
 
+        # Every Qdrant writer must set date_published_ts: the recency filter keeps
+        # points without it, so an unset field bypasses the date pushdown
+        date_published_ts = None
+        if chunk.date_published is not None:
+            # Day granularity (midnight UTC), same as extract_date_published_ts
+            day = chunk.date_published.date()
+            schema['datePublished'] = day.isoformat()
+            date_published_ts = datetime(day.year, day.month, day.day, tzinfo=timezone.utc).timestamp()
+
         return cls(
             url=chunk.chunk_id,
             name=chunk.summary,
             site=site,
-            schema_json=json.dumps(schema, ensure_ascii=False)
+            schema_json=json.dumps(schema, ensure_ascii=False),
+            date_published_ts=date_published_ts
         )
 
     def to_dict(self) -> dict:
@@ -261,5 +272,6 @@ class MapPayload:
             'url': self.url,
             'name': self.name,
             'site': self.site,
-            'schema_json': self.schema_json
+            'schema_json': self.schema_json,
+            'date_published_ts': self.date_published_ts
         }
@@ -0,0 +1,50 @@
+"""
+Publication Date Backfill Job
+
+Sets the date_published_ts payload field (and its range index) on points that
+were uploaded before the field existed. Temporal queries filter on this field
+server-side and compute recency boosts from it; points without it are kept by
+the 3-year cutoff filter (it cannot tell them from undated articles) and get no
+recency adjustment, so run this once on every collection loaded before the
+field existed. New uploads set it in build_point_payload (retrieval_providers/qdrant.py).
+
+Usage:
+    python code/python/jobs/backfill_date_published.py [collection_name]
+"""
+
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core.config import CONFIG
+from retrieval_providers.qdrant import QdrantVectorClient
+
+
+async def backfill(collection_name: str = None) -> int:
+    """Scroll the write endpoint collection and set missing publication dates."""
+    client = QdrantVectorClient(CONFIG.write_endpoint)
+    return await client.backfill_date_published(collection_name)
+
+
+def main():
+    print("=" * 60)
+    print("date_published_ts Backfill")
+    print("=" * 60)
+
+    collection_name = sys.argv[1] if len(sys.argv) > 1 else None
+
+    try:
+        count = asyncio.run(backfill(collection_name))
+        print(f"\n[SUCCESS] Updated {count} points")
+        return 0
+    except Exception as e:
+        print(f"\nERROR: {e}")
+        import traceback
+        traceback.print_exc()
+        return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
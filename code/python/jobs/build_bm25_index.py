@@ -0,0 +1,48 @@
+"""
+BM25 Index Backfill Job
+
+Builds the persistent BM25 inverted index (core/bm25_index.py) from every point
+already stored in the Qdrant write endpoint. New uploads keep the index in sync
+automatically; run this once for collections loaded before the index existed,
+or after changing the tokenizer.
+
+Usage:
+    python code/python/jobs/build_bm25_index.py [collection_name]
+"""
+
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core.config import CONFIG
+from retrieval_providers.qdrant import QdrantVectorClient
+
+
+async def build_index(collection_name: str = None) -> int:
+    """Scroll the write endpoint collection and index every document."""
+    client = QdrantVectorClient(CONFIG.write_endpoint)
+    return await client.rebuild_bm25_index(collection_name)
+
+
+def main():
+    print("=" * 60)
+    print("BM25 Index Backfill")
+    print("=" * 60)
+
+    collection_name = sys.argv[1] if len(sys.argv) > 1 else None
+
+    try:
+        count = asyncio.run(build_index(collection_name))
+        print(f"\n[SUCCESS] Indexed {count} documents")
+        return 0
+    except Exception as e:
+        print(f"\nERROR: {e}")
+        import traceback
+        traceback.print_exc()
+        return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
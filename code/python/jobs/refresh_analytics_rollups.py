@@ -0,0 +1,56 @@
+"""
+Analytics Rollup Refresh Job
+
+Recomputes the dashboard rollup tables (analytics_hourly,
+analytics_url_clicks_daily) from the raw query logs. The QueryLogger worker
+and the dashboard keep the recent buckets current while the server runs but
+never rebuild older history; use this job to rebuild all history (--full, and
+automatically when the rollup tables are empty), e.g. for a new database,
+after a migration or bulk import, or to refresh rollups for a database no
+server is writing to.
+
+Usage:
+    python code/python/jobs/refresh_analytics_rollups.py [--full]
+
+Run with the same ANALYTICS_DATABASE_URL as the server to target PostgreSQL.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from core.analytics_db import AnalyticsDB
+from core.analytics_rollup import AnalyticsRollups
+
+
+def main():
+    print("=" * 60)
+    print("Analytics Rollup Refresh")
+    print("=" * 60)
+
+    full = "--full" in sys.argv[1:]
+    db = AnalyticsDB()
+    rollups = AnalyticsRollups(db)
+    print(f"\nDatabase: {db.db_type}")
+
+    conn = db.connect()
+    try:
+        rollups.ensure_tables(conn)
+        full = full or rollups.is_empty(conn)
+        print(f"Mode: {'full rebuild' if full else 'incremental'}")
+        result = rollups.refresh(conn, full=full)
+        print(f"\n[SUCCESS] Wrote {result['hourly_buckets']} hourly and "
+              f"{result['daily_click_buckets']} daily click buckets")
+        return 0
+    except Exception as e:
+        print(f"\nERROR: {e}")
+        import traceback
+        traceback.print_exc()
+        return 1
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -427,7 +427,8 @@ class DeepResearchHandler(NLWebHandler):
                 response_structure,
                 level="low",
                 query_params=self.query_params,
-                max_length=1536  # Increased for multiple questions
+                max_length=1536,  # Increased for multiple questions
+                priority="background"
             )
 
             questions = response.get('questions', [])
@@ -218,7 +218,7 @@ class GenerateAnswer(NLWebHandler):
                 cache = get_results_cache()
                 # Use same fallback key as baseHandler: query+site if conversation_id is empty
                 cache_key = self.conversation_id if self.conversation_id else f"{self.query}_{self.site}"
-                cached_results = cache.retrieve(cache_key)
+                cached_results = await cache.retrieve(cache_key)
 
                 if cached_results:
                     print(f"[CACHE] ✓ Reusing {len(cached_results)} cached results for key {cache_key}")
@@ -271,7 +271,7 @@ class GenerateAnswer(NLWebHandler):
                     else:
                         cache_key = f"{self.query}_{self.site}"
 
-                    cached_results = cache.retrieve(cache_key)
+                    cached_results = await cache.retrieve(cache_key)
 
                     if cached_results:
                         print(f"[FREE_CONVERSATION] ✓ Found {len(cached_results)} cached results for free conversation")
@@ -223,7 +223,8 @@ class BaseReasoningAgent:
                         filled_prompt,
                         schema={},
                         level=level,
-                        query_params=getattr(self.handler, 'query_params', {})
+                        query_params=getattr(self.handler, 'query_params', {}),
+                        priority="background"  # Deep research yields to interactive ranking
                     ),
                     timeout=self.timeout
                 )
@@ -381,7 +382,8 @@ class BaseReasoningAgent:
                         level=level,
                         timeout=self.timeout,  # Pass timeout to inner call
                         query_params=getattr(self.handler, 'query_params', {}),
-                        max_length=16384  # Large buffer for research outputs
+                        max_length=16384,  # Large buffer for research outputs
+                        priority="background"  # Deep research yields to interactive ranking
                     ),
                     timeout=self.timeout
                 )
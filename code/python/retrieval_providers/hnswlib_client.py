@@ -9,8 +9,11 @@ This client provides read-only access to pre-built HNSW indices.
 import os
 import json
 import asyncio
+import threading
 from pathlib import Path
-from typing import List, Dict, Union, Optional, Any
+from typing import List, Dict, Union, Optional, Any, Iterable, Tuple
+
+import numpy as np
 
 try:
     import hnswlib
@@ -19,7 +22,8 @@ except ImportError:
 
 from core.config import CONFIG
 from core.embedding import get_embedding
-from core.retriever import RetrievalClientBase
+from core.retriever import DateRange, RetrievalClientBase
+from retrieval_providers.hnswlib_metadata import InMemoryMetadataStore, MetadataStore, labels_in_range
 from misc.logger.logging_config_helper import get_configured_logger
 from misc.logger.logger import LogLevel
 
@@ -29,11 +33,86 @@ logger = get_configured_logger("hnswlib_client")
 _hnswlib_client_cache = {}
 
 
+class KnnQueryBatcher:
+    """
+    Micro-batches concurrent unfiltered knn queries against one index.
+
+    Queries arriving within window_ms (or until max_batch are queued) are sent as
+    one knn_query over all their vectors, which hnswlib answers in parallel on
+    num_threads threads; each caller gets the first k labels of its own row.
+    """
+
+    def __init__(self, index, window_ms: float = 2, max_batch: int = 32, num_threads: int = -1):
+        self.index = index
+        self.window_s = window_ms / 1000.0
+        self.max_batch = max_batch
+        self.num_threads = num_threads
+        self._pending: List[Tuple[List[float], int, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+        self.requests = 0
+        self.batches = 0
+
+    async def query(self, embedding: List[float], k: int) -> List[int]:
+        """Queue a query for the next batch and wait for its labels."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((embedding, k, future))
+        self.requests += 1
+
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window_s, self._flush)
+
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        self.batches += 1
+        loop = batch[0][2].get_loop()
+        executor_future = loop.run_in_executor(None, self._query_sync, batch)
+        executor_future.add_done_callback(lambda done: self._deliver(batch, done))
+
+    def _query_sync(self, batch) -> np.ndarray:
+        k = min(max(request_k for _, request_k, _ in batch), self.index.get_current_count())
+        vectors = np.asarray([embedding for embedding, _, _ in batch], dtype=np.float32)
+        labels, _ = self.index.knn_query(vectors, k=k, num_threads=self.num_threads)
+        return labels
+
+    @staticmethod
+    def _deliver(batch, done: asyncio.Future) -> None:
+        error = done.exception()
+        for row, (_, k, future) in enumerate(batch):
+            if future.done():
+                continue
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(done.result()[row][:k].tolist())
+
+    def get_stats(self) -> Dict[str, float]:
+        """Get batching statistics for monitoring."""
+        return {
+            'requests': self.requests,
+            'batches': self.batches,
+            'avg_batch_size': self.requests / self.batches if self.batches else 0,
+        }
+
+
 class HnswlibClient(RetrievalClientBase):
     """
     Client for HNSW-based vector search operations.
     Provides read-only access to pre-built indices created by build_hnswlib_index.py.
     """
+
+    # date_range is applied as an hnswlib filter callback during graph traversal
+    supports_date_range = True
     
     @classmethod
     def get_instance(cls, endpoint_name: Optional[str] = None):
@@ -84,10 +163,21 @@ class HnswlibClient(RetrievalClientBase):
         # Search parameter from config (can be overridden at query time)
         self.ef_search = getattr(self.endpoint_config, 'ef_search', 50)
         
+        # Filtered search and query batching (config_retrieval.yaml -> hnswlib_params)
+        params = CONFIG.hnswlib_params
+        self.max_ef_search = params.get('max_ef_search', 1600)
+        self.exact_search_threshold = params.get('exact_search_threshold', 2000)
+        self.batch_params = params.get('batching', {})
+        self._ef_lock = threading.Lock()
+        self.ef_escalations = 0
+        self.exact_searches = 0
+        
         # Storage for loaded index and metadata
         self.index = None
-        self.metadata = {}
+        self.metadata = InMemoryMetadataStore({})  # label -> document, decoded lazily from the mapped file
         self.sites = {}
+        self.site_labels = {}  # site -> set of labels, for filter callbacks
+        self.batcher = None
         self.dimension = None
         self._index_loaded = False  # Track if index has been loaded
         
@@ -164,8 +254,9 @@ class HnswlibClient(RetrievalClientBase):
             logger.error(error_msg)
             raise ValueError(error_msg)
         
-        # Find index file (detect dimension from filename)
-        index_files = list(base_path.glob(f"{self.index_name}_*.bin"))
+        # Find index file (detect dimension from filename; {index_name}_metadata.bin is not one)
+        index_files = [f for f in base_path.glob(f"{self.index_name}_*.bin")
+                       if f.stem.rsplit('_', 1)[-1].isdigit()]
         if not index_files:
             error_msg = (f"No index files found matching {self.index_name}_*.bin in {base_path}. "
                         f"Please run 'python -m tools.build_hnswlib_index' to build the index.")
@@ -189,17 +280,22 @@ class HnswlibClient(RetrievalClientBase):
         self.index.load_index(str(index_file))
         self.index.set_ef(self.ef_search)
         
-        # Load metadata
-        metadata_file = base_path / f"{self.index_name}_metadata.json"
-        if not metadata_file.exists():
+        # Load metadata: memory-mapped binary store, or the legacy JSON dict
+        metadata_file = base_path / f"{self.index_name}_metadata.bin"
+        legacy_metadata_file = base_path / f"{self.index_name}_metadata.json"
+        if metadata_file.exists():
+            self.metadata = MetadataStore(metadata_file)
+        elif legacy_metadata_file.exists():
+            logger.warning(f"Loading legacy metadata {legacy_metadata_file} into memory; run "
+                           f"'python -m tools.build_hnswlib_index --convert-metadata {base_path}' to memory-map it")
+            with open(legacy_metadata_file, 'r') as f:
+                # Convert string keys to integers
+                self.metadata = InMemoryMetadataStore({int(k): v for k, v in json.load(f).items()})
+        else:
             error_msg = f"Metadata file not found: {metadata_file}"
             logger.error(error_msg)
             raise ValueError(error_msg)
         
-        with open(metadata_file, 'r') as f:
-            # Convert string keys to integers
-            self.metadata = {int(k): v for k, v in json.load(f).items()}
-        
         # Load site index
         sites_file = base_path / f"{self.index_name}_sites.json"
         if not sites_file.exists():
@@ -210,6 +306,15 @@ class HnswlibClient(RetrievalClientBase):
         with open(sites_file, 'r') as f:
             self.sites = json.load(f)
         
+        self.site_labels = {site: set(labels) for site, labels in self.sites.items()}
+        if self.batch_params.get('enabled', True):
+            self.batcher = KnnQueryBatcher(
+                self.index,
+                window_ms=self.batch_params.get('window_ms', 2),
+                max_batch=self.batch_params.get('max_batch', 32),
+                num_threads=self.batch_params.get('num_threads', -1),
+            )
+        
         logger.info(f"Successfully loaded index with dimension {self.dimension}")
     
     async def delete_documents_by_site(self, site: str, **kwargs) -> int:
@@ -278,41 +383,115 @@ class HnswlibClient(RetrievalClientBase):
         sites_to_search = [site] if isinstance(site, str) else site
         
         # Get all document IDs for the specified sites
-        valid_ids = set()
-        for s in sites_to_search:
-            if s in self.sites:
-                valid_ids.update(self.sites[s])
+        site_sets = [self.site_labels[s] for s in sites_to_search if s in self.site_labels]
+        valid_ids = site_sets[0] if len(site_sets) == 1 else set().union(*site_sets)
+        
+        date_range = kwargs.get('date_range')
+        if date_range:
+            valid_ids = self._labels_in_date_range(date_range, valid_ids)
         
         if not valid_ids:
             logger.info(f"No documents found for sites: {sites_to_search}")
             return []
         
-        # Search with a larger k to ensure we get enough results after filtering
-        k = min(len(valid_ids), num_results * 3)  # Search for more to account for filtering
+        if len(valid_ids) == len(self.metadata):
+            # Every document qualifies (e.g. a single-site index): no filter needed
+            labels = await self._knn_query(embedding, num_results)
+        else:
+            labels = await asyncio.get_event_loop().run_in_executor(
+                None, self._filtered_knn_query_sync, embedding, num_results, valid_ids)
+        
+        results = [self._format_result(label) for label in labels]
+        logger.debug(f"Search returned {len(results)} results for sites {sites_to_search}")
+        return results
+    
+    def _format_result(self, label: int) -> List[str]:
+        meta = self.metadata[label]
+        return [
+            meta["url"],
+            meta["schema_json"],
+            meta["name"],
+            meta["site"]
+        ]
+    
+    def _labels_in_date_range(self, date_range: DateRange, labels: Iterable[int]) -> set:
+        """Restrict labels to documents published within date_range."""
+        return labels_in_range(self.metadata.published_ts, labels, date_range.start_ts, date_range.end_ts)
+    
+    async def _knn_query(self, embedding: List[float], k: int) -> List[int]:
+        """Unfiltered nearest neighbours, batched with concurrent queries when enabled."""
+        k = min(k, len(self.metadata))
+        if self.batcher is not None:
+            return await self.batcher.query(embedding, k)
         
-        # Perform the search
         def search_sync():
             labels, distances = self.index.knn_query([embedding], k=k)
-            return labels[0], distances[0]  # Return first (and only) query results
-        
-        labels, distances = await asyncio.get_event_loop().run_in_executor(None, search_sync)
-        
-        # Filter results by site and format output
-        results = []
-        for label, distance in zip(labels, distances):
-            if label in valid_ids:
-                meta = self.metadata[label]
-                results.append([
-                    meta["url"],
-                    meta["schema_json"],
-                    meta["name"],
-                    meta["site"]
-                ])
-                if len(results) >= num_results:
-                    break
+            return labels[0].tolist()  # Return first (and only) query results
         
-        logger.debug(f"Search returned {len(results)} results for sites {sites_to_search}")
-        return results
+        return await asyncio.get_event_loop().run_in_executor(None, search_sync)
+    
+    def _filtered_knn_query_sync(self, embedding: List[float], num_results: int, allowed: set) -> List[int]:
+        """
+        Nearest neighbours restricted to allowed labels, always num_results of them
+        when that many are allowed.
+        
+        The filter callback is checked while the graph is traversed, so no results are
+        lost to post-filtering. hnswlib raises RuntimeError when the search cannot reach
+        k allowed neighbours; ef is then doubled up to max_ef_search, and small or
+        unreachable label sets are searched exactly.
+        """
+        k = min(num_results, len(allowed))
+        if len(allowed) <= self.exact_search_threshold:
+            return self._exact_knn(embedding, k, allowed)
+        
+        filter_fn = allowed.__contains__
+        try:
+            labels, _ = self.index.knn_query([embedding], k=k, filter=filter_fn)
+            return labels[0].tolist()
+        except RuntimeError:
+            pass
+        
+        # ef is index-wide, so escalated queries take turns; unfiltered queries
+        # running meanwhile only search a little wider than needed
+        with self._ef_lock:
+            self.ef_escalations += 1
+            ef = max(self.ef_search, k) * 2
+            try:
+                while ef <= self.max_ef_search:
+                    self.index.set_ef(ef)
+                    try:
+                        labels, _ = self.index.knn_query([embedding], k=k, filter=filter_fn)
+                        logger.debug(f"Filtered search found {k} results at ef={ef}")
+                        return labels[0].tolist()
+                    except RuntimeError:
+                        ef *= 2
+            finally:
+                self.index.set_ef(self.ef_search)
+        
+        logger.info(f"Filtered search could not reach {k} of {len(allowed)} allowed documents, searching exactly")
+        return self._exact_knn(embedding, k, allowed)
+    
+    def _exact_knn(self, embedding: List[float], k: int, allowed: set, chunk_size: int = 8192) -> List[int]:
+        """Brute-force cosine search over the stored vectors of the allowed labels."""
+        self.exact_searches += 1
+        query = np.asarray(embedding, dtype=np.float32)
+        query /= max(float(np.linalg.norm(query)), 1e-12)
+        labels = np.fromiter(allowed, dtype=np.int64, count=len(allowed))
+        
+        best_labels, best_scores = [], []
+        for start in range(0, len(labels), chunk_size):
+            chunk = labels[start:start + chunk_size]
+            vectors = np.asarray(self.index.get_items(chunk), dtype=np.float32)
+            scores = (vectors @ query) / np.maximum(np.linalg.norm(vectors, axis=1), 1e-12)
+            if len(chunk) > k:
+                top = np.argpartition(-scores, k - 1)[:k]
+                chunk, scores = chunk[top], scores[top]
+            best_labels.append(chunk)
+            best_scores.append(scores)
+        
+        labels = np.concatenate(best_labels)
+        scores = np.concatenate(best_scores)
+        return labels[np.argsort(-scores, kind='stable')[:k]].tolist()
     
     async def search_by_url(self, url: str, **kwargs) -> Optional[List[str]]:
         """
@@ -328,15 +507,9 @@ class HnswlibClient(RetrievalClientBase):
         # Ensure index is loaded
         self._ensure_index_loaded()
         
-        # Linear search through metadata (could be optimized with a URL index)
-        for doc_id, meta in self.metadata.items():
-            if meta["url"] == url:
-                return [
-                    meta["url"],
-                    meta["schema_json"],
-                    meta["name"],
-                    meta["site"]
-                ]
+        label = self.metadata.label_for_url(url)
+        if label is not None:
+            return self._format_result(label)
         
         logger.debug(f"No document found with URL: {url}")
         return None
@@ -370,24 +543,18 @@ class HnswlibClient(RetrievalClientBase):
             logger.error(f"Invalid embedding dimension: expected {self.dimension}, got {len(embedding) if embedding else 0}")
             return []
         
-        # Perform the search
-        def search_sync():
-            labels, distances = self.index.knn_query([embedding], k=num_results)
-            return labels[0], distances[0]  # Return first (and only) query results
-        
-        labels, distances = await asyncio.get_event_loop().run_in_executor(None, search_sync)
+        date_range = kwargs.get('date_range')
+        if date_range:
+            allowed = self._labels_in_date_range(date_range, self.metadata.labels())
+            if not allowed:
+                return []
+            labels = await asyncio.get_event_loop().run_in_executor(
+                None, self._filtered_knn_query_sync, embedding, num_results, allowed)
+        else:
+            labels = await self._knn_query(embedding, num_results)
         
         # Format results
-        results = []
-        for label in labels:
-            if label in self.metadata:
-                meta = self.metadata[label]
-                results.append([
-                    meta["url"],
-                    meta["schema_json"],
-                    meta["name"],
-                    meta["site"]
-                ])
+        results = [self._format_result(label) for label in labels if label in self.metadata]
         
         logger.debug(f"Global search returned {len(results)} results")
         return results
@@ -0,0 +1,215 @@
+"""
+Compact, memory-mapped document metadata for HNSW indices.
+
+{index_name}_metadata.json held the full schema_json of every document and had
+to be json.load-ed into a dict by every worker at startup. The binary
+{index_name}_metadata.bin written by build_hnswlib_index is instead
+memory-mapped read-only, so startup only maps the file, workers share the OS
+page cache, and a document is decompressed only when its label is looked up.
+
+Layout (little endian, all sections 8-byte aligned):
+    header        magic, codec, number of label slots, number of URLs
+    offsets       uint64[slots + 1]  record i is blob[offsets[i]:offsets[i + 1]] (empty = no document)
+    published_ts  float64[slots]     datePublished as UTC epoch seconds, NaN if unknown
+    url_hashes    uint64[urls]       sorted 64-bit hashes of document URLs
+    url_labels    uint64[urls]       label of the URL at the same position
+    blob          per-record compressed JSON [url, name, site, schema_json]
+
+Records are compressed with zstd when the zstandard package is installed, zlib otherwise.
+"""
+
+import hashlib
+import json
+import mmap
+import struct
+import zlib
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Union
+
+import numpy as np
+
+from core.hybrid_rescoring import extract_date_published_ts
+
+# zstandard is optional; zlib is used without it
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+MAGIC = b"NLWMETA1"
+HEADER = struct.Struct("<8sB7xQQ")
+CODEC_ZLIB = 0
+CODEC_ZSTD = 1
+
+RECORD_FIELDS = ("url", "name", "site", "schema_json")
+
+
+def url_hash(url: str) -> int:
+    return int.from_bytes(hashlib.blake2b(url.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def _compressor(codec: int):
+    if codec == CODEC_ZSTD:
+        return zstandard.ZstdCompressor(level=3).compress
+    return lambda data: zlib.compress(data, 6)
+
+
+def _decompressor(codec: int):
+    if codec == CODEC_ZSTD:
+        if not ZSTD_AVAILABLE:
+            raise ImportError("Metadata file is zstd-compressed. Please run: pip install zstandard")
+        return zstandard.ZstdDecompressor().decompress
+    return zlib.decompress
+
+
+def write_metadata_store(path: Union[str, Path], metadata: Dict[int, Dict[str, Any]],
+                         codec: Optional[int] = None) -> None:
+    """
+    Write document metadata in the memory-mappable format.
+
+    Args:
+        path: Output file ({index_name}_metadata.bin)
+        metadata: label -> {"url", "name", "site", "schema_json"}
+        codec: CODEC_ZSTD or CODEC_ZLIB (defaults to zstd when available)
+    """
+    if codec is None:
+        codec = CODEC_ZSTD if ZSTD_AVAILABLE else CODEC_ZLIB
+    compress = _compressor(codec)
+
+    slots = max(metadata) + 1 if metadata else 0
+    offsets = np.zeros(slots + 1, dtype="<u8")
+    published_ts = np.full(slots, np.nan, dtype="<f8")
+    records = []
+    position = 0
+    for label in range(slots):
+        meta = metadata.get(label)
+        if meta is not None:
+            record = compress(json.dumps([meta.get(field, "") for field in RECORD_FIELDS],
+                                         ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+            records.append(record)
+            position += len(record)
+            ts = extract_date_published_ts(meta.get("schema_json"))
+            if ts is not None:
+                published_ts[label] = ts
+        offsets[label + 1] = position
+
+    url_pairs = sorted((url_hash(meta["url"]), label) for label, meta in metadata.items() if meta.get("url"))
+    url_hashes = np.array([h for h, _ in url_pairs], dtype="<u8")
+    url_labels = np.array([label for _, label in url_pairs], dtype="<u8")
+
+    tmp_path = Path(f"{path}.tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, codec, slots, len(url_pairs)))
+        for array in (offsets, published_ts, url_hashes, url_labels):
+            f.write(array.tobytes())
+        for record in records:
+            f.write(record)
+    tmp_path.replace(path)
+
+
+class MetadataStore:
+    """Read-only, memory-mapped view of a file written by write_metadata_store."""
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, codec, slots, num_urls = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            self._mmap.close()
+            raise ValueError(f"{self.path} is not an HNSW metadata file")
+        self._decompress = _decompressor(codec)
+
+        # Zero-copy views into the mapping
+        position = HEADER.size
+        self._offsets = np.frombuffer(self._mmap, dtype="<u8", count=slots + 1, offset=position)
+        position += self._offsets.nbytes
+        self.published_ts = np.frombuffer(self._mmap, dtype="<f8", count=slots, offset=position)
+        position += self.published_ts.nbytes
+        self._url_hashes = np.frombuffer(self._mmap, dtype="<u8", count=num_urls, offset=position)
+        position += self._url_hashes.nbytes
+        self._url_labels = np.frombuffer(self._mmap, dtype="<u8", count=num_urls, offset=position)
+        self._blob_start = position + self._url_labels.nbytes
+
+        self._sizes = np.diff(self._offsets)
+        self._count = int(np.count_nonzero(self._sizes))
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __contains__(self, label) -> bool:
+        return 0 <= label < len(self._sizes) and self._sizes[label] > 0
+
+    def __getitem__(self, label) -> Dict[str, str]:
+        if label not in self:
+            raise KeyError(label)
+        start = self._blob_start + int(self._offsets[label])
+        record = self._decompress(self._mmap[start:start + int(self._sizes[label])])
+        return dict(zip(RECORD_FIELDS, json.loads(record)))
+
+    def labels(self) -> np.ndarray:
+        """Labels that have a document."""
+        return np.flatnonzero(self._sizes)
+
+    def label_for_url(self, url: str) -> Optional[int]:
+        h = np.uint64(url_hash(url))
+        position = int(np.searchsorted(self._url_hashes, h))
+        # Hash collisions are checked against the stored URL
+        while position < len(self._url_hashes) and self._url_hashes[position] == h:
+            label = int(self._url_labels[position])
+            if self[label]["url"] == url:
+                return label
+            position += 1
+        return None
+
+    def close(self) -> None:
+        # Drop the array views before unmapping
+        self._offsets = self.published_ts = self._url_hashes = self._url_labels = self._sizes = None
+        self._mmap.close()
+
+
+class InMemoryMetadataStore:
+    """The same interface over a legacy {index_name}_metadata.json dict."""
+
+    def __init__(self, metadata: Dict[int, Dict[str, Any]]):
+        self._metadata = metadata
+        self._url_index = {meta["url"]: label for label, meta in metadata.items()}
+        slots = max(metadata) + 1 if metadata else 0
+        self.published_ts = np.full(slots, np.nan)
+        for label, meta in metadata.items():
+            ts = extract_date_published_ts(meta.get("schema_json"))
+            if ts is not None:
+                self.published_ts[label] = ts
+
+    def __len__(self) -> int:
+        return len(self._metadata)
+
+    def __contains__(self, label) -> bool:
+        return label in self._metadata
+
+    def __getitem__(self, label) -> Dict[str, Any]:
+        return self._metadata[label]
+
+    def labels(self) -> np.ndarray:
+        return np.fromiter(self._metadata, dtype=np.int64, count=len(self._metadata))
+
+    def label_for_url(self, url: str) -> Optional[int]:
+        return self._url_index.get(url)
+
+    def close(self) -> None:
+        self._metadata.clear()
+
+
+def labels_in_range(published_ts: np.ndarray, labels: Iterable[int],
+                    start_ts: Optional[float], end_ts: Optional[float]) -> set:
+    """Labels whose publication date lies within [start_ts, end_ts]; undated labels never match."""
+    labels = np.fromiter(labels, dtype=np.int64)
+    ts = published_ts[labels]
+    mask = ~np.isnan(ts)
+    if start_ts is not None:
+        mask &= ts >= start_ts
+    if end_ts is not None:
+        mask &= ts <= end_ts
+    return set(labels[mask].tolist())
@@ -38,6 +38,14 @@ class PgVectorClient(RetrievalClientBase):
     - PostgreSQL database with pgvector extension installed
     - A configured table with vector type column for embeddings
     """
+
+    # date_range becomes a WHERE clause on the ISO date prefix of schema_json->>'datePublished'
+    supports_date_range = True
+
+    # ISO date (YYYY-MM-DD) of the document, for schema_json objects or single-element arrays.
+    # An expression index on it makes date-filtered searches cheap:
+    #   CREATE INDEX ON <table> ((LEFT(COALESCE(schema_json->>'datePublished', schema_json->0->>'datePublished'), 10)))
+    DATE_PUBLISHED_SQL = "LEFT(COALESCE(schema_json->>'datePublished', schema_json->0->>'datePublished'), 10)"
     
     def __init__(self, endpoint_name: Optional[str] = None):
         """
@@ -404,7 +412,7 @@ class PgVectorClient(RetrievalClientBase):
             query: Search query string
             site: Site identifier or list of sites
             num_results: Maximum number of results to return
-            **kwargs: Additional parameters (e.g., similarity_metric)
+            **kwargs: Additional parameters (e.g., similarity_metric, date_range)
             
         Returns:
             List of search results, where each result is a list of strings:
@@ -436,19 +444,32 @@ class PgVectorClient(RetrievalClientBase):
             "inner_product": "<#>",    # Negative inner product
             "euclidean": "<->",        # Euclidean distance
         }.get(similarity_metric, "<=>")  # Default to cosine
+
+        date_range = kwargs.get("date_range")
         
         async def _search_docs(conn):
             # Use dict_row to get results as dictionaries
             async with conn.cursor(row_factory=dict_row) as cur:
-                # Build WHERE clause for site filtering if needed
-                where_clause = ""
+                # Build WHERE clause for site and date filtering if needed
+                conditions = []
                 params = [query_embedding]
                 
                 if sites:
                     # Create placeholders for site parameters
                     site_placeholders = ", ".join(["%s"] * len(sites))
-                    where_clause = f"WHERE site IN ({site_placeholders})"
+                    conditions.append(f"site IN ({site_placeholders})")
                     params.extend(sites)
+
+                if date_range:
+                    # ISO dates compare correctly as strings
+                    if date_range.start_ts is not None:
+                        conditions.append(f"{self.DATE_PUBLISHED_SQL} >= %s")
+                        params.append(date_range.start_date())
+                    if date_range.end_ts is not None:
+                        conditions.append(f"{self.DATE_PUBLISHED_SQL} <= %s")
+                        params.append(date_range.end_date())
+
+                where_clause = f"WHERE {' AND '.join(conditions)}" if conditions else ""
                 
                 # Construct and execute query
                 query_sql = f"""
@@ -19,8 +19,13 @@ from qdrant_client.http.exceptions import UnexpectedResponse
 
 from core.config import CONFIG
 from core.embedding import get_embedding
-from core.retriever import RetrievalClientBase
+from core.retriever import DateRange, RetrievalClientBase
 from core.bm25 import BM25Scorer
+from core.bm25_index import BM25Index, get_bm25_index
+from core.hybrid_rescoring import (
+    extract_date_published_ts, get_hybrid_rescorer, is_temporal_query, recency_cutoff_ts
+)
+from core.ngram_tokenizer import unique_terms
 from misc.logger.logging_config_helper import get_configured_logger
 from misc.logger.logger import LogLevel
 
@@ -38,11 +43,35 @@ if 'search' not in dir(AsyncQdrantClient):
 else:
     logger.debug("qdrant-client AsyncQdrantClient.search() is available")
 
+
+def build_point_payload(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Build the Qdrant payload for a document.
+
+    date_published_ts is always derived (from schema_json unless the document
+    already carries it, e.g. MapPayload.to_dict()): the recency filter keeps
+    points without the field, so a payload missing it bypasses the date pushdown.
+    """
+    date_published_ts = doc.get("date_published_ts")
+    if date_published_ts is None:
+        date_published_ts = extract_date_published_ts(doc.get("schema_json"))
+    return {
+        "url": doc.get("url"),
+        "name": doc.get("name"),
+        "site": doc.get("site"),
+        "schema_json": doc.get("schema_json"),
+        # Precomputed so temporal queries never parse schema_json per point
+        "date_published_ts": date_published_ts,
+    }
+
 class QdrantVectorClient(RetrievalClientBase):
     """
     Client for Qdrant vector database operations, providing a unified interface for 
     indexing, storing, and retrieving vector-based search results.
     """
+
+    # date_range is applied as a range filter on the date_published_ts payload index
+    supports_date_range = True
     
     def __init__(self, endpoint_name: Optional[str] = None):
         """
@@ -253,7 +282,8 @@ class QdrantVectorClient(RetrievalClientBase):
 
     async def _ensure_text_indexes(self, collection_name: str):
         """
-        Ensure text indexes exist on name and schema_json fields for hybrid search.
+        Ensure text indexes exist on name and schema_json fields for hybrid search,
+        plus a range index on date_published_ts for recency filtering.
 
         Args:
             collection_name: Name of the collection
@@ -304,6 +334,22 @@ class QdrantVectorClient(RetrievalClientBase):
             else:
                 logger.warning(f"Could not create text index on 'schema_json': {e}")
 
+        try:
+            # Range index on the precomputed publication date for recency filtering
+            logger.info(f"Creating float index on 'date_published_ts' field for collection '{collection_name}'")
+            await client.create_payload_index(
+                collection_name=collection_name,
+                field_name="date_published_ts",
+                field_schema=models.PayloadSchemaType.FLOAT,
+            )
+            logger.info(f"Successfully created float index on 'date_published_ts' field")
+        except Exception as e:
+            # Index might already exist
+            if "already exists" in str(e).lower() or "index" in str(e).lower():
+                logger.debug(f"Index on 'date_published_ts' field already exists or error creating: {e}")
+            else:
+                logger.warning(f"Could not create index on 'date_published_ts': {e}")
+
     async def create_collection(self, collection_name: Optional[str] = None,
                               vector_size: int = 1536) -> bool:
         """
@@ -468,6 +514,13 @@ class QdrantVectorClient(RetrievalClientBase):
         )
         logger.info(f"Deleted {count} points")
 
+        bm25_index = self._get_bm25_index()
+        if bm25_index is not None:
+            try:
+                bm25_index.remove_site(site)
+            except Exception as e:
+                logger.warning(f"Failed to remove site '{site}' from BM25 index: {e}")
+
         return count
 
     async def upload_documents(self, documents: List[Dict[str, Any]], 
@@ -518,12 +571,7 @@ class QdrantVectorClient(RetrievalClientBase):
                 points.append(models.PointStruct(
                     id=point_id,
                     vector=doc["embedding"],
-                    payload={
-                        "url": doc.get("url"),
-                        "name": doc.get("name"),
-                        "site": doc.get("site"),
-                        "schema_json": doc.get("schema_json")
-                    }
+                    payload=build_point_payload(doc)
                 ))
             
             if points:
@@ -554,6 +602,9 @@ class QdrantVectorClient(RetrievalClientBase):
                             raise
                 
                 logger.info(f"Successfully uploaded {total_uploaded} points to collection '{collection_name}'")
+
+                # Keep the BM25 inverted index in sync with the collection
+                self._index_documents_for_bm25([point.payload for point in points])
                 return total_uploaded
             
             return 0
@@ -562,6 +613,131 @@ class QdrantVectorClient(RetrievalClientBase):
             logger.exception(f"Error uploading documents to collection '{collection_name}': {str(e)}")
             raise
     
+    def _get_bm25_index(self) -> Optional[BM25Index]:
+        """
+        Get the persistent BM25 inverted index if enabled in bm25_params.
+
+        Returns:
+            Optional[BM25Index]: Shared index instance, or None if disabled/unavailable
+        """
+        bm25_config = CONFIG.bm25_params
+        if not bm25_config.get('enabled', True) or not bm25_config.get('use_index', True):
+            return None
+        try:
+            return get_bm25_index(bm25_config.get('index_path'))
+        except Exception as e:
+            logger.warning(f"BM25 index unavailable, falling back to per-query corpus stats: {e}")
+            return None
+
+    def _index_documents_for_bm25(self, documents: List[Dict[str, Any]]) -> None:
+        """Add uploaded documents to the BM25 inverted index (best effort)."""
+        bm25_index = self._get_bm25_index()
+        if bm25_index is None:
+            return
+        try:
+            indexed = bm25_index.add_documents(documents)
+            logger.info(f"Indexed {indexed} documents into BM25 index (corpus size: {bm25_index.doc_count})")
+        except Exception as e:
+            logger.warning(f"Failed to update BM25 index: {e}")
+
+    async def rebuild_bm25_index(self, collection_name: Optional[str] = None) -> int:
+        """
+        Backfill the BM25 inverted index from all points in a collection.
+
+        Args:
+            collection_name: Optional collection name (defaults to configured name)
+
+        Returns:
+            int: Number of documents indexed
+        """
+        collection_name = collection_name or self.default_collection_name
+        bm25_index = self._get_bm25_index()
+        if bm25_index is None:
+            logger.warning("BM25 index is disabled in bm25_params; nothing to rebuild")
+            return 0
+
+        client = await self._get_qdrant_client()
+        if not await client.collection_exists(collection_name):
+            logger.warning(f"Collection '{collection_name}' does not exist")
+            return 0
+
+        total = 0
+        offset = None
+        batch_size = 1000
+        while True:
+            points, next_offset = await client.scroll(
+                collection_name=collection_name,
+                limit=batch_size,
+                offset=offset,
+                with_payload=["url", "name", "site", "schema_json"]
+            )
+            if not points:
+                break
+
+            total += bm25_index.add_documents([point.payload for point in points])
+            logger.info(f"BM25 index rebuild: {total} documents indexed")
+
+            offset = next_offset
+            if offset is None:
+                break
+
+        return total
+
+    async def backfill_date_published(self, collection_name: Optional[str] = None) -> int:
+        """
+        Backfill the date_published_ts payload field for points uploaded before it existed.
+
+        Args:
+            collection_name: Optional collection name (defaults to configured name)
+
+        Returns:
+            int: Number of points updated
+        """
+        collection_name = collection_name or self.default_collection_name
+        client = await self._get_qdrant_client()
+        if not await client.collection_exists(collection_name):
+            logger.warning(f"Collection '{collection_name}' does not exist")
+            return 0
+
+        await self._ensure_text_indexes(collection_name)
+
+        total = 0
+        offset = None
+        batch_size = 1000
+        while True:
+            points, next_offset = await client.scroll(
+                collection_name=collection_name,
+                limit=batch_size,
+                offset=offset,
+                with_payload=["schema_json", "date_published_ts"]
+            )
+            if not points:
+                break
+
+            # Group by timestamp so each distinct date is a single set_payload call
+            by_ts: Dict[float, List[Any]] = {}
+            for point in points:
+                if point.payload.get("date_published_ts") is not None:
+                    continue
+                ts = extract_date_published_ts(point.payload.get("schema_json"))
+                if ts is not None:
+                    by_ts.setdefault(ts, []).append(point.id)
+
+            for ts, point_ids in by_ts.items():
+                await client.set_payload(
+                    collection_name=collection_name,
+                    payload={"date_published_ts": ts},
+                    points=point_ids
+                )
+                total += len(point_ids)
+            logger.info(f"date_published_ts backfill: {total} points updated")
+
+            offset = next_offset
+            if offset is None:
+                break
+
+        return total
+
     def _create_site_filter(self, site: Union[str, List[str]]):
         """
         Create a Qdrant filter for site filtering.
@@ -587,70 +763,53 @@ class QdrantVectorClient(RetrievalClientBase):
             must=[models.FieldCondition(key="site", match=models.MatchAny(any=sites))]
         )
     
-    def _detect_query_intent(self, query: str, alpha_default: float, beta_default: float) -> Tuple[float, float]:
+    def _add_date_range_filter(self, filter_condition: Optional[models.Filter],
+                               min_ts: float) -> models.Filter:
         """
-        Detect query intent (exact match vs semantic) and adjust alpha/beta weights.
+        Restrict a filter to points published after min_ts.
+
+        Points without date_published_ts (unknown date, or not yet backfilled)
+        are kept, matching the client-side recency rules.
 
         Args:
-            query: The search query
-            alpha_default: Default alpha (vector weight)
-            beta_default: Default beta (BM25 weight)
+            filter_condition: Existing filter (e.g. site filter) or None
+            min_ts: Exclusive lower bound on date_published_ts (epoch seconds)
 
         Returns:
-            Tuple[float, float]: (alpha, beta) weights based on intent
+            models.Filter: Combined filter
         """
-        import re
-
-        # Exact match intent features
-        has_quotes = '"' in query or '"' in query or '"' in query
-        has_numbers = bool(re.search(r'\d+', query))
-        has_hashtag = '#' in query
-
-        # Detect proper nouns (capitalized English words)
-        proper_nouns = re.findall(r'\b[A-Z][a-z]+\b', query)
-
-        # Semantic intent features
-        question_words = ['如何', '為什麼', '什麼', '怎麼', 'how', 'why', 'what', 'when', 'where']
-        has_question = any(word in query.lower() for word in question_words)
-
-        concept_words = ['趨勢', '策略', '方法', '應用', '發展', '技術', 'trend', 'strategy', 'approach', 'development']
-        has_concept = any(word in query.lower() for word in concept_words)
-
-        # Query length (Chinese characters + English words)
-        chinese_chars = len(re.findall(r'[\u4e00-\u9fff]', query))
-        english_words = len(re.findall(r'\b[a-zA-Z]{2,}\b', query))
-        total_length = chinese_chars + english_words
-
-        # Calculate intent scores
-        exact_score = 0
-        if has_quotes: exact_score += 3
-        if has_numbers: exact_score += 2
-        if has_hashtag: exact_score += 2
-        if len(proper_nouns) >= 2: exact_score += 2
-        if total_length > 15: exact_score += 1  # Long queries tend to be specific
-
-        semantic_score = 0
-        if has_question: semantic_score += 3
-        if has_concept: semantic_score += 2
-        if total_length < 8: semantic_score += 1  # Short queries tend to be exploratory
-
-        # Decide alpha/beta based on intent
-        if exact_score > semantic_score + 2:
-            # Strong exact match intent
-            alpha, beta = 0.4, 0.6
-            intent_type = "EXACT_MATCH"
-        elif semantic_score > exact_score + 2:
-            # Strong semantic intent
-            alpha, beta = 0.7, 0.3
-            intent_type = "SEMANTIC"
-        else:
-            # Balanced or unclear - use default
-            alpha, beta = alpha_default, beta_default
-            intent_type = "BALANCED"
+        date_condition = models.Filter(
+            should=[
+                models.FieldCondition(key="date_published_ts", range=models.Range(gt=min_ts)),
+                models.IsEmptyCondition(is_empty=models.PayloadField(key="date_published_ts")),
+            ]
+        )
+        if filter_condition is None:
+            return models.Filter(must=[date_condition])
+        return models.Filter(must=list(filter_condition.must or []) + [date_condition])
+
+    def _add_published_range_filter(self, filter_condition: Optional[models.Filter],
+                                    date_range: DateRange) -> models.Filter:
+        """
+        Restrict a filter to points published within date_range.
 
-        logger.info(f"Query intent: {intent_type} (exact_score={exact_score}, semantic_score={semantic_score}) → α={alpha}, β={beta}")
+        Unlike the recency cutoff, points without date_published_ts are excluded,
+        so run jobs/backfill_date_published.py on collections uploaded before it existed.
 
-        return alpha, beta
+        Args:
+            filter_condition: Existing filter (e.g. site filter) or None
+            date_range: Inclusive bounds on date_published_ts
+
+        Returns:
+            models.Filter: Combined filter
+        """
+        date_condition = models.FieldCondition(
+            key="date_published_ts",
+            range=models.Range(gte=date_range.start_ts, lte=date_range.end_ts)
+        )
+        if filter_condition is None:
+            return models.Filter(must=[date_condition])
+        return models.Filter(must=list(filter_condition.must or []) + [date_condition])
 
     def _parse_schema_metadata(self, schema_json: str) -> Tuple[str, str, str]:
         """
@@ -761,6 +920,7 @@ class QdrantVectorClient(RetrievalClientBase):
             collection_name: Optional collection name (defaults to configured name)
             query_params: Additional query parameters
             include_vectors: Whether to include document vectors in results (for MMR)
+            date_range: Optional DateRange (kwarg); only points published within it are returned
 
         Returns:
             List[List[str]]: List of search results in format [url, text_json, name, site]
@@ -769,6 +929,8 @@ class QdrantVectorClient(RetrievalClientBase):
         logger.info(f"Starting Qdrant search - collection: {collection_name}, site: {site}, num_results: {num_results}, include_vectors: {include_vectors}")
         logger.debug(f"Query: {query}")
         
+        rescoring_stats = None
+
         try:
             start_embed = time.time()
             embedding = await get_embedding(query, query_params=query_params)
@@ -790,63 +952,27 @@ class QdrantVectorClient(RetrievalClientBase):
                 # Use hybrid search: combine vector similarity with keyword matching
                 logger.info(f"Performing hybrid search (vector + keyword) for query: {query[:50]}...")
 
-                # Extract Chinese keywords for keyword search (2+ character words)
-                import re
-
-                # For Chinese text, extract individual 2-4 character sequences as keywords
-                # This is a simple approach that works reasonably well without requiring
-                # a full Chinese word segmentation library
-                chinese_text = ''.join(re.findall(r'[\u4e00-\u9fff]+', query))
-                chinese_keywords = []
-                if chinese_text:
-                    # Extract 2-character keywords
-                    for i in range(len(chinese_text) - 1):
-                        word = chinese_text[i:i+2]
-                        if word not in chinese_keywords:
-                            chinese_keywords.append(word)
-                    # Extract 3-character keywords
-                    for i in range(len(chinese_text) - 2):
-                        word = chinese_text[i:i+3]
-                        if word not in chinese_keywords:
-                            chinese_keywords.append(word)
-                    # Extract 4-character keywords
-                    for i in range(len(chinese_text) - 3):
-                        word = chinese_text[i:i+4]
-                        if word not in chinese_keywords:
-                            chinese_keywords.append(word)
-
-                english_keywords = [w.lower() for w in re.findall(r'[a-zA-Z]{2,}', query)]
-                all_keywords = chinese_keywords + english_keywords
+                # Extract keywords with the same tokenizer BM25 uses: Chinese 2-4 character
+                # sequences (no word segmentation library needed) plus English words
+                all_keywords = unique_terms(BM25Scorer().tokenize(query))
 
                 logger.debug(f"Extracted {len(all_keywords)} keywords for hybrid search")
 
-                # Identify critical domain keywords that should be required
-                # First, find which domain(s) the query is about
-                domain_indicators = ['零售', '金融', '製造', '醫療', '教育', '政府', '農業', '運輸',
-                                    '物流', '通訊', '媒體', '娛樂', '旅遊', '餐飲', '房地產', '能源']
-
-                # Define domain-specific company/entity names that indicate the domain
-                # This helps match articles about retail companies even if "零售" isn't mentioned
-                domain_entities = {
-                    '零售': ['walmart', 'target', 'amazon', 'momo', '7-eleven', '全家', 'familymart',
-                            '統一超商', '家樂福', 'carrefour', '好市多', 'costco', 'pchome', '蝦皮', 'shopee',
-                            '零售it', 'retail'],
-                    '金融': ['fintech', '金融科技', '銀行', 'bank', '證券', '保險', '投資', '花旗', '摩根'],
-                    '製造': ['tsmc', '台積電', '鴻海', 'foxconn', '製造業', '工廠', 'factory'],
-                }
-
-                # Find which domains are mentioned in the query
-                query_domains = [domain for domain in domain_indicators if domain in query]
-
-                if query_domains:
-                    logger.info(f"===== HYBRID SEARCH V2 ACTIVE ===== Query domains detected: {query_domains} - will filter results to only include articles containing these domains or related entities")
-
                 # Retrieve more candidates for keyword re-ranking
                 # CRITICAL: Need to retrieve many more results because vector search alone
                 # ranks keyword-matching articles very low (e.g., retail articles at rank 127+)
                 # With keywords, we need a much larger pool for boosting to work effectively
                 retrieval_limit = min(500, num_results * 10) if all_keywords else num_results
 
+                date_range = kwargs.get('date_range')
+                if date_range:
+                    # Explicit time range from TimeRangeExtractor, applied on the payload index
+                    filter_condition = self._add_published_range_filter(filter_condition, date_range)
+                # Temporal queries drop articles older than 3 years during rescoring;
+                # apply the same cutoff server-side so those points never fill the candidate pool
+                elif all_keywords and is_temporal_query(query):
+                    filter_condition = self._add_date_range_filter(filter_condition, recency_cutoff_ts())
+
                 # Perform standard vector search
                 search_result = await client.search(
                     collection_name=collection_name,
@@ -865,224 +991,29 @@ class QdrantVectorClient(RetrievalClientBase):
                     if has_vector:
                         logger.debug(f"Vectors available, length: {len(first_point.vector)}")
 
-                # Apply keyword boosting to results
+                # Apply keyword/BM25, domain and recency rescoring on the worker pool
+                # so CPU-bound scoring of up to 500 candidates does not block the event loop
                 if all_keywords:
-                    scored_results = []
-                    on_topic_results = []  # Results that match critical keywords
-                    off_topic_results = []  # Results that don't match critical keywords
-                    point_scores = {}  # Dictionary to store BM25/keyword scores by URL
-
-                    # Get BM25 configuration
-                    bm25_config = CONFIG.bm25_params
-                    use_bm25 = bm25_config.get('enabled', True)
-                    k1 = bm25_config.get('k1', 1.5)
-                    b = bm25_config.get('b', 0.75)
-
-                    # Detect query intent and adjust alpha/beta accordingly
-                    alpha_default = bm25_config.get('alpha', 0.6)
-                    beta_default = bm25_config.get('beta', 0.4)
-                    alpha, beta = self._detect_query_intent(query, alpha_default, beta_default)
-
-                    # Initialize BM25 scorer if enabled
-                    bm25_scorer = None
-                    avg_doc_length = 0
-                    term_doc_counts = {}
-                    corpus_size = len(search_result)
-
-                    if use_bm25 and corpus_size > 0:
-
-                        bm25_scorer = BM25Scorer(k1=k1, b=b)
-
-                        # Prepare documents for corpus statistics
-                        documents = []
-                        for point in search_result:
-                            payload = point.payload
-                            doc_dict = {
-                                'name': payload.get("name", ""),
-                                'description': payload.get("schema_json", "")
-                            }
-                            documents.append(doc_dict)
-
-                        # Calculate corpus statistics
-                        avg_doc_length, term_doc_counts = bm25_scorer.calculate_corpus_stats(documents)
-                        logger.debug(f"BM25 corpus stats - avg_length: {avg_doc_length}, unique_terms: {len(term_doc_counts)}")
-
-                    for point in search_result:
-                        base_score = point.score
-                        keyword_boost = 0
-                        bm25_score = 0.0
-
-                        # Extract payload
-                        payload = point.payload
-                        doc_url = payload.get("url", "")  # Get URL for score mapping
-                        name = payload.get("name", "").lower()
-                        schema_json = payload.get("schema_json", "").lower()
-
-                        # Check if article contains the query's domain(s) or related entities
-                        # Check both the domain keyword itself (e.g., "零售") AND company names (e.g., "walmart")
-                        has_critical_keyword = False
-                        if query_domains:
-                            # First check for negative indicators - publications that are about OTHER domains
-                            # These mention retail/finance/etc. but are not ABOUT that domain
-                            negative_indicators = {
-                                '零售': ['fintech周報', 'fintech週報', 'fintech雙周報',
-                                        'martech周報', 'martech週報', 'martech雙周報',
-                                        'cloud周報', 'cloud週報', 'cloud雙周報',
-                                        'ai趨勢周報', 'ai趨勢週報', 'ai趨勢雙周報',
-                                        '金融科技', '台積電', 'tsmc', '趨勢科技', '鴻海', 'vmware', '博通'],
-                                '金融': ['零售it', 'retail', 'martech周報', 'martech週報', 'martech雙周報'],
-                                '製造': ['零售it', 'retail', 'fintech周報', 'fintech週報', 'fintech雙周報'],
-                            }
-
-                            is_negative = False
-                            for domain in query_domains:
-                                if domain in negative_indicators:
-                                    for neg_indicator in negative_indicators[domain]:
-                                        if neg_indicator in name.lower():
-                                            is_negative = True
-                                            break
-                                if is_negative:
-                                    break
-
-                            # If article has negative indicators, skip it
-                            if is_negative:
-                                has_critical_keyword = False
-                            else:
-                                # Check for positive indicators
-                                # STRICTER: Require domain keyword in TITLE or known entity in title/body
-                                for domain in query_domains:
-                                    # Check if domain keyword is in TITLE (not just anywhere in content)
-                                    if domain.lower() in name:
-                                        has_critical_keyword = True
-                                        break
-
-                                    # Check domain-specific entity names (can be in title or body)
-                                    if domain in domain_entities:
-                                        for entity in domain_entities[domain]:
-                                            if entity.lower() in name or entity.lower() in schema_json:
-                                                has_critical_keyword = True
-                                                break
-                                    if has_critical_keyword:
-                                        break
-
-                        # Calculate BM25 score or fallback to keyword boost
-                        if use_bm25 and bm25_scorer:
-                            # BM25 scoring - combine title and description
-                            doc_title = payload.get("name", "")
-                            doc_description = payload.get("schema_json", "")
-                            # Weight title 3x by repeating it
-                            doc_text = f"{doc_title} {doc_title} {doc_title} {doc_description}"
-
-                            # Calculate BM25 score
-                            bm25_score = bm25_scorer.calculate_score(
-                                query_tokens=all_keywords,
-                                document_text=doc_text,
-                                avg_doc_length=avg_doc_length,
-                                corpus_size=corpus_size,
-                                term_doc_counts=term_doc_counts
-                            )
-
-                            # Combined score: α * vector_score + β * bm25_score
-                            final_score = alpha * base_score + beta * bm25_score
-                        else:
-                            # OLD LOGIC: Simple keyword boosting (fallback)
-                            for keyword in all_keywords:
-                                keyword_lower = keyword.lower()
-                                # VERY strong boost for keywords in title (3-4 char keywords get higher weight)
-                                if keyword_lower in name:
-                                    # Longer keywords are more specific and should get higher boost
-                                    if len(keyword) >= 3:
-                                        keyword_boost += 3.0  # 300% boost for 3+ char keywords in title
-                                    else:
-                                        keyword_boost += 1.0  # 100% boost for 2-char keywords in title
-                                # Moderate boost for keywords in body
-                                elif keyword_lower in schema_json:
-                                    if len(keyword) >= 3:
-                                        keyword_boost += 0.5  # 50% boost for 3+ char keywords in body
-                                    else:
-                                        keyword_boost += 0.1  # 10% boost for 2-char keywords in body
-
-                            # Combined score: base similarity * (1 + keyword boost)
-                            # Example: 0.27 base * (1 + 6.0 boost for 零售+零售業 in title) = 1.89
-                            # This beats 0.51 base with no keyword match
-                            final_score = base_score * (1 + keyword_boost)
-
-                        # Apply recency boost for temporal queries at retrieval level
-                        # This is CRITICAL because we only pass top N results to the LLM ranker
-                        temporal_keywords = ['最新', '最近', '近期', 'latest', 'recent', '新', '現在', '目前', '當前']
-                        is_temporal_query = any(keyword in query for keyword in temporal_keywords)
-
-                        if is_temporal_query:
-                            try:
-                                # Parse publication date from schema_json
-                                import json
-                                from datetime import datetime, timezone
-                                schema_dict = json.loads(payload.get("schema_json", "{}"))
-                                date_published = schema_dict.get('datePublished', '')
-
-                                if date_published:
-                                    date_str = date_published.split('T')[0] if 'T' in date_published else date_published
-                                    pub_date = datetime.strptime(date_str, '%Y-%m-%d').replace(tzinfo=timezone.utc)
-                                    now = datetime.now(timezone.utc)
-                                    days_old = (now - pub_date).days
-
-                                    # HARD CUTOFF: For temporal queries, exclude articles older than 3 years
-                                    # This prevents old articles from appearing even with high keyword scores
-                                    if days_old > 1095:  # 3 years
-                                        final_score = 0.0  # Completely exclude
-                                        continue  # Skip adding to results
-
-                                    # STRONG recency multipliers for temporal queries
-                                    # Last 6 months: 2.5x boost (very recent)
-                                    # 6-12 months: 1.8x boost (recent)
-                                    # 1-2 years: 1.0x (neutral)
-                                    # 2-3 years: 0.5x (old - strong penalty)
-                                    if days_old <= 180:
-                                        recency_multiplier = 2.5
-                                    elif days_old <= 365:
-                                        recency_multiplier = 1.8
-                                    elif days_old <= 730:
-                                        recency_multiplier = 1.0
-                                    else:  # 730-1095 days (2-3 years)
-                                        recency_multiplier = 0.5
-
-                                    final_score = final_score * recency_multiplier
-                            except Exception as e:
-                                # If we can't parse date, don't apply recency boost
-                                logger.warning(f"Failed to parse date for recency boost at {doc_url}: {e}")
-                                pass
-
-                        # Store BM25 and keyword boost scores in dictionary for later logging
-                        if doc_url:
-                            point_scores[doc_url] = {
-                                'bm25_score': bm25_score,
-                                'keyword_boost': keyword_boost
-                            }
-
-                        # Separate on-topic vs off-topic results
-                        if query_domains and has_critical_keyword:
-                            on_topic_results.append((final_score, point))
-                        elif query_domains and not has_critical_keyword:
-                            off_topic_results.append((final_score, point))
-                        else:
-                            # No domain filtering in query, all results are valid
-                            scored_results.append((final_score, point))
-
-                    # Combine results: ONLY return on-topic results for domain-specific queries
-                    if query_domains:
-                        on_topic_results.sort(key=lambda x: x[0], reverse=True)
-                        off_topic_results.sort(key=lambda x: x[0], reverse=True)
+                    rescoring = await get_hybrid_rescorer().rescore(
+                        query,
+                        all_keywords,
+                        [(point.score, point.payload) for point in search_result],
+                        CONFIG.bm25_params
+                    )
+                    rescoring_stats = rescoring.stats
+                    point_scores = rescoring.point_scores  # Dictionary of BM25/keyword scores by URL
+                    alpha, beta, use_bm25 = rescoring.alpha, rescoring.beta, rescoring.use_bm25
+                    scored_results = [(final_score, search_result[idx]) for final_score, idx in rescoring.ranking]
 
-                        # ONLY use on-topic results - no backfill
-                        # User has hundreds of retail articles, so we should have enough
-                        scored_results = on_topic_results
-                        logger.info(f"Hybrid search: {len(on_topic_results)} on-topic results (strict domain filtering, no backfill)")
+                    logger.info(f"Hybrid rescoring: α={alpha}, β={beta}, bm25={use_bm25}")
+                    if rescoring_stats.get('budget_exhausted'):
+                        logger.warning(f"Hybrid rescoring CPU budget exhausted: {rescoring_stats['fully_scored']}/{rescoring_stats['candidates']} candidates fully scored")
 
-                        if len(off_topic_results) > 0:
-                            logger.debug(f"Filtered out {len(off_topic_results)} off-topic results")
-                    else:
-                        # No domain filtering in query, sort all results
-                        scored_results.sort(key=lambda x: x[0], reverse=True)
+                    if rescoring.query_domains:
+                        logger.info(f"===== HYBRID SEARCH V2 ACTIVE ===== Query domains detected: {rescoring.query_domains} - filtered results to only include articles containing these domains or related entities")
+                        logger.info(f"Hybrid search: {len(scored_results)} on-topic results (strict domain filtering, no backfill)")
+                        if rescoring.off_topic_count > 0:
+                            logger.debug(f"Filtered out {rescoring.off_topic_count} off-topic results")
 
                     # Take top num_results
                     top_results = [point for _, point in scored_results[:num_results]]
@@ -1117,8 +1048,10 @@ class QdrantVectorClient(RetrievalClientBase):
                 )
 
                 # Analytics: Log retrieved documents with scores
+                # With a retrieval_log the caller logs the rows it ends up using (see log_retrieved_items)
                 handler = kwargs.get('handler')
-                if handler and hasattr(handler, 'query_id'):
+                retrieval_log = kwargs.get('retrieval_log')
+                if retrieval_log is not None or (handler and hasattr(handler, 'query_id')):
                     query_logger = get_query_logger()
                     try:
                         # Map scores back to results by URL
@@ -1185,12 +1118,10 @@ class QdrantVectorClient(RetrievalClientBase):
                             else:
                                 continue
 
-                            query_logger.log_retrieved_document(
-                                query_id=handler.query_id,
+                            record = dict(
                                 doc_url=url,
                                 doc_title=name,
                                 doc_description=description,
-                                retrieval_position=position,
                                 vector_similarity_score=float(vector_score),
                                 bm25_score=float(bm25_score),
                                 keyword_boost_score=float(keyword_boost_score),
@@ -1199,23 +1130,38 @@ class QdrantVectorClient(RetrievalClientBase):
                                 doc_author=author,
                                 doc_source='qdrant_hybrid_search'
                             )
+                            if retrieval_log is not None:
+                                retrieval_log.setdefault(url, record)
+                            else:
+                                query_logger.log_retrieved_document(
+                                    query_id=handler.query_id, retrieval_position=position, **record)
 
-                        logger.info(f"Analytics: Logged {len(results)} retrieved documents for query {handler.query_id}")
+                        if retrieval_log is None:
+                            logger.info(f"Analytics: Logged {len(results)} retrieved documents for query {handler.query_id}")
                     except Exception as e:
                         logger.warning(f"Failed to log retrieved documents: {e}")
 
             retrieve_time = time.time() - start_retrieve
 
+            timing_context = {
+                "embedding_time": f"{embed_time:.2f}s",
+                "retrieval_time": f"{retrieve_time:.2f}s",
+                "total_time": f"{embed_time + retrieve_time:.2f}s",
+                "results_count": len(results),
+                "embedding_dim": len(embedding),
+            }
+            if rescoring_stats:
+                timing_context.update({
+                    "rescoring_queue_time": f"{rescoring_stats['queue_time'] * 1000:.1f}ms",
+                    "rescoring_compute_time": f"{rescoring_stats['compute_time'] * 1000:.1f}ms",
+                    "rescoring_cpu_time": f"{rescoring_stats['cpu_time'] * 1000:.1f}ms",
+                    "rescoring_budget_exhausted": rescoring_stats['budget_exhausted'],
+                })
+
             logger.log_with_context(
                 LogLevel.INFO,
                 "Qdrant search completed",
-                {
-                    "embedding_time": f"{embed_time:.2f}s",
-                    "retrieval_time": f"{retrieve_time:.2f}s",
-                    "total_time": f"{embed_time + retrieve_time:.2f}s",
-                    "results_count": len(results),
-                    "embedding_dim": len(embedding),
-                }
+                timing_context
             )
 
             return results
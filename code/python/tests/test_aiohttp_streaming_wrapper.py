@@ -0,0 +1,152 @@
+"""
+Tests for SSE frame coalescing in the aiohttp streaming wrapper.
+"""
+
+import asyncio
+import json
+import sys
+from unittest.mock import Mock
+
+import pytest
+
+import webserver.aiohttp_streaming_wrapper as wrapper_module
+from core.config import CONFIG
+from webserver.aiohttp_streaming_wrapper import AioHttpStreamingWrapper, encode_sse
+
+
+class FakeResponse:
+    def __init__(self):
+        self.writes = []
+        self.prepared = True
+        self._eof_sent = False
+
+    async def write(self, data):
+        self.writes.append(data)
+
+    async def write_eof(self):
+        self._eof_sent = True
+
+
+def make_wrapper(monkeypatch, **sse_params):
+    monkeypatch.setattr(CONFIG, "sse_params", {"coalesce": True, "window_ms": 5, "max_buffer_bytes": 65536,
+                                               **sse_params})
+    request = Mock(method="GET", path="/ask", headers={}, transport=None)
+    response = FakeResponse()
+    return AioHttpStreamingWrapper(request, response, {}), response
+
+
+def frames(response):
+    body = b"".join(response.writes).decode()
+    return [json.loads(chunk[len("data: "):]) for chunk in body.split("\n\n") if chunk]
+
+
+class TestSSECoalescing:
+    """Test batching of SSE frames into fewer writes"""
+
+    def test_frames_in_window_share_one_write(self, monkeypatch):
+        wrapper, response = make_wrapper(monkeypatch)
+
+        async def run():
+            for n in range(5):
+                await wrapper.write_stream({"message_type": "intermediate_message", "n": n})
+            assert response.writes == []
+            await asyncio.sleep(0.05)
+            await wrapper.write_stream({"message_type": "complete"}, end_response=True)
+
+        asyncio.run(run())
+
+        assert len(response.writes) == 2
+        assert [f.get("n") for f in frames(response)] == [0, 1, 2, 3, 4, None]
+        stats = wrapper.get_stream_stats()
+        assert stats["frames"] == 6
+        assert stats["writes"] == 2
+        assert stats["bytes"] == sum(len(w) for w in response.writes)
+
+    def test_buffer_limit_and_finish_flush(self, monkeypatch):
+        wrapper, response = make_wrapper(monkeypatch, window_ms=10000, max_buffer_bytes=100)
+
+        async def run():
+            for n in range(6):
+                await wrapper.write_stream({"message_type": "result", "content": "x" * 20, "n": n})
+            await wrapper.finish_response()
+
+        asyncio.run(run())
+
+        assert [f["n"] for f in frames(response)] == list(range(6))
+        assert 1 < len(response.writes) < 6
+        assert response._eof_sent
+
+    def test_disabled_writes_every_frame(self, monkeypatch):
+        wrapper, response = make_wrapper(monkeypatch, coalesce=False)
+
+        async def run():
+            for n in range(3):
+                await wrapper.write_stream({"n": n})
+
+        asyncio.run(run())
+        assert len(response.writes) == 3
+
+
+class TestEncodeSSE:
+    """Test the SSE frame encoder"""
+
+    def test_matches_json(self):
+        message = {"message_type": "result", "content": [{"title": "台積電", "score": 0.5}]}
+        frame = encode_sse(message)
+        assert frame.startswith(b"data: ") and frame.endswith(b"\n\n")
+        assert json.loads(frame[len(b"data: "):]) == message
+
+    @pytest.mark.parametrize("orjson_available", [True, False])
+    def test_falls_back_to_json(self, monkeypatch, orjson_available):
+        monkeypatch.setattr(wrapper_module, "ORJSON_AVAILABLE", orjson_available and wrapper_module.ORJSON_AVAILABLE)
+        # Integer keys are rejected by orjson but accepted by json
+        assert json.loads(encode_sse({1: "a"})[len(b"data: "):]) == {"1": "a"}
+
+
+class TestDeepResearchRoute:
+    """Test that the deep research stream delivers its last frames before closing"""
+
+    def run_route(self, monkeypatch, run_query):
+        from aiohttp import web
+        from aiohttp.test_utils import TestClient, TestServer
+        from webserver.routes.api import setup_api_routes
+
+        class FakeDeepResearchHandler:
+            def __init__(self, query_params, wrapper):
+                self.conversation_id = "conv-1"
+                self.wrapper = wrapper
+
+            async def runQuery(self):
+                return await run_query(self.wrapper)
+
+        monkeypatch.setattr(CONFIG, "sse_params", {"coalesce": True, "window_ms": 50, "max_buffer_bytes": 65536})
+        fake_module = type(sys)("methods.deep_research")
+        fake_module.DeepResearchHandler = FakeDeepResearchHandler
+        monkeypatch.setitem(sys.modules, "methods.deep_research", fake_module)
+
+        async def fetch():
+            app = web.Application()
+            setup_api_routes(app)
+            async with TestClient(TestServer(app)) as client:
+                response = await client.get("/api/deep_research", params={"query": "台積電"})
+                return await response.read()
+
+        body = asyncio.run(fetch()).decode()
+        return [json.loads(chunk[len("data: "):]) for chunk in body.split("\n\n") if chunk.startswith("data: ")]
+
+    def test_final_result_and_complete_are_flushed(self, monkeypatch):
+        async def run_query(wrapper):
+            await wrapper.write_stream({"message_type": "intermediate_result", "stage": "analyst_complete"})
+            return {"answer": "report", "items": []}
+
+        types = [f["message_type"] for f in self.run_route(monkeypatch, run_query)]
+
+        assert types == ["begin-nlweb-response", "intermediate_result", "final_result", "complete"]
+
+    def test_error_frame_is_flushed(self, monkeypatch):
+        async def run_query(wrapper):
+            raise RuntimeError("orchestrator failed")
+
+        frames = self.run_route(monkeypatch, run_query)
+
+        assert frames[-1] == {"message_type": "error", "error": "orchestrator failed"}
@@ -0,0 +1,87 @@
+"""
+Tests for the pooled AnalyticsDB connection layer.
+"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from core.analytics_db import AnalyticsDB, PoolTimeout
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    monkeypatch.delenv("ANALYTICS_DATABASE_URL", raising=False)
+    instance = AnalyticsDB(str(tmp_path / "query_logs.db"), pool_size=2, pool_timeout=0.2)
+    with instance.connection(write=True) as conn:
+        conn.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT)")
+    yield instance
+    instance.close_pools()
+
+
+class TestConnectionPool:
+    """Test pooled readers, the single SQLite writer and saturation metrics"""
+
+    def test_writes_share_one_connection(self, db):
+        def insert(start):
+            for i in range(start, start + 50):
+                with db.connection(write=True) as conn:
+                    conn.execute("INSERT INTO items (id, name) VALUES (?, ?)", (i, f"item {i}"))
+
+        threads = [threading.Thread(target=insert, args=(n * 50,)) for n in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        stats = db.get_pool_stats()
+        assert stats["writer"]["size"] == 1
+        assert stats["writer"]["acquisitions"] == 201
+        assert asyncio.run(db.fetch_one("SELECT COUNT(*) AS n FROM items")) == {"n": 200}
+
+    def test_readers_are_read_only(self, db):
+        with pytest.raises(Exception, match="readonly"):
+            with db.connection() as conn:
+                conn.execute("INSERT INTO items (id, name) VALUES (1, 'x')")
+
+    def test_error_rolls_back(self, db):
+        with pytest.raises(ValueError):
+            with db.connection(write=True) as conn:
+                conn.execute("INSERT INTO items (id, name) VALUES (1, 'x')")
+                raise ValueError("boom")
+        assert asyncio.run(db.fetch_all("SELECT * FROM items")) == []
+
+    def test_saturated_pool_times_out(self, db):
+        held = [db.acquire(), db.acquire()]
+        started = time.monotonic()
+        with pytest.raises(PoolTimeout):
+            db.acquire()
+        assert time.monotonic() - started >= 0.2
+
+        db.release(held.pop())
+        conn = db.acquire()
+        for conn in held + [conn]:
+            db.release(conn)
+
+        stats = db.get_pool_stats()["readers"]
+        assert stats["timeouts"] == 1
+        assert stats["in_use"] == 0
+        assert stats["peak_in_use"] == 2
+
+    def test_async_helpers_run_concurrently(self, db):
+        with db.connection(write=True) as conn:
+            conn.executemany("INSERT INTO items (id, name) VALUES (?, ?)", [(i, f"item {i}") for i in range(5)])
+
+        async def run():
+            return await asyncio.gather(
+                db.fetch_all("SELECT name FROM items WHERE id < ? ORDER BY id", (2,)),
+                db.fetch_one("SELECT name FROM items WHERE id = ?", (4,)),
+                db.fetch_one("SELECT name FROM items WHERE id = ?", (99,)),
+            )
+
+        rows, row, missing = asyncio.run(run())
+        assert rows == [{"name": "item 0"}, {"name": "item 1"}]
+        assert row == {"name": "item 4"}
+        assert missing is None
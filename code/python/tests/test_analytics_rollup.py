@@ -0,0 +1,171 @@
+"""
+Tests for the analytics dashboard rollups.
+"""
+
+import asyncio
+import sqlite3
+import time
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestClient, TestServer
+
+from core.analytics_db import AnalyticsDB
+from core.analytics_rollup import AnalyticsRollups, DAY_SECONDS
+from core.query_logger import QueryLogger
+from webserver.analytics_handler import AnalyticsHandler
+
+NOW = time.time()
+
+
+def insert_query(conn, query_id, timestamp, latency=None, cost=None, error=0, docs=(), clicks=()):
+    conn.execute(
+        "INSERT INTO queries (query_id, timestamp, user_id, query_text, site, mode, "
+        "latency_total_ms, cost_usd, error_occurred) VALUES (?, ?, 'u', '颱風', 'all', 'list', ?, ?, ?)",
+        (query_id, timestamp, latency, cost, error))
+    for position, url in enumerate(docs):
+        conn.execute(
+            "INSERT INTO retrieved_documents (query_id, doc_url, doc_title, retrieval_position) "
+            "VALUES (?, ?, ?, ?)", (query_id, url, f"title {url}", position))
+    for url, position, dwell in clicks:
+        conn.execute(
+            "INSERT INTO user_interactions (query_id, doc_url, interaction_type, interaction_timestamp, "
+            "result_position, dwell_time_ms, clicked) VALUES (?, ?, 'click', ?, ?, ?, 1)",
+            (query_id, url, timestamp + 5, position, dwell))
+
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    monkeypatch.delenv("ANALYTICS_DATABASE_URL", raising=False)
+    path = str(tmp_path / "query_logs.db")
+    QueryLogger(db_path=path, rollup_interval=0).shutdown()
+
+    conn = sqlite3.connect(path)
+    insert_query(conn, "old", NOW - 20 * DAY_SECONDS, latency=500, cost=0.5, docs=["a"])
+    insert_query(conn, "q1", NOW - 3600, latency=100, cost=0.01, docs=["a", "b"],
+                 clicks=[("a", 0, 1000), ("b", 1, None)])
+    insert_query(conn, "q2", NOW - 60, latency=300, error=1, docs=["a"], clicks=[("a", 2, 3000)])
+    insert_query(conn, "q3", NOW - 30, docs=["c"])
+    conn.commit()
+    conn.close()
+    return path
+
+
+def open_rollups(db_path):
+    db = AnalyticsDB(db_path)
+    conn = db.connect()
+    rollups = AnalyticsRollups(db)
+    rollups.ensure_tables(conn)
+    return rollups, conn
+
+
+class TestRollups:
+    """Test rollup maintenance and reads"""
+
+    def test_stats_match_raw_tables(self, db_path):
+        rollups, conn = open_rollups(db_path)
+        try:
+            rollups.refresh(conn)
+            stats = rollups.read_stats(conn, NOW - 7 * DAY_SECONDS)
+        finally:
+            conn.close()
+
+        assert stats["total_queries"] == 3
+        assert stats["avg_latency_ms"] == pytest.approx(200)
+        assert stats["total_cost_usd"] == pytest.approx(0.01)
+        assert stats["error_count"] == 1
+        assert stats["queries_with_clicks"] == 2
+        assert stats["training_samples"] == 4
+
+    def test_top_clicks(self, db_path):
+        rollups, conn = open_rollups(db_path)
+        try:
+            rollups.refresh(conn)
+            clicks = rollups.read_top_clicks(conn, NOW - 7 * DAY_SECONDS, 10)
+        finally:
+            conn.close()
+
+        assert clicks[0] == {"doc_url": "a", "doc_title": "title a", "click_count": 2,
+                             "avg_position": 1.0, "avg_dwell_time": 2000.0}
+        assert clicks[1]["doc_url"] == "b"
+        assert clicks[1]["avg_dwell_time"] is None
+
+    def test_incremental_refresh_only_recomputes_window(self, db_path):
+        rollups, conn = open_rollups(db_path)
+        try:
+            rollups.refresh(conn, full=True)
+            # Raw rows outside the lookback window are no longer scanned
+            conn.execute("DELETE FROM queries WHERE query_id = 'old'")
+            insert_query(conn, "q4", time.time(), latency=100)
+            conn.commit()
+            rollups.refresh(conn)
+
+            assert rollups.read_stats(conn, NOW - 30 * DAY_SECONDS)["total_queries"] == 5
+            rollups.refresh(conn, full=True)
+            assert rollups.read_stats(conn, NOW - 30 * DAY_SECONDS)["total_queries"] == 4
+        finally:
+            conn.close()
+
+    def test_pooled_refresh_aggregates_off_the_writer(self, db_path):
+        rollups, conn = open_rollups(db_path)
+        conn.close()
+        db = rollups.db
+        compute = rollups.compute
+
+        def compute_checking_writer(*args):
+            # The writer must be free while the raw tables are scanned
+            writer = db.acquire(write=True, timeout=0.1)
+            db.release(writer, write=True)
+            return compute(*args)
+
+        rollups.compute = compute_checking_writer
+        assert rollups.refresh_pooled() is not None
+        with db.connection() as conn:
+            stats = rollups.read_stats(conn, NOW - 30 * DAY_SECONDS)
+
+        # An empty rollup only gets the lookback window; the 20-day-old query
+        # is left to the full rebuild job
+        assert stats["total_queries"] == 3
+        assert not rollups.refresh_if_stale(300)
+
+
+class TestDashboardEndpoints:
+    """Test the aiohttp endpoints reading the rollups"""
+
+    def test_stats_and_top_clicks(self, db_path):
+        async def run():
+            handler = AnalyticsHandler(db_path=db_path)
+            app = web.Application()
+            app.router.add_get('/stats', handler.get_stats)
+            app.router.add_get('/top_clicks', handler.get_top_clicks)
+            app.router.add_get('/queries', handler.get_queries)
+            async with TestClient(TestServer(app)) as client:
+                stats = await (await client.get('/stats', params={"days": 7})).json()
+                clicks = await (await client.get('/top_clicks')).json()
+                queries = await (await client.get('/queries', params={"limit": 2})).json()
+            return stats, clicks, queries
+
+        stats, clicks, queries = asyncio.run(run())
+
+        assert stats["total_queries"] == 3
+        assert stats["click_through_rate"] == pytest.approx(2 / 3)
+        assert [c["doc_url"] for c in clicks] == ["a", "b"]
+        assert [q["query_id"] for q in queries] == ["q3", "q2"]
+        assert queries[1]["clicks"] == 1
+
+    def test_query_logger_worker_maintains_rollups(self, tmp_path, monkeypatch):
+        monkeypatch.delenv("ANALYTICS_DATABASE_URL", raising=False)
+        query_logger = QueryLogger(db_path=str(tmp_path / "logs.db"), flush_interval=0.02, rollup_interval=0.05)
+        try:
+            query_logger.log_query_start("q1", "u1", "台積電", "all", "list")
+            query_logger.log_query_complete("q1", latency_total_ms=250)
+
+            deadline = time.time() + 3
+            while query_logger.get_query_stats().get("total_queries") != 1 and time.time() < deadline:
+                time.sleep(0.05)
+            stats = query_logger.get_query_stats()
+        finally:
+            query_logger.shutdown()
+
+        assert stats["total_queries"] == 1
+        assert stats["avg_latency_ms"] == pytest.approx(250)
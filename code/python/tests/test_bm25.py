@@ -0,0 +1,92 @@
+"""
+Tests for BM25 scoring.
+"""
+
+import pytest
+
+from core.bm25 import BM25Scorer
+from core.ngram_tokenizer import NgramTokenizer
+
+
+DOCUMENTS = [
+    "台積電 台積電 台積電 台積電公布第三季財報 AI 晶片需求強勁",
+    "零售趨勢 零售趨勢 零售趨勢 零售業數位轉型 walmart retail",
+    "AI發展 AI發展 AI發展 生成式AI應用 台積電 供應鏈",
+    "",
+]
+
+
+class TestBM25Batch:
+    """Test vectorized batch scoring against the scalar path"""
+
+    def test_batch_matches_scalar_with_candidate_stats(self):
+        """Default corpus stats come from the candidate set"""
+        scorer = BM25Scorer()
+        query_tokens = scorer.tokenize("台積電 AI 晶片")
+        avg_doc_length, term_doc_counts = scorer.calculate_corpus_stats(
+            [{"name": "", "description": doc} for doc in DOCUMENTS]
+        )
+
+        batch = scorer.calculate_scores_batch(query_tokens, DOCUMENTS)
+
+        for doc, score in zip(DOCUMENTS, batch):
+            expected = scorer.calculate_score(
+                query_tokens, doc, avg_doc_length, len(DOCUMENTS), term_doc_counts
+            )
+            assert score == pytest.approx(expected)
+        assert batch[3] == 0.0
+
+    def test_batch_matches_scalar_with_external_stats(self):
+        """Explicit corpus stats (e.g. from the persistent index) are honoured"""
+        scorer = BM25Scorer(k1=1.2, b=0.5)
+        query_tokens = scorer.tokenize("零售 walmart")
+        term_doc_counts = {"零售": 40, "walmart": 5}
+
+        batch = scorer.calculate_scores_batch(
+            query_tokens, DOCUMENTS, avg_doc_length=20.0, corpus_size=1000,
+            term_doc_counts=term_doc_counts
+        )
+
+        for doc, score in zip(DOCUMENTS, batch):
+            expected = scorer.calculate_score(query_tokens, doc, 20.0, 1000, term_doc_counts)
+            assert score == pytest.approx(expected)
+
+    def test_empty_inputs(self):
+        scorer = BM25Scorer()
+        assert scorer.calculate_scores_batch([], DOCUMENTS).tolist() == [0.0] * len(DOCUMENTS)
+        assert len(scorer.calculate_scores_batch(["ai"], [])) == 0
+
+
+class TestNgramTokenizer:
+    """Test integer n-gram encoding and the per-document cache"""
+
+    def test_encode_matches_string_tokens(self):
+        """Encoded IDs correspond one-to-one with BM25Scorer.tokenize output"""
+        tokenizer = NgramTokenizer()
+        text = "台積電公布財報 NVIDIA AI 晶片"
+        tokens = BM25Scorer(tokenizer=tokenizer).tokenize(text)
+
+        assert tokenizer.encode(text).tolist() == [tokenizer.term_id(t) for t in tokens]
+        assert [tokenizer.decode(tokenizer.term_id(t)) for t in tokens[:3]] == tokens[:3]
+
+    def test_term_id_rejects_non_tokens(self):
+        tokenizer = NgramTokenizer()
+        assert tokenizer.term_id("台") is None
+        assert tokenizer.term_id("台積電公布") is None
+        assert tokenizer.term_id("a") is None
+
+    def test_term_counts_cached(self):
+        """Repeated documents are served from the cache"""
+        tokenizer = NgramTokenizer()
+        first = tokenizer.term_counts("零售業數位轉型", key="https://a")
+        second = tokenizer.term_counts("零售業數位轉型", key="https://a")
+
+        assert first is second
+        assert tokenizer.get_stats()["hits"] == 1
+        assert first[2] == 6 + 5 + 4
+
+    def test_cache_bounded_by_bytes(self):
+        tokenizer = NgramTokenizer(max_cache_bytes=200)
+        for i in range(10):
+            tokenizer.term_counts(f"零售業數位轉型{i}", key=str(i))
+        assert tokenizer.get_stats()["cache_bytes"] <= 200
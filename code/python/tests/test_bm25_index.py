@@ -0,0 +1,115 @@
+"""
+Tests for the persistent BM25 inverted index.
+"""
+
+import sqlite3
+
+import pytest
+
+from core.bm25 import BM25Scorer
+from core.bm25_index import SCHEMA_VERSION, BM25Index, build_document_text
+
+
+DOCS = [
+    {"url": "https://a", "name": "台積電 財報", "schema_json": "台積電 公布 第三季 財報", "site": "news"},
+    {"url": "https://b", "name": "零售 趨勢", "schema_json": "零售業 數位轉型 walmart", "site": "news"},
+    {"url": "https://c", "name": "AI 發展", "schema_json": "生成式 AI 應用 台積電", "site": "tech"},
+]
+
+
+@pytest.fixture
+def index(tmp_path):
+    idx = BM25Index(str(tmp_path / "bm25.db"))
+    idx.add_documents(DOCS)
+    yield idx
+    idx.close()
+
+
+class TestBM25Index:
+    """Test BM25Index incremental updates and scoring"""
+
+    def test_corpus_stats(self, index):
+        """Doc count and avgdl reflect all indexed documents"""
+        scorer = BM25Scorer()
+        lengths = [len(scorer.tokenize(build_document_text(d["name"], d["schema_json"]))) for d in DOCS]
+
+        assert index.doc_count == 3
+        assert index.avg_doc_length == pytest.approx(sum(lengths) / 3)
+        assert index.get_term_doc_counts(["台積", "零售"]) == {"台積": 2, "零售": 1}
+
+    def test_score_matches_scalar_scorer(self, index):
+        """Index scores equal BM25Scorer.calculate_score with corpus-wide stats"""
+        scorer = BM25Scorer()
+        query_tokens = scorer.tokenize("台積電財報")
+        scores = index.score(query_tokens, ["https://a", "https://b", "https://c"])
+
+        _, term_doc_counts = scorer.calculate_corpus_stats(
+            [{"name": d["name"], "description": d["schema_json"]} for d in DOCS]
+        )
+        for doc in DOCS:
+            expected = scorer.calculate_score(
+                query_tokens=query_tokens,
+                document_text=build_document_text(doc["name"], doc["schema_json"]),
+                avg_doc_length=index.avg_doc_length,
+                corpus_size=3,
+                term_doc_counts=term_doc_counts,
+            )
+            assert scores[doc["url"]] == pytest.approx(expected)
+        assert scores["https://a"] > scores["https://c"] > scores["https://b"] == 0.0
+
+    def test_unindexed_urls_omitted(self, index):
+        """Candidates missing from the index are left for the caller to score"""
+        scores = index.score(["台積"], ["https://a", "https://missing"])
+        assert set(scores) == {"https://a"}
+
+    def test_readd_replaces_postings(self, index):
+        """Re-adding a URL replaces its postings without double counting"""
+        index.add_documents([{"url": "https://a", "name": "天氣", "schema_json": "颱風 來襲", "site": "news"}])
+
+        assert index.doc_count == 3
+        assert index.get_term_doc_counts(["台積"]) == {"台積": 1}
+        assert index.score(["台積"], ["https://a"]) == {"https://a": 0.0}
+
+    def test_remove_site(self, index):
+        """Removing a site drops its documents and df contributions"""
+        assert index.remove_site("news") == 2
+        assert index.doc_count == 1
+        assert index.get_term_doc_counts(["零售", "台積"]) == {"台積": 1}
+
+    def test_reopen_keeps_current_schema(self, index):
+        """An index written with the current schema survives reopening"""
+        reopened = BM25Index(str(index.index_path))
+        try:
+            assert reopened.doc_count == 3
+        finally:
+            reopened.close()
+
+    def test_old_schema_is_recreated(self, tmp_path):
+        """An index with TEXT term keys (no schema_version) is rebuilt empty instead of never matching"""
+        path = tmp_path / "old.db"
+        conn = sqlite3.connect(str(path))
+        conn.execute("CREATE TABLE docs (url TEXT PRIMARY KEY, site TEXT, length INTEGER NOT NULL)")
+        conn.execute("CREATE TABLE postings (term TEXT NOT NULL, url TEXT NOT NULL, tf INTEGER NOT NULL, "
+                     "PRIMARY KEY (term, url)) WITHOUT ROWID")
+        conn.execute("CREATE TABLE terms (term TEXT PRIMARY KEY, df INTEGER NOT NULL) WITHOUT ROWID")
+        conn.execute("CREATE TABLE stats (key TEXT PRIMARY KEY, value REAL NOT NULL)")
+        conn.execute("INSERT INTO docs VALUES ('https://a', 'news', 10)")
+        conn.execute("INSERT INTO postings VALUES ('台積', 'https://a', 2)")
+        conn.execute("INSERT INTO terms VALUES ('台積', 1)")
+        conn.executemany("INSERT INTO stats VALUES (?, ?)", [("doc_count", 1), ("total_length", 10)])
+        conn.commit()
+        conn.close()
+
+        index = BM25Index(str(path))
+        try:
+            assert index.doc_count == 0
+            index.add_documents(DOCS)
+            assert index.get_term_doc_counts(["台積"]) == {"台積": 2}
+        finally:
+            index.close()
+
+        conn = sqlite3.connect(str(path))
+        try:
+            assert conn.execute("SELECT value FROM stats WHERE key = 'schema_version'").fetchone() == (SCHEMA_VERSION,)
+        finally:
+            conn.close()
@@ -294,11 +294,12 @@ class TestWebSocketManager:
         }
         
         await manager.broadcast_message("conv_broadcast", message, exclude_user_id="user_0")
+        await manager.flush_conversation("conv_broadcast")
         
         # Check that user_1 and user_2 received it, but not user_0
-        connections[0][0].send_json.assert_not_called()
-        connections[1][0].send_json.assert_called_once_with(message)
-        connections[2][0].send_json.assert_called_once_with(message)
+        connections[0][0].send_str.assert_not_called()
+        connections[1][0].send_str.assert_called_once_with(json.dumps(message))
+        connections[2][0].send_str.assert_called_once_with(json.dumps(message))
     
     @pytest.mark.asyncio
     async def test_queue_size_check(self, manager):
@@ -393,6 +394,143 @@ class TestWebSocketManager:
         assert "average_queue_depth" in metrics
 
 
+class TestBroadcastQueue:
+    """Test serialize-once broadcast with per-connection send queues"""
+    
+    def run(self, scenario):
+        async def main():
+            manager = WebSocketManager({"max_participants": 10})
+            try:
+                await scenario(manager)
+            finally:
+                await manager.shutdown()
+        
+        asyncio.run(main())
+    
+    async def connect(self, manager, user_id, send_str=None, send_queue_size=256):
+        ws = AsyncMock()
+        ws.closed = False
+        if send_str:
+            ws.send_str = send_str
+        connection = WebSocketConnection(
+            websocket=ws,
+            participant_id=user_id,
+            conversation_id="conv_stream",
+            config=ConnectionConfig(send_queue_size=send_queue_size)
+        )
+        await manager.add_connection("conv_stream", connection)
+        return ws, connection
+    
+    def test_message_is_encoded_once(self):
+        message = {"message_type": "result", "content": [{"title": "台積電"}]}
+        
+        async def scenario(manager):
+            sockets = [(await self.connect(manager, f"user_{i}"))[0] for i in range(3)]
+            with patch("chat.websocket.encode_message", wraps=json.dumps) as encode:
+                await manager.broadcast_message("conv_stream", message)
+            await manager.flush_conversation("conv_stream")
+            
+            assert encode.call_count == 1
+            for ws in sockets:
+                ws.send_str.assert_called_once_with(json.dumps(message))
+        
+        self.run(scenario)
+    
+    def test_slow_consumer_gets_coalesced_chunks(self):
+        async def scenario(manager):
+            release = asyncio.Event()
+            slow_frames = []
+            
+            async def slow_send(frame):
+                await release.wait()
+                slow_frames.append(json.loads(frame))
+            
+            fast_ws, fast = await self.connect(manager, "fast")
+            _, slow = await self.connect(manager, "slow", send_str=slow_send)
+            
+            # Chunks arrive one per event-loop turn, as they do from the streaming handler
+            await manager.broadcast_message("conv_stream", {"message_type": "result", "n": 0})
+            await asyncio.sleep(0)
+            for n in range(1, 11):
+                await manager.broadcast_message("conv_stream", {"message_type": "intermediate_message", "n": n})
+                await asyncio.sleep(0)
+            await manager.broadcast_message("conv_stream", {"message_type": "complete"})
+            
+            # The fast participant is not held back by the slow one
+            await fast.drain(timeout=1)
+            assert fast_ws.send_str.call_count == 12
+            
+            release.set()
+            await slow.drain(timeout=1)
+            assert slow_frames == [
+                {"message_type": "result", "n": 0},
+                {"message_type": "intermediate_message", "n": 10},
+                {"message_type": "complete"},
+            ]
+            lag = manager.get_metrics()["send_lag"]
+            assert lag["connections"][slow.connection_id]["coalesced"] == 9
+            assert lag["connections"][slow.connection_id]["frames_sent"] == 3
+            assert lag["frames_coalesced"] == 9
+        
+        self.run(scenario)
+    
+    def test_only_same_stage_or_site_chunks_coalesce(self):
+        async def scenario(manager):
+            release = asyncio.Event()
+            frames = []
+            
+            async def slow_send(frame):
+                await release.wait()
+                frames.append(json.loads(frame))
+            
+            _, slow = await self.connect(manager, "slow", send_str=slow_send)
+            
+            await manager.broadcast_message("conv_stream", {"message_type": "result", "n": 0})
+            await asyncio.sleep(0)
+            for message in [
+                {"message_type": "intermediate_result", "stage": "analyst_complete", "citations_count": 3},
+                {"message_type": "intermediate_result", "stage": "critic_reviewing"},
+                {"message_type": "site_querying", "site": "cna.com.tw"},
+                {"message_type": "site_querying", "site": "ltn.com.tw"},
+                {"message_type": "retrieval_count", "site": "cna.com.tw", "count": 10},
+                {"message_type": "retrieval_count", "site": "cna.com.tw", "count": 20},
+            ]:
+                await manager.broadcast_message("conv_stream", message)
+                await asyncio.sleep(0)
+            
+            release.set()
+            await slow.drain(timeout=1)
+            assert [(f["message_type"], f.get("stage") or f.get("site")) for f in frames[1:]] == [
+                ("intermediate_result", "analyst_complete"),
+                ("intermediate_result", "critic_reviewing"),
+                ("site_querying", "cna.com.tw"),
+                ("site_querying", "ltn.com.tw"),
+                ("retrieval_count", "cna.com.tw"),
+            ]
+            assert frames[-1]["count"] == 20
+        
+        self.run(scenario)
+    
+    def test_full_queue_disconnects_slow_consumer(self):
+        async def scenario(manager):
+            async def stuck_send(frame):
+                await asyncio.Event().wait()
+            
+            _, connection = await self.connect(manager, "stuck", send_str=stuck_send, send_queue_size=2)
+            
+            await manager.broadcast_message("conv_stream", {"message_type": "result", "n": 0})
+            await asyncio.sleep(0)
+            for n in range(1, 4):
+                await manager.broadcast_message("conv_stream", {"message_type": "result", "n": n})
+            
+            assert connection.state == ConnectionState.FAILED
+            stats = manager.get_metrics()["send_lag"]["connections"][connection.connection_id]
+            assert stats["overflows"] == 1
+            assert stats["peak_queue_depth"] == 2
+        
+        self.run(scenario)
+
+
 class TestWebSocketAuth:
     """Test WebSocket authentication"""
     
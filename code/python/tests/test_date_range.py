@@ -0,0 +1,69 @@
+"""
+Tests for the date_range filter pushed down into vector search.
+"""
+
+import json
+from datetime import datetime, timezone
+
+from core.baseHandler import NLWebHandler
+from core.retriever import DateRange, filter_results_by_date_range
+
+
+def day_ts(year, month, day):
+    return datetime(year, month, day, tzinfo=timezone.utc).timestamp()
+
+
+def make_item(url, date_published=None):
+    schema = {"headline": url}
+    if date_published:
+        schema["datePublished"] = date_published
+    return [url, json.dumps(schema), url, "news"]
+
+
+class TestDateRange:
+    """Test building and applying date ranges"""
+
+    def test_from_temporal_range(self):
+        date_range = DateRange.from_temporal_range(
+            {"is_temporal": True, "start_date": "2024-03-01", "end_date": "2024-03-07"})
+
+        assert date_range == DateRange(day_ts(2024, 3, 1), day_ts(2024, 3, 7))
+        assert date_range.start_date() == "2024-03-01"
+        assert date_range.end_date() == "2024-03-07"
+
+    def test_non_temporal_or_incomplete_ranges_are_ignored(self):
+        assert DateRange.from_temporal_range(None) is None
+        assert DateRange.from_temporal_range({"is_temporal": False, "start_date": "2024-03-01"}) is None
+        assert DateRange.from_temporal_range({"is_temporal": True, "end_date": "2024-03-07"}) is None
+        assert DateRange.from_temporal_range({"is_temporal": True, "start_date": "last week"}) is None
+
+    def test_open_ended_range(self):
+        date_range = DateRange.from_temporal_range({"is_temporal": True, "start_date": "2024-03-01"})
+
+        assert date_range.end_ts is None
+        assert date_range.contains(day_ts(2030, 1, 1))
+        assert not date_range.contains(day_ts(2024, 2, 29))
+
+    def test_bounds_are_inclusive_and_undated_never_match(self):
+        date_range = DateRange(day_ts(2024, 3, 1), day_ts(2024, 3, 7))
+
+        assert date_range.contains(day_ts(2024, 3, 1))
+        assert date_range.contains(day_ts(2024, 3, 7))
+        assert not date_range.contains(day_ts(2024, 3, 8))
+        assert not date_range.contains(None)
+
+    def test_filter_results_keeps_order(self):
+        items = [
+            make_item("a", "2024-03-05T08:30:00+08:00"),
+            make_item("b", "2023-12-31"),
+            make_item("c"),
+            make_item("d", "2024-03-02"),
+        ]
+        date_range = DateRange(day_ts(2024, 3, 1), day_ts(2024, 3, 7))
+
+        assert [r[0] for r in filter_results_by_date_range(items, date_range)] == ["a", "d"]
+
+
+def test_temporal_retrieval_size():
+    assert NLWebHandler.retrieval_size({"is_temporal": True, "relative_days": 7}) == 80
+    assert NLWebHandler.retrieval_size({"is_temporal": False}) == 50
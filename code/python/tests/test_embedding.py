@@ -0,0 +1,78 @@
+"""
+Tests for embedding request coalescing.
+"""
+
+import asyncio
+
+import pytest
+
+import core.embedding as embedding
+from core.embedding import EmbeddingCoalescer
+
+
+@pytest.fixture
+def batch_calls(monkeypatch):
+    """Replace provider calls with fakes that record each request."""
+    calls = []
+
+    async def fake_batch(texts, provider=None, model=None, timeout=60):
+        calls.append(list(texts))
+        return [[float(len(t))] for t in texts]
+
+    async def fake_single(text, provider, model_id, timeout):
+        calls.append([text])
+        return [float(len(text))]
+
+    monkeypatch.setattr(embedding, "batch_get_embeddings", fake_batch)
+    monkeypatch.setattr(embedding, "_fetch_embedding", fake_single)
+    return calls
+
+
+class TestEmbeddingCoalescer:
+    """Test micro-batching of concurrent embedding requests"""
+
+    def test_concurrent_requests_share_one_batch(self, batch_calls):
+        coalescer = EmbeddingCoalescer(window_ms=20, max_batch=64)
+
+        async def run():
+            return await asyncio.gather(*[
+                coalescer.embed(text, "openai", "m") for text in ["a", "bb", "ccc", "bb"]
+            ])
+
+        results = asyncio.run(run())
+
+        assert results == [[1.0], [2.0], [3.0], [2.0]]
+        assert results[1] is not results[3]
+        assert batch_calls == [["a", "bb", "ccc"]]
+        assert coalescer.get_stats()["requests"] == 4
+
+    def test_max_batch_flushes_early(self, batch_calls):
+        coalescer = EmbeddingCoalescer(window_ms=10000, max_batch=2)
+
+        async def run():
+            return await asyncio.gather(*[coalescer.embed(t, "openai", "m") for t in ["a", "b", "c", "d"]])
+
+        asyncio.run(asyncio.wait_for(run(), timeout=5))
+
+        assert batch_calls == [["a", "b"], ["c", "d"]]
+
+    def test_single_request_uses_single_call(self, batch_calls):
+        coalescer = EmbeddingCoalescer(window_ms=1)
+        assert asyncio.run(coalescer.embed("abc", "openai", "m")) == [3.0]
+        assert batch_calls == [["abc"]]
+
+    def test_batch_error_propagates_to_all_waiters(self, monkeypatch):
+        async def failing_batch(texts, provider=None, model=None, timeout=60):
+            raise RuntimeError("rate limited")
+
+        monkeypatch.setattr(embedding, "batch_get_embeddings", failing_batch)
+        coalescer = EmbeddingCoalescer(window_ms=5)
+
+        async def run():
+            return await asyncio.gather(
+                coalescer.embed("a", "openai", "m"), coalescer.embed("b", "openai", "m"),
+                return_exceptions=True
+            )
+
+        results = asyncio.run(run())
+        assert all(isinstance(r, RuntimeError) for r in results)
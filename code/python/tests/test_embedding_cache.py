@@ -0,0 +1,103 @@
+"""
+Tests for the query embedding cache.
+"""
+
+import asyncio
+import threading
+import time
+
+from core.embedding_cache import EmbeddingCache, make_cache_key
+
+
+VECTOR = [0.1, -0.2, 0.30000000000000004]
+
+
+class TestEmbeddingCache:
+    """Test LRU/TTL behaviour and the SQLite tier"""
+
+    def test_key_includes_provider_and_model(self):
+        """Same text under a different provider/model is a different entry"""
+        cache = EmbeddingCache()
+        cache.put("openai", "text-embedding-3-small", "台積電 最新", VECTOR)
+
+        assert cache.get("openai", "text-embedding-3-small", "台積電 最新") == VECTOR
+        assert cache.get("azure_openai", "text-embedding-3-small", "台積電 最新") is None
+        assert cache.get("openai", "text-embedding-3-large", "台積電 最新") is None
+
+    def test_text_normalization(self):
+        """Whitespace and full-width forms map to the same key; case does not"""
+        assert make_cache_key("p", "m", "  ＡＩ   晶片 ") == make_cache_key("p", "m", "AI 晶片")
+        assert make_cache_key("p", "m", "AI") != make_cache_key("p", "m", "ai")
+
+    def test_returned_vector_is_a_copy(self):
+        cache = EmbeddingCache()
+        cache.put("p", "m", "q", VECTOR)
+        cache.get("p", "m", "q").append(1.0)
+
+        assert cache.get("p", "m", "q") == VECTOR
+
+    def test_lru_eviction_and_counters(self):
+        cache = EmbeddingCache(max_entries=2)
+        for text in ["a", "b", "c"]:
+            cache.put("p", "m", text, VECTOR)
+
+        assert cache.get("p", "m", "a") is None
+        assert cache.get("p", "m", "c") == VECTOR
+        stats = cache.get_stats()
+        assert stats["evictions"] == 1
+        assert stats["memory_hits"] == 1
+        assert stats["misses"] == 1
+
+    def test_ttl_expiry(self):
+        cache = EmbeddingCache(ttl_seconds=0.01)
+        cache.put("p", "m", "q", VECTOR)
+        time.sleep(0.02)
+
+        assert cache.get("p", "m", "q") is None
+        assert cache.get_stats()["expired"] == 1
+
+    def test_sqlite_tier_survives_restart(self, tmp_path):
+        """A new process (fresh memory tier) is served from disk"""
+        path = str(tmp_path / "embeddings.db")
+        first = EmbeddingCache(sqlite_path=path)
+        first.put_many("p", "m", [("q1", VECTOR), ("q2", [1.0, 2.0])])
+        first.close()
+
+        second = EmbeddingCache(sqlite_path=path)
+        try:
+            assert second.contains("p", "m", "q2")
+            assert second.get("p", "m", "q1") == VECTOR
+            assert second.get("p", "m", "q1") == VECTOR
+            stats = second.get_stats()
+            assert stats["disk_hits"] == 1
+            assert stats["memory_hits"] == 1
+        finally:
+            second.close()
+
+    def test_async_sqlite_tier_runs_off_the_event_loop(self, tmp_path):
+        """get_async/put_async only touch SQLite from worker threads"""
+        cache = EmbeddingCache(max_entries=1, sqlite_path=str(tmp_path / "embeddings.db"))
+        threads = []
+        real_conn = cache._conn
+
+        class RecordingConnection:
+            def __getattr__(self, name):
+                threads.append(threading.current_thread())
+                return getattr(real_conn, name)
+
+        cache._conn = RecordingConnection()
+
+        async def run():
+            await cache.put_async("p", "m", "q1", VECTOR)
+            await cache.put_async("p", "m", "q2", VECTOR)
+            # With one LRU slot each lookup evicts the other entry, so both are disk hits
+            return await cache.get_async("p", "m", "q1"), await cache.get_async("p", "m", "q2")
+
+        try:
+            assert asyncio.run(run()) == (VECTOR, VECTOR)
+            assert threads and threading.main_thread() not in threads
+            stats = cache.get_stats()
+            assert (stats["disk_hits"], stats["memory_hits"], stats["misses"]) == (2, 0, 0)
+        finally:
+            cache._conn = real_conn
+            cache.close()
@@ -0,0 +1,159 @@
+"""
+Tests for filtered search, URL lookup and query batching in HnswlibClient.
+"""
+
+import asyncio
+import json
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+hnswlib = pytest.importorskip("hnswlib")
+
+import retrieval_providers.hnswlib_client as hnswlib_module
+from core.retriever import DateRange
+from retrieval_providers.hnswlib_client import HnswlibClient
+from retrieval_providers.hnswlib_metadata import MetadataStore, write_metadata_store
+
+DIM = 16
+NUM_DOCS = 3000
+SMALL_SITE = 40
+
+
+@pytest.fixture
+def vectors():
+    return np.random.default_rng(7).normal(size=(NUM_DOCS, DIM)).astype(np.float32)
+
+
+@pytest.fixture(params=["bin", "json"])
+def client(request, tmp_path, monkeypatch, vectors):
+    """Client over a pre-built index where every 75th document belongs to a small site."""
+    index = hnswlib.Index(space="cosine", dim=DIM)
+    index.init_index(max_elements=NUM_DOCS, ef_construction=100, M=8)
+    index.add_items(vectors, np.arange(NUM_DOCS))
+    index.save_index(str(tmp_path / f"test_{DIM}.bin"))
+
+    metadata, sites = {}, {"big": [], "small": []}
+    for label in range(NUM_DOCS):
+        site = "small" if label % 75 == 0 else "big"
+        metadata[label] = {"url": f"https://{site}/{label}", "name": f"doc {label}", "site": site,
+                           "schema_json": json.dumps({"datePublished": f"2024-01-{label % 28 + 1:02d}"})}
+        sites[site].append(label)
+    if request.param == "bin":
+        write_metadata_store(tmp_path / "test_metadata.bin", metadata)
+    else:
+        # Legacy format of indices built before the memory-mapped store
+        (tmp_path / "test_metadata.json").write_text(json.dumps(metadata))
+    (tmp_path / "test_sites.json").write_text(json.dumps(sites))
+
+    async def fake_get_embedding(query, **kwargs):
+        return vectors[int(query.split("-")[1])].tolist()
+
+    monkeypatch.setattr(hnswlib_module, "get_embedding", fake_get_embedding)
+    monkeypatch.setattr(HnswlibClient, "_get_endpoint_config",
+                        lambda self: SimpleNamespace(database_path=str(tmp_path), index_name="test"))
+    instance = HnswlibClient("test")
+    instance.metadata_format = request.param
+    return instance
+
+
+def exact_top(vectors, query_label, labels, k):
+    normed = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    labels = np.asarray(sorted(labels))
+    scores = normed[labels] @ normed[query_label]
+    return labels[np.argsort(-scores, kind="stable")[:k]].tolist()
+
+
+def labels_of(results):
+    return [int(r[0].rsplit("/", 1)[1]) for r in results]
+
+
+class TestFilteredSearch:
+    """Test that site filters return num_results from the requested site"""
+
+    def test_small_site_is_searched_exactly(self, client, vectors):
+        results = asyncio.run(client.search("doc-5", "small", num_results=10))
+
+        assert len(results) == 10
+        assert all(r[3] == "small" for r in results)
+        assert labels_of(results) == exact_top(vectors, 5, client.site_labels["small"], 10)
+
+    def test_filter_callback_escalates_until_enough_results(self, client):
+        client.exact_search_threshold = 0
+        results = asyncio.run(client.search("doc-5", "small", num_results=SMALL_SITE))
+
+        assert len(results) == SMALL_SITE
+        assert {r[3] for r in results} == {"small"}
+
+    def test_ef_is_raised_then_exact_search_is_the_last_resort(self, client, vectors):
+        client._ensure_index_loaded()
+        real_index = client.index
+        efs = []
+
+        class NarrowIndex:
+            """Index whose filtered searches fail below ef=400."""
+            ef = client.ef_search
+
+            def set_ef(self, ef):
+                efs.append(ef)
+                self.ef = ef
+
+            def knn_query(self, *args, **kwargs):
+                if self.ef < 400:
+                    raise RuntimeError("Cannot return the results in a contiguous 2D array")
+                return real_index.knn_query(*args, **kwargs)
+
+            def __getattr__(self, name):
+                return getattr(real_index, name)
+
+        client.index = NarrowIndex()
+        client.exact_search_threshold = 0
+        assert len(asyncio.run(client.search("doc-5", "small", num_results=10))) == 10
+        assert efs == [100, 200, 400, client.ef_search]
+        assert client.exact_searches == 0
+
+        client.max_ef_search = 150
+        results = asyncio.run(client.search("doc-5", "small", num_results=10))
+        assert labels_of(results) == exact_top(vectors, 5, client.site_labels["small"], 10)
+        assert client.exact_searches == 1
+        assert client.ef_escalations == 2
+
+    def test_whole_index_site_list_skips_filter(self, client):
+        results = asyncio.run(client.search("doc-5", ["big", "small"], num_results=10))
+
+        assert labels_of(results)[0] == 5
+        assert client.exact_searches == 0
+
+
+def test_date_range_filters_in_graph(client):
+    day = 24 * 60 * 60
+    jan_1 = DateRange.from_temporal_range({"is_temporal": True, "start_date": "2024-01-01"}).start_ts
+    date_range = DateRange(jan_1 + 2 * day, jan_1 + 3 * day)
+    results = asyncio.run(client.search_all_sites("doc-5", num_results=20, date_range=date_range))
+
+    assert len(results) == 20
+    assert all(json.loads(r[1])["datePublished"] in ("2024-01-03", "2024-01-04") for r in results)
+
+
+def test_metadata_is_memory_mapped(client):
+    client._ensure_index_loaded()
+    assert isinstance(client.metadata, MetadataStore) == (client.metadata_format == "bin")
+
+
+def test_search_by_url(client):
+    asyncio.run(client.search("doc-1", "big", num_results=1))
+
+    assert asyncio.run(client.search_by_url("https://small/150"))[2] == "doc 150"
+    assert asyncio.run(client.search_by_url("https://small/151")) is None
+
+
+def test_concurrent_global_searches_share_one_knn_query(client):
+    async def run():
+        return await asyncio.gather(*(client.search_all_sites(f"doc-{i}", num_results=5 + i) for i in range(6)))
+
+    all_results = asyncio.run(run())
+
+    assert [labels_of(results)[0] for results in all_results] == list(range(6))
+    assert [len(results) for results in all_results] == [5, 6, 7, 8, 9, 10]
+    assert client.batcher.get_stats() == {"requests": 6, "batches": 1, "avg_batch_size": 6}
@@ -0,0 +1,76 @@
+"""
+Tests for the memory-mapped HNSW metadata store.
+"""
+
+import json
+
+import numpy as np
+import pytest
+
+from retrieval_providers.hnswlib_metadata import (
+    CODEC_ZLIB, InMemoryMetadataStore, MetadataStore, labels_in_range, write_metadata_store
+)
+
+
+def make_metadata():
+    return {
+        0: {"url": "https://news/0", "name": "台積電法說會", "site": "news",
+            "schema_json": json.dumps({"datePublished": "2024-03-05T08:30:00+08:00"}, ensure_ascii=False)},
+        1: {"url": "https://news/1", "name": "颱風動態", "site": "news", "schema_json": "{}"},
+        # Label 2 intentionally missing
+        3: {"url": "https://blog/3", "name": "選舉", "site": "blog",
+            "schema_json": json.dumps({"datePublished": "2024-03-07"})},
+    }
+
+
+@pytest.fixture(params=["default", "zlib", "in_memory"])
+def store(request, tmp_path):
+    if request.param == "in_memory":
+        yield InMemoryMetadataStore(make_metadata())
+        return
+    path = tmp_path / "test_metadata.bin"
+    write_metadata_store(path, make_metadata(), codec=CODEC_ZLIB if request.param == "zlib" else None)
+    store = MetadataStore(path)
+    yield store
+    store.close()
+
+
+class TestMetadataStore:
+    """Test lazy lookups through either store"""
+
+    def test_lookup_by_label(self, store):
+        assert len(store) == 3
+        assert store[0]["name"] == "台積電法說會"
+        assert store[3] == make_metadata()[3]
+        assert 2 not in store and 4 not in store
+        with pytest.raises(KeyError):
+            store[2]
+
+    def test_labels_and_urls(self, store):
+        assert sorted(store.labels().tolist()) == [0, 1, 3]
+        assert store.label_for_url("https://blog/3") == 3
+        assert store.label_for_url("https://blog/4") is None
+
+    def test_published_dates_filter_labels(self, store):
+        assert np.isnan(store.published_ts[1])
+        mar_5 = store.published_ts[0]
+
+        assert labels_in_range(store.published_ts, store.labels(), mar_5, None) == {0, 3}
+        assert labels_in_range(store.published_ts, [0, 1, 3], None, mar_5) == {0}
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / "test_metadata.bin"
+    path.write_bytes(b"{}" * 32)
+    with pytest.raises(ValueError):
+        MetadataStore(path)
+
+
+def test_binary_store_is_smaller_than_json(tmp_path):
+    metadata = {i: {"url": f"https://news/{i}", "name": f"新聞 {i}", "site": "news",
+                    "schema_json": json.dumps({"articleBody": "台灣新聞內容 " * 50, "datePublished": "2024-03-05"},
+                                              ensure_ascii=False)}
+                for i in range(200)}
+    write_metadata_store(tmp_path / "m.bin", metadata)
+
+    assert (tmp_path / "m.bin").stat().st_size < len(json.dumps(metadata)) / 4
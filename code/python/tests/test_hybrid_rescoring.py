@@ -0,0 +1,134 @@
+"""
+Tests for hybrid search rescoring.
+"""
+
+import asyncio
+import json
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+
+from core.hybrid_rescoring import (
+    HybridRescorer, extract_date_published_ts, recency_cutoff_ts, recency_multipliers, rescore_candidates
+)
+
+
+BM25_PARAMS = {"enabled": True, "k1": 1.5, "b": 0.75, "alpha": 0.6, "beta": 0.4, "use_index": False}
+
+
+def make_payload(url, name, body="", days_old=None):
+    schema = {"description": body}
+    if days_old is not None:
+        published = datetime.now(timezone.utc) - timedelta(days=days_old)
+        schema["datePublished"] = published.strftime("%Y-%m-%d")
+    schema_json = json.dumps(schema, ensure_ascii=False)
+    # Mirrors build_point_payload (Qdrant uploads), which precomputes the date field
+    return {"url": url, "name": name, "schema_json": schema_json,
+            "date_published_ts": extract_date_published_ts(schema_json)}
+
+
+class TestRescoreCandidates:
+    """Test the pure rescoring function"""
+
+    def test_bm25_reorders_candidates(self):
+        candidates = [
+            (0.50, make_payload("https://a", "天氣預報", "颱風")),
+            (0.45, make_payload("https://b", "台積電財報", "台積電 營收 創新高")),
+        ]
+        result = rescore_candidates("台積電財報", ["台積", "積電", "台積電"], candidates, BM25_PARAMS)
+
+        assert [idx for _, idx in result.ranking] == [1, 0]
+        assert result.point_scores["https://b"]["bm25_score"] > 0
+        assert result.stats["budget_exhausted"] is False
+
+    def test_domain_filtering_drops_off_topic(self):
+        candidates = [
+            (0.9, make_payload("https://a", "AI趨勢週報 零售", "零售")),
+            (0.5, make_payload("https://b", "零售業數位轉型", "walmart")),
+        ]
+        result = rescore_candidates("零售 趨勢", ["零售", "趨勢"], candidates, BM25_PARAMS)
+
+        assert result.query_domains == ["零售"]
+        assert [idx for _, idx in result.ranking] == [1]
+        assert result.off_topic_count == 1
+
+    def test_temporal_cutoff_and_boost(self):
+        candidates = [
+            (0.9, make_payload("https://old", "新聞", days_old=2000)),
+            (0.5, make_payload("https://new", "新聞", days_old=10)),
+        ]
+        result = rescore_candidates("最新 新聞", ["新聞"], candidates, BM25_PARAMS)
+
+        assert [idx for _, idx in result.ranking] == [1]
+        assert "https://old" not in result.point_scores
+
+    def test_temporal_ignores_schema_json_dates(self):
+        """Recency uses only the precomputed payload field"""
+        payload = make_payload("https://old", "新聞", days_old=2000)
+        payload["date_published_ts"] = None
+        result = rescore_candidates("最新 新聞", ["新聞"], [(0.9, payload)], BM25_PARAMS)
+
+        assert [idx for _, idx in result.ranking] == [0]
+
+    def test_cpu_budget_exhausted_keeps_vector_score(self):
+        candidates = [(0.5, make_payload(f"https://{i}", "台積電", "台積電 " * 200)) for i in range(200)]
+        result = rescore_candidates("台積電", ["台積", "積電", "台積電"], candidates, BM25_PARAMS,
+                                    cpu_budget_ms=1e-6)
+
+        assert result.stats["budget_exhausted"] is True
+        assert all(score == pytest.approx(0.6 * 0.5) for score, _ in result.ranking)
+
+    def test_recency_cutoff_applies_past_the_budget(self):
+        candidates = [(0.5, make_payload(f"https://{i}", "新聞", "新聞 " * 200, days_old=2000 if i % 2 else 10))
+                      for i in range(200)]
+        result = rescore_candidates("最新 新聞", ["新聞"], candidates, BM25_PARAMS, cpu_budget_ms=1e-6)
+
+        assert result.stats["budget_exhausted"] is True
+        assert sorted(idx for _, idx in result.ranking) == list(range(0, 200, 2))
+
+
+class TestHybridRescorer:
+    """Test running rescoring on a worker pool"""
+
+    @pytest.mark.parametrize("executor_type", ["inline", "thread"])
+    def test_rescore_off_loop(self, executor_type):
+        rescorer = HybridRescorer(executor_type=executor_type, max_workers=1)
+        candidates = [(0.5, make_payload("https://a", "台積電", "台積電"))]
+        try:
+            result = asyncio.run(rescorer.rescore("台積電", ["台積電"], candidates, BM25_PARAMS))
+        finally:
+            rescorer.shutdown()
+
+        assert [idx for _, idx in result.ranking] == [0]
+        assert result.stats["queue_time"] >= 0
+
+
+class TestRecency:
+    """Test precomputed publication dates and vectorized multipliers"""
+
+    def test_extract_date_published_ts(self):
+        expected = datetime(2024, 3, 5, tzinfo=timezone.utc).timestamp()
+        assert extract_date_published_ts('{"datePublished": "2024-03-05T08:30:00+08:00"}') == expected
+        assert extract_date_published_ts({"datePublished": "2024-03-05"}) == expected
+        assert extract_date_published_ts('{"headline": "x"}') is None
+        assert extract_date_published_ts("not json") is None
+        assert extract_date_published_ts('{"datePublished": "yesterday"}') is None
+
+    def test_multiplier_buckets(self):
+        now = datetime(2025, 1, 1, tzinfo=timezone.utc)
+        days = [0, 180, 181, 365, 730, 731, 1095, 1096]
+        published = np.array([(now - timedelta(days=d)).timestamp() for d in days] + [np.nan])
+        multipliers = recency_multipliers(published, now)
+
+        assert multipliers[:-2].tolist() == [2.5, 2.5, 1.8, 1.8, 1.0, 0.5, 0.5]
+        assert np.isnan(multipliers[7])
+        assert multipliers[8] == 1.0
+
+    def test_cutoff_matches_multiplier_exclusion(self):
+        now = datetime(2025, 1, 1, tzinfo=timezone.utc)
+        cutoff = recency_cutoff_ts(now)
+        kept, dropped = recency_multipliers(np.array([cutoff + 1, cutoff]), now)
+
+        assert kept == 0.5
+        assert np.isnan(dropped)
@@ -0,0 +1,106 @@
+"""
+Tests for the LLM call scheduler.
+"""
+
+import asyncio
+
+import pytest
+
+from core.llm import LLMScheduler
+
+
+def make_scheduler(**limits):
+    return LLMScheduler({"default": {"max_concurrency": 1, **limits}, "endpoints": {}})
+
+
+class TestLLMScheduler:
+    """Test concurrency limits, priority order and rate limiting"""
+
+    def test_concurrency_limit(self):
+        scheduler = make_scheduler(max_concurrency=2)
+        peak = 0
+        running = 0
+
+        async def call():
+            nonlocal peak, running
+            async with scheduler.slot("openai", "m"):
+                running += 1
+                peak = max(peak, running)
+                await asyncio.sleep(0.01)
+                running -= 1
+
+        async def run():
+            await asyncio.gather(*[call() for _ in range(6)])
+
+        asyncio.run(run())
+        stats = scheduler.get_stats()["openai"]
+        assert peak == 2
+        assert stats["granted"] == 6
+        assert stats["in_flight"] == 0
+
+    def test_interactive_served_before_background(self):
+        scheduler = make_scheduler()
+        order = []
+
+        async def call(name, priority):
+            async with scheduler.slot("openai", "m", priority):
+                order.append(name)
+                await asyncio.sleep(0)
+
+        async def run():
+            await scheduler.acquire("openai", "m")  # Occupy the only slot
+            tasks = [asyncio.create_task(call(f"bg{i}", "background")) for i in range(2)]
+            tasks.append(asyncio.create_task(call("ui", "interactive")))
+            await asyncio.sleep(0)
+            assert scheduler.get_stats()["openai"]["queue_depth"] == {
+                "interactive": 1, "normal": 0, "background": 2}
+            scheduler.release("openai", "m")
+            await asyncio.gather(*tasks)
+
+        asyncio.run(run())
+        assert order == ["ui", "bg0", "bg1"]
+
+    def test_per_model_limit_does_not_block_other_models(self):
+        scheduler = make_scheduler(max_concurrency=4, model_max_concurrency=1)
+
+        async def run():
+            await scheduler.acquire("openai", "high")
+            await asyncio.wait_for(scheduler.acquire("openai", "low"), timeout=1)
+            blocked = asyncio.create_task(scheduler.acquire("openai", "high"))
+            await asyncio.sleep(0.01)
+            assert not blocked.done()
+            scheduler.release("openai", "high")
+            await asyncio.wait_for(blocked, timeout=1)
+
+        asyncio.run(run())
+
+    def test_token_bucket_rate_limit(self):
+        scheduler = make_scheduler(max_concurrency=10, requests_per_second=50, burst=1)
+
+        async def call():
+            async with scheduler.slot("openai", "m"):
+                pass
+
+        async def run():
+            loop = asyncio.get_running_loop()
+            start = loop.time()
+            await asyncio.gather(*[call() for _ in range(4)])
+            return loop.time() - start
+
+        elapsed = asyncio.run(run())
+        # One burst token, then 3 refills at 50/s
+        assert elapsed >= 0.05
+        assert scheduler.get_stats()["openai"]["rate_limited"] >= 1
+
+    def test_cancelled_waiter_leaves_queue(self):
+        scheduler = make_scheduler()
+
+        async def run():
+            await scheduler.acquire("openai", "m")
+            with pytest.raises(asyncio.TimeoutError):
+                await asyncio.wait_for(scheduler.acquire("openai", "m"), timeout=0.01)
+            scheduler.release("openai", "m")
+            await asyncio.wait_for(scheduler.acquire("openai", "m"), timeout=1)
+
+        asyncio.run(run())
+        assert scheduler.get_stats()["openai"]["queue_depth"]["normal"] == 0
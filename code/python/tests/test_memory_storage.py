@@ -0,0 +1,109 @@
+"""
+Tests for the indexed, log-backed MemoryStorage.
+"""
+
+import asyncio
+import json
+
+from chat_storage_providers.memory_storage import MemoryStorage
+from core.schemas import Message
+
+
+def make_message(conversation_id, n):
+    return Message(message_id=f"{conversation_id}-{n}", conversation_id=conversation_id, content=f"message {n}")
+
+
+def make_storage(tmp_path, **config):
+    return MemoryStorage({"storage_path": str(tmp_path), **config})
+
+
+def log_lines(tmp_path, conversation_id):
+    return (tmp_path / "conversations" / f"{conversation_id}.jsonl").read_text().splitlines()
+
+
+class TestMemoryStorage:
+    """Test per-conversation indexing, buffered logs and lazy loading"""
+
+    def test_recent_messages_per_conversation(self, tmp_path):
+        async def run():
+            storage = make_storage(tmp_path, persist_to_disk=False, max_messages_per_conversation=4)
+            for n in range(6):
+                await storage.store_message(make_message("a", n))
+            await storage.store_message(make_message("b", 0))
+            return (
+                await storage.get_conversation_messages("a", limit=2),
+                await storage.get_conversation_messages("a"),
+                await storage.get_conversation_messages("missing"),
+            )
+
+        recent, retained, missing = asyncio.run(run())
+        assert [m.message_id for m in recent] == ["a-4", "a-5"]
+        assert [m.message_id for m in retained] == ["a-2", "a-3", "a-4", "a-5"]
+        assert missing == []
+
+    def test_buffered_log_is_loaded_lazily(self, tmp_path):
+        async def write():
+            storage = make_storage(tmp_path, flush_interval=60)
+            for conversation_id in ("a", "b"):
+                for n in range(3):
+                    await storage.store_message(make_message(conversation_id, n))
+            # Nothing is written until the flush
+            assert not (tmp_path / "conversations" / "a.jsonl").exists()
+            await storage.close()
+
+        async def read():
+            storage = make_storage(tmp_path)
+            assert storage._conversations == {}
+            messages = await storage.get_conversation_messages("a")
+            return messages, list(storage._conversations)
+
+        asyncio.run(write())
+        assert len(log_lines(tmp_path, "a")) == 3
+
+        messages, loaded = asyncio.run(read())
+        assert [m.content for m in messages] == ["message 0", "message 1", "message 2"]
+        assert loaded == ["a"]
+
+    def test_log_keeps_history_beyond_memory_bound(self, tmp_path):
+        async def write():
+            storage = make_storage(tmp_path, max_messages_per_conversation=2)
+            for n in range(5):
+                await storage.store_message(make_message("a", n))
+            await storage.close()
+
+        async def read():
+            storage = make_storage(tmp_path, max_messages_per_conversation=2)
+            return await storage.get_conversation_messages("a")
+
+        asyncio.run(write())
+        assert len(log_lines(tmp_path, "a")) == 5
+        assert [m.message_id for m in asyncio.run(read())] == ["a-3", "a-4"]
+
+    def test_log_truncation_is_opt_in(self, tmp_path):
+        async def run():
+            storage = make_storage(tmp_path, max_messages_per_conversation=2,
+                                   max_log_messages_per_conversation=3)
+            for n in range(7):
+                await storage.store_message(make_message("a", n))
+            await storage.close()
+            await storage.store_message(make_message("a", 7))
+            await storage.close()
+            return storage._log_lines["a"]
+
+        line_count = asyncio.run(run())
+        assert [json.loads(line)["message_id"] for line in log_lines(tmp_path, "a")] == ["a-4", "a-5", "a-6", "a-7"]
+        assert line_count == 4
+
+    def test_legacy_log_is_split_by_conversation(self, tmp_path):
+        with open(tmp_path / "messages.jsonl", "w") as f:
+            for conversation_id, n in [("a", 0), ("b", 0), ("a", 1)]:
+                f.write(json.dumps(make_message(conversation_id, n).to_dict()) + "\n")
+
+        async def run():
+            storage = make_storage(tmp_path)
+            return await storage.get_conversation_messages("a")
+
+        messages = asyncio.run(run())
+        assert [m.message_id for m in messages] == ["a-0", "a-1"]
+        assert len(log_lines(tmp_path, "b")) == 1
+        assert not (tmp_path / "messages.jsonl").exists()
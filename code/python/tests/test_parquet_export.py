@@ -0,0 +1,127 @@
+"""
+Tests for streaming analytics/training data export.
+"""
+
+import asyncio
+import io
+import sqlite3
+import time
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestClient, TestServer
+
+from core.analytics_db import AnalyticsDB
+from core.query_logger import QueryLogger
+from webserver.analytics_handler import AnalyticsHandler, TRAINING_EXPORT_CSV_HEADERS
+
+DAY = 24 * 60 * 60
+
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    """Analytics DB with two queries on different days, three documents each."""
+    monkeypatch.delenv("ANALYTICS_DATABASE_URL", raising=False)
+    path = str(tmp_path / "query_logs.db")
+    QueryLogger(db_path=path).shutdown()
+
+    conn = sqlite3.connect(path)
+    now = time.time()
+    for q, timestamp in enumerate([now - 2 * DAY, now]):
+        query_id = f"q{q}"
+        conn.execute(
+            "INSERT INTO queries (query_id, timestamp, user_id, query_text, site, mode) "
+            "VALUES (?, ?, 'u', '台積電 財報', 'all', 'summarize')", (query_id, timestamp))
+        for position in range(3):
+            url = f"https://news/{q}/{position}"
+            conn.execute(
+                "INSERT INTO retrieved_documents (query_id, doc_url, doc_title, retrieval_position, bm25_score) "
+                "VALUES (?, ?, '台積電', ?, 1.5)", (query_id, url, position))
+            conn.execute(
+                "INSERT INTO ranking_scores (query_id, doc_url, ranking_position, llm_final_score, ranking_method) "
+                "VALUES (?, ?, ?, ?, 'llm')", (query_id, url, position, 90 - 10 * position))
+            conn.execute(
+                "INSERT INTO ranking_scores (query_id, doc_url, ranking_position, xgboost_score, "
+                "mmr_diversity_score, ranking_method) VALUES (?, ?, ?, 0.5, 0.1, 'xgboost_shadow')",
+                (query_id, url, position))
+    conn.commit()
+    conn.close()
+    return path
+
+
+def download(db_path, query):
+    async def run():
+        app = web.Application()
+        app.router.add_get('/export', AnalyticsHandler(db_path=db_path).export_training_data)
+        async with TestClient(TestServer(app)) as client:
+            response = await client.get('/export', params=query)
+            return response.status, response.headers, await response.read()
+
+    return asyncio.run(run())
+
+
+class TestStreamQuery:
+    """Test chunked reads from the analytics DB"""
+
+    def test_rows_arrive_in_chunks_of_dicts(self, db_path):
+        db = AnalyticsDB(db_path)
+        with db.connection() as conn:
+            chunks = list(db.stream_query(conn, "SELECT doc_url FROM retrieved_documents", chunk_size=4))
+        assert [len(chunk) for chunk in chunks] == [4, 2]
+        assert chunks[0][0] == {"doc_url": "https://news/0/0"}
+
+
+class TestExportEndpoint:
+    """Test the streamed /api/analytics/export_training_data download"""
+
+    def test_csv_download(self, db_path):
+        status, headers, body = download(db_path, {"days": 7})
+        assert status == 200
+        assert "attachment" in headers["Content-Disposition"]
+
+        text = body.decode("utf-8")
+        assert text.startswith("﻿")
+        lines = text.lstrip("﻿").splitlines()
+        assert lines[0].split(",") == TRAINING_EXPORT_CSV_HEADERS
+        # One row per (document, ranking_scores row): llm + xgboost_shadow
+        assert len(lines) == 13
+
+    def test_parquet_download_is_typed(self, db_path):
+        pq = pytest.importorskip("pyarrow.parquet")
+        status, _, body = download(db_path, {"days": 7, "format": "parquet"})
+        assert status == 200
+
+        table = pq.read_table(io.BytesIO(body))
+        assert table.num_rows == 12
+        assert str(table.schema.field("retrieval_position").type) == "int64"
+        assert str(table.schema.field("bm25_score").type) == "double"
+        assert table.column("query_text")[0].as_py() == "台積電 財報"
+
+    def test_unknown_format_rejected(self, db_path):
+        status, _, _ = download(db_path, {"format": "xlsx"})
+        assert status == 400
+
+
+class TestTrainingParquet:
+    """Test the day-partitioned training dataset and loading it for XGBoost"""
+
+    def test_export_and_load_round_trip(self, db_path, tmp_path):
+        pytest.importorskip("pyarrow")
+        from training.export_training_data import FEATURE_NAMES, export_to_parquet
+        from training.xgboost_trainer import load_training_data
+
+        dataset_dir = tmp_path / "training_data_parquet"
+        num_rows, metadata = export_to_parquet(db_path, dataset_dir, chunk_size=2)
+
+        assert num_rows == 6
+        assert metadata["query_groups"] == [3, 3]
+        assert len(list(dataset_dir.glob("day=*/*.parquet"))) == 2
+
+        X, y, query_groups = load_training_data(days=30, data_path=str(dataset_dir))
+        assert X.shape == (6, len(FEATURE_NAMES))
+        assert sorted(y.tolist()) == [70.0, 70.0, 80.0, 80.0, 90.0, 90.0]
+        assert query_groups == [3, 3]
+
+        # Only the query from today is within the last day
+        _, recent_y, recent_groups = load_training_data(days=1, data_path=str(dataset_dir))
+        assert recent_groups == [3]
@@ -0,0 +1,213 @@
+"""
+Tests for the batched QueryLogger writer.
+"""
+
+import sqlite3
+import time
+
+import pytest
+
+from core.query_logger import QueryLogger
+
+
+@pytest.fixture
+def query_logger(tmp_path, monkeypatch):
+    monkeypatch.delenv("ANALYTICS_DATABASE_URL", raising=False)
+    created = []
+
+    def make(**kwargs):
+        instance = QueryLogger(db_path=str(tmp_path / "query_logs.db"), **kwargs)
+        created.append(instance)
+        return instance
+
+    yield make
+    for instance in created:
+        instance.shutdown()
+
+
+def count_rows(logger_instance, table):
+    conn = sqlite3.connect(str(logger_instance.db.db_path))
+    try:
+        return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def log_documents(logger_instance, query_id, count):
+    for i in range(count):
+        logger_instance.log_retrieved_document(
+            query_id=query_id, doc_url=f"https://news/{i}", doc_title=f"title {i}",
+            doc_description="", retrieval_position=i
+        )
+
+
+class TestBatchedWriter:
+    """Test batching, backpressure and writer metrics"""
+
+    def test_rows_are_written_in_batches(self, query_logger):
+        instance = query_logger(batch_size=50, flush_interval=0.05)
+        instance.log_query_start("q1", "u1", "台積電", "all", "list")
+        log_documents(instance, "q1", 120)
+        instance.shutdown()
+
+        assert count_rows(instance, "queries") == 1
+        assert count_rows(instance, "retrieved_documents") == 120
+        stats = instance.get_writer_stats()
+        assert stats["rows_written"] == 121
+        assert stats["batches_written"] >= 3
+        assert stats["queue_depth"] == 0
+
+    def test_full_queue_drops_instead_of_blocking(self, query_logger):
+        instance = query_logger(max_queue_size=5)
+        # Stop the worker so the queue cannot drain
+        instance.is_running = False
+        instance.worker_thread.join()
+
+        started = time.time()
+        log_documents(instance, "q1", 20)
+
+        assert time.time() - started < 1.0
+        assert instance.log_queue.qsize() == 5
+        assert instance.get_writer_stats()["rows_dropped"] == 15
+
+    def test_bad_row_does_not_lose_batch(self, query_logger):
+        instance = query_logger(flush_interval=0.05)
+        instance.log_query_start("q1", "u1", "台積電", "all", "list")
+        log_documents(instance, "q1", 3)
+        instance._enqueue("retrieved_documents", {"no_such_column": 1})
+        log_documents(instance, "q1", 2)
+        instance.shutdown()
+
+        assert count_rows(instance, "retrieved_documents") == 5
+        assert instance.get_writer_stats()["write_errors"] == 1
+
+    def test_query_complete_uses_shared_connection(self, query_logger):
+        instance = query_logger()
+        instance.log_query_start("q1", "u1", "台積電", "all", "list")
+        instance.log_query_complete("q1", latency_total_ms=12.5, num_results_retrieved=3)
+        instance.log_queue.join()
+
+        conn = sqlite3.connect(str(instance.db.db_path))
+        try:
+            row = conn.execute("SELECT latency_total_ms FROM queries WHERE query_id = 'q1'").fetchone()
+        finally:
+            conn.close()
+        assert row == (12.5,)
+
+    def test_query_complete_records_cancelled_llm_work(self, query_logger):
+        instance = query_logger()
+        instance.log_query_start("q1", "u1", "台積電", "all", "list")
+        instance.log_query_complete("q1", latency_total_ms=5, llm_calls_cancelled=4, llm_tokens_saved=2400)
+        instance.log_queue.join()
+
+        conn = sqlite3.connect(str(instance.db.db_path))
+        try:
+            row = conn.execute(
+                "SELECT llm_calls_cancelled, llm_tokens_saved FROM queries WHERE query_id = 'q1'"
+            ).fetchone()
+        finally:
+            conn.close()
+        assert row == (4, 2400)
+
+    def test_parent_rows_never_wait_on_the_writer(self, query_logger):
+        instance = query_logger(flush_interval=0.02)
+        # Another writer (e.g. a long worker batch) holds the single SQLite writer
+        writer = instance.db.acquire(write=True)
+        try:
+            started = time.time()
+            instance.log_query_start("q1", "u1", "台積電", "all", "list")
+            log_documents(instance, "q1", 2)
+            instance.log_query_complete("q1", latency_total_ms=7)
+            assert time.time() - started < 0.5
+        finally:
+            instance.db.release(writer, write=True)
+        instance.shutdown()
+
+        conn = sqlite3.connect(str(instance.db.db_path))
+        try:
+            row = conn.execute("SELECT latency_total_ms FROM queries WHERE query_id = 'q1'").fetchone()
+        finally:
+            conn.close()
+        assert row == (7,)
+        assert count_rows(instance, "retrieved_documents") == 2
+        stats = instance.get_writer_stats()
+        assert stats["write_errors"] == 0
+        assert stats["rows_deferred"] == 0
+
+    def test_tool_routing_examples_are_llm_decisions(self, query_logger):
+        instance = query_logger()
+        for query_id, tool, routing in [("q1", "details", "llm"), ("q2", "search", "embedding"),
+                                        ("q3", "compare", "llm_candidates")]:
+            instance.log_query_start(query_id, "u1", f"query {query_id}", "all", "list")
+            instance.log_query_complete(query_id, latency_total_ms=5, tool_selected=tool, tool_routing=routing)
+        instance.log_queue.join()
+
+        assert sorted(instance.get_tool_routing_examples()) == [("query q1", "details"), ("query q3", "compare")]
+
+    def test_cancellation_columns_added_to_existing_db(self, tmp_path, query_logger):
+        conn = sqlite3.connect(str(tmp_path / "query_logs.db"))
+        conn.execute("CREATE TABLE queries (query_id TEXT PRIMARY KEY, timestamp REAL NOT NULL, "
+                     "user_id TEXT NOT NULL, query_text TEXT NOT NULL, site TEXT NOT NULL, mode TEXT NOT NULL, "
+                     "parent_query_id TEXT, schema_version INTEGER DEFAULT 2)")
+        conn.commit()
+        conn.close()
+
+        instance = query_logger()
+        conn = sqlite3.connect(str(instance.db.db_path))
+        try:
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(queries)")]
+        finally:
+            conn.close()
+        assert "llm_calls_cancelled" in columns
+        assert "llm_tokens_saved" in columns
+
+
+class TestParentOrdering:
+    """Test deferring child rows until their queries row exists"""
+
+    def test_children_before_parent_are_deferred_not_slept_on(self, query_logger):
+        instance = query_logger(flush_interval=0.02)
+        log_documents(instance, "early", 3)
+        instance.log_query_start("other", "u1", "颱風", "all", "list")
+        log_documents(instance, "other", 2)
+
+        # The unrelated query's rows are written while "early" is still waiting
+        deadline = time.time() + 2
+        while count_rows(instance, "retrieved_documents") < 2 and time.time() < deadline:
+            time.sleep(0.02)
+        assert count_rows(instance, "retrieved_documents") == 2
+        assert instance.get_writer_stats()["pending_rows"] == 3
+
+        instance.log_query_start("early", "u1", "台積電", "all", "list")
+        instance.shutdown()
+
+        assert count_rows(instance, "retrieved_documents") == 5
+        stats = instance.get_writer_stats()
+        assert stats["rows_deferred"] == 3
+        assert stats["pending_rows"] == 0
+        assert stats["rows_orphaned"] == 0
+
+    def test_orphans_dropped_after_timeout(self, query_logger):
+        instance = query_logger(flush_interval=0.02, orphan_timeout=0.1)
+        log_documents(instance, "missing", 4)
+
+        deadline = time.time() + 2
+        while instance.get_writer_stats()["rows_orphaned"] < 4 and time.time() < deadline:
+            time.sleep(0.02)
+
+        stats = instance.get_writer_stats()
+        assert stats["rows_orphaned"] == 4
+        assert stats["pending_rows"] == 0
+        assert count_rows(instance, "retrieved_documents") == 0
+
+    def test_parent_from_previous_run_is_found(self, query_logger):
+        first = query_logger()
+        first.log_query_start("q1", "u1", "台積電", "all", "list")
+        first.shutdown()
+
+        second = query_logger(flush_interval=0.02)
+        second.log_user_interaction(query_id="q1", doc_url="https://news/1", interaction_type="click")
+        second.shutdown()
+
+        assert count_rows(second, "user_interactions") == 1
+        assert second.get_writer_stats()["rows_deferred"] == 0
@@ -0,0 +1,268 @@
+"""
+Tests for batched LLM ranking.
+"""
+
+import asyncio
+import json
+import re
+
+import pytest
+
+import core.ranking as ranking_module
+from core.config import CONFIG
+from core.ranking import Ranking
+from core.ranking_cache import RankingCache
+from core.state import NLWebHandlerState
+
+
+class FakeHandler:
+    def __init__(self):
+        self.site = "news"
+        self.item_type = "Article"
+        self.query = "台積電"
+        self.query_params = {}
+        self.required_item_type = None
+        self.connection_alive_event = asyncio.Event()
+        self.connection_alive_event.set()
+        self.pre_checks_done_event = asyncio.Event()
+        self.pre_checks_done_event.set()
+        self.abort_fast_track_event = asyncio.Event()
+        self.query_done = False
+        self.final_ranked_answers = []
+        self.state = NLWebHandlerState(self)
+
+
+def make_items(count):
+    return [
+        {"url": f"https://news/{i}", "title": f"item {i}", "site": "news",
+         "schema_json": json.dumps({"@type": "Article", "description": f"desc {i}"})}
+        for i in range(count)
+    ]
+
+
+@pytest.fixture
+def llm(monkeypatch):
+    """Fake ask_llm scoring item N as 10 * N; records each prompt."""
+    calls = []
+
+    async def fake_ask_llm(prompt, schema, level="low", query_params=None, max_length=512, **kwargs):
+        calls.append(prompt)
+        numbers = [int(n) for n in re.findall(r"desc (\d+)", prompt)]
+        if "results" in schema:
+            return {"results": [{"id": i + 1, "score": 10 * n, "description": f"d{n}"}
+                                for i, n in enumerate(numbers) if n != 4]}
+        return {"score": 10 * numbers[0], "description": f"d{numbers[0]}"}
+
+    sent = []
+    monkeypatch.setattr(ranking_module, "ask_llm", fake_ask_llm)
+    monkeypatch.setattr(ranking_module, "fill_prompt", lambda prompt, handler, values: prompt.replace(
+        "{item.description}", str(values["item.description"])))
+    monkeypatch.setattr(ranking_module, "create_assistant_result",
+                        lambda results, handler=None: sent.append([r["url"] for r in results]))
+    monkeypatch.setattr(Ranking, "get_ranking_prompt",
+                        lambda self: ("Score this item: {item.description}", {"score": "int", "description": "str"}))
+    monkeypatch.setattr(CONFIG, "mmr_params", {"enabled": False})
+    monkeypatch.setattr(CONFIG, "xgboost_params", {"enabled": False})
+    monkeypatch.setattr(ranking_module, "get_ranking_cache", lambda: None)
+    return calls, sent
+
+
+def run_ranking(items, batch_params, monkeypatch, handler_attrs=None):
+    monkeypatch.setattr(CONFIG, "ranking_batch_params", batch_params)
+
+    async def run():
+        handler = FakeHandler()
+        for name, value in (handler_attrs or {}).items():
+            setattr(handler, name, value)
+        await Ranking(handler, items, ranking_type=Ranking.REGULAR_TRACK).do()
+        return handler
+
+    return asyncio.run(run())
+
+
+class TestBatchedRanking:
+    """Test scoring several items per LLM call"""
+
+    def test_batches_reduce_llm_calls(self, llm, monkeypatch):
+        calls, sent = llm
+        handler = run_ranking(make_items(8), {"enabled": True, "batch_size": 3}, monkeypatch)
+
+        # Batches [0-2], [3-5], [6-7]; item 4 is missing from its batch response and ranked alone
+        assert len(calls) == 4
+        assert [r["url"] for r in handler.final_ranked_answers] == [f"https://news/{i}" for i in (7, 6)]
+        # Items above EARLY_SEND_THRESHOLD are sent as soon as their batch returns
+        assert sorted(sent) == [["https://news/6"], ["https://news/7"]]
+
+    def test_disabled_ranks_per_item(self, llm, monkeypatch):
+        calls, _ = llm
+        run_ranking(make_items(4), {"enabled": False, "batch_size": 8}, monkeypatch)
+        assert len(calls) == 4
+
+    def test_provider_override(self, monkeypatch):
+        monkeypatch.setattr(CONFIG, "ranking_batch_params",
+                            {"enabled": True, "batch_size": 8, "providers": {CONFIG.preferred_llm_endpoint: 2}})
+        assert Ranking(FakeHandler(), []).get_batch_size() == 2
+
+    def test_parse_batch_response_drops_malformed(self):
+        response = {"results": [
+            {"id": 1, "score": "70", "description": "ok"},
+            {"id": 1, "score": 10},
+            {"id": 9, "score": 50},
+            {"id": "x", "score": 50},
+            {"id": 2},
+            "junk",
+        ]}
+        assert Ranking._parse_batch_response(response, 3) == {0: {"score": 70, "description": "ok"}}
+
+
+class FakeQueryLogger:
+    def __init__(self):
+        self.scores = []
+
+    def log_ranking_score(self, **kwargs):
+        self.scores.append((kwargs["doc_url"], kwargs["llm_final_score"]))
+
+
+class TestRankingCache:
+    """Test serving repeated (query, document) rankings from the cache"""
+
+    @pytest.fixture
+    def cache(self, monkeypatch):
+        cache = RankingCache(max_entries=100)
+        monkeypatch.setattr(ranking_module, "get_ranking_cache", lambda: cache)
+        return cache
+
+    def test_hits_skip_llm_but_are_logged(self, llm, cache, monkeypatch):
+        calls, sent = llm
+        query_logger = FakeQueryLogger()
+        monkeypatch.setattr(ranking_module, "get_query_logger", lambda: query_logger)
+        batch_params = {"enabled": True, "batch_size": 3}
+
+        first = run_ranking(make_items(8), batch_params, monkeypatch, {"query_id": "q1"})
+        llm_calls = len(calls)
+        second = run_ranking(make_items(8), batch_params, monkeypatch, {"query_id": "q2"})
+
+        assert len(calls) == llm_calls
+        assert cache.get_stats()["hits"] == 8
+        assert [r["url"] for r in second.final_ranked_answers] == [r["url"] for r in first.final_ranked_answers]
+        assert sorted(query_logger.scores[8:]) == sorted(query_logger.scores[:8])
+        # Early send still applies to cached high scorers
+        assert sent[-2:] == [["https://news/7"], ["https://news/6"]]
+
+    def test_changed_content_is_a_miss(self, llm, cache, monkeypatch):
+        calls, _ = llm
+        params = {"enabled": False}
+        run_ranking(make_items(2), params, monkeypatch)
+        items = make_items(2)
+        items[1]["schema_json"] = items[1]["schema_json"].replace("desc 1", "desc 1 updated")
+        run_ranking(items, params, monkeypatch)
+
+        assert len(calls) == 3
+
+    def test_batch_rankings_are_not_served_to_single_item_prompts(self, llm, cache, monkeypatch):
+        calls, _ = llm
+        run_ranking(make_items(8), {"enabled": True, "batch_size": 3}, monkeypatch)
+        llm_calls = len(calls)
+        run_ranking(make_items(8), {"enabled": False}, monkeypatch)
+
+        # Only item 4, ranked alone by the batch request's fallback, was scored by the single-item prompt
+        assert len(calls) == llm_calls + 7
+
+    def test_sqlite_lookup_is_one_query(self, tmp_path):
+        cache = RankingCache(backend="sqlite", sqlite_path=str(tmp_path / "ranking.db"))
+        cache.put("single", {"score": 80})
+        cache.put("batch", {"score": 60})
+        cache.put("other", {"score": 10})
+        selects = []
+        cache._conn.set_trace_callback(lambda sql: selects.append(sql) if sql.startswith("SELECT") else None)
+        try:
+            rankings = asyncio.run(cache.get_many_async([["single", "batch"], ["missing", "batch"], ["missing"]]))
+        finally:
+            cache.close()
+
+        assert rankings == [{"score": 80}, {"score": 60}, None]
+        assert len(selects) == 1
+        assert (cache.hits, cache.misses) == (2, 1)
+
+    def test_ttl_and_size_eviction(self):
+        cache = RankingCache(max_entries=2, ttl_seconds=0)
+        for key in ["a", "b", "c"]:
+            cache.put(key, {"score": 1})
+        assert cache.get("a") is None
+        assert cache.get("c") == {"score": 1}
+        assert cache.get_stats()["evictions"] == 1
+
+        expiring = RankingCache(ttl_seconds=1e-9)
+        expiring.put("a", {"score": 1})
+        assert expiring.get("a") is None
+        assert expiring.get_stats()["expired"] == 1
+
+    def test_sqlite_backend(self, tmp_path):
+        path = str(tmp_path / "ranking.db")
+        cache = RankingCache(backend="sqlite", max_entries=1, sqlite_path=path)
+        cache.put("a", {"score": 80, "description": "台積電"})
+        cache.put("b", {"score": 10, "description": ""})
+        cache.close()
+
+        reopened = RankingCache(backend="sqlite", sqlite_path=path)
+        try:
+            assert reopened.get("a") is None
+            assert reopened.get("b") == {"score": 10, "description": ""}
+        finally:
+            reopened.close()
+
+
+class TestRankingCancellation:
+    """Test cancelling in-flight LLM calls the request no longer needs"""
+
+    @pytest.fixture
+    def slow_llm(self, monkeypatch):
+        started = []
+
+        async def fake_ask_llm(prompt, schema, level="low", query_params=None, max_length=512, **kwargs):
+            started.append(prompt)
+            await asyncio.sleep(10)
+            return {"score": 90, "description": "late"}
+
+        monkeypatch.setattr(ranking_module, "ask_llm", fake_ask_llm)
+        monkeypatch.setattr(ranking_module, "fill_prompt", lambda prompt, handler, values: prompt)
+        monkeypatch.setattr(Ranking, "get_ranking_prompt", lambda self: ("台積電 news item", {"score": "int"}))
+        monkeypatch.setattr(ranking_module, "get_ranking_cache", lambda: None)
+        monkeypatch.setattr(CONFIG, "ranking_batch_params", {"enabled": False})
+        return started
+
+    @pytest.mark.parametrize("ranking_type", [Ranking.FAST_TRACK, Ranking.REGULAR_TRACK])
+    def test_disconnect_cancels_llm_calls(self, slow_llm, ranking_type):
+        async def run():
+            handler = FakeHandler()
+            ranker = Ranking(handler, make_items(3), ranking_type=ranking_type)
+            asyncio.get_running_loop().call_later(0.1, handler.connection_alive_event.clear)
+            await asyncio.wait_for(ranker.do(), timeout=2)
+            return handler, ranker
+
+        handler, ranker = asyncio.run(run())
+
+        assert len(slow_llm) == 3
+        assert ranker.cancel_reason == "connection_lost"
+        assert handler.llm_calls_cancelled == 3
+        # Prompt estimate plus the 512-token completion budget, per cancelled call
+        assert handler.llm_tokens_saved == 3 * (Ranking.estimate_tokens("台積電 news item") + 512)
+        assert handler.final_ranked_answers == []
+
+    def test_fast_track_abort_cancels_llm_calls(self, slow_llm):
+        async def run():
+            handler = FakeHandler()
+            ranker = Ranking(handler, make_items(2), ranking_type=Ranking.FAST_TRACK)
+            asyncio.get_running_loop().call_later(0.05, handler.abort_fast_track_event.set)
+            await asyncio.wait_for(ranker.do(), timeout=2)
+            return handler, ranker
+
+        handler, ranker = asyncio.run(run())
+
+        assert ranker.cancel_reason == "fast_track_aborted"
+        assert handler.llm_calls_cancelled == 2
+
+    def test_finished_ranking_is_not_cancelled(self, llm, monkeypatch):
+        handler = run_ranking(make_items(3), {"enabled": False}, monkeypatch)
+        assert handler.llm_calls_cancelled == 0
+        assert handler.llm_tokens_saved == 0
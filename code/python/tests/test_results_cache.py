@@ -0,0 +1,121 @@
+"""
+Tests for the list/generate results cache and its backends.
+"""
+
+import asyncio
+import threading
+
+import numpy as np
+import pytest
+
+from core.results_cache import (
+    MemoryBackend, ResultsCache, SQLiteBackend, create_backend, decode_results, encode_results
+)
+
+
+def make_results(count):
+    return [
+        {"url": f"https://news/{i}", "name": f"新聞 {i}", "site": "news",
+         "ranking": {"score": 90 - i, "description": f"d{i}"},
+         "schema_object": {"@type": "Article", "headline": f"新聞 {i}"},
+         "retrieval_scores": {"bm25": np.float32(1.5)},
+         "vector": np.ones(4)}
+        for i in range(count)
+    ]
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def cache(request, tmp_path):
+    backend = MemoryBackend() if request.param == "memory" else SQLiteBackend(str(tmp_path / "results.db"))
+    cache = ResultsCache(ttl_seconds=300, backend=backend)
+    yield cache
+    cache.close()
+
+
+class TestResultsCache:
+    """Test storing and reusing ranked results"""
+
+    def test_round_trip_strips_vectors(self, cache):
+        asyncio.run(cache.store("conv-1", make_results(3), "台積電"))
+        results = asyncio.run(cache.retrieve("conv-1"))
+
+        assert [r["url"] for r in results] == ["https://news/0", "https://news/1", "https://news/2"]
+        assert results[0]["schema_object"]["headline"] == "新聞 0"
+        assert results[0]["retrieval_scores"]["bm25"] == 1.5
+        assert all("vector" not in r for r in results)
+
+    def test_hit_rate_stats(self, cache):
+        asyncio.run(cache.store("conv-1", make_results(1), "q"))
+        asyncio.run(cache.retrieve("conv-1"))
+        asyncio.run(cache.retrieve("conv-2"))
+
+        stats = cache.get_stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["hit_rate"] == 0.5
+        assert stats["total_entries"] == 1
+
+    def test_expired_entries_miss(self, cache):
+        cache.ttl_seconds = -1
+        # Leave expiry to the lookup rather than the periodic purge
+        cache.cleanup_interval = float("inf")
+        asyncio.run(cache.store("conv-1", make_results(1), "q"))
+
+        assert asyncio.run(cache.retrieve("conv-1")) is None
+        assert cache.get_stats()["expired"] == 1
+
+    def test_retrieve_returns_independent_copies(self, cache):
+        asyncio.run(cache.store("conv-1", make_results(2), "q"))
+        asyncio.run(cache.retrieve("conv-1"))[0]["ranking"]["score"] = 0
+
+        assert asyncio.run(cache.retrieve("conv-1"))[0]["ranking"]["score"] == 90
+
+    def test_sqlite_shared_between_instances(self, tmp_path):
+        path = str(tmp_path / "results.db")
+        writer = ResultsCache(backend=SQLiteBackend(path))
+        reader = ResultsCache(backend=SQLiteBackend(path))
+        asyncio.run(writer.store("conv-1", make_results(2), "q"))
+
+        assert len(asyncio.run(reader.retrieve("conv-1"))) == 2
+
+
+class TestMemoryBackend:
+    """Test heap-based expiry"""
+
+    def test_purge_only_removes_expired(self):
+        backend = MemoryBackend()
+        backend.set("old", b"a", 10)
+        backend.set("new", b"b", 100)
+        # Re-storing a key leaves a stale heap record that must not evict it
+        backend.set("old", b"c", 200)
+
+        assert backend.purge_expired(50) == 0
+        assert backend.purge_expired(150) == 1
+        assert backend.get("new") is None
+        assert backend.get("old") == (b"c", 200)
+
+
+def test_payload_is_compact():
+    results = make_results(20)
+    payload = encode_results(results, "q")
+    assert decode_results(payload)["query"] == "q"
+    assert len(payload) < len(str(results).encode())
+
+
+def test_unknown_backend_falls_back_to_memory():
+    assert isinstance(create_backend({"backend": "memcached"}), MemoryBackend)
+
+
+def test_blocking_backends_run_off_the_event_loop(tmp_path):
+    threads = []
+
+    class RecordingBackend(SQLiteBackend):
+        def set(self, key, payload, expires_at):
+            threads.append(threading.current_thread())
+            super().set(key, payload, expires_at)
+
+    cache = ResultsCache(backend=RecordingBackend(str(tmp_path / "results.db")))
+    asyncio.run(cache.store("conv-1", make_results(1), "q"))
+    cache.close()
+
+    assert threads and threads[0] is not threading.main_thread()
@@ -0,0 +1,161 @@
+"""
+Tests for speculative retrieval started alongside the prechecks.
+"""
+
+import asyncio
+
+import pytest
+
+import core.query_logger as query_logger_module
+import core.speculative_retrieval as speculative_module
+from core.retriever import DateRange, log_retrieved_items
+from core.speculative_retrieval import SpeculativeRetrieval, get_speculation_stats
+
+
+class FakeHandler:
+    def __init__(self, query="台積電 財報"):
+        self.query = query
+        self.site = "all"
+        self.query_params = {}
+        self.prev_queries = []
+        self.decontextualized_query = ""
+        self.query_id = "q1"
+        self.retrieval_speculation = None
+
+
+@pytest.fixture
+def searches(monkeypatch):
+    """Fake search returning num_results items; records (query, num_results) per call."""
+    calls = []
+
+    async def fake_search(query, site, query_params=None, handler=None, num_results=50, include_vectors=False,
+                          retrieval_log=None):
+        assert handler is None
+        calls.append((query, num_results))
+        await asyncio.sleep(0.01)
+        items = [[f"https://news/{i}", "{}", f"item {i}", site] for i in range(num_results)]
+        for item in items:
+            retrieval_log.setdefault(item[0], {"doc_url": item[0], "doc_title": item[2]})
+        return items
+
+    monkeypatch.setattr(speculative_module, "search", fake_search)
+    return calls
+
+
+def resolve(handler, query, num_results, speculative_results=50, date_range=None):
+    async def run():
+        speculation = SpeculativeRetrieval(handler, speculative_results)
+        speculation.start()
+        return speculation, await speculation.resolve(query, num_results, date_range)
+
+    return asyncio.run(run())
+
+
+class TestSpeculativeRetrieval:
+    """Test keeping or discarding the speculative search"""
+
+    def test_unchanged_query_is_kept(self, searches):
+        handler = FakeHandler()
+        speculation, items = resolve(handler, " 台積電  財報", 50)
+
+        assert len(items) == 50
+        assert searches == [("台積電 財報", 50)]
+        assert handler.retrieval_speculation == "kept"
+
+    def test_decontextualized_query_is_discarded(self, searches):
+        handler = FakeHandler("它的股價呢")
+        speculation, items = resolve(handler, "台積電的股價", 50)
+
+        assert items is None
+        assert speculation.task.cancelled()
+        assert handler.retrieval_speculation == "query_changed"
+
+    def test_temporal_range_needing_more_candidates_is_discarded(self, searches):
+        handler = FakeHandler()
+        _, items = resolve(handler, handler.query, 150)
+
+        assert items is None
+        assert handler.retrieval_speculation == "temporal_range"
+
+    def test_date_filtered_search_is_discarded(self, searches):
+        handler = FakeHandler()
+        _, items = resolve(handler, handler.query, 50, date_range=DateRange(start_ts=0.0))
+
+        assert items is None
+        assert handler.retrieval_speculation == "temporal_range"
+
+    def test_failed_search_is_discarded(self, monkeypatch):
+        async def failing_search(*args, **kwargs):
+            raise RuntimeError("qdrant down")
+
+        monkeypatch.setattr(speculative_module, "search", failing_search)
+        handler = FakeHandler()
+        _, items = resolve(handler, handler.query, 50)
+
+        assert items is None
+        assert handler.retrieval_speculation == "failed"
+
+    def test_stats_count_outcomes(self, searches):
+        before = get_speculation_stats()["outcomes"].get("kept", 0)
+        resolve(FakeHandler(), "台積電 財報", 50)
+
+        stats = get_speculation_stats()
+        assert stats["outcomes"]["kept"] == before + 1
+        assert 0 < stats["kept_rate"] <= 1
+
+
+class TestSpeculationAnalytics:
+    """Test that only the kept results are logged, once"""
+
+    def test_single_turn_queries_speculate(self):
+        handler = FakeHandler()
+        assert SpeculativeRetrieval.can_speculate(handler)
+
+        handler.prev_queries = ["台積電"]
+        assert not SpeculativeRetrieval.can_speculate(handler)
+
+        handler.decontextualized_query = handler.query
+        assert SpeculativeRetrieval.can_speculate(handler)
+
+    def test_known_date_range_skips_speculation(self):
+        assert not SpeculativeRetrieval.can_speculate(FakeHandler("過去7天 台積電"))
+        assert not SpeculativeRetrieval.can_speculate(FakeHandler("台積電 最新財報"))
+
+        handler = FakeHandler()
+        handler.query_params = {"time_range_start": "2024-01-01", "time_range_end": "2024-01-31"}
+        assert not SpeculativeRetrieval.can_speculate(handler)
+
+    def test_date_range_cancels_before_prechecks_finish(self, searches):
+        handler = FakeHandler()
+        before = get_speculation_stats()["outcomes"].get("temporal_range", 0)
+
+        async def run():
+            speculation = SpeculativeRetrieval(handler, 50)
+            speculation.start()
+            await asyncio.sleep(0)
+            speculation.on_temporal_range({"is_temporal": False})
+            assert not speculation.task.done()
+            speculation.on_temporal_range({"is_temporal": True, "start_date": "2024-01-01"})
+            return speculation, await speculation.resolve(handler.query, 50)
+
+        speculation, items = asyncio.run(run())
+
+        assert items is None
+        assert speculation.task.cancelled()
+        assert get_speculation_stats()["outcomes"]["temporal_range"] == before + 1
+
+    def test_kept_results_are_logged_in_final_order(self, searches, monkeypatch):
+        logged = []
+
+        class FakeQueryLogger:
+            def log_retrieved_document(self, **row):
+                logged.append(row)
+
+        monkeypatch.setattr(query_logger_module, "get_query_logger", lambda: FakeQueryLogger())
+        handler = FakeHandler()
+        speculation, items = resolve(handler, handler.query, 10)
+
+        assert log_retrieved_items(handler, items, speculation.retrieval_log) == 10
+        assert [(row["retrieval_position"], row["doc_url"]) for row in logged] == \
+            [(i, f"https://news/{i}") for i in range(10)]
+        assert {row["query_id"] for row in logged} == {"q1"}
@@ -0,0 +1,141 @@
+"""
+Tests for the embedding tool router in front of LLM tool selection.
+"""
+
+import asyncio
+
+import pytest
+
+import core.router as router_module
+from core.router import EmbeddingRouter, Tool, ToolSelector, get_routing_stats, needs_llm_parameters
+
+
+def make_tool(name, return_structure):
+    return Tool(name=name, path="", method="builtin", arguments={}, examples=[], schema_type="NewsQuery",
+                prompt="{request.query}", return_structure=return_structure)
+
+
+SEARCH = make_tool("search", {"score": "0-100", "search_query": "query"})
+DETAILS = make_tool("details", {"score": "0-100", "item_name": "event", "details_requested": "details"})
+COMPARE = make_tool("compare", {"score": "0-100", "item1_name": "a", "item2_name": "b"})
+TOOLS = [SEARCH, DETAILS, COMPARE]
+
+
+def make_router():
+    router = EmbeddingRouter(min_similarity=0.5, margin=0.1, max_llm_candidates=2)
+    router.add_vectors("search", [[1, 0, 0], [0.9, 0.1, 0]])
+    router.add_vectors("details", [[0, 1, 0]])
+    router.add_vectors("compare", [[0, 0, 1]])
+    return router
+
+
+class TestEmbeddingRouter:
+    """Test routing decisions from cosine similarity"""
+
+    def test_clear_winner_is_confident(self):
+        decision = make_router().route([2, 0.2, 0], TOOLS)
+
+        assert decision.outcome == "confident"
+        assert decision.candidates == [SEARCH]
+        assert decision.similarities["search"] > 0.99
+
+    def test_close_candidates_are_ambiguous(self):
+        decision = make_router().route([0.1, 1, 0.95], TOOLS)
+
+        assert decision.outcome == "ambiguous"
+        assert [tool.name for tool in decision.candidates] == ["details", "compare"]
+
+    def test_dissimilar_query_evaluates_every_tool(self):
+        router = make_router()
+        router.min_similarity = 0.9
+        decision = router.route([1, 1, 1], TOOLS)
+
+        assert decision.outcome == "low_similarity"
+        assert len(decision.candidates) == 3
+
+    def test_unembedded_tool_defers_to_llm(self):
+        other = make_tool("other", {})
+        assert make_router().route([1, 0, 0], TOOLS + [other]) is None
+
+    def test_logged_examples_extend_known_tools(self, monkeypatch):
+        async def fake_batch(texts):
+            return [[0, 1, 0] for _ in texts]
+
+        monkeypatch.setattr(router_module, "batch_get_embeddings", fake_batch)
+        router = make_router()
+        added = asyncio.run(router.fit_from_log([("行政院預算案內容", "details"), ("q", "removed_tool")]))
+
+        assert added == 1
+        assert router._vectors["details"].shape == (2, 3)
+
+    def test_parameter_extraction_needs_llm(self):
+        assert not needs_llm_parameters(SEARCH)
+        assert needs_llm_parameters(DETAILS)
+
+
+class FakeHandler:
+    def __init__(self):
+        self.query_params = {}
+        self.tool_routing = None
+
+
+@pytest.fixture
+def selector(monkeypatch):
+    """ToolSelector whose LLM evaluations are recorded instead of sent."""
+    evaluated = []
+
+    async def fake_evaluate(query, tool):
+        evaluated.append(tool.name)
+        return {"tool": tool, "score": 80, "result": {"score": 80}}
+
+    instance = ToolSelector.__new__(ToolSelector)
+    instance.handler = FakeHandler()
+    instance.evaluated = evaluated
+    monkeypatch.setattr(instance, "_evaluate_tool", fake_evaluate)
+    return instance
+
+
+def route_with(monkeypatch, selector, query_vector):
+    router = make_router()
+
+    async def fake_route_query(query, tools):
+        return router.route(query_vector, tools)
+
+    monkeypatch.setattr(router_module, "route_query", fake_route_query)
+    return asyncio.run(selector._route_tools("台積電", TOOLS))
+
+
+class TestToolSelectorRouting:
+    """Test which tools still go to the LLM"""
+
+    def test_confident_search_skips_llm(self, monkeypatch, selector):
+        before = get_routing_stats()["llm_calls_skipped"]
+        results = route_with(monkeypatch, selector, [1, 0, 0])
+
+        assert selector.evaluated == []
+        assert results[0]["tool"] is SEARCH
+        assert results[0]["result"]["search_query"] == "台積電"
+        assert selector.handler.tool_routing == "embedding"
+        assert get_routing_stats()["llm_calls_skipped"] == before + 3
+
+    def test_confident_tool_with_parameters_asks_llm_once(self, monkeypatch, selector):
+        route_with(monkeypatch, selector, [0, 1, 0])
+
+        assert selector.evaluated == ["details"]
+        assert selector.handler.tool_routing == "embedding_params"
+
+    def test_ambiguous_evaluates_only_candidates(self, monkeypatch, selector):
+        route_with(monkeypatch, selector, [0.1, 1, 0.95])
+
+        assert sorted(selector.evaluated) == ["compare", "details"]
+        assert selector.handler.tool_routing == "llm_candidates"
+
+    def test_router_unavailable_evaluates_all_tools(self, monkeypatch, selector):
+        async def no_router(query, tools):
+            return None
+
+        monkeypatch.setattr(router_module, "route_query", no_router)
+        asyncio.run(selector._route_tools("台積電", TOOLS))
+
+        assert sorted(selector.evaluated) == ["compare", "details", "search"]
+        assert selector.handler.tool_routing == "llm"
@@ -9,6 +9,9 @@ Example:
     python -m tools.build_hnswlib_index \
         /Users/rvguha/mahi/data/sites/embeddings/small/allsites.txt \
         ../data/hnswlib
+
+Convert the metadata of an index built before the memory-mapped format:
+    python -m tools.build_hnswlib_index --convert-metadata ../data/hnswlib
 """
 
 import json
@@ -25,6 +28,8 @@ except ImportError:
     print("Error: hnswlib not installed. Please run: pip install hnswlib")
     sys.exit(1)
 
+from retrieval_providers.hnswlib_metadata import write_metadata_store
+
 # Set up logging
 logging.basicConfig(level=logging.INFO, format='%(message)s')
 logger = logging.getLogger(__name__)
@@ -96,7 +101,7 @@ class HnswIndexBuilder:
         logger.info(f"Index building complete!")
         logger.info(f"Files created:")
         logger.info(f"  - {output_path / f'{index_name}_{self.dimension}.bin'}")
-        logger.info(f"  - {output_path / f'{index_name}_metadata.json'}")
+        logger.info(f"  - {output_path / f'{index_name}_metadata.bin'}")
         logger.info(f"  - {output_path / f'{index_name}_sites.json'}")
         
         return True
@@ -214,10 +219,9 @@ class HnswIndexBuilder:
         self.index.save_index(str(index_file))
         logger.info(f"Saved HNSW index to {index_file}")
         
-        # Save metadata
-        metadata_file = output_path / f"{index_name}_metadata.json"
-        with open(metadata_file, 'w') as f:
-            json.dump(self.metadata, f)
+        # Save metadata (memory-mapped by HnswlibClient, see retrieval_providers/hnswlib_metadata.py)
+        metadata_file = output_path / f"{index_name}_metadata.bin"
+        write_metadata_store(metadata_file, self.metadata)
         logger.info(f"Saved metadata for {len(self.metadata)} documents")
         
         # Save site index
@@ -227,10 +231,34 @@ class HnswIndexBuilder:
         logger.info(f"Saved site index for {len(self.sites)} sites")
 
 
+def convert_metadata(index_dir: str, index_name: str = "nlweb_hnswlib") -> bool:
+    """
+    Rewrite {index_name}_metadata.json of an existing index as {index_name}_metadata.bin.
+    
+    Args:
+        index_dir: Directory containing the index files
+        index_name: Prefix of the index files
+    """
+    json_file = Path(index_dir) / f"{index_name}_metadata.json"
+    if not json_file.exists():
+        logger.error(f"Metadata file not found: {json_file}")
+        return False
+    
+    with open(json_file, 'r') as f:
+        metadata = {int(k): v for k, v in json.load(f).items()}
+    bin_file = json_file.with_suffix('.bin')
+    write_metadata_store(bin_file, metadata)
+    logger.info(f"Converted metadata for {len(metadata)} documents to {bin_file} "
+                f"({bin_file.stat().st_size / json_file.stat().st_size:.0%} of the JSON size)")
+    return True
+
+
 def main():
     parser = argparse.ArgumentParser(description='Build HNSW index from JSONL embeddings file')
-    parser.add_argument('input_file', help='Input JSONL file with embeddings')
-    parser.add_argument('output_dir', help='Output directory for index and metadata')
+    parser.add_argument('input_file', nargs='?', help='Input JSONL file with embeddings')
+    parser.add_argument('output_dir', nargs='?', help='Output directory for index and metadata')
+    parser.add_argument('--convert-metadata', metavar='INDEX_DIR',
+                       help='Convert the JSON metadata of an existing index to the memory-mapped format')
     parser.add_argument('--index-name', default='nlweb_hnswlib', 
                        help='Prefix for output files (default: nlweb_hnswlib)')
     parser.add_argument('--max-elements', type=int, default=1000000,
@@ -242,6 +270,11 @@ def main():
     
     args = parser.parse_args()
     
+    if args.convert_metadata:
+        sys.exit(0 if convert_metadata(args.convert_metadata, args.index_name) else 1)
+    if not args.input_file or not args.output_dir:
+        parser.error("input_file and output_dir are required")
+    
     builder = HnswIndexBuilder(
         max_elements=args.max_elements,
         M=args.M,
@@ -12,9 +12,10 @@ Output:
 import sqlite3
 import csv
 import json
+import shutil
 import sys
 from pathlib import Path
-from typing import List, Dict, Tuple
+from typing import List, Dict, Iterator, Tuple
 from collections import defaultdict
 
 # Add parent directory to path to import feature_engineering
@@ -30,6 +31,7 @@ from feature_engineering import (
     extract_mmr_features,
     TOTAL_FEATURES_PHASE_A
 )
+from core.parquet_export import PYARROW_AVAILABLE, PartitionedParquetWriter, make_schema
 
 def get_db_path() -> Path:
     """Get absolute path to analytics database from project root."""
@@ -46,20 +48,11 @@ def get_output_dir() -> Path:
     output_dir.mkdir(parents=True, exist_ok=True)
     return output_dir
 
-def fetch_training_data(db_path: Path) -> List[Dict]:
-    """
-    Fetch all training samples from database.
-
-    Returns:
-        List of dicts, each containing all raw data needed for feature extraction
-    """
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-
-    # Complex JOIN to get all data needed for feature extraction
-    query = '''
+# Complex JOIN to get all data needed for feature extraction
+TRAINING_QUERY = '''
         SELECT
             q.query_id,
+            q.timestamp,
             q.query_text,
             q.mode,
             rd.doc_url,
@@ -96,7 +89,38 @@ def fetch_training_data(db_path: Path) -> List[Dict]:
         ORDER BY q.query_id, rd.retrieval_position
     '''
 
-    cursor.execute(query)
+# Feature names for CSV header / Parquet columns
+FEATURE_NAMES = [
+    # Query (6)
+    'query_length', 'word_count', 'has_quotes', 'has_numbers',
+    'has_question_words', 'keyword_count',
+    # Document (8)
+    'doc_length', 'recency_days', 'has_author', 'has_publication_date',
+    'schema_completeness', 'title_length', 'description_length', 'url_length',
+    # Query-Document (7)
+    'vector_similarity', 'bm25_score', 'keyword_boost', 'temporal_boost',
+    'final_retrieval_score', 'keyword_overlap_ratio', 'title_exact_match',
+    # Ranking (6)
+    'retrieval_position', 'ranking_position', 'llm_final_score',
+    'relative_score_to_top', 'score_percentile', 'position_change',
+    # MMR (2)
+    'mmr_diversity_score', 'detected_intent',
+]
+
+# Rows fetched per cursor round trip when streaming
+CHUNK_SIZE = 5000
+
+def fetch_training_data(db_path: Path) -> List[Dict]:
+    """
+    Fetch all training samples from database.
+
+    Returns:
+        List of dicts, each containing all raw data needed for feature extraction
+    """
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+
+    cursor.execute(TRAINING_QUERY)
 
     # Get column names
     columns = [desc[0] for desc in cursor.description]
@@ -112,6 +136,38 @@ def fetch_training_data(db_path: Path) -> List[Dict]:
     print(f"Fetched {len(rows)} training samples from database")
     return rows
 
+def iter_query_groups(db_path: Path, chunk_size: int = CHUNK_SIZE) -> Iterator[List[Dict]]:
+    """
+    Stream training samples from the database, one query at a time.
+
+    Rows are read with fetchmany, so only one chunk plus the current query's
+    rows are in memory. Relies on TRAINING_QUERY ordering by query_id.
+
+    Yields:
+        List of row dicts belonging to the same query_id
+    """
+    conn = sqlite3.connect(db_path)
+    try:
+        cursor = conn.cursor()
+        cursor.execute(TRAINING_QUERY)
+        columns = [desc[0] for desc in cursor.description]
+
+        group: List[Dict] = []
+        while True:
+            chunk = cursor.fetchmany(chunk_size)
+            if not chunk:
+                break
+            for row in chunk:
+                row_dict = dict(zip(columns, row))
+                if group and row_dict['query_id'] != group[0]['query_id']:
+                    yield group
+                    group = []
+                group.append(row_dict)
+        if group:
+            yield group
+    finally:
+        conn.close()
+
 def compute_all_llm_scores_per_query(rows: List[Dict]) -> Dict[str, List[float]]:
     """
     Pre-compute all LLM scores per query for percentile calculation.
@@ -238,24 +294,7 @@ def export_to_csv(rows: List[Dict], output_path: Path) -> Tuple[int, Dict]:
     current_group_size = 0
 
     # Feature names for CSV header
-    feature_names = [
-        # Query (6)
-        'query_length', 'word_count', 'has_quotes', 'has_numbers',
-        'has_question_words', 'keyword_count',
-        # Document (8)
-        'doc_length', 'recency_days', 'has_author', 'has_publication_date',
-        'schema_completeness', 'title_length', 'description_length', 'url_length',
-        # Query-Document (7)
-        'vector_similarity', 'bm25_score', 'keyword_boost', 'temporal_boost',
-        'final_retrieval_score', 'keyword_overlap_ratio', 'title_exact_match',
-        # Ranking (6)
-        'retrieval_position', 'ranking_position', 'llm_final_score',
-        'relative_score_to_top', 'score_percentile', 'position_change',
-        # MMR (2)
-        'mmr_diversity_score', 'detected_intent',
-        # Label
-        'label'
-    ]
+    feature_names = FEATURE_NAMES + ['label']
 
     with open(output_path, 'w', newline='', encoding='utf-8') as f:
         writer = csv.writer(f)
@@ -299,8 +338,81 @@ def export_to_csv(rows: List[Dict], output_path: Path) -> Tuple[int, Dict]:
 
     return len(rows), metadata
 
+def export_to_parquet(db_path: Path, dataset_dir: Path, chunk_size: int = CHUNK_SIZE) -> Tuple[int, Dict]:
+    """
+    Stream training data into a day-partitioned Parquet dataset.
+
+    Columns: query_id, timestamp, the 29 features (float64) and label. Rows
+    of a query stay contiguous, so query groups can be recovered from
+    query_id runs when loading (see xgboost_trainer.load_training_data).
+
+    Args:
+        db_path: Analytics database
+        dataset_dir: Output directory (replaced if it exists)
+        chunk_size: Rows per cursor fetch and per Parquet row group
+
+    Returns:
+        Tuple of (num_rows_exported, metadata_dict)
+    """
+    columns = [('query_id', 'string'), ('timestamp', 'float64')]
+    columns += [(name, 'float64') for name in FEATURE_NAMES]
+    columns.append(('label', 'float64'))
+    schema = make_schema(columns, metadata={'feature_names': json.dumps(FEATURE_NAMES)})
+
+    # Like the CSV export, a new export replaces the previous one
+    if dataset_dir.exists():
+        shutil.rmtree(dataset_dir)
+
+    query_groups = []
+    total_rows = 0
+    buffer: List[Dict] = []
+    with PartitionedParquetWriter(dataset_dir, schema) as writer:
+        for group in iter_query_groups(db_path, chunk_size):
+            all_llm_scores = [row['llm_final_score'] for row in group]
+            for row in group:
+                features = extract_features_from_row(row, all_llm_scores)
+                record = dict(zip(FEATURE_NAMES, features))
+                record.update(query_id=row['query_id'], timestamp=row['timestamp'],
+                              label=row['llm_final_score'])
+                buffer.append(record)
+            query_groups.append(len(group))
+            total_rows += len(group)
+            if len(buffer) >= chunk_size:
+                writer.write(buffer)
+                buffer = []
+        if buffer:
+            writer.write(buffer)
+        rows_per_day = writer.rows_per_day
+
+    metadata = {
+        'feature_version': 'phase_a',
+        'format': 'parquet',
+        'expected_features': TOTAL_FEATURES_PHASE_A,
+        'feature_names': FEATURE_NAMES,
+        'total_samples': total_rows,
+        'total_queries': len(query_groups),
+        'query_groups': query_groups,
+        'rows_per_day': rows_per_day,
+        'label_type': 'llm_final_score',
+        'label_description': 'Synthetic labels from LLM ranking (0-100)',
+        'export_timestamp': Path(__file__).stat().st_mtime
+    }
+
+    return total_rows, metadata
+
 def main():
     """Main export function."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Export XGBoost training data')
+    parser.add_argument(
+        '--format',
+        choices=['csv', 'parquet'],
+        default='csv',
+        help='csv: single training_data.csv; parquet: day-partitioned dataset (requires pyarrow)'
+    )
+    args = parser.parse_args()
+
     print("=" * 60)
     print("XGBoost Training Data Export (Task B1)")
     print("=" * 60)
@@ -308,6 +420,10 @@ def main():
     # Get paths
     db_path = get_db_path()
     output_dir = get_output_dir()
+
+    if args.format == 'parquet':
+        main_parquet(db_path, output_dir)
+        return
     csv_path = output_dir / "training_data.csv"
     metadata_path = output_dir / "training_metadata.json"
 
@@ -346,5 +462,40 @@ def main():
     print(f"  - {metadata_path}")
     print("\nNext step: Run validate_training_data.py to verify data quality")
 
+def main_parquet(db_path: Path, output_dir: Path):
+    """Export to a Parquet dataset without materializing the join."""
+    if not PYARROW_AVAILABLE:
+        print("\nERROR: Parquet export requires pyarrow (pip install pyarrow)")
+        return
+
+    dataset_dir = output_dir / "training_data_parquet"
+    metadata_path = output_dir / "training_metadata.json"
+
+    print(f"\nDatabase: {db_path}")
+    print(f"Output dataset: {dataset_dir}")
+    print(f"Output Metadata: {metadata_path}")
+
+    print("\nStreaming training data from database...")
+    num_exported, metadata = export_to_parquet(db_path, dataset_dir)
+
+    if num_exported == 0:
+        print("\nERROR: No training data found!")
+        print("Verify that shadow mode has run and generated xgboost_shadow records.")
+        return
+
+    with open(metadata_path, 'w', encoding='utf-8') as f:
+        json.dump(metadata, f, indent=2, ensure_ascii=False)
+
+    print("\n" + "=" * 60)
+    print("[SUCCESS] Training data export complete!")
+    print("=" * 60)
+    print(f"Exported: {num_exported} samples")
+    print(f"Queries: {metadata['total_queries']}")
+    print(f"Days: {len(metadata['rows_per_day'])}")
+    print("\nFiles created:")
+    print(f"  - {dataset_dir}")
+    print(f"  - {metadata_path}")
+    print("\nNext step: python -m training.xgboost_trainer --data_path " + str(dataset_dir))
+
 if __name__ == '__main__':
     main()
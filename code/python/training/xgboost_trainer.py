@@ -15,6 +15,7 @@ Backwards compatibility is not guaranteed at this time.
 
 import os
 import json
+import time
 import numpy as np
 from datetime import datetime
 from typing import Dict, List, Tuple, Optional, Any
@@ -57,9 +58,60 @@ XGBRANKER_PARAMS = {
 }
 
 
+def load_parquet_training_data(
+    data_path: str,
+    days: Optional[int] = None
+) -> Tuple[np.ndarray, np.ndarray, List[int]]:
+    """
+    Load a Parquet training dataset written by export_training_data --format parquet.
+
+    Files are memory-mapped, so feature columns are read from the page cache
+    rather than copied through Python objects.
+
+    Args:
+        data_path: Dataset directory (day=YYYY-MM-DD partitions) or a single .parquet file
+        days: Only load samples from the last N days (None = all)
+
+    Returns:
+        Tuple of (X, y, query_groups); query groups are the query_id run lengths
+    """
+    import pyarrow.parquet as pq
+
+    filters = None
+    if days is not None:
+        filters = [('timestamp', '>', time.time() - days * 24 * 60 * 60)]
+
+    table = pq.read_table(data_path, memory_map=True, filters=filters)
+
+    metadata = table.schema.metadata or {}
+    if b'feature_names' in metadata:
+        feature_names = json.loads(metadata[b'feature_names'])
+    else:
+        reserved = {'query_id', 'timestamp', 'label', 'day'}
+        feature_names = [name for name in table.column_names if name not in reserved]
+
+    if table.num_rows == 0:
+        return np.empty((0, len(feature_names))), np.empty(0), []
+
+    X = np.column_stack([
+        table.column(name).to_numpy(zero_copy_only=False).astype(np.float64, copy=False)
+        for name in feature_names
+    ])
+    y = table.column('label').to_numpy(zero_copy_only=False).astype(np.float64, copy=False)
+
+    # Rows of a query are contiguous in the export
+    query_ids = table.column('query_id').to_numpy(zero_copy_only=False)
+    boundaries = np.flatnonzero(query_ids[1:] != query_ids[:-1]) + 1
+    query_groups = np.diff(np.concatenate(([0], boundaries, [len(query_ids)]))).tolist()
+
+    logger.info(f"Loaded {len(y)} samples, {len(query_groups)} queries from {data_path}")
+    return X, y, query_groups
+
+
 def load_training_data(
     days: int = 30,
-    min_clicks: int = 500
+    min_clicks: int = 500,
+    data_path: Optional[str] = None
 ) -> Tuple[np.ndarray, np.ndarray, Optional[List[int]]]:
     """
     Load training data from analytics database.
@@ -67,6 +119,7 @@ def load_training_data(
     Args:
         days: Number of days to look back
         min_clicks: Minimum number of clicks required
+        data_path: Parquet training dataset to load instead (see load_parquet_training_data)
 
     Returns:
         Tuple of:
@@ -78,6 +131,9 @@ def load_training_data(
     """
     logger.info(f"Loading training data: days={days}, min_clicks={min_clicks}")
 
+    if data_path:
+        return load_parquet_training_data(data_path, days=days)
+
     # Phase A: Return placeholder data
     logger.warning("load_training_data() not yet implemented (Phase A placeholder)")
     logger.info("Full implementation will be added in Phase C when training data is available")
@@ -348,6 +404,12 @@ def main():
         default=500,
         help='Minimum number of clicks required'
     )
+    parser.add_argument(
+        '--data_path',
+        type=str,
+        default=None,
+        help='Parquet training dataset from export_training_data --format parquet'
+    )
     parser.add_argument(
         '--output',
         type=str,
@@ -369,7 +431,9 @@ def main():
     logger.info(f"Starting training: model_type={args.model_type}, days={args.days}")
 
     # Load training data
-    X, y, query_groups = load_training_data(days=args.days, min_clicks=args.min_clicks)
+    X, y, query_groups = load_training_data(
+        days=args.days, min_clicks=args.min_clicks, data_path=args.data_path
+    )
 
     # Train model
     if args.model_type == 'binary':
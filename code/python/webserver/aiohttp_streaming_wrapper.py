@@ -10,12 +10,32 @@ import time
 import asyncio
 import json
 import logging
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 from aiohttp import web
 
+from core.config import CONFIG
+
+# orjson is optional (faster SSE encoding); json is used when it is missing
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
 logger = logging.getLogger(__name__)
 
 
+def encode_sse(message: Any) -> bytes:
+    """Encode a message as an SSE data frame."""
+    if ORJSON_AVAILABLE:
+        try:
+            return b"data: " + orjson.dumps(message) + b"\n\n"
+        except TypeError:
+            # Non-string keys, oversized ints, ... - let json handle (or reject) them
+            pass
+    return f"data: {json.dumps(message)}\n\n".encode()
+
+
 class AioHttpStreamingWrapper:
     """
     Wrapper to make aiohttp StreamResponse compatible with existing NLWeb handlers.
@@ -40,6 +60,24 @@ class AioHttpStreamingWrapper:
         # For compatibility with existing handlers
         self.generate_mode = query_params.get('generate_mode', 'none')
         
+        # Frame coalescing: frames written within window_ms go out in one write
+        sse_params = CONFIG.sse_params
+        self.coalesce = sse_params.get('coalesce', True)
+        self.coalesce_window = sse_params.get('window_ms', 5) / 1000
+        self.max_buffer_bytes = sse_params.get('max_buffer_bytes', 65536)
+        self._buffer: List[bytes] = []
+        self._buffered_bytes = 0
+        self._buffered_since = 0.0
+        self._flush_task: Optional[asyncio.Task] = None
+        self._write_lock = asyncio.Lock()
+        
+        # Per-stream write statistics
+        self.frames_written = 0
+        self.bytes_written = 0
+        self.writes = 0
+        self.total_flush_latency = 0.0
+        self.max_flush_latency = 0.0
+        
     async def start_heartbeat(self):
         """Start sending SSE keepalive messages"""
         try:
@@ -79,15 +117,19 @@ class AioHttpStreamingWrapper:
                 self.connection_alive = False
                 return
             
-            # Format as SSE
-            data = f"data: {json.dumps(message)}\n\n"
-            await self.response.write(data.encode())
-            
-            # Yield control
-            await asyncio.sleep(0)
+            frame = encode_sse(message)
+            if self.coalesce:
+                self._buffer_frame(frame)
+                if end_response or self._buffered_bytes >= self.max_buffer_bytes:
+                    await self.flush()
+            else:
+                await self._write_frames([frame], time.monotonic())
+                # Yield control
+                await asyncio.sleep(0)
             
             if end_response:
                 self.connection_alive = False
+                self._cancel_pending_flush()
                 if self.heartbeat_task:
                     self.heartbeat_task.cancel()
                     
@@ -97,6 +139,66 @@ class AioHttpStreamingWrapper:
             if self.heartbeat_task:
                 self.heartbeat_task.cancel()
     
+    def _buffer_frame(self, frame: bytes) -> None:
+        """Queue a frame and make sure a flush is scheduled for the end of the window"""
+        if not self._buffer:
+            self._buffered_since = time.monotonic()
+        self._buffer.append(frame)
+        self._buffered_bytes += len(frame)
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_after_window())
+    
+    async def _flush_after_window(self) -> None:
+        # A zero window still collects every frame produced in the current loop tick
+        await asyncio.sleep(self.coalesce_window)
+        await self.flush()
+    
+    def _cancel_pending_flush(self) -> None:
+        if self._flush_task and not self._flush_task.done() and self._flush_task is not asyncio.current_task():
+            self._flush_task.cancel()
+        self._flush_task = None
+    
+    async def flush(self) -> None:
+        """Write all buffered frames in a single write"""
+        async with self._write_lock:
+            if not self._buffer:
+                return
+            frames, self._buffer = self._buffer, []
+            self._buffered_bytes = 0
+            if self.response._eof_sent:
+                # Someone closed the response behind our back; writing now would fail
+                logger.warning(f"Dropping {len(frames)} SSE frames buffered after EOF on {self.path}")
+                return
+            try:
+                await self._write_frames(frames, self._buffered_since)
+            except Exception as e:
+                logger.debug(f"Error writing to stream: {e}")
+                self.connection_alive = False
+                if self.heartbeat_task:
+                    self.heartbeat_task.cancel()
+    
+    async def _write_frames(self, frames: List[bytes], queued_at: float) -> None:
+        data = frames[0] if len(frames) == 1 else b"".join(frames)
+        await self.response.write(data)
+        latency = time.monotonic() - queued_at
+        self.frames_written += len(frames)
+        self.bytes_written += len(data)
+        self.writes += 1
+        self.total_flush_latency += latency
+        self.max_flush_latency = max(self.max_flush_latency, latency)
+    
+    def get_stream_stats(self) -> Dict[str, Any]:
+        """Bytes, frames and flush latency for this stream"""
+        return {
+            "frames": self.frames_written,
+            "bytes": self.bytes_written,
+            "writes": self.writes,
+            "frames_per_write": self.frames_written / self.writes if self.writes else 0,
+            "avg_flush_latency_ms": self.total_flush_latency / self.writes * 1000 if self.writes else 0,
+            "max_flush_latency_ms": self.max_flush_latency * 1000,
+            "buffered_frames": len(self._buffer)
+        }
+    
     async def sendMessage(self, message: Dict[str, Any]):
         """
         Send a message - compatibility method for existing handlers.
@@ -129,7 +231,13 @@ class AioHttpStreamingWrapper:
         self.heartbeat_task = asyncio.create_task(self.start_heartbeat())
     
     async def finish_response(self):
-        """Clean up the response"""
+        """Flush buffered frames and close the response - use this instead of response.write_eof()"""
+        # Frames still inside the coalescing window go out before EOF, and the
+        # scheduled window flush must not fire after it
+        await self.flush()
+        self._cancel_pending_flush()
+        logger.debug(f"SSE stream {self.path} finished: {self.get_stream_stats()}")
+        
         if self.heartbeat_task:
             self.heartbeat_task.cancel()
             try:
@@ -137,7 +245,7 @@ class AioHttpStreamingWrapper:
             except asyncio.CancelledError:
                 pass
         
-        if self.connection_alive and not self.response._eof_sent:
+        if not self.response._eof_sent:
             try:
                 await self.response.write_eof()
             except Exception:
@@ -169,8 +277,7 @@ class AioHttpSendChunkWrapper:
             
             if isinstance(chunk, dict):
                 # Format as SSE data
-                message = f"data: {json.dumps(chunk)}\n\n"
-                await self.response.write(message.encode())
+                await self.response.write(encode_sse(chunk))
             elif isinstance(chunk, str):
                 await self.response.write(chunk.encode())
             elif isinstance(chunk, bytes):
@@ -194,8 +301,7 @@ class AioHttpSendChunkWrapper:
             return
             
         try:
-            data_message = f"data: {json.dumps(message)}\n\n"
-            await self.response.write(data_message.encode())
+            await self.response.write(encode_sse(message))
             
             if end_response:
                 self.closed = True
@@ -13,6 +13,7 @@ WARNING: This code is under development and may undergo changes in future releas
 Backwards compatibility is not guaranteed at this time.
 """
 
+import asyncio
 import json
 import csv
 import io
@@ -22,9 +23,95 @@ from pathlib import Path
 import time
 from misc.logger.logging_config_helper import get_configured_logger
 from core.analytics_db import AnalyticsDB
+from core.analytics_rollup import AnalyticsRollups
+from core.parquet_export import PYARROW_AVAILABLE, iter_parquet_bytes, make_schema
 
 logger = get_configured_logger("analytics_handler")
 
+# Rows fetched per server-side cursor round trip during exports
+EXPORT_CHUNK_SIZE = 5000
+
+# Refresh rollups on read if the QueryLogger worker has not done so for this long
+ROLLUP_MAX_AGE_SECONDS = 300
+
+# Raw-log export columns (Schema v2) with their Parquet types
+TRAINING_EXPORT_COLUMNS = [
+    ('query_id', 'string'), ('query_text', 'string'), ('query_length_words', 'int64'),
+    ('query_length_chars', 'int64'), ('has_temporal_indicator', 'int64'),
+    ('doc_url', 'string'), ('doc_title', 'string'), ('doc_length', 'int64'),
+    ('title_exact_match', 'int64'), ('desc_exact_match', 'int64'),
+    ('keyword_overlap_ratio', 'float64'), ('recency_days', 'int64'), ('has_author', 'int64'),
+    ('vector_similarity_score', 'float64'), ('keyword_boost_score', 'float64'),
+    ('bm25_score', 'float64'), ('final_retrieval_score', 'float64'),
+    ('retrieval_position', 'int64'), ('retrieval_algorithm', 'string'),
+    ('llm_final_score', 'float64'), ('relative_score', 'float64'), ('score_percentile', 'float64'),
+    ('ranking_position', 'int64'), ('ranking_method', 'string'),
+    ('clicked', 'int64'), ('dwell_time_ms', 'float64'), ('mode', 'string'),
+    ('query_latency_ms', 'float64'), ('schema_version', 'int64'), ('timestamp', 'float64'),
+]
+
+# CSV keeps its original column set (no raw timestamp)
+TRAINING_EXPORT_CSV_HEADERS = [name for name, _ in TRAINING_EXPORT_COLUMNS if name != 'timestamp']
+
+TRAINING_EXPORT_SQL = """
+    SELECT
+        q.query_id,
+        q.query_text,
+        q.query_length_words,
+        q.query_length_chars,
+        q.has_temporal_indicator,
+        rd.doc_url,
+        rd.doc_title,
+        rd.doc_length,
+        rd.title_exact_match,
+        rd.desc_exact_match,
+        rd.keyword_overlap_ratio,
+        rd.recency_days,
+        rd.has_author,
+        rd.vector_similarity_score,
+        rd.keyword_boost_score,
+        rd.bm25_score,
+        rd.final_retrieval_score,
+        rd.retrieval_position,
+        rd.retrieval_algorithm,
+        rs.llm_final_score,
+        rs.relative_score,
+        rs.score_percentile,
+        rs.ranking_position,
+        rs.ranking_method,
+        CASE WHEN ui.clicked = 1 THEN 1 ELSE 0 END as clicked,
+        COALESCE(ui.dwell_time_ms, 0) as dwell_time_ms,
+        q.mode,
+        q.latency_total_ms AS query_latency_ms,
+        q.schema_version,
+        q.timestamp
+    FROM queries q
+    LEFT JOIN retrieved_documents rd ON q.query_id = rd.query_id
+    LEFT JOIN ranking_scores rs ON q.query_id = rs.query_id AND rd.doc_url = rs.doc_url
+    LEFT JOIN user_interactions ui ON q.query_id = ui.query_id AND rd.doc_url = ui.doc_url
+    WHERE q.timestamp > {ph} AND rd.doc_url IS NOT NULL
+    ORDER BY q.timestamp DESC, rd.retrieval_position ASC
+"""
+
+
+def _iter_csv_bytes(chunks, headers):
+    """Encode row chunks as CSV, one piece per chunk, starting with a UTF-8 BOM and header."""
+    output = io.StringIO()
+    writer = csv.writer(output)
+    # UTF-8 BOM for proper Chinese character display in Excel
+    output.write('\ufeff')
+    writer.writerow(headers)
+    for rows in chunks:
+        for row in rows:
+            writer.writerow([row.get(header) for header in headers])
+        yield output.getvalue().encode('utf-8')
+        output.seek(0)
+        output.truncate(0)
+    # Header-only export when there are no rows
+    remaining = output.getvalue()
+    if remaining:
+        yield remaining.encode('utf-8')
+
 
 class AnalyticsHandler:
     """
@@ -40,6 +127,8 @@ class AnalyticsHandler:
                      If None, uses absolute path from project root.
         """
         self.db = AnalyticsDB(db_path)
+        self.rollups = AnalyticsRollups(self.db)
+        self._rollups_ready = False
         logger.info(f"Analytics handler initialized with {self.db.db_type} database")
 
     def _get_connection(self):
@@ -50,9 +139,22 @@ class AnalyticsHandler:
         """Get SQL placeholder for current database type."""
         return "%s" if self.db.db_type == 'postgres' else "?"
 
+    def _prepare_rollups(self):
+        """Create the rollup tables if needed and refresh the recent buckets when stale."""
+        if not self._rollups_ready:
+            with self.db.connection(write=True) as conn:
+                self.rollups.ensure_tables(conn)
+            self._rollups_ready = True
+        self.rollups.refresh_if_stale(ROLLUP_MAX_AGE_SECONDS)
+
+    async def _read_rollups(self, read, *args):
+        """Read from the rollup tables on a pooled reader after bringing them up to date."""
+        await asyncio.to_thread(self._prepare_rollups)
+        return await self.db.run_sync(read, *args)
+
     async def get_stats(self, request: web.Request) -> web.Response:
         """
-        Get overall statistics.
+        Get overall statistics (from the hourly rollup, to the hour).
 
         Query params:
             days: Number of days to look back (default: 7)
@@ -61,81 +163,19 @@ class AnalyticsHandler:
             days = int(request.query.get('days', 7))
             cutoff_timestamp = time.time() - (days * 24 * 60 * 60)
 
-            conn = self._get_connection()
-            cursor = conn.cursor()
-            ph = self._get_placeholder()  # SQL placeholder (? or %s)
-
-            # Helper to extract value from fetchone() result (handles both dict and tuple)
-            def get_val(result):
-                if result is None:
-                    return 0
-                if isinstance(result, dict):
-                    return list(result.values())[0] or 0
-                return result[0] or 0
-
-            # Total queries
-            cursor.execute(f"""
-                SELECT COUNT(*) FROM queries WHERE timestamp > {ph}
-            """, (cutoff_timestamp,))
-            total_queries = get_val(cursor.fetchone())
-
-            # Queries per day
-            queries_per_day = total_queries / days if days > 0 else 0
-
-            # Average latency
-            cursor.execute(f"""
-                SELECT AVG(latency_total_ms) FROM queries
-                WHERE timestamp > {ph} AND latency_total_ms IS NOT NULL
-            """, (cutoff_timestamp,))
-            avg_latency = get_val(cursor.fetchone())
-
-            # Total cost
-            cursor.execute(f"""
-                SELECT SUM(cost_usd) FROM queries
-                WHERE timestamp > {ph} AND cost_usd IS NOT NULL
-            """, (cutoff_timestamp,))
-            total_cost = get_val(cursor.fetchone())
-
-            # Cost per query
-            cost_per_query = total_cost / total_queries if total_queries > 0 else 0
-
-            # Error rate
-            cursor.execute(f"""
-                SELECT COUNT(*) FROM queries
-                WHERE timestamp > {ph} AND error_occurred = 1
-            """, (cutoff_timestamp,))
-            error_count = get_val(cursor.fetchone())
-            error_rate = error_count / total_queries if total_queries > 0 else 0
-
-            # Click-through rate
-            cursor.execute(f"""
-                SELECT COUNT(DISTINCT query_id) FROM user_interactions
-                WHERE interaction_timestamp > {ph} AND clicked = 1
-            """, (cutoff_timestamp,))
-            queries_with_clicks = get_val(cursor.fetchone())
-            ctr = queries_with_clicks / total_queries if total_queries > 0 else 0
-
-            # Training samples (query-document pairs from raw logs)
-            # Phase 1: Count from retrieved_documents instead of feature_vectors
-            cursor.execute(f"""
-                SELECT COUNT(*) FROM retrieved_documents
-                WHERE query_id IN (
-                    SELECT query_id FROM queries WHERE timestamp > {ph}
-                )
-            """, (cutoff_timestamp,))
-            training_samples = get_val(cursor.fetchone())
-
-            conn.close()
+            totals = await self._read_rollups(self.rollups.read_stats, cutoff_timestamp)
 
+            total_queries = totals["total_queries"]
             stats = {
                 "total_queries": total_queries,
-                "queries_per_day": queries_per_day,
-                "avg_latency_ms": avg_latency,
-                "total_cost_usd": total_cost,
-                "cost_per_query": cost_per_query,
-                "error_rate": error_rate,
-                "click_through_rate": ctr,
-                "training_samples": training_samples,
+                "queries_per_day": total_queries / days if days > 0 else 0,
+                "avg_latency_ms": totals["avg_latency_ms"],
+                "total_cost_usd": totals["total_cost_usd"],
+                "cost_per_query": totals["total_cost_usd"] / total_queries if total_queries > 0 else 0,
+                "error_rate": totals["error_count"] / total_queries if total_queries > 0 else 0,
+                "click_through_rate": totals["queries_with_clicks"] / total_queries if total_queries > 0 else 0,
+                # Training samples (query-document pairs from raw logs)
+                "training_samples": totals["training_samples"],
                 "days": days
             }
 
@@ -148,6 +188,51 @@ class AnalyticsHandler:
                 status=500
             )
 
+    def _fetch_queries(self, conn, cutoff_timestamp: float, limit: int):
+        """Recent parent queries with click counts (indexed on timestamp, bounded by limit)."""
+        ph = self._get_placeholder()
+        cursor = conn.cursor()
+
+        # Get queries with CTR (only parent queries, exclude generate mode children)
+        cursor.execute(f"""
+            SELECT
+                q.query_id,
+                q.query_text,
+                q.timestamp,
+                q.site,
+                q.mode,
+                q.latency_total_ms,
+                q.num_results_returned,
+                q.cost_usd,
+                (SELECT COUNT(*) FROM user_interactions
+                 WHERE query_id = q.query_id AND clicked = 1) as clicks
+            FROM queries q
+            WHERE q.timestamp > {ph} AND q.parent_query_id IS NULL
+            ORDER BY q.timestamp DESC
+            LIMIT {ph}
+        """, (cutoff_timestamp, limit))
+
+        queries = []
+        for row in cursor.fetchall():
+            # Safely calculate CTR, handle None values
+            num_results = int(row['num_results_returned']) if row['num_results_returned'] is not None else 0
+            clicks = int(row['clicks']) if row['clicks'] is not None else 0
+            ctr = clicks / num_results if num_results > 0 else 0
+
+            queries.append({
+                "query_id": row['query_id'],
+                "query_text": row['query_text'],
+                "timestamp": row['timestamp'],
+                "site": row['site'],
+                "mode": row['mode'],
+                "latency_total_ms": row['latency_total_ms'],
+                "num_results_returned": num_results,
+                "cost_usd": row['cost_usd'],
+                "clicks": clicks,
+                "ctr": ctr
+            })
+        return queries
+
     async def get_queries(self, request: web.Request) -> web.Response:
         """
         Get recent queries with metrics.
@@ -161,67 +246,7 @@ class AnalyticsHandler:
             limit = int(request.query.get('limit', 50))
             cutoff_timestamp = time.time() - (days * 24 * 60 * 60)
 
-            conn = self._get_connection()
-            cursor = conn.cursor()
-            ph = self._get_placeholder()
-
-            # Get queries with CTR (only parent queries, exclude generate mode children)
-            cursor.execute(f"""
-                SELECT
-                    q.query_id,
-                    q.query_text,
-                    q.timestamp,
-                    q.site,
-                    q.mode,
-                    q.latency_total_ms,
-                    q.num_results_returned,
-                    q.cost_usd,
-                    (SELECT COUNT(*) FROM user_interactions
-                     WHERE query_id = q.query_id AND clicked = 1) as clicks
-                FROM queries q
-                WHERE q.timestamp > {ph} AND q.parent_query_id IS NULL
-                ORDER BY q.timestamp DESC
-                LIMIT {ph}
-            """, (cutoff_timestamp, limit))
-
-            rows = cursor.fetchall()
-            queries = []
-
-            for row in rows:
-                # Handle both dict (PostgreSQL) and tuple (SQLite) row formats
-                if isinstance(row, dict):
-                    query_id = row['query_id']
-                    query_text = row['query_text']
-                    timestamp = row['timestamp']
-                    site = row['site']
-                    mode = row['mode']
-                    latency = row['latency_total_ms']
-                    num_results = row['num_results_returned']
-                    cost = row['cost_usd']
-                    clicks = row['clicks']
-                else:
-                    query_id, query_text, timestamp, site, mode, latency, num_results, cost, clicks = row
-
-                # Safely calculate CTR, handle None values
-                num_results = int(num_results) if num_results is not None else 0
-                clicks = int(clicks) if clicks is not None else 0
-                ctr = clicks / num_results if num_results > 0 else 0
-
-                queries.append({
-                    "query_id": query_id,
-                    "query_text": query_text,
-                    "timestamp": timestamp,
-                    "site": site,
-                    "mode": mode,
-                    "latency_total_ms": latency,
-                    "num_results_returned": num_results,
-                    "cost_usd": cost,
-                    "clicks": clicks,
-                    "ctr": ctr
-                })
-
-            conn.close()
-
+            queries = await self.db.run_sync(self._fetch_queries, cutoff_timestamp, limit)
             return web.json_response(queries)
 
         except Exception as e:
@@ -233,7 +258,7 @@ class AnalyticsHandler:
 
     async def get_top_clicks(self, request: web.Request) -> web.Response:
         """
-        Get top clicked results.
+        Get top clicked results (from the daily click rollup, to the day).
 
         Query params:
             days: Number of days to look back (default: 7)
@@ -244,51 +269,7 @@ class AnalyticsHandler:
             limit = int(request.query.get('limit', 20))
             cutoff_timestamp = time.time() - (days * 24 * 60 * 60)
 
-            conn = self._get_connection()
-            cursor = conn.cursor()
-            ph = self._get_placeholder()
-
-            # Get most clicked URLs with average position and dwell time
-            cursor.execute(f"""
-                SELECT
-                    ui.doc_url,
-                    rd.doc_title,
-                    COUNT(*) as click_count,
-                    AVG(ui.result_position) as avg_position,
-                    AVG(ui.dwell_time_ms) as avg_dwell_time
-                FROM user_interactions ui
-                LEFT JOIN retrieved_documents rd ON ui.doc_url = rd.doc_url
-                WHERE ui.clicked = 1
-                  AND ui.interaction_timestamp > {ph}
-                GROUP BY ui.doc_url, rd.doc_title
-                ORDER BY click_count DESC
-                LIMIT {ph}
-            """, (cutoff_timestamp, limit))
-
-            rows = cursor.fetchall()
-            clicks = []
-
-            for row in rows:
-                # Handle both dict (PostgreSQL) and tuple (SQLite) row formats
-                if isinstance(row, dict):
-                    doc_url = row['doc_url']
-                    doc_title = row['doc_title']
-                    click_count = row['click_count']
-                    avg_position = row['avg_position']
-                    avg_dwell_time = row['avg_dwell_time']
-                else:
-                    doc_url, doc_title, click_count, avg_position, avg_dwell_time = row
-
-                clicks.append({
-                    "doc_url": doc_url,
-                    "doc_title": doc_title,
-                    "click_count": int(click_count) if click_count else 0,
-                    "avg_position": float(avg_position) if avg_position else None,
-                    "avg_dwell_time": float(avg_dwell_time) if avg_dwell_time else None
-                })
-
-            conn.close()
-
+            clicks = await self._read_rollups(self.rollups.read_top_clicks, cutoff_timestamp, limit)
             return web.json_response(clicks)
 
         except Exception as e:
@@ -298,131 +279,71 @@ class AnalyticsHandler:
                 status=500
             )
 
-    async def export_training_data(self, request: web.Request) -> web.Response:
+    async def export_training_data(self, request: web.Request) -> web.StreamResponse:
         """
-        Export training data as CSV from raw logs.
+        Export training data from raw logs as a streamed CSV or Parquet download.
 
         Phase 1: Exports raw interaction data from 4 tables (queries, retrieved_documents,
         ranking_scores, user_interactions) for ML model training.
 
+        Rows are read from a server-side cursor in chunks and written to the
+        response as they are encoded, so the export never holds the whole join
+        in memory.
+
         Query params:
             days: Number of days to look back (default: 7)
+            format: csv (default) or parquet
         """
+        export_format = request.query.get('format', 'csv')
+        if export_format not in ('csv', 'parquet'):
+            return web.json_response({"error": "format must be csv or parquet"}, status=400)
+        if export_format == 'parquet' and not PYARROW_AVAILABLE:
+            return web.json_response({"error": "Parquet export requires pyarrow"}, status=501)
+
         try:
             days = int(request.query.get('days', 7))
             cutoff_timestamp = time.time() - (days * 24 * 60 * 60)
 
-            conn = self._get_connection()
-            cursor = conn.cursor()
-            ph = self._get_placeholder()
-
-            # Debug: check database type and tables
-            logger.info(f"Export: Using {self.db.db_type} database")
-
-            # Get table names (different SQL for SQLite vs PostgreSQL)
-            if self.db.db_type == 'postgres':
-                cursor.execute("SELECT tablename FROM pg_tables WHERE schemaname = 'public'")
-            else:
-                cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
-
-            # Handle both dict and tuple results
-            table_rows = cursor.fetchall()
-            if table_rows and isinstance(table_rows[0], dict):
-                tables = [list(row.values())[0] for row in table_rows]
-            else:
-                tables = [row[0] for row in table_rows]
-            logger.info(f"Export: Available tables: {tables}")
-
-            # Export raw logs for ML training
-            logger.info(f"Exporting raw logs from last {days} days (Schema v2)")
-            cursor.execute(f"""
-                SELECT
-                    q.query_id,
-                    q.query_text,
-                    q.query_length_words,
-                    q.query_length_chars,
-                    q.has_temporal_indicator,
-                    rd.doc_url,
-                    rd.doc_title,
-                    rd.doc_length,
-                    rd.title_exact_match,
-                    rd.desc_exact_match,
-                    rd.keyword_overlap_ratio,
-                    rd.recency_days,
-                    rd.has_author,
-                    rd.vector_similarity_score,
-                    rd.keyword_boost_score,
-                    rd.bm25_score,
-                    rd.final_retrieval_score,
-                    rd.retrieval_position,
-                    rd.retrieval_algorithm,
-                    rs.llm_final_score,
-                    rs.relative_score,
-                    rs.score_percentile,
-                    rs.ranking_position,
-                    rs.ranking_method,
-                    CASE WHEN ui.clicked = 1 THEN 1 ELSE 0 END as clicked,
-                    COALESCE(ui.dwell_time_ms, 0) as dwell_time_ms,
-                    q.mode,
-                    q.latency_total_ms,
-                    q.schema_version
-                FROM queries q
-                LEFT JOIN retrieved_documents rd ON q.query_id = rd.query_id
-                LEFT JOIN ranking_scores rs ON q.query_id = rs.query_id AND rd.doc_url = rs.doc_url
-                LEFT JOIN user_interactions ui ON q.query_id = ui.query_id AND rd.doc_url = ui.doc_url
-                WHERE q.timestamp > {ph} AND rd.doc_url IS NOT NULL
-                ORDER BY q.timestamp DESC, rd.retrieval_position ASC
-            """, (cutoff_timestamp,))
-
-            rows = cursor.fetchall()
-            headers = [
-                'query_id', 'query_text', 'query_length_words', 'query_length_chars', 'has_temporal_indicator',
-                'doc_url', 'doc_title', 'doc_length', 'title_exact_match', 'desc_exact_match',
-                'keyword_overlap_ratio', 'recency_days', 'has_author',
-                'vector_similarity_score', 'keyword_boost_score', 'bm25_score', 'final_retrieval_score',
-                'retrieval_position', 'retrieval_algorithm',
-                'llm_final_score', 'relative_score', 'score_percentile', 'ranking_position', 'ranking_method',
-                'clicked', 'dwell_time_ms', 'mode', 'query_latency_ms', 'schema_version'
-            ]
-
-            conn.close()
-
-            # Create CSV
-            output = io.StringIO()
-            writer = csv.writer(output)
-
-            # Write header
-            writer.writerow(headers)
-
-            # Write data rows
-            for row in rows:
-                # Handle both dict (PostgreSQL) and tuple (SQLite)
-                if isinstance(row, dict):
-                    writer.writerow([row.get(header) for header in headers])
-                else:
-                    writer.writerow(row)
-
-            # Return CSV file with UTF-8 BOM for proper Chinese character display in Excel
-            csv_data = '\ufeff' + output.getvalue()  # Add UTF-8 BOM
-            output.close()
-
-            return web.Response(
-                body=csv_data.encode('utf-8'),
-                content_type='text/csv',
-                charset='utf-8',
-                headers={
-                    'Content-Disposition': f'attachment; filename="training_data_{int(time.time())}.csv"'
-                }
-            )
-
+            # Pooled connection: chunks are fetched in worker threads
+            conn = await asyncio.to_thread(self.db.acquire)
+        except Exception as e:
+            logger.error(f"Error exporting training data: {e}")
+            return web.json_response({"error": str(e)}, status=500)
+
+        logger.info(f"Exporting raw logs from last {days} days as {export_format} ({self.db.db_type})")
+        chunks = self.db.stream_query(
+            conn, TRAINING_EXPORT_SQL.format(ph=self._get_placeholder()), (cutoff_timestamp,),
+            chunk_size=EXPORT_CHUNK_SIZE
+        )
+        if export_format == 'parquet':
+            encoded = iter_parquet_bytes(chunks, make_schema(TRAINING_EXPORT_COLUMNS))
+            content_type = 'application/vnd.apache.parquet'
+        else:
+            encoded = _iter_csv_bytes(chunks, TRAINING_EXPORT_CSV_HEADERS)
+            content_type = 'text/csv; charset=utf-8'
+
+        response = web.StreamResponse(headers={
+            'Content-Type': content_type,
+            'Content-Disposition': f'attachment; filename="training_data_{int(time.time())}.{export_format}"'
+        })
+        try:
+            await response.prepare(request)
+            while True:
+                # Fetching and encoding a chunk is blocking work; keep it off the event loop
+                data = await asyncio.to_thread(next, encoded, None)
+                if data is None:
+                    break
+                await response.write(data)
+            await response.write_eof()
         except Exception as e:
             import traceback
+            # Headers are already sent, so the client sees a truncated download
             logger.error(f"Error exporting training data: {e}")
             logger.error(traceback.format_exc())
-            return web.json_response(
-                {"error": str(e)},
-                status=500
-            )
+        finally:
+            encoded.close()
+            self.db.release(conn)
+        return response
 
     async def handle_analytics_event(self, request: web.Request) -> web.Response:
         """
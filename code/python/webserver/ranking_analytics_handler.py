@@ -95,60 +95,39 @@ class RankingAnalyticsHandler:
         limit = int(request.query.get('limit', 10))
         
         try:
-            conn = self._get_connection()
-            cursor = conn.cursor()
-            placeholder = self._get_placeholder()
-            
-            # 1. Get query info
-            cursor.execute(f"SELECT * FROM queries WHERE query_id = {placeholder}", (query_id,))
-            query_row = cursor.fetchone()
-            
-            if not query_row:
+            # Pooled reads run off the event loop; ? placeholders are adapted per backend
+            query_data = await self.db.fetch_one("SELECT * FROM queries WHERE query_id = ?", (query_id,))
+
+            if not query_data:
                 return web.json_response({'error': 'Query not found'}, status=404)
-                
-            # Convert row to dict
-            if self.db.db_type == 'postgres':
-                query_data = dict(query_row)
-            else:
-                columns = [description[0] for description in cursor.description]
-                query_data = dict(zip(columns, query_row))
-                
+
             # 2. Get Pipeline Stats (Counts)
-            # Count retrieved
-            cursor.execute(f"SELECT COUNT(*) FROM retrieved_documents WHERE query_id = {placeholder}", (query_id,))
-            retrieved_count = cursor.fetchone()[0]
-            
-            # Count ranked
-            cursor.execute(f"SELECT COUNT(*) FROM ranking_scores WHERE query_id = {placeholder}", (query_id,))
-            ranked_count = cursor.fetchone()[0]
-            
+            counts = await self.db.fetch_one("""
+                SELECT
+                    (SELECT COUNT(*) FROM retrieved_documents WHERE query_id = ?) AS retrieved_count,
+                    (SELECT COUNT(*) FROM ranking_scores WHERE query_id = ?) AS ranked_count
+            """, (query_id, query_id))
+            retrieved_count = counts['retrieved_count']
+            ranked_count = counts['ranked_count']
+
             # 3. Get Top K Ranked Documents (The "Output")
             # We use GROUP BY doc_url to merge duplicate rows (e.g. separate LLM and MMR log entries)
             # MAX(llm_snippet) ensures we get the non-empty snippet if it exists in one of the rows
-            cursor.execute(f"""
-                SELECT 
+            ranking_scores = await self.db.fetch_all("""
+                SELECT
                     doc_url,
                     MAX(llm_final_score) as llm_final_score,
                     MAX(llm_snippet) as llm_snippet,
                     MAX(mmr_diversity_score) as mmr_diversity_score,
                     MAX(xgboost_score) as xgboost_score,
                     MAX(final_ranking_score) as final_ranking_score
-                FROM ranking_scores 
-                WHERE query_id = {placeholder} 
+                FROM ranking_scores
+                WHERE query_id = ?
                 GROUP BY doc_url
                 ORDER BY final_ranking_score DESC
-                LIMIT {limit}
-            """, (query_id,))
-            
-            ranking_scores = []
-            if self.db.db_type == 'postgres':
-                ranking_scores = [dict(row) for row in cursor.fetchall()]
-            else:
-                columns = [description[0] for description in cursor.description]
-                ranking_scores = [dict(zip(columns, row)) for row in cursor.fetchall()]
-                
-            conn.close()
-            
+                LIMIT ?
+            """, (query_id, limit))
+
             response = {
                 'query': query_data,
                 'stats': {
@@ -377,9 +377,9 @@ async def deep_research_handler(request: web.Request) -> web.Response:
             # Note: Research report is now passed directly from frontend to backend
             # via query_params in free conversation mode, no DB storage needed
 
-        # Close the stream
+        # Close the stream (finish_response flushes the coalesced frames before EOF)
         await wrapper.write_stream({"message_type": "complete"})
-        await response.write_eof()
+        await wrapper.finish_response()
 
         return response
 
@@ -391,7 +391,7 @@ async def deep_research_handler(request: web.Request) -> web.Response:
         }
         try:
             await wrapper.write_stream(error_data)
-            await response.write_eof()
+            await wrapper.finish_response()
         except:
             pass
         return web.json_response(error_data, status=500)
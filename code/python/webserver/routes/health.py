@@ -1,5 +1,6 @@
 """Health check routes for aiohttp server"""
 
+import asyncio
 from aiohttp import web
 import logging
 import time
@@ -15,6 +16,9 @@ def setup_health_routes(app: web.Application):
     """Setup health check routes"""
     app.router.add_get('/health', health_check)
     app.router.add_get('/ready', readiness_check)
+    app.router.add_get('/health/llm', llm_scheduler_stats)
+    app.router.add_get('/health/analytics', analytics_writer_stats)
+    app.router.add_get('/health/cache', results_cache_stats)
 
 
 async def health_check(request: web.Request) -> web.Response:
@@ -63,4 +67,39 @@ async def readiness_check(request: web.Request) -> web.Response:
         'status': 'ready' if all_ready else 'not_ready',
         'checks': checks,
         'timestamp': datetime.utcnow().isoformat()
-    }, status=status_code)
\ No newline at end of file
+    }, status=status_code)
+
+async def llm_scheduler_stats(request: web.Request) -> web.Response:
+    """LLM scheduler queue depth, in-flight calls and wait times per endpoint"""
+    from core.llm import get_llm_scheduler
+
+    scheduler = get_llm_scheduler()
+    return web.json_response({
+        'enabled': scheduler is not None,
+        'endpoints': scheduler.get_stats() if scheduler else {},
+        'timestamp': datetime.utcnow().isoformat()
+    })
+
+
+async def analytics_writer_stats(request: web.Request) -> web.Response:
+    """Analytics writer throughput, queue backlog, write lag and connection pool saturation"""
+    from core.query_logger import get_query_logger
+
+    query_logger = get_query_logger()
+    return web.json_response({
+        'writer': query_logger.get_writer_stats(),
+        'pools': query_logger.db.get_pool_stats(),
+        'timestamp': datetime.utcnow().isoformat()
+    })
+
+
+async def results_cache_stats(request: web.Request) -> web.Response:
+    """List/generate results cache backend, size and hit rate"""
+    from core.results_cache import get_results_cache
+
+    # Counting entries is a query on the sqlite backend
+    stats = await asyncio.to_thread(get_results_cache().get_stats)
+    return web.json_response({
+        'results_cache': stats,
+        'timestamp': datetime.utcnow().isoformat()
+    })